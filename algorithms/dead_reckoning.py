@@ -0,0 +1,167 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: dead_reckoning.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Détection de changement pour l'ingestion des positions
+Air Traffic Management - RDC
+
+Les sources externes renvoient souvent la même position d'un appel à l'autre
+(AviationStack ne rafraîchit `live.updated` que toutes les quelques minutes).
+Le détecteur garde, par avion, le dernier point écrit et ne laisse passer un
+nouveau point que s'il apporte une information :
+- nouvel horodatage source,
+- écart à la position extrapolée (cap + vitesse) supérieur à la tolérance,
+- changement d'altitude ou d'état sol/vol,
+- ou silence prolongé (point de contrôle périodique).
+"""
+
+import os
+import math
+import time
+import threading
+from datetime import datetime
+
+EARTH_RADIUS_M = 6371000.0
+KNOT_TO_MS = 0.514444
+
+
+def parse_source_timestamp(value):
+    """Source timestamp (epoch seconds or ISO 8601 string) as epoch seconds, or None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def project_position(lat, lon, heading, speed_kts, dt_seconds):
+    """Position reached after dt seconds on a constant heading/speed (short-range approximation)"""
+    if not speed_kts or dt_seconds <= 0:
+        return lat, lon
+    distance = speed_kts * KNOT_TO_MS * dt_seconds
+    heading_rad = math.radians(heading or 0)
+    dlat = distance * math.cos(heading_rad) / EARTH_RADIUS_M
+    dlon = distance * math.sin(heading_rad) / (EARTH_RADIUS_M * max(math.cos(math.radians(lat)), 1e-6))
+    return lat + math.degrees(dlat), lon + math.degrees(dlon)
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Equirectangular distance in metres (accurate enough below a few hundred km)"""
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return EARTH_RADIUS_M * math.hypot(x, y)
+
+
+class PositionChangeDetector:
+    """
+    Per-aircraft last-written fix cache with dead-reckoning tolerance.
+
+    The anchor is the last fix that was actually written, so the prediction
+    error cannot drift silently across several suppressed fixes.
+    """
+
+    def __init__(self, tolerance_m=None, altitude_tolerance_ft=None, max_silence_seconds=None):
+        self.tolerance_m = float(tolerance_m if tolerance_m is not None
+                                 else os.environ.get('DEAD_RECKONING_TOLERANCE_M', 250))
+        self.altitude_tolerance_ft = float(altitude_tolerance_ft if altitude_tolerance_ft is not None
+                                           else os.environ.get('DEAD_RECKONING_ALT_TOLERANCE_FT', 200))
+        self.max_silence_seconds = float(max_silence_seconds if max_silence_seconds is not None
+                                         else os.environ.get('DEAD_RECKONING_MAX_SILENCE', 60))
+        self._last = {}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            'seen': 0,
+            'written': 0,
+            'suppressed_duplicate': 0,
+            'suppressed_predicted': 0
+        }
+
+    def forget(self, key):
+        with self._lock:
+            self._last.pop(key, None)
+
+    def should_write(self, key, fix, now=None):
+        """
+        Decide whether `fix` (normalized flight dict) must be persisted.
+
+        Returns (write: bool, reason: str). Reasons: new, duplicate, predicted,
+        moved, altitude, ground, heartbeat.
+        """
+        now = time.time() if now is None else now
+        lat, lon = fix.get('latitude'), fix.get('longitude')
+        source_ts = parse_source_timestamp(fix.get('live_updated') or fix.get('source_updated'))
+
+        with self._lock:
+            self.stats['seen'] += 1
+            last = self._last.get(key)
+
+            reason = self._decide(last, fix, lat, lon, source_ts, now)
+            if reason in ('duplicate', 'predicted'):
+                self.stats[f'suppressed_{reason}'] += 1
+                return False, reason
+
+            self._last[key] = {
+                'latitude': lat,
+                'longitude': lon,
+                'altitude': fix.get('altitude') or 0,
+                'heading': fix.get('heading') or 0,
+                'ground_speed': fix.get('ground_speed') or 0,
+                'on_ground': bool(fix.get('on_ground')),
+                'source_ts': source_ts,
+                'written_at': now
+            }
+            self.stats['written'] += 1
+            return True, reason
+
+    def _decide(self, last, fix, lat, lon, source_ts, now):
+        if last is None or lat is None or lon is None:
+            return 'new'
+
+        # Same source fix as the one already stored: never worth a new row
+        if source_ts is not None and last['source_ts'] is not None and source_ts <= last['source_ts']:
+            return 'duplicate'
+
+        if now - last['written_at'] >= self.max_silence_seconds:
+            return 'heartbeat'
+
+        if bool(fix.get('on_ground')) != last['on_ground']:
+            return 'ground'
+
+        if abs((fix.get('altitude') or 0) - last['altitude']) > self.altitude_tolerance_ft:
+            return 'altitude'
+
+        # Elapsed time on the source clock when available, wall clock otherwise
+        if source_ts is not None and last['source_ts'] is not None:
+            dt = source_ts - last['source_ts']
+        else:
+            dt = now - last['written_at']
+
+        pred_lat, pred_lon = project_position(
+            last['latitude'], last['longitude'], last['heading'], last['ground_speed'], dt
+        )
+        if distance_m(pred_lat, pred_lon, lat, lon) <= self.tolerance_m:
+            return 'predicted'
+        return 'moved'
+
+    def suppression_ratio(self, stats=None):
+        stats = stats or self.stats
+        if not stats['seen']:
+            return 0.0
+        suppressed = stats['suppressed_duplicate'] + stats['suppressed_predicted']
+        return suppressed / stats['seen']
+
+
+position_change_detector = PositionChangeDetector()
@@ -0,0 +1,89 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: density_grid.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Grilles de densité de trafic par tuile
+Air Traffic Management - RDC
+
+Les positions sont projetées en Web Mercator puis comptées, pour un niveau de
+zoom, sur une grille de GRID x GRID cellules par tuile de carte (256 px). Le
+comptage est creux : chaque position reçoit un index de tuile et de cellule,
+et seules les tuiles qui contiennent des positions sont comptées (np.unique
+sur les tuiles, un seul np.bincount sur les cellules) ; un lot étalé sur une
+grande emprise coûte autant au zoom 9 qu'au zoom 3. Les lots successifs
+s'additionnent tuile par tuile.
+
+render_rgba() convertit une grille en image (échelle logarithmique,
+transparente là où il n'y a pas de trafic).
+"""
+
+import numpy as np
+
+TILE_PIXELS = 256
+GRID = 64
+MAX_LATITUDE = 85.05112878
+
+# Dégradé de la carte de chaleur : (position 0..1, R, G, B, alpha)
+COLOR_STOPS = np.array([
+    (0.0, 37, 99, 235, 60),
+    (0.35, 6, 182, 212, 130),
+    (0.65, 234, 179, 8, 190),
+    (1.0, 239, 68, 68, 230),
+], dtype=float)
+
+
+def mercator_pixels(lats, lons, zoom):
+    """Global Web Mercator pixel coordinates (x, y) of points at a zoom level"""
+    lat = np.clip(np.asarray(lats, dtype=float), -MAX_LATITUDE, MAX_LATITUDE)
+    lon = np.asarray(lons, dtype=float)
+    world = TILE_PIXELS * 2 ** zoom
+    x = (lon + 180.0) / 360.0 * world
+    sin_lat = np.sin(np.radians(lat))
+    y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)) * world
+    return np.clip(x, 0, world - 1e-6), np.clip(y, 0, world - 1e-6)
+
+
+def bin_positions(lats, lons, zoom, grid=GRID):
+    """
+    Position counts per tile at a zoom level.
+    Returns {(tile_x, tile_y): uint32 array (grid rows from north, grid columns from west)}
+    for the tiles holding at least one position.
+    """
+    lat = np.asarray(lats, dtype=float)
+    if lat.size == 0:
+        return {}
+    px, py = mercator_pixels(lat, lons, zoom)
+
+    # Cell coordinates on the world grid, split into tile and cell within the tile
+    cell = TILE_PIXELS / grid
+    cx = (px // cell).astype(np.int64)
+    cy = (py // cell).astype(np.int64)
+    keys, tile_of = np.unique(np.stack([cx // grid, cy // grid], axis=1), axis=0, return_inverse=True)
+    slot = tile_of.reshape(-1) * grid * grid + (cy % grid) * grid + (cx % grid)
+    counts = np.bincount(slot, minlength=len(keys) * grid * grid).astype(np.uint32).reshape(-1, grid, grid)
+
+    return {(int(x), int(y)): counts[i] for i, (x, y) in enumerate(keys)}
+
+
+def render_rgba(counts, scale=None, size=TILE_PIXELS):
+    """
+    RGBA image (size x size x 4, uint8) of a count grid. Colors follow
+    log(1 + count) / log(1 + scale); `scale` defaults to the grid maximum.
+    """
+    counts = np.asarray(counts, dtype=float)
+    scale = float(scale if scale is not None else counts.max())
+    level = np.log1p(counts) / np.log1p(scale) if scale > 0 else np.zeros_like(counts)
+    level = np.clip(level, 0.0, 1.0)
+
+    image = np.stack([np.interp(level, COLOR_STOPS[:, 0], COLOR_STOPS[:, k]) for k in range(1, 5)], axis=-1)
+    image[counts == 0] = 0
+
+    # Each cell becomes a block of size / grid pixels
+    repeat = max(1, size // counts.shape[0])
+    image = np.repeat(np.repeat(image, repeat, axis=0), repeat, axis=1)
+    return image.round().astype(np.uint8)
@@ -0,0 +1,79 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: grid_clustering.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Regroupement des avions sur une grille écran
+Air Traffic Management - RDC
+
+À faible zoom, les avions proches à l'écran sont regroupés par cellule d'une
+grille dont la taille suit le zoom de la carte (CELL_PIXELS pixels d'une
+tuile Web Mercator de 256 px). Le calcul est vectorisé : un seul passage
+NumPy pour l'index de cellule, les effectifs, les centroïdes, les altitudes
+et l'emprise de chaque groupe.
+"""
+
+import numpy as np
+
+TILE_PIXELS = 256
+CELL_PIXELS = 60
+
+
+def cell_size_degrees(zoom, cell_pixels=CELL_PIXELS):
+    """Width of a grid cell, in degrees of longitude, at a map zoom level"""
+    return 360.0 / (TILE_PIXELS * 2 ** zoom) * cell_pixels
+
+
+def grid_cluster(lats, lons, altitudes=None, zoom=0, cell_pixels=CELL_PIXELS):
+    """
+    Group points by grid cell.
+
+    Returns one dict per occupied cell, ordered by cell:
+    count, centroid (latitude, longitude), min/max altitude, bounds
+    [min_lat, min_lon, max_lat, max_lon] and `members` (indices of the points).
+    """
+    lat = np.asarray(lats, dtype=float)
+    lon = np.asarray(lons, dtype=float)
+    if lat.size == 0:
+        return []
+    alt = np.zeros_like(lat) if altitudes is None else np.nan_to_num(np.asarray(altitudes, dtype=float))
+
+    size = cell_size_degrees(zoom, cell_pixels)
+    columns = int(np.ceil(360.0 / size)) + 1
+    cell_x = np.floor((lon + 180.0) / size).astype(np.int64)
+    cell_y = np.floor((lat + 90.0) / size).astype(np.int64)
+    cells, inverse, counts = np.unique(cell_y * columns + cell_x, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    n = cells.size
+
+    mean_lat = np.bincount(inverse, weights=lat, minlength=n) / counts
+    mean_lon = np.bincount(inverse, weights=lon, minlength=n) / counts
+
+    def reduce(ufunc, values, start):
+        out = np.full(n, start)
+        ufunc.at(out, inverse, values)
+        return out
+
+    min_alt, max_alt = reduce(np.minimum, alt, np.inf), reduce(np.maximum, alt, -np.inf)
+    min_lat, max_lat = reduce(np.minimum, lat, np.inf), reduce(np.maximum, lat, -np.inf)
+    min_lon, max_lon = reduce(np.minimum, lon, np.inf), reduce(np.maximum, lon, -np.inf)
+
+    order = np.argsort(inverse, kind='stable')
+    members = np.split(order, np.cumsum(counts)[:-1])
+
+    return [
+        {
+            'count': int(counts[i]),
+            'latitude': float(mean_lat[i]),
+            'longitude': float(mean_lon[i]),
+            'min_altitude': float(min_alt[i]),
+            'max_altitude': float(max_alt[i]),
+            'bounds': [float(min_lat[i]), float(min_lon[i]), float(max_lat[i]), float(max_lon[i])],
+            'members': members[i].tolist()
+        }
+        for i in range(n)
+    ]
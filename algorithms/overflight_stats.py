@@ -0,0 +1,116 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: overflight_stats.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Statistiques incrémentales de survol
+Air Traffic Management - RDC
+
+Chaque survol actif garde un accumulateur mis à jour en O(1) à chaque point
+reçu : distance parcourue le long de la trajectoire, altitudes min/max,
+vitesse moyenne, nombre de points et zones traversées. Les valeurs sont
+écrites sur la ligne Overflight à la sortie, sans relire l'historique des
+positions.
+"""
+
+import math
+
+EARTH_RADIUS_KM = 6371.0
+KM_TO_NM = 0.539957
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    a = (math.sin(math.radians(lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+class OverflightAccumulator:
+    """Running metrics of one overflight session"""
+
+    __slots__ = ('distance_km', 'min_altitude', 'max_altitude', 'speed_sum', 'speed_count',
+                 'position_count', 'zones', 'last_lat', 'last_lon')
+
+    def __init__(self):
+        self.distance_km = 0.0
+        self.min_altitude = None
+        self.max_altitude = None
+        self.speed_sum = 0.0
+        self.speed_count = 0
+        self.position_count = 0
+        self.zones = []
+        self.last_lat = None
+        self.last_lon = None
+
+    def add_fix(self, lat, lon, altitude=None, speed=None, zones=()):
+        if lat is None or lon is None:
+            return
+        if self.last_lat is not None:
+            self.distance_km += haversine_km(self.last_lat, self.last_lon, lat, lon)
+        self.last_lat, self.last_lon = lat, lon
+
+        if altitude is not None:
+            self.min_altitude = altitude if self.min_altitude is None else min(self.min_altitude, altitude)
+            self.max_altitude = altitude if self.max_altitude is None else max(self.max_altitude, altitude)
+        if speed:
+            self.speed_sum += speed
+            self.speed_count += 1
+        self.position_count += 1
+
+        for zone in zones:
+            if zone not in self.zones:
+                self.zones.append(zone)
+
+    def extend_to(self, lat, lon):
+        """Add the last leg up to the exit fix, which lies outside the airspace"""
+        if lat is None or lon is None or self.last_lat is None:
+            return
+        self.distance_km += haversine_km(self.last_lat, self.last_lon, lat, lon)
+        self.last_lat, self.last_lon = lat, lon
+
+    @property
+    def avg_speed(self):
+        return self.speed_sum / self.speed_count if self.speed_count else None
+
+    def summary(self):
+        return {
+            'distance_km': round(self.distance_km, 3),
+            'min_altitude': self.min_altitude,
+            'max_altitude': self.max_altitude,
+            'avg_speed': round(self.avg_speed, 1) if self.avg_speed is not None else None,
+            'position_count': self.position_count,
+            'zones': list(self.zones)
+        }
+
+    def apply_to(self, overflight):
+        """Write the accumulated metrics on an Overflight row"""
+        if self.position_count == 0:
+            return overflight
+        if self.position_count > 1:
+            # Along-track distance replaces the entry-exit straight line
+            overflight.distance_km = self.distance_km
+            overflight.distance_nm = self.distance_km * KM_TO_NM
+        overflight.min_altitude = self.min_altitude
+        overflight.max_altitude = self.max_altitude
+        overflight.avg_speed = self.avg_speed
+        overflight.position_count = self.position_count
+        if self.zones:
+            overflight.fir_crossed = ','.join(self.zones)[:200]
+        return overflight
+
+    @classmethod
+    def from_positions(cls, positions):
+        """
+        Rebuild an accumulator from stored positions (oldest first), used when a
+        worker picks up an overflight that started before it was running.
+        """
+        acc = cls()
+        for p in positions:
+            acc.add_fix(p.latitude, p.longitude, p.altitude, p.ground_speed)
+        return acc
@@ -0,0 +1,225 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: traffic_simulator.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Simulateur de trafic vectorisé et déterministe
+Air Traffic Management - RDC
+
+Chaque vol suit l'orthodromie entre ses deux aéroports à vitesse constante,
+avec un profil vertical montée / croisière / descente (taux de montée et de
+descente fixes, croisière tronquée sur les vols courts). La position est une
+fonction pure du temps : deux appels au même instant donnent le même point,
+et tout le trafic est calculé en un passage NumPy.
+
+Le tirage d'un trafic aléatoire (random_fleet) dépend uniquement de la graine,
+ce qui rend les essais de charge reproductibles. stream() produit des lots
+d'enregistrements au format de fetch_external_flight_data(), à la cadence
+voulue, pour alimenter le pipeline de suivi sans API externe.
+"""
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_NM = 1.852
+
+CLIMB_RATE_FPM = 2000
+DESCENT_RATE_FPM = 1500
+DEFAULT_CRUISE_SPEED_KTS = 450
+DEFAULT_CRUISE_ALTITUDE_FT = 35000
+CRUISE_LEVELS_FT = (31000, 33000, 35000, 37000, 39000)
+
+# Préfixes OACI utilisés pour les indicatifs du trafic aléatoire
+AIRLINE_PREFIXES = ('CAA', 'ETH', 'KQA', 'RWD', 'SAA', 'AFR', 'BEL', 'TAP', 'MSR', 'QTR')
+# Adresses OACI 24 bits réservées au trafic simulé
+ICAO24_BASE = 0xF00000
+
+
+def great_circle_distances(lat1, lon1, lat2, lon2):
+    """Vectorized haversine distance (km) between point arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def initial_bearings(lat1, lon1, lat2, lon2):
+    """Vectorized initial bearing (degrees) from the first points to the second"""
+    lat1, lat2 = np.radians(lat1), np.radians(lat2)
+    delta_lon = np.radians(np.asarray(lon2, dtype=float) - np.asarray(lon1, dtype=float))
+    x = np.sin(delta_lon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(delta_lon)
+    return (np.degrees(np.arctan2(x, y)) + 360) % 360
+
+
+def great_circle_points(lat1, lon1, lat2, lon2, fraction):
+    """
+    Points at `fraction` (0 = first point, 1 = second) of the great circle
+    between the point arrays, as (latitudes, longitudes).
+    """
+    phi1, lam1, phi2, lam2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    f = np.asarray(fraction, dtype=float)
+    delta = great_circle_distances(lat1, lon1, lat2, lon2) / EARTH_RADIUS_KM
+
+    # Identical endpoints: sin(delta) = 0, linear weights give the same point
+    sin_delta = np.sin(delta)
+    safe = sin_delta > 1e-12
+    sin_delta = np.where(safe, sin_delta, 1.0)
+    a = np.where(safe, np.sin((1 - f) * delta) / sin_delta, 1 - f)
+    b = np.where(safe, np.sin(f * delta) / sin_delta, f)
+
+    x = a * np.cos(phi1) * np.cos(lam1) + b * np.cos(phi2) * np.cos(lam2)
+    y = a * np.cos(phi1) * np.sin(lam1) + b * np.cos(phi2) * np.sin(lam2)
+    z = a * np.sin(phi1) + b * np.sin(phi2)
+    return np.degrees(np.arctan2(z, np.hypot(x, y))), np.degrees(np.arctan2(y, x))
+
+
+class TrafficSimulator:
+    """
+    A set of flights, each defined by its route, departure time, cruise speed
+    and cruise altitude. Times are seconds on any common clock (epoch seconds,
+    or seconds relative to a reference instant).
+    """
+
+    def __init__(self, dep_lat, dep_lon, arr_lat, arr_lon, departure_times,
+                 cruise_speeds=DEFAULT_CRUISE_SPEED_KTS, cruise_altitudes=DEFAULT_CRUISE_ALTITUDE_FT,
+                 climb_rate=CLIMB_RATE_FPM, descent_rate=DESCENT_RATE_FPM, identities=None):
+        self.dep_lat = np.asarray(dep_lat, dtype=float)
+        self.dep_lon = np.asarray(dep_lon, dtype=float)
+        self.arr_lat = np.asarray(arr_lat, dtype=float)
+        self.arr_lon = np.asarray(arr_lon, dtype=float)
+        n = self.dep_lat.size
+
+        self.departure_times = np.broadcast_to(np.asarray(departure_times, dtype=float), (n,)).copy()
+        self.cruise_speeds = np.broadcast_to(np.asarray(cruise_speeds, dtype=float), (n,)).copy()
+        self.cruise_altitudes = np.broadcast_to(np.asarray(cruise_altitudes, dtype=float), (n,)).copy()
+        self.climb_rate = float(climb_rate)
+        self.descent_rate = float(descent_rate)
+        # Per flight record fields (icao24, callsign, airports...) copied into records()
+        self.identities = list(identities) if identities is not None else [{} for _ in range(n)]
+
+        self.distances_km = great_circle_distances(self.dep_lat, self.dep_lon, self.arr_lat, self.arr_lon)
+        speeds_kmh = np.maximum(self.cruise_speeds, 1.0) * KM_PER_NM
+        self.durations = self.distances_km / speeds_kmh * 3600.0
+        self.arrival_times = self.departure_times + self.durations
+        # Direction of arrival, used once the remaining distance is zero
+        self._final_headings = (initial_bearings(self.arr_lat, self.arr_lon, self.dep_lat, self.dep_lon) + 180) % 360
+
+    def __len__(self):
+        return self.dep_lat.size
+
+    @classmethod
+    def random_fleet(cls, airports, count, seed=0, start=0.0, min_distance_km=150):
+        """
+        `count` flights between random pairs of `airports` ([(icao, lat, lon), ...]),
+        all airborne at `start`, each at a random point of its route. Same
+        seed, same traffic.
+        """
+        if len(airports) < 2:
+            raise ValueError("At least two airports are needed")
+        rng = np.random.default_rng(seed)
+        codes = [a[0] for a in airports]
+        lats = np.array([a[1] for a in airports], dtype=float)
+        lons = np.array([a[2] for a in airports], dtype=float)
+
+        dep = rng.integers(0, len(airports), count)
+        # Distinct arrival airport: a non-zero shift modulo the airport count
+        arr = (dep + rng.integers(1, len(airports), count)) % len(airports)
+        # Pairs closer than min_distance_km are replaced by the farthest airport
+        distances = great_circle_distances(lats[dep], lons[dep], lats[arr], lons[arr])
+        if np.any(distances < min_distance_km):
+            all_pairs = great_circle_distances(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+            short = distances < min_distance_km
+            arr[short] = np.argmax(all_pairs[dep[short]], axis=1)
+
+        speeds = rng.uniform(420, 490, count)
+        altitudes = rng.choice(CRUISE_LEVELS_FT, count)
+        distances = great_circle_distances(lats[dep], lons[dep], lats[arr], lons[arr])
+        departures = start - rng.uniform(0.02, 0.98, count) * distances / (speeds * KM_PER_NM) * 3600.0
+        prefixes = rng.integers(0, len(AIRLINE_PREFIXES), count)
+        numbers = rng.integers(100, 9999, count)
+
+        identities = [
+            {
+                'icao24': f"{ICAO24_BASE + i:06x}",
+                'callsign': f"{AIRLINE_PREFIXES[prefixes[i]]}{numbers[i]}",
+                'flight_number': f"{AIRLINE_PREFIXES[prefixes[i]]}{numbers[i]}",
+                'departure_icao': codes[dep[i]],
+                'arrival_icao': codes[arr[i]]
+            }
+            for i in range(count)
+        ]
+        return cls(lats[dep], lons[dep], lats[arr], lons[arr], departures,
+                   cruise_speeds=speeds, cruise_altitudes=altitudes, identities=identities)
+
+    def positions(self, t):
+        """
+        State of every flight at time `t`, as arrays: latitude, longitude,
+        altitude (ft), heading, ground_speed (kts), vertical_speed (ft/min),
+        progress (0..1) and airborne. Flights not yet departed (already
+        arrived) are on the ground at their departure (arrival) airport.
+        """
+        elapsed = float(t) - self.departure_times
+        airborne = (elapsed > 0) & (elapsed < self.durations)
+        elapsed = np.clip(elapsed, 0.0, self.durations)
+        progress = np.divide(elapsed, self.durations, out=np.ones_like(elapsed), where=self.durations > 0)
+
+        lat, lon = great_circle_points(self.dep_lat, self.dep_lon, self.arr_lat, self.arr_lon, progress)
+
+        remaining = self.durations - elapsed
+        climb = elapsed / 60.0 * self.climb_rate
+        descent = remaining / 60.0 * self.descent_rate
+        altitude = np.minimum(np.minimum(climb, descent), self.cruise_altitudes)
+        vertical_speed = np.where(
+            altitude < self.cruise_altitudes,
+            np.where(climb <= descent, self.climb_rate, -self.descent_rate),
+            0.0
+        )
+
+        heading = np.where(
+            remaining > 1.0,
+            initial_bearings(lat, lon, self.arr_lat, self.arr_lon),
+            self._final_headings
+        )
+
+        return {
+            'latitude': lat,
+            'longitude': lon,
+            'altitude': np.where(airborne, altitude, 0.0),
+            'heading': heading,
+            'ground_speed': np.where(airborne, self.cruise_speeds, 0.0),
+            'vertical_speed': np.where(airborne, vertical_speed, 0.0),
+            'progress': progress,
+            'airborne': airborne
+        }
+
+    def records(self, t, airborne_only=True):
+        """Flights at time `t` as fetch_external_flight_data() records"""
+        state = self.positions(t)
+        columns = {k: np.round(state[k], 5 if k in ('latitude', 'longitude') else 0).tolist()
+                   for k in ('latitude', 'longitude', 'altitude', 'heading', 'ground_speed', 'vertical_speed')}
+        airborne = state['airborne'].tolist()
+
+        records = []
+        for i, identity in enumerate(self.identities):
+            if airborne_only and not airborne[i]:
+                continue
+            record = dict(identity)
+            record.update({k: values[i] for k, values in columns.items()})
+            record.update({'on_ground': not airborne[i], 'live_updated': float(t), 'source': 'simulator'})
+            records.append(record)
+        return records
+
+    def stream(self, start, interval=5.0, count=None, airborne_only=True):
+        """
+        Batches of records every `interval` seconds of simulated time from
+        `start`: yields (t, records), `count` times or forever.
+        """
+        step = 0
+        while count is None or step < count:
+            t = start + step * interval
+            yield t, self.records(t, airborne_only=airborne_only)
+            step += 1
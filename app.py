@@ -15,6 +15,10 @@ import os
 import eventlet
 eventlet.monkey_patch()
 
+from utils.cooperative import make_psycopg2_green
+# Queries wait for PostgreSQL through the hub instead of blocking every websocket
+make_psycopg2_green()
+
 from flask import Flask, render_template, redirect, url_for, request, jsonify, session
 from flask_socketio import SocketIO, emit
 from flask_login import LoginManager, login_required, current_user
@@ -50,7 +54,9 @@ def create_app(config_name='default'):
         app.config.from_object(config[env_config])
     
     db.init_app(app)
-    socketio.init_app(app, cors_allowed_origins="*", async_mode='eventlet')
+    # The Redis queue carries the radar pushes of the tracking workers to every web process
+    socketio.init_app(app, cors_allowed_origins="*", async_mode='eventlet',
+                      message_queue=os.environ.get('REDIS_URL'))
     login_manager.init_app(app)
     csrf.init_app(app)
     CORS(app)
@@ -173,29 +179,164 @@ def handle_connect():
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    pass
+    from flask import request
+    from services.radar_view import RadarViews
+    from services.replay import ReplaySessions
+    RadarViews.unsubscribe(request.sid)
+    ReplaySessions.stop(request.sid)
 
 
 @socketio.on('request_flight_update')
-def handle_flight_update_request():
-    from services.flight_tracker import get_active_flights
-    flights = get_active_flights()
-    emit('flight_update', {'flights': flights})
+def handle_flight_update_request(data=None):
+    """
+    Current active flights. The body is the serialized snapshot shared with
+    /radar/api/flights, sent as binary JSON; a client that sends the etag it
+    holds gets {'unchanged': True} instead.
+    """
+    from services.snapshot_cache import active_flights_snapshot
+    snapshot = active_flights_snapshot()
+    if (data or {}).get('etag') == snapshot.etag:
+        emit('flight_update', {'etag': snapshot.etag, 'unchanged': True})
+        return
+    emit('flight_update', {'etag': snapshot.etag, 'version': snapshot.version, 'flights': snapshot.body})
+
+
+def _radar_subscription(data):
+    """(region, encoding) requested by a radar client, or None when not allowed"""
+    from flask_login import current_user
+    from services.radar_feed import ROOMS, ENCODINGS
+    if not current_user.is_authenticated:
+        return None
+    data = data or {}
+    region = data.get('region', 'all')
+    if region not in ROOMS:
+        emit('subscribed', {'region': region, 'error': 'unknown region'})
+        return None
+    encoding = data.get('encoding', 'json')
+    return region, encoding if encoding in ENCODINGS else 'json'
+
+
+def _send_radar_keyframe(region, encoding):
+    from services.radar_feed import RadarFeed, EVENT
+    frame = RadarFeed.resync_frame(region, encoding)
+    if frame is not None:
+        emit(EVENT, frame)
+
+
+def _push_radar_views():
+    """Background task of each web process: send the subscribed views of every new picture"""
+    from services.radar_feed import RadarFeed
+    from services.radar_view import RadarViews
+    while True:
+        socketio.sleep(RadarFeed.PUSH_INTERVAL_SECONDS)
+        try:
+            with app.app_context():
+                RadarViews.push(socketio.emit)
+        except Exception as e:
+            app.logger.warning(f"[RadarViews] Push failed: {e}")
+
+
+_radar_view_task = None
 
 
 @socketio.on('subscribe_radar')
 def handle_subscribe_radar(data):
-    from flask_socketio import join_room
-    region = data.get('region', 'all')
-    join_room(f'radar_{region}')
-    emit('subscribed', {'region': region})
+    """
+    Frame subscription (room of keyframes/deltas), or view subscription when
+    `view` (bbox, zoom, filters) is given: the client then receives its
+    viewport only, clustered at low zoom.
+    """
+    global _radar_view_task
+    from flask import request
+    from flask_socketio import join_room, leave_room
+    from services.radar_feed import RadarFeed, ROOMS, ENCODINGS, room_name
+    from services.radar_view import RadarViews, parse_view, build_view, VIEW_EVENT, CLUSTER_MAX_ZOOM
+    subscription = _radar_subscription(data)
+    if subscription is None:
+        return
+    region, encoding = subscription
+
+    try:
+        view = parse_view((data or {}).get('view'))
+    except ValueError as e:
+        emit('subscribed', {'region': region, 'error': str(e)})
+        return
+
+    for room_region in ROOMS:
+        for room_encoding in ENCODINGS:
+            leave_room(room_name(room_region, room_encoding))
+
+    if view is None:
+        RadarViews.unsubscribe(request.sid)
+        join_room(room_name(region, encoding))
+        emit('subscribed', {'region': region, 'encoding': encoding, 'cluster_max_zoom': CLUSTER_MAX_ZOOM,
+                            'cycle_interval': RadarFeed.cycle_interval()})
+        _send_radar_keyframe(region, encoding)
+        return
+
+    view['in_rdc'] = view['in_rdc'] or region == 'rdc'
+    RadarViews.subscribe(request.sid, view)
+    if _radar_view_task is None:
+        _radar_view_task = socketio.start_background_task(_push_radar_views)
+    emit('subscribed', {'region': region, 'view': True, 'cluster_max_zoom': CLUSTER_MAX_ZOOM,
+                        'cycle_interval': RadarFeed.cycle_interval()})
+    emit(VIEW_EVENT, build_view(view))
 
 
 def broadcast_flight_update(flights_data):
     socketio.emit('flight_update', {'flights': flights_data}, room='radar_all')
 
 
-app = create_app(os.environ.get('FLASK_CONFIG', 'default'))
+@socketio.on('radar_resync')
+def handle_radar_resync(data):
+    # A client that missed a delta starts again from a keyframe
+    subscription = _radar_subscription(data)
+    if subscription is not None:
+        _send_radar_keyframe(*subscription)
+
+
+def _play_replay(sid, token, start, end, speed, step):
+    from services.replay import play
+    try:
+        with app.app_context():
+            play(sid, token, start, end, speed, step, socketio.emit, sleep=socketio.sleep)
+    except Exception as e:
+        app.logger.warning(f"[Replay] Stream failed: {e}")
+
+
+@socketio.on('replay_start')
+def handle_replay_start(data):
+    """
+    Play the traffic of [start, end] at `speed` times real speed, one frame
+    every `step` seconds of replayed time ('replay_frame', then 'replay_end').
+    A new start replaces the stream the client was playing.
+    """
+    from flask import request
+    from flask_login import current_user
+    from services.replay import ReplaySessions, parse_stream
+    if not current_user.is_authenticated:
+        return
+    try:
+        start, end, speed, step = parse_stream(data)
+    except ValueError as e:
+        emit('replay_error', {'error': str(e)})
+        return
+    token = ReplaySessions.start(request.sid)
+    emit('replay_started', {'start': start.isoformat() + 'Z', 'end': end.isoformat() + 'Z',
+                            'speed': speed, 'step': step})
+    socketio.start_background_task(_play_replay, request.sid, token, start, end, speed, step)
+
+
+@socketio.on('replay_stop')
+def handle_replay_stop(data=None):
+    from flask import request
+    from services.replay import ReplaySessions
+    ReplaySessions.stop(request.sid)
+
+
+# The CPU pool workers (utils.cooperative) re-run this script as __mp_main__: no app there
+if __name__ != '__mp_main__':
+    app = create_app(os.environ.get('FLASK_CONFIG', 'default'))
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
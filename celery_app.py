@@ -12,6 +12,7 @@ Handles asynchronous task processing for flight tracking and data ingestion
 """
 import os
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 
 # Redis URL from environment or default
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
@@ -21,7 +22,7 @@ celery = Celery(
     'atm_rdc',
     broker=REDIS_URL,
     backend=REDIS_URL,
-    include=['tasks.flight_tasks', 'tasks.invoice_tasks']
+    include=['tasks.flight_tasks', 'tasks.invoice_tasks', 'tasks.outbox_tasks']
 )
 
 # Celery configuration
@@ -43,15 +44,22 @@ celery.conf.update(
 celery.conf.beat_schedule = {
     'fetch-flight-positions': {
         'task': 'tasks.flight_tasks.fetch_flight_positions',
+        'schedule': 5.0,  # Every 5 seconds (overflight/landing detection runs on each batch)
+        'options': {'expires': 5},  # Drop ticks still queued when the next one is due
+    },
+    'drain-outbox': {
+        'task': 'tasks.outbox_tasks.drain_outbox',
         'schedule': 5.0,  # Every 5 seconds
+        'options': {'expires': 5},
     },
-    'check-overflights': {
-        'task': 'tasks.flight_tasks.check_airspace_entries',
-        'schedule': 10.0,  # Every 10 seconds
+    'purge-outbox': {
+        'task': 'tasks.outbox_tasks.purge_outbox',
+        'schedule': 86400.0,  # Daily
     },
-    'check-airport-movements': {
-        'task': 'tasks.flight_tasks.check_airport_movements',
-        'schedule': 10.0,  # Every 10 seconds
+    'aggregate-traffic-density': {
+        'task': 'tasks.flight_tasks.aggregate_traffic_density',
+        'schedule': 60.0,  # Every minute (heatmap tiles)
+        'options': {'expires': 60},
     },
     'generate-pending-invoices': {
         'task': 'tasks.invoice_tasks.generate_pending_invoices',
@@ -59,5 +67,19 @@ celery.conf.beat_schedule = {
     },
 }
 
+
+@worker_process_init.connect
+def init_worker(**kwargs):
+    """One application context per worker process, with warm caches before the first tick"""
+    from worker_app import init_worker_process
+    init_worker_process()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker(**kwargs):
+    from worker_app import shutdown_worker_process
+    shutdown_worker_process()
+
+
 if __name__ == '__main__':
     celery.start()
@@ -11,10 +11,10 @@ from .user import User, Role, Permission
 from .aircraft import Aircraft
 from .airport import Airport
 from .airline import Airline
-from .flight import Flight, FlightPosition, FlightRoute
+from .flight import Flight, FlightPosition, FlightRoute, TrafficDensityTile, position_time_bucket
 from .operations import Overflight, Landing
 from .billing import Invoice, InvoiceLineItem, TariffConfig
-from .system import AuditLog, Alert, Notification, SystemConfig
+from .system import AuditLog, Alert, Notification, SystemConfig, OutboxEvent
 from .airspace import Airspace
 from .api_key import ApiKey
 from .telegram import TelegramSubscriber
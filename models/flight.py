@@ -12,6 +12,20 @@ from geoalchemy2 import Geometry
 from sqlalchemy import Text
 from .base import db
 
+# Width of the time buckets indexing flight_positions (replay reads whole buckets)
+POSITION_BUCKET_SECONDS = 60
+_EPOCH = datetime(1970, 1, 1)
+
+
+def position_time_bucket(timestamp):
+    """Time bucket of a (naive UTC) position timestamp"""
+    return int((timestamp - _EPOCH).total_seconds() // POSITION_BUCKET_SECONDS)
+
+
+def _default_time_bucket(context):
+    return position_time_bucket(context.get_current_parameters().get('timestamp') or datetime.utcnow())
+
+
 class Flight(db.Model):
     """
     Flight records with routing and status information
@@ -99,6 +113,13 @@ class FlightPosition(db.Model):
     Stores position history for trajectory visualization
     """
     __tablename__ = 'flight_positions'
+    __table_args__ = (
+        # Trajectory reads are "positions of X ordered by time": keep them index range scans
+        db.Index('ix_flight_positions_flight_ts', 'flight_id', 'timestamp'),
+        db.Index('ix_flight_positions_overflight_ts', 'overflight_id', 'timestamp'),
+        # Time-slice reads (replay): a few buckets, then the aircraft in them
+        db.Index('ix_flight_positions_bucket', 'time_bucket', 'flight_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     flight_id = db.Column(db.Integer, db.ForeignKey('flights.id'), index=True)
@@ -125,6 +146,8 @@ class FlightPosition(db.Model):
         geom = db.Column(Geometry('POINT', srid=4326))
 
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # position_time_bucket(timestamp), filled on insert
+    time_bucket = db.Column(db.Integer, default=_default_time_bucket)
 
     flight = db.relationship('Flight', backref=db.backref('positions', lazy='dynamic'))
 
@@ -178,3 +201,27 @@ class FlightRoute(db.Model):
             'altitude_ft': self.altitude_ft,
             'airway': self.airway
         }
+
+
+class TrafficDensityTile(db.Model):
+    """
+    Traffic density aggregate: number of stored positions per cell of one
+    map tile (Web Mercator zoom/x/y) over one UTC day, maintained
+    incrementally from flight_positions for the heatmap layers
+    """
+    __tablename__ = 'traffic_density_tiles'
+    __table_args__ = (
+        db.UniqueConstraint('zoom', 'tile_x', 'tile_y', 'day', name='uq_traffic_density_tile'),
+        db.Index('ix_traffic_density_zoom_day', 'zoom', 'day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    zoom = db.Column(db.SmallInteger, nullable=False)
+    tile_x = db.Column(db.Integer, nullable=False)
+    tile_y = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    # zlib-compressed uint32 grid (rows from north to south)
+    counts = db.Column(db.LargeBinary, nullable=False)
+    total = db.Column(db.Integer, default=0)
+    max_count = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
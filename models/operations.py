@@ -17,6 +17,12 @@ class Overflight(db.Model):
     Records entry/exit points and calculates distance for billing
     """
     __tablename__ = 'overflights'
+    __table_args__ = (
+        # At most one active session per flight, even with several workers entering it at once
+        db.Index('uq_overflights_active_flight', 'flight_id', unique=True,
+                 postgresql_where=db.text("status = 'active'"),
+                 sqlite_where=db.text("status = 'active'")),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -183,3 +183,35 @@ class SystemConfig(db.Model):
             return json.loads(self.value)
 
         return self.value
+
+
+class OutboxEvent(db.Model):
+    """
+    Side effects of tracking state changes (notifications, auto-invoicing),
+    written in the same transaction as the change and delivered later by
+    the outbox consumers
+    """
+    __tablename__ = 'outbox_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False, index=True)
+    payload = db.Column(db.JSON, default=dict)
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, processing, done, failed
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    claimed_at = db.Column(db.DateTime)
+    processed_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'event_type': self.event_type,
+            'payload': self.payload,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
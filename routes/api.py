@@ -16,6 +16,7 @@ from models import db, Flight, Aircraft, Airport, Airline, Overflight, Landing,
 from services.telegram_service import TelegramService
 from utils.decorators import role_required
 from utils.system_gate import SystemGate
+from services.snapshot_cache import SnapshotCache, cycle_version, snapshot_response
 
 api_bp = Blueprint('api', __name__)
 
@@ -102,6 +103,12 @@ def get_landings():
 @api_bp.route('/stats/summary')
 @login_required
 def get_stats_summary():
+    # Same figures for every user: computed once per tracking cycle
+    snapshot = SnapshotCache.get('stats_summary', cycle_version(), build_stats_summary)
+    return snapshot_response(snapshot)
+
+
+def build_stats_summary():
     today = datetime.utcnow().date()
     start_of_day = datetime.combine(today, datetime.min.time())
     start_of_month = today.replace(day=1)
@@ -129,7 +136,7 @@ def get_stats_summary():
         }
     }
     
-    return jsonify(stats)
+    return stats
 
 
 @api_bp.route('/stats/traffic')
@@ -203,6 +210,69 @@ def export_overflights():
     return Response(stream_with_context(generate()), mimetype='application/json')
 
 
+def _parse_datetime_arg(name):
+    """Optional instant query argument, naive UTC. Raises ValueError when malformed."""
+    from services.replay import parse_instant
+
+    value = request.args.get(name)
+    if not value:
+        return None
+    return parse_instant(value, name)
+
+
+def _stream_json_array(rows):
+    def generate():
+        yield '['
+        first = True
+        for row in rows:
+            if not first:
+                yield ','
+            yield json.dumps(row)
+            first = False
+        yield ']'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+@api_bp.route('/spatial/airspaces/<int:airspace_id>/crossings')
+@login_required
+def get_airspace_crossings(airspace_id):
+    """Flights that crossed an airspace (boundary, FIR, restricted zone) in a time range"""
+    from services.spatial_query import flights_crossing_airspace, positions_in_airspace
+
+    try:
+        start = _parse_datetime_arg('start')
+        end = _parse_datetime_arg('end')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if request.args.get('detail') == 'positions':
+        rows = positions_in_airspace(airspace_id, start, end)
+    else:
+        rows = flights_crossing_airspace(airspace_id, start, end)
+    return _stream_json_array(rows)
+
+
+@api_bp.route('/spatial/positions/near')
+@login_required
+def get_positions_near():
+    """Stored positions within `radius` metres of a point"""
+    from services.spatial_query import positions_near
+
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    radius = request.args.get('radius', 5000, type=float)
+    if lat is None or lon is None:
+        return jsonify({'error': 'lat and lon are required'}), 400
+    try:
+        start = _parse_datetime_arg('start')
+        end = _parse_datetime_arg('end')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rows = positions_near(lat, lon, radius, start, end)
+    return _stream_json_array(rows)
+
+
 @api_bp.route('/export/landings')
 @login_required
 def export_landings():
@@ -9,13 +9,20 @@
 from flask import Blueprint, render_template, jsonify, request
 from flask_login import login_required, current_user
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 import os
 
 from models import db, Flight, FlightPosition, Aircraft, Airport, Overflight, Alert
 from services.flight_tracker import (
-    get_active_flights, get_rdc_boundary, get_weather_tile_url,
+    get_weather_tile_url,
     get_airport_metar, get_airport_weather
 )
+from services.trail_buffer import get_trails
+from services.radar_view import parse_view, build_view
+from services.snapshot_cache import active_flights_snapshot, snapshot_response
+from services.airspace_geometry import AirspaceGeometry, LEVEL_NAMES, level_for_zoom
+from services import traffic_density
+from services.replay import parse_instant, parse_window, replay_frame
 
 radar_bp = Blueprint('radar', __name__)
 
@@ -70,15 +77,33 @@ def terminal():
 @radar_bp.route('/api/flights')
 @login_required
 def api_flights():
-    flights_data = get_active_flights()
-    return jsonify(flights_data)
+    # Served from the live picture; live updates arrive over Socket.IO
+    try:
+        view = parse_view(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    if view is None:
+        # Built once per cycle for every user; 304 when unchanged
+        return snapshot_response(active_flights_snapshot())
+    # Bounding box, zoom and filters: aircraft or clusters of the viewport only
+    return jsonify(build_view(view))
 
+
+@radar_bp.route('/api/airspaces')
 @radar_bp.route('/api/boundary')
 @login_required
-def api_boundary():
-    boundary = get_rdc_boundary()
-    return jsonify(boundary)
+def api_airspaces():
+    # Detail level from ?level= or the map ?zoom= (full detail without either)
+    level = request.args.get('level')
+    if level is None:
+        zoom = request.args.get('zoom', type=int)
+        level = level_for_zoom(zoom)
+    elif level not in LEVEL_NAMES:
+        return jsonify({'error': f"Invalid level: {level!r}", 'levels': list(LEVEL_NAMES)}), 400
+
+    # Revalidated on every use (304 while unchanged): an edit shows up at once
+    return snapshot_response(AirspaceGeometry.snapshot(level))
 
 
 @radar_bp.route('/api/airports')
@@ -106,6 +131,46 @@ def acknowledge_alert(alert_id):
     return jsonify({'success': True})
 
 
+@radar_bp.route('/api/heatmap/<int:z>/<int:x>/<int:y>.<fmt>')
+@login_required
+def api_heatmap_tile(z, x, y, fmt):
+    """Traffic density tile over the last `days` days (maintained aggregate)"""
+    if fmt not in traffic_density.FORMATS:
+        return jsonify({'error': f"Invalid format: {fmt!r}"}), 404
+    if not traffic_density.MIN_ZOOM <= z <= traffic_density.MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({'error': 'Tile out of range',
+                        'min_zoom': traffic_density.MIN_ZOOM, 'max_zoom': traffic_density.MAX_ZOOM}), 404
+    days = min(max(request.args.get('days', traffic_density.DEFAULT_DAYS, type=int), 1), traffic_density.MAX_DAYS)
+    return traffic_density.tile_response(z, x, y, days, fmt)
+
+
+@radar_bp.route('/api/heatmap/config')
+@login_required
+def api_heatmap_config():
+    return jsonify({
+        'min_zoom': traffic_density.MIN_ZOOM,
+        'max_zoom': traffic_density.MAX_ZOOM,
+        'default_days': traffic_density.DEFAULT_DAYS,
+        'max_days': traffic_density.MAX_DAYS
+    })
+
+
+@radar_bp.route('/api/replay')
+@login_required
+def api_replay():
+    """
+    Every aircraft at a past instant `t` (epoch seconds or ISO 8601, UTC),
+    interpolated between the fixes stored within `window` seconds of it
+    """
+    try:
+        t = parse_instant(request.args.get('t'))
+        window = parse_window(request.args.get('window'))
+        frame = replay_frame(t, window)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(frame)
+
+
 @radar_bp.route('/api/weather/tiles')
 @login_required
 def api_weather_tiles():
@@ -141,27 +206,24 @@ def api_airport_weather(icao_code):
 @login_required
 def api_active_overflights():
     """Get active overflights with trajectory data"""
-    active = Overflight.query.filter_by(status='active').all()
-    
+    active = Overflight.query.options(
+        joinedload(Overflight.flight).joinedload(Flight.aircraft)
+    ).filter_by(status='active').all()
+
+    # All trails in one pipelined read (one SQL query for cold buffers)
+    trails = get_trails([ovf.flight_id for ovf in active if ovf.flight_id])
+
     result = []
     for ovf in active:
         flight = ovf.flight
         trajectory = []
         current_pos = None
-        
+
         if flight:
-            positions = FlightPosition.query.filter_by(
-                flight_id=flight.id
-            ).order_by(FlightPosition.timestamp.desc()).limit(50).all()
-            
-            if positions:
-                current_pos = positions[0]
-
-            trajectory = [
-                {'lat': p.latitude, 'lon': p.longitude, 'alt': p.altitude or 0}
-                for p in reversed(positions)
-            ]
-        
+            trajectory = trails.get(flight.id, [])
+            if trajectory:
+                current_pos = trajectory[-1]
+
         result.append({
             'id': ovf.id,
             'session_id': ovf.session_id,
@@ -180,8 +242,8 @@ def api_active_overflights():
                 'flight_number': flight.flight_number if flight else None,
                 'departure': flight.departure_icao if flight else None,
                 'arrival': flight.arrival_icao if flight else None,
-                'altitude': current_pos.altitude if current_pos else (ovf.entry_alt or 0),
-                'ground_speed': current_pos.ground_speed if current_pos else 0,
+                'altitude': current_pos['alt'] if current_pos else (ovf.entry_alt or 0),
+                'ground_speed': current_pos['gs'] if current_pos else 0,
                 'aircraft': {
                     'model': flight.aircraft.model if flight and flight.aircraft else None,
                     'type': flight.aircraft.type_code if flight and flight.aircraft else None,
@@ -202,10 +264,22 @@ def api_overflight_trajectory(overflight_id):
     trajectory = []
     
     if ovf.flight_id:
+        # Range scan on (overflight_id, timestamp); positions are linked at ingest
         positions = FlightPosition.query.filter(
-            FlightPosition.flight_id == ovf.flight_id,
-            FlightPosition.is_in_rdc == True
+            FlightPosition.overflight_id == ovf.id
         ).order_by(FlightPosition.timestamp).all()
+
+        if not positions:
+            # Positions stored before ingestion linked them to their session
+            query = FlightPosition.query.filter(
+                FlightPosition.flight_id == ovf.flight_id,
+                FlightPosition.is_in_rdc == True
+            )
+            if ovf.entry_time:
+                query = query.filter(FlightPosition.timestamp >= ovf.entry_time)
+            if ovf.exit_time:
+                query = query.filter(FlightPosition.timestamp <= ovf.exit_time)
+            positions = query.order_by(FlightPosition.timestamp).all()
         
         trajectory = [
             {'lat': p.latitude, 'lon': p.longitude, 'alt': p.altitude or 0, 'time': p.timestamp.isoformat() if p.timestamp else None}
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: benchmark_socketio_latency.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Websocket latency of the eventlet web server under database and CPU load
+Runs a Socket.IO server (eventlet, as app.py) answering pings, and a client in
+a separate process measuring the round trip of one ping every --interval
+seconds. Each scenario adds load inside the server process, the way request
+handlers would:
+
+- db-blocking:    --db-workers green threads running SELECT pg_sleep(), psycopg2 blocking
+- db-cooperative: the same with the wait callback of utils.cooperative
+- cpu-inline:     --cpu-workers green threads laying out invoice PDFs in the server
+- cpu-pool:       the same through run_cpu_bound() (process pool)
+
+The db scenarios need DATABASE_URL pointing to PostgreSQL; they are skipped
+otherwise.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIOS = ('idle', 'db-blocking', 'db-cooperative', 'cpu-inline', 'cpu-pool')
+
+
+def sample_invoice_data(items=150):
+    """invoice_pdf_data()-shaped invoice with `items` lines"""
+    rows = [[f'Survol - Session OVF-{i:05d}', f'{300 + i} km', '0.85 USD/km', f'{(300 + i) * 0.85:.2f} USD']
+            for i in range(items)]
+    return {
+        'header_title': "RÉGIE DES VOIES AÉRIENNES",
+        'header_subtitle': "République Démocratique du Congo",
+        'header_address': "Aéroport International de N'Djili - Kinshasa",
+        'footer_legal': "Conditions de paiement : 30 jours",
+        'footer_banks': "Banque Centrale du Congo",
+        'logo_path': None,
+        'title': 'FACTURE',
+        'qr_data': 'RVA|BENCH-0001|1000.00|2026-01-01T00:00:00',
+        'info': [['Numéro:', 'BENCH-0001', '', ''], ['Date:', '01/01/2026', '', '']],
+        'client': ['<b>Client</b>', 'Airline'],
+        'details_header': '<b>Détails</b>',
+        'items': [['Description', 'Quantité', 'Prix unitaire', 'Total']] + rows,
+        'totals': [['', '', 'Total', '1000.00 USD']],
+        'bank_details': '<b>Coordonnées bancaires</b>',
+        'regie_name': 'Régie des Voies Aériennes',
+        'contact': 'facturation@rva.cd',
+        'generated': 'Généré par benchmark'
+    }
+
+
+# ----------------------------------------------------------------------
+# Client (separate process, no eventlet)
+# ----------------------------------------------------------------------
+
+def run_client(url, duration, interval):
+    import socketio
+
+    try:
+        import websocket  # noqa: F401 (websocket-client: the websocket transport of socketio.Client)
+        transports = ['websocket']
+    except ImportError:
+        transports = ['polling']
+
+    client = socketio.Client()
+    client.connect(url, transports=transports)
+    rtts = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        sent = time.perf_counter()
+        try:
+            client.call('bench_ping', {}, timeout=30)
+            rtts.append((time.perf_counter() - sent) * 1000)
+        except socketio.exceptions.TimeoutError:
+            rtts.append(30000.0)
+        time.sleep(max(0.0, interval - (time.perf_counter() - sent)))
+    client.disconnect()
+    print(json.dumps({'transport': transports[0], 'rtts': rtts}))
+
+
+# ----------------------------------------------------------------------
+# Server
+# ----------------------------------------------------------------------
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def start_load(scenario, args, stop):
+    """Spawn the load green threads of a scenario; returns a cleanup callable"""
+    import eventlet
+
+    if scenario.startswith('db-'):
+        from psycopg2 import extensions
+        from sqlalchemy import create_engine, text
+        from utils.cooperative import make_psycopg2_green
+
+        if scenario == 'db-cooperative':
+            make_psycopg2_green()
+        else:
+            extensions.set_wait_callback(None)
+        engine = create_engine(os.environ['DATABASE_URL'], pool_size=args.db_workers, max_overflow=0)
+
+        def query():
+            while not stop.is_set():
+                with engine.connect() as conn:
+                    conn.execute(text('SELECT pg_sleep(:s)'), {'s': args.query_seconds})
+
+        workers = [eventlet.spawn(query) for _ in range(args.db_workers)]
+        return lambda: ([w.wait() for w in workers], engine.dispose())
+
+    if scenario.startswith('cpu-'):
+        import tempfile
+        from services.invoice_generator import render_invoice_pdf
+        from utils.cooperative import run_cpu_bound
+
+        data = sample_invoice_data()
+        folder = tempfile.mkdtemp()
+
+        def render(worker):
+            path = os.path.join(folder, f'bench-{worker}.pdf')
+            while not stop.is_set():
+                if scenario == 'cpu-pool':
+                    run_cpu_bound(render_invoice_pdf, path, data)
+                else:
+                    render_invoice_pdf(path, data)
+                # A handler returns to the hub between two requests
+                eventlet.sleep(0)
+
+        workers = [eventlet.spawn(render, i) for i in range(args.cpu_workers)]
+        return lambda: [w.wait() for w in workers]
+
+    return lambda: None
+
+
+def run_scenario(scenario, args, port):
+    import threading
+    import eventlet
+
+    # Green under monkey patching
+    stop = threading.Event()
+    cleanup = start_load(scenario, args, stop)
+    eventlet.sleep(0.5)
+
+    client = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--client', f'http://127.0.0.1:{port}',
+         '--duration', str(args.duration), '--interval', str(args.interval)],
+        stdout=subprocess.PIPE, text=True
+    )
+    # Green wait: the server keeps answering meanwhile
+    while client.poll() is None:
+        eventlet.sleep(0.1)
+    stop.set()
+    cleanup()
+
+    result = json.loads(client.stdout.read().strip().splitlines()[-1])
+    rtts = result['rtts']
+    return {
+        'scenario': scenario,
+        'transport': result['transport'],
+        'pings': len(rtts),
+        'p50': percentile(rtts, 0.5),
+        'p95': percentile(rtts, 0.95),
+        'p99': percentile(rtts, 0.99),
+        'max': max(rtts)
+    }
+
+
+def run_server(args):
+    import eventlet
+    eventlet.monkey_patch()
+
+    from flask import Flask
+    from flask_socketio import SocketIO
+    import utils.cooperative as cooperative
+
+    if args.cpu_pool_workers:
+        cooperative.CPU_POOL_WORKERS = args.cpu_pool_workers
+
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode='eventlet')
+
+    @socketio.on('bench_ping')
+    def bench_ping(data):
+        return data
+
+    eventlet.spawn(socketio.run, app, host='127.0.0.1', port=args.port, log_output=False)
+    eventlet.sleep(0.5)
+
+    postgres = os.environ.get('DATABASE_URL', '').startswith(('postgres://', 'postgresql'))
+    results = []
+    for scenario in args.scenarios:
+        if scenario.startswith('db-') and not postgres:
+            print(f"{scenario}: skipped (DATABASE_URL is not PostgreSQL)")
+            continue
+        print(f"{scenario}: {args.duration:.0f}s...")
+        results.append(run_scenario(scenario, args, args.port))
+
+    cooperative.shutdown_pool()
+
+    print(f"\nRound trip of a Socket.IO ping, ms ({results[0]['transport'] if results else '-'} transport)")
+    print(f"{'scenario':<16}{'pings':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for r in results:
+        print(f"{r['scenario']:<16}{r['pings']:>7}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['max']:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ATM-RDC websocket latency under load")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds measured per scenario (default: 10)")
+    parser.add_argument('--interval', type=float, default=0.05, help="Seconds between two pings (default: 0.05)")
+    parser.add_argument('--db-workers', type=int, default=10, help="Concurrent queries (default: 10)")
+    parser.add_argument('--query-seconds', type=float, default=0.2, help="Duration of each query (default: 0.2)")
+    parser.add_argument('--cpu-workers', type=int, default=4, help="Concurrent PDF layouts (default: 4)")
+    parser.add_argument('--cpu-pool-workers', type=int, default=None,
+                        help="Process pool size for cpu-pool (default: CPU_POOL_WORKERS)")
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--client', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.client:
+        run_client(args.client, args.duration, args.interval)
+    else:
+        run_server(args)
@@ -0,0 +1,71 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: migrate_overflight_sessions.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Adds the partial unique index that allows one active overflight session per
+flight. Duplicate active sessions left by concurrent workers are resolved
+first: the earliest one is kept, the others are marked 'duplicate' and their
+positions are moved to the kept session.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import text
+from models import db
+from config.settings import Config
+
+
+DUPLICATES = """
+    SELECT o.id AS duplicate_id, k.keep_id
+    FROM overflights o
+    JOIN (
+        SELECT flight_id, MIN(id) AS keep_id
+        FROM overflights
+        WHERE status = 'active'
+        GROUP BY flight_id
+        HAVING COUNT(*) > 1
+    ) k ON k.flight_id = o.flight_id
+    WHERE o.status = 'active' AND o.id <> k.keep_id
+"""
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    return app
+
+
+def migrate():
+    app = create_app()
+    with app.app_context():
+        with db.engine.connect() as conn:
+            print("Resolving duplicate active overflight sessions...")
+            duplicates = conn.execute(text(DUPLICATES)).fetchall()
+            for duplicate_id, keep_id in duplicates:
+                conn.execute(text(
+                    "UPDATE flight_positions SET overflight_id = :keep WHERE overflight_id = :dup"
+                ), {'keep': keep_id, 'dup': duplicate_id})
+                conn.execute(text(
+                    "UPDATE overflights SET status = 'duplicate' WHERE id = :dup"
+                ), {'dup': duplicate_id})
+            conn.commit()
+            print(f"{len(duplicates)} duplicate sessions resolved.")
+
+            print("Creating index uq_overflights_active_flight...")
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS uq_overflights_active_flight "
+                "ON overflights (flight_id) WHERE status = 'active'"
+            ))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,77 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: migrate_position_indexes.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Adds the composite trajectory indexes on flight_positions and links
+existing in-RDC positions to their overflight session.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import text
+from models import db
+from config.settings import Config
+
+
+INDEXES = [
+    ("ix_flight_positions_flight_ts", "flight_positions (flight_id, timestamp)"),
+    ("ix_flight_positions_overflight_ts", "flight_positions (overflight_id, timestamp)"),
+]
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    return app
+
+
+def migrate():
+    app = create_app()
+    with app.app_context():
+        is_postgres = 'postgresql' in str(db.engine.url)
+
+        with db.engine.connect() as conn:
+            for name, target in INDEXES:
+                print(f"Creating index {name}...")
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {target}"))
+            conn.commit()
+
+            # Backfill overflight_id for positions recorded inside a session window
+            print("Linking existing positions to overflight sessions...")
+            if is_postgres:
+                result = conn.execute(text("""
+                    UPDATE flight_positions fp
+                    SET overflight_id = o.id
+                    FROM overflights o
+                    WHERE fp.overflight_id IS NULL
+                      AND fp.is_in_rdc = TRUE
+                      AND fp.flight_id = o.flight_id
+                      AND fp.timestamp >= o.entry_time
+                      AND (o.exit_time IS NULL OR fp.timestamp <= o.exit_time)
+                """))
+            else:
+                result = conn.execute(text("""
+                    UPDATE flight_positions
+                    SET overflight_id = (
+                        SELECT o.id FROM overflights o
+                        WHERE o.flight_id = flight_positions.flight_id
+                          AND flight_positions.timestamp >= o.entry_time
+                          AND (o.exit_time IS NULL OR flight_positions.timestamp <= o.exit_time)
+                        LIMIT 1
+                    )
+                    WHERE overflight_id IS NULL AND is_in_rdc = 1
+                """))
+            conn.commit()
+            print(f"{result.rowcount} positions linked.")
+
+
+if __name__ == "__main__":
+    migrate()
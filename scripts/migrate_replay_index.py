@@ -0,0 +1,61 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: migrate_replay_index.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Adds the time bucket column of flight_positions (replay index), fills it for
+the stored positions and creates its index.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import text, inspect
+from models import db
+from models.flight import POSITION_BUCKET_SECONDS
+from config.settings import Config
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    return app
+
+
+def migrate():
+    app = create_app()
+    with app.app_context():
+        is_postgres = 'postgresql' in str(db.engine.url)
+        columns = [c['name'] for c in inspect(db.engine).get_columns('flight_positions')]
+
+        with db.engine.connect() as conn:
+            if 'time_bucket' not in columns:
+                print("Adding flight_positions.time_bucket...")
+                conn.execute(text("ALTER TABLE flight_positions ADD COLUMN time_bucket INTEGER"))
+
+            print("Filling time buckets of stored positions...")
+            if is_postgres:
+                bucket = f"FLOOR(EXTRACT(EPOCH FROM timestamp) / {POSITION_BUCKET_SECONDS})::INTEGER"
+            else:
+                bucket = f"CAST(strftime('%s', timestamp) AS INTEGER) / {POSITION_BUCKET_SECONDS}"
+            result = conn.execute(text(
+                f"UPDATE flight_positions SET time_bucket = {bucket} "
+                f"WHERE time_bucket IS NULL AND timestamp IS NOT NULL"
+            ))
+            print(f"{result.rowcount} positions updated.")
+
+            print("Creating index ix_flight_positions_bucket...")
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_flight_positions_bucket ON flight_positions (time_bucket, flight_id)"
+            ))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,54 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: migrate_spatial_indexes.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Ensures the GiST indexes used by services.spatial_query exist on
+PostGIS databases created before the geometry columns were indexed.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import text
+from models import db
+from config.settings import Config
+
+
+GIST_INDEXES = [
+    ("idx_flight_positions_geom", "flight_positions", "geom"),
+    ("idx_airspaces_geom", "airspaces", "geom"),
+]
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    return app
+
+
+def migrate():
+    app = create_app()
+    with app.app_context():
+        if 'postgresql' not in str(db.engine.url):
+            print("Not a PostgreSQL database, spatial indexes skipped.")
+            return
+
+        with db.engine.connect() as conn:
+            for name, table, column in GIST_INDEXES:
+                print(f"Creating GiST index {name}...")
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING GIST ({column})"))
+            for _, table, _ in GIST_INDEXES:
+                conn.execute(text(f"ANALYZE {table}"))
+            conn.commit()
+            print("Spatial indexes ready.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,50 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: migrate_traffic_density.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Creates the traffic_density_tiles table (heatmap aggregate). The existing
+position history is folded in by the aggregate_traffic_density task, or at
+once with --backfill.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import inspect
+from models import db, TrafficDensityTile
+from config.settings import Config
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    return app
+
+
+def migrate(backfill=False):
+    app = create_app()
+    with app.app_context():
+        if 'traffic_density_tiles' not in inspect(db.engine).get_table_names():
+            TrafficDensityTile.__table__.create(db.engine)
+            print("Table 'traffic_density_tiles' created.")
+        else:
+            print("Table 'traffic_density_tiles' already exists.")
+
+        if backfill:
+            from services import traffic_density
+            while True:
+                stats = traffic_density.aggregate()
+                print(f"Aggregated {stats['positions']} positions (cursor {stats['cursor']})")
+                if stats['positions'] < traffic_density.BATCH_SIZE:
+                    break
+
+
+if __name__ == "__main__":
+    migrate(backfill='--backfill' in sys.argv)
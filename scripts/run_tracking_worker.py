@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+import os
+import sys
+import signal
+import socket
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker_app import get_worker_app, init_worker_process
+from services.tracking_worker import TrackingWorker
+
+app = get_worker_app()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ATM-RDC tracking worker (one per core or node)")
+    parser.add_argument('--name', default=f"{socket.gethostname()}-{os.getpid()}",
+                        help="Unique worker name (default: host-pid)")
+    args = parser.parse_args()
+
+    init_worker_process()
+    worker = TrackingWorker(args.name, app)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+
+    print(f"Starting Tracking Worker {args.name}...")
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
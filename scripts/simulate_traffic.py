@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: simulate_traffic.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Load test of the tracking pipeline with simulated traffic
+Feeds seeded, reproducible traffic (algorithms.traffic_simulator) between the
+airports of the database into dispatch_batch(): tracking workers when some
+are registered, the in-process tracking engine otherwise. Identity
+resolution, geofencing, overflight sessions (billing) and the radar push run
+as with a real source, without any external API.
+"""
+import os
+import sys
+import time
+import argparse
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker_app import get_worker_app, init_worker_process
+from algorithms.traffic_simulator import TrafficSimulator
+
+app = get_worker_app()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ATM-RDC simulated traffic load test")
+    parser.add_argument('--flights', type=int, default=1000, help="Number of simulated flights (default: 1000)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed of the traffic (default: 42)")
+    parser.add_argument('--interval', type=float, default=5.0,
+                        help="Seconds of simulated time between two batches (default: 5)")
+    parser.add_argument('--batches', type=int, default=None, help="Number of batches (default: until interrupted)")
+    parser.add_argument('--fast', action='store_true', help="Send batches back to back instead of in real time")
+    args = parser.parse_args()
+
+    init_worker_process()
+    from services.reference_data import ReferenceData
+    from tasks.flight_tasks import dispatch_batch
+
+    airports = [(icao, a['latitude'], a['longitude']) for icao, a in sorted(ReferenceData.airports().items())
+                if a['latitude'] is not None and a['longitude'] is not None]
+    if len(airports) < 2:
+        sys.exit("At least two airports with coordinates are needed in the database")
+
+    start = time.time()
+    simulator = TrafficSimulator.random_fleet(airports, args.flights, seed=args.seed, start=start)
+    print(f"Simulating {args.flights} flights between {len(airports)} airports (seed {args.seed})...")
+
+    durations = []
+    try:
+        for t, records in simulator.stream(start, interval=args.interval, count=args.batches):
+            if not args.fast:
+                time.sleep(max(0.0, t - time.time()))
+            began = time.perf_counter()
+            result = dispatch_batch(records)
+            durations.append(time.perf_counter() - began)
+            print(f"t+{t - start:.0f}s airborne={len(records)} status={result.get('status')} "
+                  f"{durations[-1] * 1000:.0f} ms")
+    except KeyboardInterrupt:
+        pass
+
+    if durations:
+        durations.sort()
+        print(f"{len(durations)} batches: median {durations[len(durations) // 2] * 1000:.0f} ms, "
+              f"max {durations[-1] * 1000:.0f} ms")
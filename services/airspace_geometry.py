@@ -0,0 +1,192 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: airspace_geometry.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Multi-resolution airspace geometry for the maps
+Every Airspace row (boundary, FIRs, restricted zones...) is served as one
+GeoJSON FeatureCollection per detail level, simplified for the map zoom it
+is drawn at (topology-preserving simplification, then coordinates snapped to
+a grid matching the tolerance). The hardcoded RDC boundary is served while
+no airspace is stored.
+
+Collections are built once per airspace version through SnapshotCache, so
+their ETag is the hash of the content; browsers revalidate them on every use
+(the URL is not versioned). The version is a Redis counter (airspace:version)
+bumped when a committed session changed an Airspace row. The same commit
+drops the geofencing cache of the process; the other processes drop theirs
+when they see the version move (sync_geofencing_cache, every SYNC_SECONDS).
+"""
+import os
+import time
+import logging
+import threading
+from itertools import chain
+
+import shapely
+from shapely.geometry import mapping, shape
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Airspace
+from services.snapshot_cache import SnapshotCache
+from utils import redis_client
+from utils.cooperative import run_cpu_bound
+
+logger = logging.getLogger(__name__)
+
+# (level, highest map zoom served, simplification tolerance and grid, in degrees)
+LEVELS = (
+    ('low', 4, 0.05, 0.001),
+    ('medium', 7, 0.01, 0.0001),
+    ('high', 10, 0.002, 0.00001),
+    ('full', None, 0.0, 0.000001),
+)
+LEVEL_NAMES = tuple(name for name, _, _, _ in LEVELS)
+
+# How often a process compares its geofencing cache with the shared version
+SYNC_SECONDS = float(os.environ.get('AIRSPACE_SYNC_SECONDS', 5))
+
+
+def level_for_zoom(zoom):
+    """Detail level drawn at a map zoom (the finest one without zoom)"""
+    if zoom is None:
+        return LEVEL_NAMES[-1]
+    for name, max_zoom, _, _ in LEVELS:
+        if max_zoom is None or zoom <= max_zoom:
+            return name
+    return LEVEL_NAMES[-1]
+
+
+def simplify(geom, level):
+    """Geometry simplified for `level`"""
+    _, _, tolerance, grid = next(spec for spec in LEVELS if spec[0] == level)
+    if tolerance:
+        geom = shapely.simplify(geom, tolerance, preserve_topology=True)
+    return shapely.set_precision(geom, grid)
+
+
+def simplify_geometries(wkbs, level):
+    """GeoJSON geometries of WKB geometries simplified for `level`"""
+    return [mapping(simplify(shapely.from_wkb(wkb), level)) for wkb in wkbs]
+
+
+def _airspace_shapes():
+    """(properties, shapely geometry) of every stored airspace"""
+    from services.spatial_query import load_airspace_shape
+
+    shapes = []
+    for airspace in Airspace.query.order_by(Airspace.id).all():
+        try:
+            geom = load_airspace_shape(airspace)
+        except Exception as e:
+            logger.warning(f"[AirspaceGeometry] Unreadable geometry for airspace {airspace.id}: {e}")
+            continue
+        if geom is not None and not geom.is_empty:
+            shapes.append((airspace.to_dict(), geom))
+    return shapes
+
+
+def build_collection(level):
+    """GeoJSON FeatureCollection of the airspaces at a detail level"""
+    from services.flight_tracker import RDC_BOUNDARY
+
+    shapes = _airspace_shapes()
+    if not shapes:
+        shapes = [({'id': None, 'name': 'RDC', 'type': 'boundary'}, shape(RDC_BOUNDARY['geometry']))]
+
+    # Simplifying every airspace is CPU-bound: in the pool, off the web server's hub
+    geometries = run_cpu_bound(simplify_geometries, [geom.wkb for _, geom in shapes], level)
+    return {
+        'type': 'FeatureCollection',
+        'level': level,
+        'features': [
+            {'type': 'Feature', 'properties': properties, 'geometry': geometry}
+            for (properties, _), geometry in zip(shapes, geometries)
+        ]
+    }
+
+
+class AirspaceGeometry:
+    """Version of the stored airspaces, and their collections per level"""
+
+    VERSION_KEY = 'airspace:version'
+
+    _lock = threading.Lock()
+    # Used when Redis is unavailable: only this process' changes are seen
+    _local_version = 0
+    # Version the geofencing cache of this process was last checked against
+    _synced_version = None
+    _synced_at = 0.0
+
+    @classmethod
+    def version(cls):
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                shared = r.get(cls.VERSION_KEY)
+                return str(int(shared or 0))
+            except Exception as e:
+                logger.warning(f"[AirspaceGeometry] Redis version read failed: {e}")
+                redis_client.mark_down()
+        return f"local.{cls._local_version}"
+
+    @classmethod
+    def snapshot(cls, level):
+        """Serialized collection of `level` for the current airspace version"""
+        return SnapshotCache.get(f"airspaces:{level}", cls.version(), lambda: build_collection(level))
+
+    @classmethod
+    def sync_geofencing_cache(cls, now=None):
+        """
+        Drop the geofencing cache of this process when another process
+        changed an airspace (the shared version moved). Checked at most
+        every SYNC_SECONDS; called before the cache is read.
+        """
+        from services.flight_tracker import clear_airspace_cache
+
+        now = time.time() if now is None else now
+        if now - cls._synced_at < SYNC_SECONDS:
+            return
+        cls._synced_at = now
+        version = cls.version()
+        if cls._synced_version is not None and version != cls._synced_version:
+            clear_airspace_cache()
+        cls._synced_version = version
+
+    @classmethod
+    def invalidate(cls):
+        """Regenerate the collections, here and in the other processes"""
+        from services.flight_tracker import clear_airspace_cache
+
+        with cls._lock:
+            cls._local_version += 1
+        clear_airspace_cache()
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                r.incr(cls.VERSION_KEY)
+            except Exception as e:
+                logger.warning(f"[AirspaceGeometry] Redis version bump failed: {e}")
+                redis_client.mark_down()
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_airspace_changes(session, flush_context):
+    if any(isinstance(obj, Airspace) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info['airspace_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_airspace_changes(session):
+    if session.info.pop('airspace_changed', False):
+        AirspaceGeometry.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_airspace_changes(session):
+    session.info.pop('airspace_changed', None)
@@ -173,6 +173,7 @@ class AviationStackClient:
                     'codeshared_airline_name': codeshared.get('airline_name'),
                     'codeshared_flight_number': codeshared.get('flight_number'),
                     'live_updated': live.get('updated'),
+                    'source': 'aviationstack',
                     'timestamp': datetime.utcnow().isoformat()
                 })
             
@@ -369,6 +370,7 @@ class ADSBExchangeClient:
                     'aircraft_type_icao': ac.get('t'),
                     'category': ac.get('category'),
                     'emergency': ac.get('emergency'),
+                    'source': 'adsbexchange',
                     'timestamp': datetime.utcnow().isoformat()
                 })
             
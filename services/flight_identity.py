@@ -0,0 +1,363 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: flight_identity.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Flight identity resolution for ingestion
+A received record is matched to its Flight by (icao24, flight_date), then by
+callsign / IATA / ICAO flight-number aliases for that date, then by alias on
+undated flights (rows created by hand or by older versions).
+
+Resolved identities stay in memory, so a known aircraft costs nothing; the
+records of a cycle that are not in memory are warmed with one query, and the
+aircraft still unknown after that are created with one INSERT for Aircraft
+and one for Flight (SQLite, which cannot return the new ids in row order
+from one statement, inserts the flights one by one). On PostgreSQL,
+resolvers creating flights serialize on the ingestion partitions of those
+aircraft (transaction advisory locks), so two workers never create the same
+flight.
+"""
+import time
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, and_, exists, insert, text
+from sqlalchemy.orm import joinedload
+
+from models import db, Flight, Aircraft, Overflight, Landing
+from services.flight_tracker import dialect_insert
+from services.partitioning import partition_for
+
+logger = logging.getLogger(__name__)
+
+# Column sizes of the Flight identity fields
+ALIAS_LENGTHS = {'callsign': 20, 'flight_iata': 10, 'flight_icao': 10}
+# First key of the advisory locks taken on ingestion partitions
+PARTITION_LOCK_NAMESPACE = 7301
+
+
+def _clean(value, lower=False):
+    value = (value or '').strip()
+    return value.lower() if lower else value.upper()
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+class FlightIdentityResolver:
+    """
+    In-memory identity index of one worker process.
+    Not thread-safe on its own: the tracking engine calls it under its lock.
+    """
+
+    # A source without flight dates keeps yesterday's flight while it is still received
+    CONTINUITY_SECONDS = 3 * 3600
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._identities = {}   # (icao24, date) -> flight_id
+        self._aliases = {}      # (ALIAS, date or None) -> flight_id
+        self._aircraft = {}     # icao24 -> aircraft_id
+        self._rejected = set()  # icao24 whose aircraft could not be created today
+        self._in_progress = set()
+        self._last_seen = {}    # flight_id -> time.time()
+        self._day = None
+
+    # ------------------------------------------------------------------
+    # Resolution
+    # ------------------------------------------------------------------
+
+    def resolve(self, flights_data, now=None):
+        """
+        Flight of each record (same order as `flights_data`). Records with
+        neither icao24 nor callsign resolve to None; every other record gets a
+        Flight, created if needed (added to the session, not committed).
+        """
+        now = now or datetime.utcnow()
+        clock = time.time()
+        self._roll_day(now.date())
+
+        keys = [self._record_key(fd, now.date()) for fd in flights_data]
+        resolved = [self._lookup(key, clock) if key else None for key in keys]
+
+        missing = [key for key, flight_id in zip(keys, resolved) if key and flight_id is None]
+        if missing:
+            self._warm(missing)
+            resolved = [flight_id if flight_id or not key else self._lookup(key, clock, warmed=True)
+                        for key, flight_id in zip(keys, resolved)]
+
+        self._ensure_aircraft([key['icao24'] for key in keys if key and key['icao24']], flights_data, keys)
+
+        missing = [(fd, key) for fd, key, flight_id in zip(flights_data, keys, resolved) if key and flight_id is None]
+        if missing and self._lock_partitions([key for _, key in missing]):
+            # Resolvers of the same partitions waited for us, or we for them: read
+            # what the other one committed before creating anything
+            self._warm([key for _, key in missing])
+            resolved = [flight_id if flight_id or not key else self._lookup(key, clock, warmed=True)
+                        for key, flight_id in zip(keys, resolved)]
+            missing = [(fd, key) for fd, key, flight_id in zip(flights_data, keys, resolved)
+                       if key and flight_id is None]
+        if missing:
+            created = self._create_flights(missing)
+            resolved = [flight_id or (created.get(self._new_flight_key(key)) if key else None)
+                        for key, flight_id in zip(keys, resolved)]
+
+        ids = set(flight_id for flight_id in resolved if flight_id)
+        # The landing state machine reads flight.aircraft: loaded with the flights
+        flights = {
+            f.id: f for f in Flight.query.options(joinedload(Flight.aircraft)).filter(Flight.id.in_(ids)).all()
+        } if ids else {}
+
+        attach = {}
+        for key, flight_id in zip(keys, resolved):
+            flight = flights.get(flight_id)
+            if flight is None:
+                continue
+            self._last_seen[flight_id] = clock
+            # Attach the aircraft to flights created without one
+            if flight.aircraft_id is None and self._aircraft.get(key['icao24']):
+                attach[flight_id] = self._aircraft[key['icao24']]
+        if attach:
+            aircraft = {a.id: a for a in Aircraft.query.filter(Aircraft.id.in_(set(attach.values()))).all()}
+            for flight_id, aircraft_id in attach.items():
+                flights[flight_id].aircraft = aircraft.get(aircraft_id)
+
+        return [flights.get(flight_id) for flight_id in resolved]
+
+    def _record_key(self, flight_data, today):
+        icao24 = _clean(flight_data.get('icao24'), lower=True)
+        aliases = []
+        for field in ('callsign', 'flight_iata', 'flight_icao'):
+            # Cut to the column size, as stored, so the alias matches its row
+            alias = _clean(flight_data.get(field))[:ALIAS_LENGTHS[field]]
+            if alias and alias not in aliases:
+                aliases.append(alias)
+        if not icao24 and not aliases:
+            return None
+
+        source_date = _parse_date(flight_data.get('flight_date'))
+        return {
+            'icao24': icao24 or None,
+            'aliases': aliases,
+            'date': source_date or today,
+            # Undated sources may still be flying yesterday's flight
+            'previous_date': None if source_date else today - timedelta(days=1)
+        }
+
+    def _lookup(self, key, clock, warmed=False):
+        flight_id = self._match(key, key['date'])
+        if flight_id:
+            return flight_id
+
+        if key['previous_date']:
+            flight_id = self._match(key, key['previous_date'])
+            recent = clock - self._last_seen.get(flight_id, 0) <= self.CONTINUITY_SECONDS
+            if flight_id and (recent or (warmed and flight_id in self._in_progress)):
+                return flight_id
+
+        for alias in key['aliases']:
+            flight_id = self._aliases.get((alias, None))
+            if flight_id:
+                return flight_id
+        return None
+
+    def _match(self, key, flight_date):
+        if key['icao24']:
+            flight_id = self._identities.get((key['icao24'], flight_date))
+            if flight_id:
+                return flight_id
+        for alias in key['aliases']:
+            flight_id = self._aliases.get((alias, flight_date))
+            if flight_id:
+                return flight_id
+        return None
+
+    # ------------------------------------------------------------------
+    # Warm-up and creation
+    # ------------------------------------------------------------------
+
+    def _warm(self, keys):
+        """Load the candidate flights of every unresolved record in one query"""
+        icaos = list(set(k['icao24'] for k in keys if k['icao24']))
+        aliases = list(set(a for k in keys for a in k['aliases']))
+        dates = list(set(d for k in keys for d in (k['date'], k['previous_date']) if d))
+
+        matches = []
+        if icaos:
+            matches.append(Aircraft.icao24.in_(icaos))
+        if aliases:
+            matches.extend([Flight.callsign.in_(aliases), Flight.flight_iata.in_(aliases),
+                            Flight.flight_icao.in_(aliases)])
+
+        in_progress = or_(
+            exists().where(and_(Overflight.flight_id == Flight.id, Overflight.status == 'active')),
+            exists().where(and_(Landing.flight_id == Flight.id, Landing.status != 'completed'))
+        )
+        rows = db.session.query(
+            Flight.id, Flight.flight_date, Flight.callsign, Flight.flight_iata, Flight.flight_icao,
+            Flight.aircraft_id, Aircraft.icao24, in_progress
+        ).outerjoin(Aircraft, Flight.aircraft_id == Aircraft.id).filter(
+            or_(Flight.flight_date.in_(dates), Flight.flight_date.is_(None)),
+            or_(*matches)
+        ).order_by(Flight.id).all()
+
+        # Ordered by id: the most recent flight wins when an alias repeats
+        for flight_id, flight_date, callsign, flight_iata, flight_icao, aircraft_id, icao24, active in rows:
+            if icao24:
+                self._aircraft[icao24] = aircraft_id
+                if flight_date:
+                    self._identities[(icao24, flight_date)] = flight_id
+            for alias in (callsign, flight_iata, flight_icao):
+                if alias:
+                    self._aliases[(alias.strip().upper(), flight_date)] = flight_id
+            if active:
+                self._in_progress.add(flight_id)
+
+    def _ensure_aircraft(self, icaos, flights_data, keys):
+        """Create the aircraft never seen before, in one statement"""
+        unknown = set(icao for icao in icaos if icao not in self._aircraft and icao not in self._rejected)
+        if not unknown:
+            return
+
+        now = datetime.utcnow()
+        rows = {}
+        for flight_data, key in zip(flights_data, keys):
+            if not key or key['icao24'] not in unknown or key['icao24'] in rows:
+                continue
+            rows[key['icao24']] = {
+                'icao24': key['icao24'],
+                'registration': _clean(flight_data.get('registration')) or None,
+                'type_code': flight_data.get('aircraft_type_icao'),
+                'operator': flight_data.get('airline_name'),
+                'operator_iata': flight_data.get('airline_iata'),
+                'operator_icao': flight_data.get('airline_icao'),
+                'mtow': 0,
+                'mlw': 0,
+                'is_active': True,
+                'created_at': now,
+                'updated_at': now
+            }
+
+        insert = dialect_insert()
+        # Any conflict (icao24 or registration already known) leaves the existing row
+        stmt = insert(Aircraft).values(list(rows.values())).on_conflict_do_nothing().returning(
+            Aircraft.id, Aircraft.icao24
+        )
+        for aircraft_id, icao24 in db.session.execute(stmt):
+            self._aircraft[icao24] = aircraft_id
+
+        skipped = [icao for icao in unknown if icao not in self._aircraft]
+        if skipped:
+            existing = db.session.query(Aircraft.id, Aircraft.icao24).filter(Aircraft.icao24.in_(skipped)).all()
+            self._aircraft.update({icao24: aircraft_id for aircraft_id, icao24 in existing})
+
+        # Registration held by another aircraft: flights go without aircraft,
+        # and the insert is not attempted again before tomorrow
+        rejected = [icao for icao in skipped if icao not in self._aircraft]
+        if rejected:
+            self._rejected.update(rejected)
+            logger.warning(
+                "[FlightIdentity] Aircraft not created, registration already used by another aircraft: "
+                + ', '.join(f"{icao} ({rows[icao]['registration']})" for icao in sorted(rejected))
+            )
+
+    @staticmethod
+    def _lock_partitions(keys):
+        """
+        Hold the advisory locks of the partitions of `keys` until the end of
+        the transaction (PostgreSQL only, in partition order so two resolvers
+        cannot deadlock). Returns True when locks were taken.
+        """
+        if db.engine.dialect.name != 'postgresql':
+            return False
+        partitions = sorted(set(
+            partition_for(key['icao24'] or f"cs:{key['aliases'][0]}") for key in keys
+        ))
+        for partition in partitions:
+            db.session.execute(
+                text('SELECT pg_advisory_xact_lock(:namespace, :partition)'),
+                {'namespace': PARTITION_LOCK_NAMESPACE, 'partition': partition}
+            )
+        return True
+
+    @staticmethod
+    def _new_flight_key(key):
+        return (key['icao24'] or key['aliases'][0], key['date'])
+
+    def _create_flights(self, missing):
+        """Insert one Flight per unresolved aircraft in one statement. Returns {new key: flight_id}."""
+        now = datetime.utcnow()
+        rows = {}
+        icao_of = {}
+        for flight_data, key in missing:
+            new_key = self._new_flight_key(key)
+            if new_key in rows:
+                continue
+            icao_of[new_key] = key['icao24']
+            on_ground = bool(flight_data.get('on_ground'))
+            rows[new_key] = {
+                'callsign': (key['aliases'][0] if key['aliases'] else key['icao24'].upper())[:20],
+                'flight_number': (flight_data.get('flight_number') or '')[:20] or None,
+                'flight_iata': _clean(flight_data.get('flight_iata'))[:10] or None,
+                'flight_icao': _clean(flight_data.get('flight_icao'))[:10] or None,
+                'aircraft_id': self._aircraft.get(key['icao24']),
+                'flight_date': key['date'],
+                'departure_icao': flight_data.get('departure_icao'),
+                'departure_iata': flight_data.get('departure_iata'),
+                'departure_airport': flight_data.get('departure_airport'),
+                'arrival_icao': flight_data.get('arrival_icao'),
+                'arrival_iata': flight_data.get('arrival_iata'),
+                'arrival_airport': flight_data.get('arrival_airport'),
+                'flight_status': 'on_ground' if on_ground else 'in_flight',
+                'departure_delay_min': 0,
+                'arrival_delay_min': 0,
+                'is_domestic': False,
+                'is_cargo': False,
+                'created_at': now,
+                'updated_at': now
+            }
+
+        new_keys = list(rows)
+        # Ids come back in the order of the rows (batch index), whatever the dialect
+        stmt = insert(Flight).returning(Flight.id, sort_by_parameter_order=True)
+        flight_ids = db.session.scalars(stmt, [rows[k] for k in new_keys]).all()
+
+        created = {}
+        for new_key, flight_id in zip(new_keys, flight_ids):
+            row = rows[new_key]
+            created[new_key] = flight_id
+            flight_date = new_key[1]
+            if icao_of[new_key]:
+                self._identities[(icao_of[new_key], flight_date)] = flight_id
+            for alias in (row['callsign'], row['flight_iata'], row['flight_icao']):
+                if alias:
+                    self._aliases.setdefault((alias, flight_date), flight_id)
+
+        logger.info(f"[FlightIdentity] Created {len(created)} flights for unseen aircraft")
+        return created
+
+    def _roll_day(self, today):
+        """Forget identities older than yesterday once the date changes"""
+        if self._day == today:
+            return
+        keep = today - timedelta(days=1)
+        self._identities = {k: v for k, v in self._identities.items() if k[1] >= keep}
+        self._aliases = {k: v for k, v in self._aliases.items() if k[1] is None or k[1] >= keep}
+        live = set(self._identities.values()) | set(self._aliases.values())
+        self._last_seen = {k: v for k, v in self._last_seen.items() if k in live}
+        self._in_progress &= live
+        self._rejected.clear()
+        self._day = today
+
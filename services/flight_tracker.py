@@ -12,21 +12,34 @@ Air Traffic Management - RDC
 """
 
 from datetime import datetime
-import random
 import math
 import os
+import time
 from functools import lru_cache
 
+import numpy as np
+import shapely
+from shapely import wkt
 from shapely.geometry import Point, shape
 from shapely.prepared import prep
+from algorithms.traffic_simulator import TrafficSimulator, great_circle_distances, KM_PER_NM, DEFAULT_CRUISE_SPEED_KTS
 from geoalchemy2.shape import to_shape
 from models import db, Flight, FlightPosition, Aircraft, Airport, Overflight, Landing, TariffConfig, Airspace, SystemConfig
 from services.api_client import fetch_external_flight_data, openweathermap, aviationweather
-from services.invoice_generator import trigger_auto_invoice
-from services.telegram_service import TelegramService
+from services import outbox
 from services.translation_service import t
+from services.live_state import LiveStateStore, normalize_state
+from services.reference_data import ReferenceData
+from utils.system_gate import SystemGate
 
 CACHED_RDC_BOUNDARY_GEOM = None
+CACHED_AIRSPACE_ZONES = None
+CACHED_AIRPORT_ARRAYS = None
+CACHED_TARIFFS = None
+CACHED_TARIFFS_AT = 0.0
+
+# Tariff edits reach running workers after at most this delay
+TARIFF_SNAPSHOT_TTL = 300
 
 RDC_BOUNDARY = {
     "type": "Feature",
@@ -84,6 +97,8 @@ def get_rdc_boundary_geom():
     """
     global CACHED_RDC_BOUNDARY_GEOM
 
+    from services.airspace_geometry import AirspaceGeometry
+    AirspaceGeometry.sync_geofencing_cache()
     if CACHED_RDC_BOUNDARY_GEOM is not None:
         return CACHED_RDC_BOUNDARY_GEOM
 
@@ -121,22 +136,169 @@ def is_point_in_rdc(lat, lon):
     return geom.contains(point)
 
 
-def get_active_flights(use_external_api=True):
+def are_points_in_rdc(lats, lons):
+    """
+    Vectorized geofence: one boolean per (lat, lon) pair.
+    Missing coordinates are reported as outside.
     """
-    Get active flights from external API (AviationStack/ADSBexchange) or database.
+    geom = get_rdc_boundary_geom()
+    if geom is None or not lats:
+        return [False] * len(lats)
+
+    valid = [i for i, (lat, lon) in enumerate(zip(lats, lons)) if lat is not None and lon is not None]
+    result = [False] * len(lats)
+    if not valid:
+        return result
+
+    # PreparedGeometry wraps the shapely geometry in .context
+    inside = shapely.contains_xy(
+        getattr(geom, 'context', geom),
+        [lons[i] for i in valid],
+        [lats[i] for i in valid]
+    )
+    for i, flag in zip(valid, inside):
+        result[i] = bool(flag)
+    return result
+
+
+def get_airspace_zones():
+    """
+    Named zones inside the RDC (FIR, restricted areas...) as (name, geometry)
+    pairs, cached like the boundary.
+    """
+    global CACHED_AIRSPACE_ZONES
+
+    from services.airspace_geometry import AirspaceGeometry
+    AirspaceGeometry.sync_geofencing_cache()
+    if CACHED_AIRSPACE_ZONES is not None:
+        return CACHED_AIRSPACE_ZONES
+
+    zones = []
+    try:
+        for airspace in Airspace.query.filter(Airspace.type != 'boundary').all():
+            if airspace.geom is None:
+                continue
+            geom = wkt.loads(airspace.geom) if isinstance(airspace.geom, str) else to_shape(airspace.geom)
+            shapely.prepare(geom)
+            zones.append((airspace.name, geom))
+    except Exception as e:
+        print(f"[FlightTracker] Failed to load airspace zones from DB: {e}")
+        return []
+
+    CACHED_AIRSPACE_ZONES = zones
+    return zones
+
+
+def clear_airspace_cache():
+    """Forget the cached boundary and zones (after an Airspace change)"""
+    global CACHED_RDC_BOUNDARY_GEOM, CACHED_AIRSPACE_ZONES
+    CACHED_RDC_BOUNDARY_GEOM = None
+    CACHED_AIRSPACE_ZONES = None
+
+
+def zones_for_points(lats, lons):
+    """Names of the zones containing each point (one list per point)"""
+    result = [[] for _ in lats]
+    zones = get_airspace_zones()
+    if not zones or not lats:
+        return result
+    for name, geom in zones:
+        inside = shapely.contains_xy(geom, lons, lats)
+        for i, flag in enumerate(inside):
+            if flag:
+                result[i].append(name)
+    return result
+
+
+def format_radar_flight(state):
+    """Convert a normalized live state (see services.live_state) to the radar payload"""
+    status = state.get('status') or 'in_flight'
+    status_color = 'green'
+    if status == 'approaching':
+        status_color = 'yellow'
+    elif status == 'on_ground':
+        status_color = 'blue'
+
+    return {
+        'id': state.get('flight_id') or state.get('key'),
+        'callsign': state.get('callsign'),
+        'flight_number': state.get('flight_number'),
+        'latitude': state.get('latitude'),
+        'longitude': state.get('longitude'),
+        'altitude': state.get('altitude') or 0,
+        'heading': state.get('heading') or 0,
+        'ground_speed': state.get('ground_speed') or 0,
+        'vertical_speed': state.get('vertical_speed') or 0,
+        'status': status,
+        'status_color': status_color,
+        'in_rdc': state.get('in_rdc', False),
+        'departure': state.get('departure_icao'),
+        'arrival': state.get('arrival_icao'),
+        'departure_details': {
+            'icao': state.get('departure_icao'),
+            'terminal': state.get('departure_terminal'),
+            'gate': state.get('departure_gate'),
+            'timezone': state.get('departure_timezone')
+        },
+        'arrival_details': {
+            'icao': state.get('arrival_icao'),
+            'terminal': state.get('arrival_terminal'),
+            'gate': state.get('arrival_gate'),
+            'baggage': state.get('arrival_baggage'),
+            'timezone': state.get('arrival_timezone')
+        },
+        'codeshare': {
+            'airline': state.get('codeshared_airline_name'),
+            'flight_number': state.get('codeshared_flight_number')
+        },
+        'squawk': state.get('squawk'),
+        'aircraft': {
+            'registration': state.get('registration'),
+            'model': state.get('aircraft_type_iata') or state.get('aircraft_type_icao'),
+            'type': state.get('aircraft_type_icao') or state.get('aircraft_type_iata'),
+            'operator': state.get('airline_name') or state.get('airline_iata'),
+            'airline_iata': state.get('airline_iata')
+        }
+    }
+
+
+def get_live_flights():
+    """
+    Radar view read from the live-state store (no relational DB access).
+    Returns None when the store is cold so callers can fall back.
+    """
+    if not LiveStateStore.is_warm():
+        return None
+
+    if not SystemGate.is_active():
+        return []
+
+    return [format_radar_flight(s) for s in LiveStateStore.get_snapshot()]
+
+
+def get_active_flights(use_external_api=True, use_live_state=True):
+    """
+    Get active flights from the live-state store, external API (AviationStack/ADSBexchange) or database.
 
     Check system status first.
     
     Strategy:
-    1. Try external API first (if configured)
-    2. Fallback to database + simulation if API fails or not configured
+    1. Read the live-state store written by the ingestion worker (if warm)
+    2. Try external API (if configured)
+    3. Fallback to database + simulation if API fails or not configured
     
     Args:
         use_external_api: Whether to attempt external API fetch first
+        use_live_state: Whether to serve from the live-state store when warm
         
     Returns:
         List of flight dictionaries with position data
     """
+    if use_live_state:
+        live_flights = get_live_flights()
+        if live_flights is not None:
+            return live_flights
+
     # Check system status
     config = SystemConfig.query.filter_by(key='system_active').first()
     if config and config.get_typed_value() is False:
@@ -153,59 +315,10 @@ def get_active_flights(use_external_api=True):
                     lat = flight_data.get('latitude')
                     lon = flight_data.get('longitude')
                     in_rdc = is_point_in_rdc(lat, lon) if lat and lon else False
-                    
-                    alt = flight_data.get('altitude') or 0
-                    status = 'on_ground' if flight_data.get('on_ground') else 'in_flight'
-                    if alt > 0 and alt < 10000 and not flight_data.get('on_ground'):
-                        status = 'approaching'
-                    
-                    status_color = 'green'
-                    if status == 'approaching':
-                        status_color = 'yellow'
-                    elif status == 'on_ground':
-                        status_color = 'blue'
-                    
-                    result.append({
-                        'id': hash(flight_data.get('icao24', flight_data.get('callsign', ''))),
-                        'callsign': flight_data.get('callsign') or flight_data.get('icao24', 'UNKNOWN'),
-                        'flight_number': flight_data.get('flight_number') or flight_data.get('callsign'),
-                        'latitude': lat,
-                        'longitude': lon,
-                        'altitude': alt,
-                        'heading': flight_data.get('heading') or 0,
-                        'ground_speed': flight_data.get('ground_speed') or 0,
-                        'vertical_speed': flight_data.get('vertical_speed') or 0,
-                        'status': status,
-                        'status_color': status_color,
-                        'in_rdc': in_rdc,
-                        'departure': flight_data.get('departure_icao'),
-                        'arrival': flight_data.get('arrival_icao'),
-                        'departure_details': {
-                            'icao': flight_data.get('departure_icao'),
-                            'terminal': flight_data.get('departure_terminal'),
-                            'gate': flight_data.get('departure_gate'),
-                            'timezone': flight_data.get('departure_timezone')
-                        },
-                        'arrival_details': {
-                            'icao': flight_data.get('arrival_icao'),
-                            'terminal': flight_data.get('arrival_terminal'),
-                            'gate': flight_data.get('arrival_gate'),
-                            'baggage': flight_data.get('arrival_baggage'),
-                            'timezone': flight_data.get('arrival_timezone')
-                        },
-                        'codeshare': {
-                            'airline': flight_data.get('codeshared_airline_name'),
-                            'flight_number': flight_data.get('codeshared_flight_number')
-                        },
-                        'squawk': flight_data.get('squawk'),
-                        'aircraft': {
-                            'registration': flight_data.get('registration'),
-                            'model': flight_data.get('aircraft_type_iata') or flight_data.get('aircraft_type_icao'),
-                            'type': flight_data.get('aircraft_type_icao') or flight_data.get('aircraft_type_iata'),
-                            'operator': flight_data.get('airline_name') or flight_data.get('airline_iata'),
-                            'airline_iata': flight_data.get('airline_iata')
-                        }
-                    })
+
+                    state = normalize_state(flight_data, in_rdc=in_rdc)
+                    if state:
+                        result.append(format_radar_flight(state))
                 
                 if result:
                     return result
@@ -213,24 +326,34 @@ def get_active_flights(use_external_api=True):
             print(f"[FlightTracker] External API error, falling back to simulation: {e}")
     
     # Fallback: Use database flights with simulation
+    # One query for the flights; airports and aircraft come from the reference registry
     flights = Flight.query.filter(
         Flight.flight_status.in_(['in_flight', 'approaching', 'on_ground'])
     ).all()
-    
+
+    airports = ReferenceData.airports()
+    aircraft_by_id = ReferenceData.aircraft([f.aircraft_id for f in flights])
+    airborne = [f for f in flights if f.flight_status == 'in_flight']
+    simulated = dict(zip([f.id for f in airborne], simulate_flight_positions(airborne)))
+
+    positions = []
     for flight in flights:
-        aircraft = flight.aircraft
-        
-        if flight.flight_status == 'in_flight':
-            lat, lon, alt, heading, speed = simulate_flight_position(flight)
+        if flight.id in simulated:
+            positions.append(simulated[flight.id])
+            continue
+        airport = airports.get(flight.arrival_icao)
+        if airport:
+            positions.append((airport['latitude'], airport['longitude'], 0, 0, 0))
         else:
-            lat = lon = alt = heading = speed = 0
-            if flight.arrival_icao:
-                airport = Airport.query.filter_by(icao_code=flight.arrival_icao).first()
-                if airport:
-                    lat = airport.latitude
-                    lon = airport.longitude
-        
-        in_rdc = is_point_in_rdc(lat, lon) if lat and lon else False
+            positions.append((0, 0, 0, 0, 0))
+
+    in_rdc_flags = are_points_in_rdc(
+        [lat if lat and lon else None for lat, lon, _, _, _ in positions],
+        [lon if lat and lon else None for lat, lon, _, _, _ in positions]
+    )
+
+    for flight, (lat, lon, alt, heading, speed), in_rdc in zip(flights, positions, in_rdc_flags):
+        aircraft = aircraft_by_id.get(flight.aircraft_id)
         
         status_color = 'green'
         if flight.flight_status == 'approaching':
@@ -272,10 +395,10 @@ def get_active_flights(use_external_api=True):
             },
             'squawk': None,
             'aircraft': {
-                'registration': aircraft.registration if aircraft else None,
-                'model': aircraft.model if aircraft else None,
-                'type': aircraft.type_code if aircraft else None,
-                'operator': aircraft.operator if aircraft else None,
+                'registration': aircraft['registration'],
+                'model': aircraft['model'],
+                'type': aircraft['type_code'],
+                'operator': aircraft['operator'],
                 'airline_iata': None  # DB flights might not have this easily available unless stored
             } if aircraft else None
         })
@@ -283,41 +406,59 @@ def get_active_flights(use_external_api=True):
     return result
 
 
+# Position used for flights whose route is unknown
+DEFAULT_SIMULATED_POSITION = (-2.0, 20.0, 35000, 90, 450)
+
+
 def simulate_flight_position(flight):
-    if not flight.departure_icao or not flight.arrival_icao:
-        return -2.0, 20.0, 35000, 90, 450
-    
-    dep = Airport.query.filter_by(icao_code=flight.departure_icao).first()
-    arr = Airport.query.filter_by(icao_code=flight.arrival_icao).first()
-    
-    if not dep or not arr:
-        return -2.0, 20.0, 35000, 90, 450
-    
-    if flight.scheduled_departure and flight.scheduled_arrival:
-        total_duration = (flight.scheduled_arrival - flight.scheduled_departure).total_seconds()
-        elapsed = (datetime.utcnow() - flight.scheduled_departure).total_seconds()
-        progress = min(max(elapsed / total_duration if total_duration > 0 else 0.5, 0), 1)
-    else:
-        progress = 0.5
-    
-    lat = dep.latitude + (arr.latitude - dep.latitude) * progress
-    lon = dep.longitude + (arr.longitude - dep.longitude) * progress
-    
-    lat += random.uniform(-0.05, 0.05)
-    lon += random.uniform(-0.05, 0.05)
-    
-    heading = calculate_heading(dep.latitude, dep.longitude, arr.latitude, arr.longitude)
-    
-    if progress < 0.2:
-        altitude = 15000 + progress * 5 * 20000
-    elif progress > 0.8:
-        altitude = 35000 - (progress - 0.8) * 5 * 20000
-    else:
-        altitude = 35000
-    
-    speed = 450 + random.uniform(-20, 20)
-    
-    return lat, lon, altitude, heading, speed
+    return simulate_flight_positions([flight])[0]
+
+
+def simulate_flight_positions(flights, now=None):
+    """
+    Simulated (lat, lon, altitude, heading, speed) of each in-flight DB flight
+    on the great circle between its airports (taken from the reference
+    registry, no query), computed for the whole batch at once by the traffic
+    simulator. Positions only depend on the schedule and `now`, so repeated
+    polls show the aircraft moving steadily.
+    """
+    now = now or datetime.utcnow()
+    airports = ReferenceData.airports()
+    results = [DEFAULT_SIMULATED_POSITION] * len(flights)
+
+    routed = []
+    for i, flight in enumerate(flights):
+        dep = airports.get(flight.departure_icao) if flight.departure_icao else None
+        arr = airports.get(flight.arrival_icao) if flight.arrival_icao else None
+        if not dep or not arr:
+            continue
+        if flight.scheduled_departure and flight.scheduled_arrival:
+            departure = (flight.scheduled_departure - now).total_seconds()
+            duration = (flight.scheduled_arrival - flight.scheduled_departure).total_seconds()
+        else:
+            departure = duration = None
+        routed.append((i, dep['latitude'], dep['longitude'], arr['latitude'], arr['longitude'], departure, duration))
+
+    if not routed:
+        return results
+
+    index, dep_lat, dep_lon, arr_lat, arr_lon, departure, duration = zip(*routed)
+    distance_nm = great_circle_distances(dep_lat, dep_lon, arr_lat, arr_lon) / KM_PER_NM
+    # Speed that keeps to the schedule; unscheduled flights fly at the default speed, halfway
+    scheduled = np.array([d is not None and d > 0 for d in duration])
+    duration_h = np.array([d if d else 1.0 for d in duration], dtype=float) / 3600.0
+    speeds = np.where(scheduled, np.clip(distance_nm / duration_h, 150, 600), DEFAULT_CRUISE_SPEED_KTS)
+    departures = np.where(
+        scheduled,
+        np.array([d if d is not None else 0.0 for d in departure], dtype=float),
+        -distance_nm / DEFAULT_CRUISE_SPEED_KTS * 3600.0 / 2
+    )
+
+    state = TrafficSimulator(dep_lat, dep_lon, arr_lat, arr_lon, departures, cruise_speeds=speeds).positions(0.0)
+    columns = zip(*(state[k].tolist() for k in ('latitude', 'longitude', 'altitude', 'heading', 'ground_speed')))
+    for i, position in zip(index, columns):
+        results[i] = position
+    return results
 
 
 def calculate_heading(lat1, lon1, lat2, lon2):
@@ -332,118 +473,172 @@ def calculate_heading(lat1, lon1, lat2, lon2):
     return (heading + 360) % 360
 
 
-def check_overflight_entry(flight_id, lat, lon, alt):
-    if not is_point_in_rdc(lat, lon):
-        return None
-    
-    existing = Overflight.query.filter_by(
-        flight_id=flight_id,
-        status='active'
-    ).first()
-    
-    if existing:
-        return existing
-    
+def new_overflight_session_id():
     from uuid import uuid4
-    session_id = f"OVF-{datetime.now().strftime('%Y%m%d')}-{uuid4().hex[:8].upper()}"
-    
-    flight = Flight.query.get(flight_id)
-    
-    overflight = Overflight(
-        session_id=session_id,
-        flight_id=flight_id,
-        aircraft_id=flight.aircraft_id if flight else None,
-        entry_lat=lat,
-        entry_lon=lon,
-        entry_alt=alt,
-        entry_time=datetime.utcnow(),
-        status='active'
-    )
-    
-    db.session.add(overflight)
-    db.session.commit()
-    
-    # Notify Telegram: Entry
-    try:
-        TelegramService.notify_entry(flight)
-    except Exception as e:
-        print(f"[FlightTracker] Failed to send Telegram entry notification: {e}")
+    return f"OVF-{datetime.now().strftime('%Y%m%d')}-{uuid4().hex[:8].upper()}"
 
-    return overflight
 
+def dialect_insert():
+    """INSERT construct of the current dialect (supports ON CONFLICT ... RETURNING)"""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
 
-def check_overflight_exit(flight_id, lat, lon, alt):
-    if is_point_in_rdc(lat, lon):
-        return None
-    
-    overflight = Overflight.query.filter_by(
-        flight_id=flight_id,
-        status='active'
-    ).first()
-    
-    if not overflight:
-        return None
-    
+
+def open_overflights(entries, now=None):
+    """
+    Create the active overflight sessions of a cycle in one statement.
+
+    `entries` is a list of (flight, lat, lon, alt). Relies on the partial
+    unique index uq_overflights_active_flight: a flight that already has an
+    active session (opened by another worker meanwhile) is skipped by
+    ON CONFLICT DO NOTHING and its existing session is returned instead.
+
+    Returns {flight_id: (overflight_id, created)}. Not committed.
+    """
+    now = now or datetime.utcnow()
+    rows = {}
+    for flight, lat, lon, alt in entries:
+        rows.setdefault(flight.id, {
+            'session_id': new_overflight_session_id(),
+            'flight_id': flight.id,
+            'aircraft_id': flight.aircraft_id,
+            'entry_lat': lat,
+            'entry_lon': lon,
+            'entry_alt': alt,
+            'entry_time': now,
+            'status': 'active',
+            'position_count': 0,
+            'is_night': False,
+            'is_billed': False,
+            'billing_amount': 0,
+            'created_at': now,
+            'updated_at': now
+        })
+    if not rows:
+        return {}
+
+    insert = dialect_insert()
+    stmt = insert(Overflight).values(list(rows.values())).on_conflict_do_nothing(
+        index_elements=['flight_id'],
+        index_where=Overflight.status == 'active'
+    ).returning(Overflight.id, Overflight.flight_id)
+
+    opened = {flight_id: (overflight_id, True) for overflight_id, flight_id in db.session.execute(stmt)}
+
+    skipped = [flight_id for flight_id in rows if flight_id not in opened]
+    if skipped:
+        existing = db.session.query(Overflight.id, Overflight.flight_id).filter(
+            Overflight.flight_id.in_(skipped),
+            Overflight.status == 'active'
+        ).all()
+        opened.update({flight_id: (overflight_id, False) for overflight_id, flight_id in existing})
+
+    return opened
+
+
+def close_overflight(overflight, lat, lon, alt, now=None, stats=None):
+    """
+    Record the exit point of an overflight session (not committed).
+    `stats` (OverflightAccumulator) supplies the along-track metrics.
+    """
     overflight.exit_lat = lat
     overflight.exit_lon = lon
     overflight.exit_alt = alt
-    overflight.exit_time = datetime.utcnow()
+    overflight.exit_time = now or datetime.utcnow()
     overflight.status = 'completed'
-    
+
     if overflight.entry_time:
         duration = (overflight.exit_time - overflight.entry_time).total_seconds() / 60
         overflight.duration_minutes = duration
-    
+
     if overflight.entry_lat and overflight.entry_lon:
         distance = calculate_distance(
             overflight.entry_lat, overflight.entry_lon,
             overflight.exit_lat, overflight.exit_lon
         )
         overflight.distance_km = distance
-    
-    db.session.commit()
 
-    # Notify billing
-    from services.notification_service import NotificationService
-    flight = Flight.query.get(flight_id)
+    if stats is not None:
+        stats.apply_to(overflight)
+
+    return overflight
+
+
+def notify_overflight_entry(flight):
+    """Queue the Telegram entry message (delivered by the outbox once committed)"""
+    outbox.enqueue('telegram.entry', session=db.session, flight_id=flight.id)
+
+
+def notify_overflight_exit(overflight, flight=None):
+    """Queue the billing notification, Telegram exit message and auto-invoice of an exit"""
+    flight = flight or Flight.query.get(overflight.flight_id)
     callsign = flight.callsign if flight else "Unknown"
-    NotificationService.notify_billing(
+    outbox.enqueue(
+        'billing.notify', session=db.session,
         type='overflight_completed',
         title=t('notifications.overflight_completed_title', 'fr').format(callsign=callsign),
         message=t('notifications.overflight_completed_msg', 'fr').format(callsign=callsign),
-        link=f"/radar/overflights"
+        link="/radar/overflights"
     )
+    outbox.enqueue('telegram.exit', session=db.session, overflight_id=overflight.id)
+    # With an active landing, the invoice waits until parking completes
+    outbox.enqueue('invoice.auto', session=db.session, flight_id=overflight.flight_id, unless_landing_active=True)
+
+
+def check_overflight_entry(flight_id, lat, lon, alt):
+    if not is_point_in_rdc(lat, lon):
+        return None
+
+    flight = db.session.get(Flight, flight_id)
+    if not flight:
+        return None
+
+    overflight_id, created = open_overflights([(flight, lat, lon, alt)]).get(flight_id, (None, False))
+    if overflight_id is None:
+        return None
+    if created:
+        notify_overflight_entry(flight)
+    db.session.commit()
+
+    return db.session.get(Overflight, overflight_id)
+
+
+def check_overflight_exit(flight_id, lat, lon, alt):
+    if is_point_in_rdc(lat, lon):
+        return None
     
-    # Notify Telegram: Exit
-    try:
-        TelegramService.notify_exit(overflight)
-    except Exception as e:
-        print(f"[FlightTracker] Failed to send Telegram exit notification: {e}")
-
-    # Check if there is an active landing for this flight.
-    # If YES, we wait for landing to complete.
-    # If NO, we trigger invoice immediately.
-    active_landing = Landing.query.filter(
-        Landing.flight_id == flight_id,
-        Landing.status != 'completed'
+    overflight = Overflight.query.filter_by(
+        flight_id=flight_id,
+        status='active'
     ).first()
-
-    if not active_landing:
-        trigger_auto_invoice(flight_id)
+    
+    if not overflight:
+        return None
+    
+    close_overflight(overflight, lat, lon, alt)
+    notify_overflight_exit(overflight)
+    db.session.commit()
 
     return overflight
 
 
-@lru_cache(maxsize=32)
-def _get_tariff_config(code):
-    tariff = TariffConfig.query.filter_by(code=code).first()
-    return tariff.value if tariff else None
+def get_tariff_snapshot():
+    """All tariff values by code, loaded in one query and refreshed every TARIFF_SNAPSHOT_TTL"""
+    global CACHED_TARIFFS, CACHED_TARIFFS_AT
+
+    if CACHED_TARIFFS is None or time.time() - CACHED_TARIFFS_AT > TARIFF_SNAPSHOT_TTL:
+        CACHED_TARIFFS = {tariff.code: tariff.value for tariff in TariffConfig.query.all()}
+        CACHED_TARIFFS_AT = time.time()
+    return CACHED_TARIFFS
 
 
 def get_tariff_value(code, default=0.0):
     """Get tariff value from DB or return default"""
     try:
-        val = _get_tariff_config(code)
+        val = get_tariff_snapshot().get(code)
         return val if val is not None else default
     except:
         return default
@@ -467,117 +662,141 @@ def get_cached_rdc_airports():
     return _fetch_rdc_airports_from_db()
 
 
-def check_landing_events(flight_id, lat, lon, alt, speed, active_landing=None, skip_db_lookup=False):
+def get_rdc_airport_index():
+    """RDC airports with their coordinates as radian row vectors, built once per airport list"""
+    global CACHED_AIRPORT_ARRAYS
+
+    airports = get_cached_rdc_airports()
+    if CACHED_AIRPORT_ARRAYS is None or CACHED_AIRPORT_ARRAYS[0] is not airports:
+        CACHED_AIRPORT_ARRAYS = (
+            airports,
+            np.radians(np.array([a['latitude'] for a in airports], dtype=float))[None, :],
+            np.radians(np.array([a['longitude'] for a in airports], dtype=float))[None, :]
+        )
+    return CACHED_AIRPORT_ARRAYS
+
+
+def nearest_rdc_airports(lats, lons):
     """
-    Check for landing and parking events
+    Vectorized nearest RDC airport for each point.
+    Returns (airports, index array, distance array in km); index -1 when no airport is known.
     """
-    flight = Flight.query.get(flight_id)
-    if not flight:
-        return None
+    airports, a_lat, a_lon = get_rdc_airport_index()
+    n = len(lats)
+    if not airports or n == 0:
+        return airports, np.full(n, -1), np.full(n, np.inf)
 
-    # Get RDC airports (cached)
-    airports = get_cached_rdc_airports()
+    lat = np.radians(np.asarray(lats, dtype=float))[:, None]
+    lon = np.radians(np.asarray(lons, dtype=float))[:, None]
 
-    nearest_airport = None
-    min_dist = float('inf')
+    h = (np.sin((a_lat - lat) / 2) ** 2 +
+         np.cos(lat) * np.cos(a_lat) * np.sin((a_lon - lon) / 2) ** 2)
+    distances = 2 * 6371 * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+    index = distances.argmin(axis=1)
+    return airports, index, distances[np.arange(n), index]
 
-    for airport in airports:
-        dist = calculate_distance(lat, lon, airport['latitude'], airport['longitude'])
-        if dist < min_dist:
-            min_dist = dist
-            nearest_airport = airport
 
-    if not nearest_airport or min_dist > 50: # Check within 50km
-        return None
+def process_landing_batch(flights, lats, lons, alts, speeds, landing_map=None, overflight_map=None,
+                          commit=True, now=None, overflight_stats=None):
+    """
+    Landing/parking state machine over a batch of positions.
 
-    # Check for active landing session (not completed)
-    if skip_db_lookup:
-        landing = active_landing
-    else:
-        landing = Landing.query.filter(
-            Landing.flight_id == flight_id,
-            Landing.status != 'completed'
-        ).order_by(Landing.created_at.desc()).first()
+    flights/lats/lons/alts/speeds are parallel sequences. landing_map maps
+    flight_id -> active Landing (None: loaded in one query); overflight_map maps
+    flight_id -> active Overflight (None: loaded in one query on touchdown);
+    overflight_stats maps flight_id -> OverflightAccumulator of that overflight.
+    Nearest airport, AGL and thresholds are computed vectorized; all transitions
+    are applied with a single flush (and commit unless commit=False).
 
-    # Airport elevation in meters (approx)
-    airport_elev_m = (nearest_airport.get('elevation_ft') or 0) * 0.3048
-    alt_agl = (alt or 0) * 0.3048 - airport_elev_m # Altitude Above Ground Level (meters)
-    speed_knots = speed or 0
-
-    current_time = datetime.utcnow()
-
-    # Create new landing session if approaching
-    if not landing:
-        # If within 20km and altitude < 3000m (approx 10000ft) -> Approaching
-        if min_dist < 20 and alt_agl < 3000:
-            landing = Landing(
-                flight_id=flight_id,
-                aircraft_id=flight.aircraft_id,
-                airline_id=flight.airline_id,
-                callsign=flight.callsign,
-                registration=flight.aircraft.registration if flight.aircraft else None,
-                airport_icao=nearest_airport['icao_code'],
-                airport_name=nearest_airport['name'],
-                approach_time=current_time,
-                status='approach',
-                is_domestic=flight.is_domestic
-            )
-            db.session.add(landing)
-            db.session.commit()
-            return landing
+    Returns a list of (index, landing) for the positions that changed state.
+    """
+    n = len(flights)
+    if n == 0:
+        return []
+    current_time = now or datetime.utcnow()
 
-    else:
-        # Update existing landing session
+    airports, nearest, min_dist = nearest_rdc_airports(lats, lons)
+    if not airports:
+        return []
+
+    # Airport elevation in meters (approx) and altitude above ground level (meters)
+    elevations_m = np.array([(a.get('elevation_ft') or 0) * 0.3048 for a in airports])
+    alt_agl = np.array([a or 0 for a in alts], dtype=float) * 0.3048 - elevations_m[nearest]
+    speed_knots = np.array([v or 0 for v in speeds], dtype=float)
+
+    in_range = min_dist <= 50  # Check within 50km
+    approaching = in_range & (min_dist < 20) & (alt_agl < 3000)
+    touchdown = in_range & (min_dist < 5) & (alt_agl < 100) & (speed_knots < 180)
+    stopped = in_range & (speed_knots < 5)
+    departing = in_range & ((speed_knots > 10) | (min_dist > 5))
+
+    if landing_map is None:
+        flight_ids = [flights[i].id for i in np.flatnonzero(in_range)]
+        landing_map = {}
+        if flight_ids:
+            landings = Landing.query.filter(
+                Landing.flight_id.in_(flight_ids),
+                Landing.status != 'completed'
+            ).order_by(Landing.created_at).all()
+            # Latest active landing per flight wins
+            landing_map = {l.flight_id: l for l in landings}
+
+    transitions = []
+    landed = []
+    for i in np.flatnonzero(in_range):
+        flight = flights[i]
+        landing = landing_map.get(flight.id)
+        airport = airports[nearest[i]]
+
+        # Create new landing session if approaching
+        if landing is None:
+            # If within 20km and altitude < 3000m (approx 10000ft) -> Approaching
+            if approaching[i]:
+                landing = Landing(
+                    flight_id=flight.id,
+                    aircraft_id=flight.aircraft_id,
+                    airline_id=flight.airline_id,
+                    callsign=flight.callsign,
+                    registration=flight.aircraft.registration if flight.aircraft else None,
+                    airport_icao=airport['icao_code'],
+                    airport_name=airport['name'],
+                    approach_time=current_time,
+                    status='approach',
+                    is_domestic=flight.is_domestic
+                )
+                db.session.add(landing)
+                landing_map[flight.id] = landing
+                transitions.append((int(i), landing))
 
         # State: approach -> landed (Touchdown)
-        # Logic: Low altitude (< 100m) and low speed (< 150 kts) near airport (< 5km)
-        if landing.status == 'approach':
-            if min_dist < 5 and alt_agl < 100 and speed_knots < 180:
+        # Logic: Low altitude (< 100m) and low speed (< 180 kts) near airport (< 5km)
+        elif landing.status == 'approach':
+            if touchdown[i]:
                 landing.status = 'landed'
                 landing.touchdown_time = current_time
                 landing.landing_fee = get_tariff_value('LANDING_BASE', 150.0)
-
-                # Close any active overflight for this flight as it has landed
-                active_overflight = Overflight.query.filter_by(
-                    flight_id=flight_id,
-                    status='active'
-                ).first()
-
-                if active_overflight:
-                    active_overflight.exit_lat = lat
-                    active_overflight.exit_lon = lon
-                    active_overflight.exit_alt = alt
-                    active_overflight.exit_time = current_time
-                    active_overflight.status = 'completed'
-
-                    if active_overflight.entry_time:
-                         duration = (active_overflight.exit_time - active_overflight.entry_time).total_seconds() / 60
-                         active_overflight.duration_minutes = duration
-
-                db.session.commit()
-
-                from services.notification_service import NotificationService
-                NotificationService.notify_billing(
+                outbox.enqueue(
+                    'billing.notify', session=db.session,
                     type='flight_landed',
                     title=t('notifications.landing_title', 'fr').format(callsign=landing.callsign),
                     message=t('notifications.landing_msg', 'fr').format(airport=landing.airport_icao),
-                    link=f"/radar/terminal"
+                    link="/radar/terminal"
                 )
-                return landing
+                landed.append(int(i))
+                transitions.append((int(i), landing))
 
         # State: landed -> parking (Taxi/Parking)
         # Logic: Speed < 5 knots
         elif landing.status == 'landed':
-            if speed_knots < 5:
+            if stopped[i]:
                 landing.status = 'parking'
                 landing.parking_start = current_time
-                db.session.commit()
-                return landing
+                transitions.append((int(i), landing))
 
         # State: parking -> completed (Pushback/Departure)
         # Logic: Speed > 10 knots (started moving again) OR left airport area
         elif landing.status == 'parking':
-            if speed_knots > 10 or min_dist > 5:
+            if departing[i]:
                 landing.status = 'completed'
                 landing.parking_end = current_time
 
@@ -591,22 +810,62 @@ def check_landing_events(flight_id, lat, lon, alt, speed, active_landing=None, s
                     landing.parking_fee = billable_hours * rate
 
                 landing.total_fee = (landing.landing_fee or 0) + (landing.parking_fee or 0)
-                db.session.commit()
 
-                from services.notification_service import NotificationService
-                NotificationService.notify_billing(
+                outbox.enqueue(
+                    'billing.notify', session=db.session,
                     type='parking_completed',
                     title=t('notifications.parking_completed_title', 'fr').format(callsign=landing.callsign),
                     message=t('notifications.parking_completed_msg', 'fr').format(airport=landing.airport_icao, duration=int(landing.parking_duration_minutes or 0)),
-                    link=f"/radar/terminal"
+                    link="/radar/terminal"
                 )
+                # Automatic invoice generation, delivered by the outbox
+                outbox.enqueue('invoice.auto', session=db.session, flight_id=flight.id)
+                transitions.append((int(i), landing))
+
+    # Close any active overflight of the flights that touched down
+    if landed:
+        if overflight_map is None:
+            overflights = Overflight.query.filter(
+                Overflight.flight_id.in_([flights[i].id for i in landed]),
+                Overflight.status == 'active'
+            ).all()
+            overflight_map = {ovf.flight_id: ovf for ovf in overflights}
+        for i in landed:
+            active_overflight = overflight_map.get(flights[i].id)
+            if active_overflight and active_overflight.status == 'active':
+                close_overflight(active_overflight, lats[i], lons[i], alts[i], current_time,
+                                 stats=(overflight_stats or {}).get(flights[i].id))
+
+    if transitions:
+        db.session.flush()
+        if commit:
+            db.session.commit()
+    return transitions
 
-                # Trigger automatic invoice generation
-                trigger_auto_invoice(flight_id)
 
-                return landing
+def check_landing_events(flight_id, lat, lon, alt, speed, active_landing=None, skip_db_lookup=False):
+    """
+    Check for landing and parking events of a single position
+    (thin wrapper over process_landing_batch)
+    """
+    flight = Flight.query.get(flight_id)
+    if not flight:
+        return None
+
+    # Check for active landing session (not completed)
+    if skip_db_lookup:
+        landing = active_landing
+    else:
+        landing = Landing.query.filter(
+            Landing.flight_id == flight_id,
+            Landing.status != 'completed'
+        ).order_by(Landing.created_at.desc()).first()
 
-    return None
+    transitions = process_landing_batch(
+        [flight], [lat], [lon], [alt], [speed],
+        landing_map={flight_id: landing} if landing else {}
+    )
+    return transitions[0][1] if transitions else None
 
 
 def calculate_distance(lat1, lon1, lat2, lon2):
@@ -0,0 +1,221 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: ingest_stream.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Redis Streams ingestion bus for ATM-RDC
+fetch_flight_positions publishes each fetched batch, split by aircraft
+partition, to one stream per partition (ingest:flights:<partition>) and
+returns. Tracking workers read the streams of the partitions they own through
+the 'tracking' consumer group and acknowledge a batch once it is committed.
+
+- A worker that restarts first replays its own pending (unacknowledged) batches.
+- A worker taking over a partition claims the batches left pending by the
+  previous owner.
+- Streams are capped (INGEST_STREAM_MAXLEN); batches older than
+  INGEST_MAX_BATCH_AGE when read are acknowledged without processing, so a
+  worker that fell behind catches up on fresh positions.
+"""
+import os
+import json
+import time
+import logging
+
+from utils import redis_client
+from services.partitioning import split_batch
+
+logger = logging.getLogger(__name__)
+
+
+class IngestStream:
+    """Publisher and consumer-group reader of the ingestion streams"""
+
+    STREAM_PREFIX = 'ingest:flights:'
+    GROUP = 'tracking'
+
+    MAXLEN = int(os.environ.get('INGEST_STREAM_MAXLEN', 100))
+    MAX_BATCH_AGE_SECONDS = float(os.environ.get('INGEST_MAX_BATCH_AGE', 30))
+    # Pending batches idle for this long belong to a lost consumer
+    CLAIM_IDLE_MS = 15000
+
+    stats = {'published': 0, 'processed': 0, 'dropped_stale': 0, 'replayed': 0}
+
+    @classmethod
+    def stream_key(cls, partition):
+        return f"{cls.STREAM_PREFIX}{partition}"
+
+    # ------------------------------------------------------------------
+    # Producer
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def publish(cls, flights_data, partitions):
+        """
+        Append the batch to the stream of each partition (every partition gets
+        an entry, empty ones included, so the live picture drops departed
+        aircraft). Returns the number of entries written, or None when Redis
+        is unavailable.
+        """
+        r = redis_client.get_redis()
+        if r is None:
+            return None
+
+        by_partition = split_batch(flights_data)
+        published_at = time.time()
+        try:
+            pipe = r.pipeline(transaction=False)
+            for partition in partitions:
+                pipe.xadd(
+                    cls.stream_key(partition),
+                    {'ts': published_at, 'records': json.dumps(by_partition.get(partition, []))},
+                    maxlen=cls.MAXLEN,
+                    approximate=True
+                )
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"[IngestStream] Publish failed: {e}")
+            redis_client.mark_down()
+            return None
+
+        cls.stats['published'] += len(partitions)
+        return len(partitions)
+
+    # ------------------------------------------------------------------
+    # Consumer
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def ensure_group(cls, r, partition):
+        try:
+            r.xgroup_create(cls.stream_key(partition), cls.GROUP, id='0', mkstream=True)
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    @classmethod
+    def read(cls, consumer, partitions, count=10, block_ms=2000, replay=False):
+        """
+        Batches available to `consumer` on the given partitions.
+
+        Returns {partition: [(entry_id, published_at, records)]}, oldest first.
+        With replay=True, all of the consumer's own pending entries are
+        returned instead of new ones (used on start-up and on takeover), read
+        `count` at a time until the pending list is exhausted.
+
+        Pending entries trimmed from the stream by MAXLEN come back without
+        fields: they are acknowledged here, nothing is left to process.
+        """
+        r = redis_client.get_redis()
+        if r is None or not partitions:
+            return {}
+
+        result = {}
+        trimmed = {}
+        if not replay:
+            streams = {cls.stream_key(p): '>' for p in partitions}
+            cls._collect(r.xreadgroup(cls.GROUP, consumer, streams, count=count, block=block_ms), result, trimmed)
+        else:
+            # Each page starts after the last entry of the previous one, per stream
+            streams = {cls.stream_key(p): '0' for p in partitions}
+            while streams:
+                response = r.xreadgroup(cls.GROUP, consumer, streams, count=count, block=None)
+                streams = cls._collect(response, result, trimmed)
+        cls.ack(trimmed)
+        return result
+
+    @classmethod
+    def _collect(cls, response, result, trimmed):
+        """
+        Add the entries of an XREADGROUP response to `result` (decoded) or
+        `trimmed` (ids without fields). Returns {stream: last entry id} of the
+        streams that returned entries.
+        """
+        last_ids = {}
+        for stream, entries in response or []:
+            stream = stream.decode('utf-8') if isinstance(stream, bytes) else stream
+            partition = int(stream[len(cls.STREAM_PREFIX):])
+            for entry_id, fields in entries:
+                if fields:
+                    result.setdefault(partition, []).append(cls._decode(entry_id, fields))
+                else:
+                    trimmed.setdefault(partition, []).append(entry_id)
+            if entries:
+                last_ids[stream] = entries[-1][0]
+        return last_ids
+
+    @classmethod
+    def claim_abandoned(cls, consumer, partitions):
+        """Take over the batches a lost consumer left pending on our partitions"""
+        r = redis_client.get_redis()
+        if r is None:
+            return 0
+        claimed = 0
+        for partition in partitions:
+            # XAUTOCLAIM scans the pending list a page at a time; '0-0' ends the scan
+            start_id = '0-0'
+            while True:
+                response = r.xautoclaim(cls.stream_key(partition), cls.GROUP, consumer,
+                                        min_idle_time=cls.CLAIM_IDLE_MS, start_id=start_id, justid=True)
+                if not response:
+                    break
+                claimed += len(response[1]) if len(response) > 1 else 0
+                start_id = response[0].decode('utf-8') if isinstance(response[0], bytes) else response[0]
+                if start_id == '0-0':
+                    break
+        if claimed:
+            cls.stats['replayed'] += claimed
+            logger.info(f"[IngestStream] {consumer} claimed {claimed} abandoned batches")
+        return claimed
+
+    @classmethod
+    def ack(cls, acks):
+        """Acknowledge {partition: [entry_id, ...]}"""
+        r = redis_client.get_redis()
+        if r is None or not acks:
+            return
+        pipe = r.pipeline(transaction=False)
+        for partition, entry_ids in acks.items():
+            if entry_ids:
+                pipe.xack(cls.stream_key(partition), cls.GROUP, *entry_ids)
+        pipe.execute()
+
+    @staticmethod
+    def _decode(entry_id, fields):
+        fields = {(k.decode('utf-8') if isinstance(k, bytes) else k): v for k, v in fields.items()}
+        return (
+            entry_id.decode('utf-8') if isinstance(entry_id, bytes) else entry_id,
+            float(fields.get('ts', 0)),
+            json.loads(fields.get('records') or '[]')
+        )
+
+    @classmethod
+    def rounds(cls, batches, now=None):
+        """
+        Order read batches into processing rounds: round i holds the i-th
+        fresh batch of each partition, so each partition is processed in
+        publication order. Stale batches are returned separately, to be
+        acknowledged without processing.
+
+        Returns (rounds, stale) with rounds = [{partition: (entry_id, records)}]
+        and stale = {partition: [entry_id]}.
+        """
+        now = now or time.time()
+        rounds = []
+        stale = {}
+        for partition, entries in batches.items():
+            fresh = []
+            for entry_id, published_at, records in entries:
+                if now - published_at > cls.MAX_BATCH_AGE_SECONDS:
+                    stale.setdefault(partition, []).append(entry_id)
+                else:
+                    fresh.append((entry_id, records))
+            for i, batch in enumerate(fresh):
+                if i == len(rounds):
+                    rounds.append({})
+                rounds[i][partition] = batch
+        cls.stats['dropped_stale'] += sum(len(ids) for ids in stale.values())
+        return rounds, stale
@@ -26,6 +26,7 @@ from reportlab.lib.enums import TA_CENTER, TA_RIGHT
 from models import db, Overflight, Landing, TariffConfig, Invoice, SystemConfig, AuditLog, User, Flight
 from services.translation_service import t
 from services.telegram_service import TelegramService
+from utils.cooperative import run_cpu_bound
 
 
 def get_contact_phone():
@@ -168,13 +169,111 @@ def calculate_invoice_amounts(overflight_ids, landing_ids):
     }
 
 
-def generate_invoice_pdf(invoice, generated_by_user=None):
-    upload_dir = 'statics/uploads/invoices'
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    filename = f"{invoice.invoice_number}.pdf"
-    filepath = os.path.join(upload_dir, filename)
-    
+def invoice_pdf_data(invoice, generated_by_user=None):
+    """Everything the invoice PDF shows, read and translated here (plain, picklable data)"""
+    # Fetch Configs
+    header_title_conf = SystemConfig.query.filter_by(key='invoice_header_title').first()
+    header_title = header_title_conf.value if header_title_conf else "RÉGIE DES VOIES AÉRIENNES"
+
+    header_subtitle_conf = SystemConfig.query.filter_by(key='invoice_header_subtitle').first()
+    header_subtitle = header_subtitle_conf.value if header_subtitle_conf else "République Démocratique du Congo"
+
+    header_address_conf = SystemConfig.query.filter_by(key='invoice_header_address').first()
+    header_address = header_address_conf.value if header_address_conf else "Aéroport International de N'Djili - Kinshasa"
+
+    footer_legal_conf = SystemConfig.query.filter_by(key='invoice_footer_legal').first()
+    footer_legal = footer_legal_conf.value if footer_legal_conf else ""
+
+    footer_banks_conf = SystemConfig.query.filter_by(key='invoice_footer_banks').first()
+    footer_banks = footer_banks_conf.value if footer_banks_conf else ""
+
+    logo_path_conf = SystemConfig.query.filter_by(key='logo_path').first()
+    logo_path = logo_path_conf.value if logo_path_conf else None
+
+    try:
+        qr_data = f"RVA|{invoice.invoice_number}|{invoice.total_amount}|{invoice.created_at.isoformat()}"
+    except Exception as e:
+        print(f"Error generating QR: {e}")
+        qr_data = None
+
+    info_data = [
+        [f"{t('invoices.number')}:", invoice.invoice_number, '', ''],
+        [f"{t('invoices.date')}:", invoice.created_at.strftime('%d/%m/%Y') if invoice.created_at else '', '', ''],
+        [f"{t('invoices.due_date')}:", invoice.due_date.strftime('%d/%m/%Y') if invoice.due_date else '', '', ''],
+        [f"{t('invoices.status')}:", t(f"invoices.{invoice.status}").upper(), '', '']
+    ]
+
+    client = []
+    if invoice.airline:
+        client.append(f"<b>{t('invoices_pdf.client')}</b>")
+        client.append(f"{invoice.airline.name}")
+        if invoice.airline.address:
+            client.append(f"{invoice.airline.address}")
+        if invoice.airline.email:
+            client.append(f"{t('invoices_pdf.email')} {invoice.airline.email}")
+
+    items_data = [[t('invoices_pdf.col_desc'), t('invoices_pdf.col_qty'), t('invoices_pdf.col_unit'), t('invoices_pdf.col_total')]]
+
+    landing_base = get_tariff('LANDING_BASE')
+
+    overflights = Overflight.query.filter_by(invoice_id=invoice.id).all()
+    for ovf in overflights:
+        cost, desc, unit_desc = calculate_overflight_cost(ovf)
+
+        items_data.append([
+            t('invoices_pdf.item_overflight').format(session_id=ovf.session_id),
+            desc,
+            unit_desc,
+            f'{cost:.2f} USD'
+        ])
+
+    landings = Landing.query.filter_by(invoice_id=invoice.id).all()
+    for land in landings:
+        items_data.append([
+            t('invoices_pdf.item_landing').format(airport=land.airport_icao),
+            '1',
+            f'{landing_base:.2f} USD',
+            f'{landing_base:.2f} USD'
+        ])
+
+    totals_data = [
+        ['', '', t('invoices_pdf.subtotal'), f'{invoice.subtotal:.2f} USD'],
+        ['', '', t('invoices_pdf.tax'), f'{invoice.tax_amount:.2f} USD'],
+        ['', '', t('invoices_pdf.total'), f'{invoice.total_amount:.2f} USD'],
+    ]
+
+    phone = get_contact_phone()
+
+    # Add Generation Metadata
+    gen_time = datetime.now().strftime("%d/%m/%Y %H:%M")
+    gen_user = generated_by_user.username if generated_by_user else (f"User #{invoice.created_by}" if invoice.created_by else "Système")
+
+    return {
+        'header_title': header_title,
+        'header_subtitle': header_subtitle,
+        'header_address': header_address,
+        'footer_legal': footer_legal,
+        'footer_banks': footer_banks,
+        'logo_path': logo_path,
+        'title': t('invoices.invoice').upper(),
+        'qr_data': qr_data,
+        'info': info_data,
+        'client': client,
+        'details_header': f"<b>{t('invoices_pdf.details_header')}</b>",
+        'items': items_data,
+        'totals': totals_data,
+        'bank_details': f"<b>{t('invoices_pdf.bank_details')}</b>",
+        'regie_name': t('pdf.regie_name'),
+        'contact': f"{t('pdf.email_label')} facturation@rva.cd | {t('pdf.phone_label')} {phone}",
+        'generated': t('invoices_pdf.generated_footer').format(date=gen_time, user=gen_user)
+    }
+
+
+def render_invoice_pdf(filepath, data):
+    """
+    Lay out and write the PDF of invoice_pdf_data(). ReportLab only, no
+    database: run through run_cpu_bound() from the web server.
+    """
     doc = SimpleDocTemplate(
         filepath,
         pagesize=A4,
@@ -203,24 +302,8 @@ def generate_invoice_pdf(invoice, generated_by_user=None):
         alignment=TA_CENTER
     )
 
-    # Fetch Configs
-    header_title_conf = SystemConfig.query.filter_by(key='invoice_header_title').first()
-    header_title = header_title_conf.value if header_title_conf else "RÉGIE DES VOIES AÉRIENNES"
-
-    header_subtitle_conf = SystemConfig.query.filter_by(key='invoice_header_subtitle').first()
-    header_subtitle = header_subtitle_conf.value if header_subtitle_conf else "République Démocratique du Congo"
-
-    header_address_conf = SystemConfig.query.filter_by(key='invoice_header_address').first()
-    header_address = header_address_conf.value if header_address_conf else "Aéroport International de N'Djili - Kinshasa"
-
-    footer_legal_conf = SystemConfig.query.filter_by(key='invoice_footer_legal').first()
-    footer_legal = footer_legal_conf.value if footer_legal_conf else ""
-
-    footer_banks_conf = SystemConfig.query.filter_by(key='invoice_footer_banks').first()
-    footer_banks = footer_banks_conf.value if footer_banks_conf else ""
-
-    logo_path_conf = SystemConfig.query.filter_by(key='logo_path').first()
-    logo_path = logo_path_conf.value if logo_path_conf else None
+    header_address = data['header_address']
+    logo_path = data['logo_path']
     
     content = []
     
@@ -235,40 +318,29 @@ def generate_invoice_pdf(invoice, generated_by_user=None):
             pass
 
     # Header with Logo/Title
-    content.append(Paragraph(header_title, header_style))
-    content.append(Paragraph(header_subtitle, header_style))
+    content.append(Paragraph(data['header_title'], header_style))
+    content.append(Paragraph(data['header_subtitle'], header_style))
     if header_address:
         content.append(Paragraph(header_address.replace('\n', '<br/>'), header_style))
 
     content.append(Spacer(1, 0.5*cm))
-    content.append(Paragraph(t('invoices.invoice').upper(), title_style))
+    content.append(Paragraph(data['title'], title_style))
     content.append(Spacer(1, 0.5*cm))
     
     # QR Code Generation
-    try:
-        qr_data = f"RVA|{invoice.invoice_number}|{invoice.total_amount}|{invoice.created_at.isoformat()}"
-        qr_buffer = generate_qr_code(qr_data)
-        qr_img = Image(qr_buffer, width=3*cm, height=3*cm)
-        qr_img.hAlign = 'RIGHT'
-    except Exception as e:
-        print(f"Error generating QR: {e}")
-        qr_img = Spacer(1, 1)
+    qr_img = Spacer(1, 1)
+    if data['qr_data']:
+        try:
+            qr_buffer = generate_qr_code(data['qr_data'])
+            qr_img = Image(qr_buffer, width=3*cm, height=3*cm)
+            qr_img.hAlign = 'RIGHT'
+        except Exception as e:
+            print(f"Error generating QR: {e}")
 
     # Info Table with QR Code
-    info_data = [
-        [f"{t('invoices.number')}:", invoice.invoice_number, '', ''],
-        [f"{t('invoices.date')}:", invoice.created_at.strftime('%d/%m/%Y') if invoice.created_at else '', '', ''],
-        [f"{t('invoices.due_date')}:", invoice.due_date.strftime('%d/%m/%Y') if invoice.due_date else '', '', ''],
-        [f"{t('invoices.status')}:", t(f"invoices.{invoice.status}").upper(), '', '']
-    ]
-    
-    # Use a table to layout info (left) and QR (right)
-    # We will just put the info table first, and maybe QR below or aside.
-    # For simplicity, let's put QR code in a separate flowable or create a complex table.
-
     # Let's create a main table for the header section: [Info Table, QR Code]
 
-    inner_info_table = Table(info_data, colWidths=[3*cm, 5*cm, 1*cm, 1*cm])
+    inner_info_table = Table(data['info'], colWidths=[3*cm, 5*cm, 1*cm, 1*cm])
     inner_info_table.setStyle(TableStyle([
         ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
         ('FONTSIZE', (0, 0), (-1, -1), 10),
@@ -286,43 +358,15 @@ def generate_invoice_pdf(invoice, generated_by_user=None):
 
     content.append(Spacer(1, 0.5*cm))
     
-    if invoice.airline:
-        content.append(Paragraph(f"<b>{t('invoices_pdf.client')}</b>", styles['Normal']))
-        content.append(Paragraph(f"{invoice.airline.name}", styles['Normal']))
-        if invoice.airline.address:
-            content.append(Paragraph(f"{invoice.airline.address}", styles['Normal']))
-        if invoice.airline.email:
-            content.append(Paragraph(f"{t('invoices_pdf.email')} {invoice.airline.email}", styles['Normal']))
+    if data['client']:
+        for line in data['client']:
+            content.append(Paragraph(line, styles['Normal']))
         content.append(Spacer(1, 0.5*cm))
     
-    content.append(Paragraph(f"<b>{t('invoices_pdf.details_header')}</b>", styles['Heading2']))
+    content.append(Paragraph(data['details_header'], styles['Heading2']))
     content.append(Spacer(1, 0.3*cm))
     
-    items_data = [[t('invoices_pdf.col_desc'), t('invoices_pdf.col_qty'), t('invoices_pdf.col_unit'), t('invoices_pdf.col_total')]]
-    
-    landing_base = get_tariff('LANDING_BASE')
-    
-    overflights = Overflight.query.filter_by(invoice_id=invoice.id).all()
-    for ovf in overflights:
-        cost, desc, unit_desc = calculate_overflight_cost(ovf)
-
-        items_data.append([
-            t('invoices_pdf.item_overflight').format(session_id=ovf.session_id),
-            desc,
-            unit_desc,
-            f'{cost:.2f} USD'
-        ])
-    
-    landings = Landing.query.filter_by(invoice_id=invoice.id).all()
-    for land in landings:
-        items_data.append([
-            t('invoices_pdf.item_landing').format(airport=land.airport_icao),
-            '1',
-            f'{landing_base:.2f} USD',
-            f'{landing_base:.2f} USD'
-        ])
-    
-    items_table = Table(items_data, colWidths=[8*cm, 3*cm, 3*cm, 3*cm])
+    items_table = Table(data['items'], colWidths=[8*cm, 3*cm, 3*cm, 3*cm])
     items_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e3a5f')),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
@@ -337,13 +381,7 @@ def generate_invoice_pdf(invoice, generated_by_user=None):
     content.append(items_table)
     content.append(Spacer(1, 0.5*cm))
     
-    totals_data = [
-        ['', '', t('invoices_pdf.subtotal'), f'{invoice.subtotal:.2f} USD'],
-        ['', '', t('invoices_pdf.tax'), f'{invoice.tax_amount:.2f} USD'],
-        ['', '', t('invoices_pdf.total'), f'{invoice.total_amount:.2f} USD'],
-    ]
-    
-    totals_table = Table(totals_data, colWidths=[8*cm, 3*cm, 3*cm, 3*cm])
+    totals_table = Table(data['totals'], colWidths=[8*cm, 3*cm, 3*cm, 3*cm])
     totals_table.setStyle(TableStyle([
         ('FONTNAME', (2, -1), (-1, -1), 'Helvetica-Bold'),
         ('FONTSIZE', (0, 0), (-1, -1), 10),
@@ -362,29 +400,38 @@ def generate_invoice_pdf(invoice, generated_by_user=None):
         alignment=TA_CENTER
     )
     
-    if footer_legal:
-        content.append(Paragraph(footer_legal.replace('\n', '<br/>'), footer_style))
+    if data['footer_legal']:
+        content.append(Paragraph(data['footer_legal'].replace('\n', '<br/>'), footer_style))
         content.append(Spacer(1, 0.2*cm))
 
-    if footer_banks:
-         content.append(Paragraph(f"<b>{t('invoices_pdf.bank_details')}</b>", footer_style))
-         content.append(Paragraph(footer_banks.replace('\n', '<br/>'), footer_style))
+    if data['footer_banks']:
+         content.append(Paragraph(data['bank_details'], footer_style))
+         content.append(Paragraph(data['footer_banks'].replace('\n', '<br/>'), footer_style))
          content.append(Spacer(1, 0.2*cm))
 
-    content.append(Paragraph(t('pdf.regie_name'), footer_style))
+    content.append(Paragraph(data['regie_name'], footer_style))
     if header_address:
          content.append(Paragraph(header_address.split('\n')[0], footer_style)) # Simplified address for footer
 
-    phone = get_contact_phone()
-    content.append(Paragraph(f"{t('pdf.email_label')} facturation@rva.cd | {t('pdf.phone_label')} {phone}", footer_style))
+    content.append(Paragraph(data['contact'], footer_style))
     
-    # Add Generation Metadata
-    gen_time = datetime.now().strftime("%d/%m/%Y %H:%M")
-    gen_user = generated_by_user.username if generated_by_user else (f"User #{invoice.created_by}" if invoice.created_by else "Système")
     content.append(Spacer(1, 0.2*cm))
-    content.append(Paragraph(t('invoices_pdf.generated_footer').format(date=gen_time, user=gen_user), footer_style))
+    content.append(Paragraph(data['generated'], footer_style))
 
     doc.build(content)
+    return filepath
+
+
+def generate_invoice_pdf(invoice, generated_by_user=None):
+    upload_dir = 'statics/uploads/invoices'
+    os.makedirs(upload_dir, exist_ok=True)
+    
+    filename = f"{invoice.invoice_number}.pdf"
+    filepath = os.path.join(upload_dir, filename)
+
+    data = invoice_pdf_data(invoice, generated_by_user)
+    # The layout is CPU-bound: in the pool, off the web server's hub
+    run_cpu_bound(render_invoice_pdf, filepath, data)
     
     invoice.pdf_path = filepath
     invoice.pdf_generated_at = datetime.utcnow()
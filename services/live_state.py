@@ -0,0 +1,392 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: live_state.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Live aircraft state store for ATM-RDC
+Holds the latest normalized state of every tracked aircraft, written once per
+ingestion cycle by the Celery worker and read by the radar views.
+
+Storage layout (Redis):
+- live:aircraft  HASH   icao24 -> JSON state
+- live:geo       GEO    icao24 -> (lon, lat), used for bounding-box queries
+- live:meta      HASH   version, updated_at, count
+
+When Redis is unreachable the store falls back to an in-process snapshot so a
+single-host deployment keeps working (the web and worker processes then each
+see their own copy).
+"""
+import os
+import json
+import time
+import math
+import logging
+import threading
+from datetime import datetime
+
+from utils import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def _state_key(flight_data):
+    """Stable per-aircraft key: ICAO 24-bit address, or callsign when unknown"""
+    icao24 = (flight_data.get('icao24') or '').strip().lower()
+    if icao24:
+        return icao24
+    callsign = (flight_data.get('callsign') or '').strip().upper()
+    return f"cs:{callsign}" if callsign else None
+
+
+def derive_flight_status(altitude, on_ground):
+    """Radar status from altitude (ft) and ground flag"""
+    if on_ground:
+        return 'on_ground'
+    if altitude and 0 < altitude < 10000:
+        return 'approaching'
+    return 'in_flight'
+
+
+def normalize_state(flight_data, in_rdc=False, flight_id=None):
+    """
+    Normalize one record from fetch_external_flight_data() into a live state.
+
+    Returns None when the record has no usable key or position.
+    """
+    key = _state_key(flight_data)
+    lat = flight_data.get('latitude')
+    lon = flight_data.get('longitude')
+    if key is None or lat is None or lon is None:
+        return None
+
+    altitude = flight_data.get('altitude') or 0
+    on_ground = bool(flight_data.get('on_ground'))
+
+    return {
+        'key': key,
+        'icao24': flight_data.get('icao24'),
+        'flight_id': flight_id,
+        'callsign': flight_data.get('callsign') or flight_data.get('icao24') or 'UNKNOWN',
+        'flight_number': flight_data.get('flight_number') or flight_data.get('callsign'),
+        'latitude': lat,
+        'longitude': lon,
+        'altitude': altitude,
+        'heading': flight_data.get('heading') or 0,
+        'ground_speed': flight_data.get('ground_speed') or 0,
+        'vertical_speed': flight_data.get('vertical_speed') or 0,
+        'on_ground': on_ground,
+        'status': derive_flight_status(altitude, on_ground),
+        'in_rdc': bool(in_rdc),
+        'squawk': flight_data.get('squawk'),
+        'departure_icao': flight_data.get('departure_icao'),
+        'departure_terminal': flight_data.get('departure_terminal'),
+        'departure_gate': flight_data.get('departure_gate'),
+        'departure_timezone': flight_data.get('departure_timezone'),
+        'arrival_icao': flight_data.get('arrival_icao'),
+        'arrival_terminal': flight_data.get('arrival_terminal'),
+        'arrival_gate': flight_data.get('arrival_gate'),
+        'arrival_baggage': flight_data.get('arrival_baggage'),
+        'arrival_timezone': flight_data.get('arrival_timezone'),
+        'codeshared_airline_name': flight_data.get('codeshared_airline_name'),
+        'codeshared_flight_number': flight_data.get('codeshared_flight_number'),
+        'registration': flight_data.get('registration'),
+        'aircraft_type_iata': flight_data.get('aircraft_type_iata'),
+        'aircraft_type_icao': flight_data.get('aircraft_type_icao'),
+        'airline_name': flight_data.get('airline_name'),
+        'airline_iata': flight_data.get('airline_iata'),
+        'source': flight_data.get('source'),
+        'source_updated': flight_data.get('live_updated'),
+        'seen_at': datetime.utcnow().isoformat()
+    }
+
+
+class LiveStateStore:
+    """
+    Latest state of every tracked aircraft.
+    Writers replace the whole snapshot once per cycle (or, with sharded
+    tracking workers, the part owned by their partitions); readers never touch
+    the relational database.
+    """
+
+    HASH_KEY = 'live:aircraft'
+    GEO_KEY = 'live:geo'
+    META_KEY = 'live:meta'
+    # Keys written by each tracking partition (sharded workers)
+    PARTITION_PREFIX = 'live:partition:'
+
+    # A snapshot older than this is considered cold (ingestion stopped)
+    MAX_AGE_SECONDS = int(os.environ.get('LIVE_STATE_MAX_AGE', 60))
+
+    _lock = threading.Lock()
+    _local_states = {}
+    _local_meta = {}
+    _local_partitions = {}
+
+    # ------------------------------------------------------------------
+    # Write path
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def write_snapshot(cls, states):
+        """
+        Replace the live picture with `states` (list of normalized dicts).
+        Returns the new snapshot version.
+        """
+        states = [s for s in states if s]
+        version = int(time.time() * 1000)
+        meta = {
+            'version': version,
+            'updated_at': time.time(),
+            'count': len(states)
+        }
+
+        with cls._lock:
+            cls._local_states = {s['key']: s for s in states}
+            cls._local_meta = meta
+            cls._local_partitions = {}
+
+        r = redis_client.get_redis()
+        if r is None:
+            return version
+
+        try:
+            tmp_hash = f"{cls.HASH_KEY}:tmp"
+            tmp_geo = f"{cls.GEO_KEY}:tmp"
+
+            pipe = r.pipeline(transaction=True)
+            pipe.delete(tmp_hash, tmp_geo)
+            if states:
+                pipe.hset(tmp_hash, mapping={s['key']: json.dumps(s) for s in states})
+                geo_values = []
+                for s in states:
+                    if cls._valid_geo(s['latitude'], s['longitude']):
+                        geo_values.extend([s['longitude'], s['latitude'], s['key']])
+                if geo_values:
+                    pipe.geoadd(tmp_geo, geo_values)
+                    pipe.rename(tmp_geo, cls.GEO_KEY)
+                else:
+                    pipe.delete(cls.GEO_KEY)
+                pipe.rename(tmp_hash, cls.HASH_KEY)
+            else:
+                pipe.delete(cls.HASH_KEY, cls.GEO_KEY)
+            # A whole snapshot replaces what the partitions wrote
+            pipe.delete(*cls._partition_keys())
+            pipe.hset(cls.META_KEY, mapping=meta)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"[LiveState] Redis snapshot write failed: {e}")
+            redis_client.mark_down()
+
+        return version
+
+    @classmethod
+    def write_partitions(cls, states_by_partition):
+        """
+        Replace the aircraft of some tracking partitions only, leaving the
+        ones written by other workers in place. `states_by_partition` maps a
+        partition number to its normalized states (an empty list clears it).
+        Returns the new snapshot version.
+        """
+        version = int(time.time() * 1000)
+        states_by_partition = {p: [s for s in states if s] for p, states in states_by_partition.items()}
+
+        with cls._lock:
+            for partition, states in states_by_partition.items():
+                for key in cls._local_partitions.get(partition, ()):
+                    cls._local_states.pop(key, None)
+                cls._local_states.update({s['key']: s for s in states})
+                cls._local_partitions[partition] = {s['key'] for s in states}
+            cls._local_meta = {'version': version, 'updated_at': time.time(), 'count': len(cls._local_states)}
+
+        r = redis_client.get_redis()
+        if r is None:
+            return version
+
+        try:
+            partitions = list(states_by_partition)
+            pipe = r.pipeline(transaction=False)
+            for partition in partitions:
+                pipe.smembers(f"{cls.PARTITION_PREFIX}{partition}")
+            previous = dict(zip(partitions, pipe.execute()))
+
+            pipe = r.pipeline(transaction=True)
+            for partition, states in states_by_partition.items():
+                keys = {s['key'] for s in states}
+                stale = [k for k in (m.decode('utf-8') for m in previous[partition]) if k not in keys]
+                if stale:
+                    pipe.hdel(cls.HASH_KEY, *stale)
+                    pipe.zrem(cls.GEO_KEY, *stale)
+                partition_key = f"{cls.PARTITION_PREFIX}{partition}"
+                pipe.delete(partition_key)
+                if states:
+                    pipe.hset(cls.HASH_KEY, mapping={s['key']: json.dumps(s) for s in states})
+                    pipe.sadd(partition_key, *keys)
+                    geo_values = []
+                    for s in states:
+                        if cls._valid_geo(s['latitude'], s['longitude']):
+                            geo_values.extend([s['longitude'], s['latitude'], s['key']])
+                    if geo_values:
+                        pipe.geoadd(cls.GEO_KEY, geo_values)
+            pipe.hset(cls.META_KEY, mapping={'version': version, 'updated_at': time.time()})
+            pipe.hlen(cls.HASH_KEY)
+            count = pipe.execute()[-1]
+            r.hset(cls.META_KEY, 'count', count)
+        except Exception as e:
+            logger.warning(f"[LiveState] Redis partition write failed: {e}")
+            redis_client.mark_down()
+
+        return version
+
+    @classmethod
+    def _partition_keys(cls):
+        # Imported here: services.partitioning imports this module
+        from services.partitioning import PARTITIONS
+        return [f"{cls.PARTITION_PREFIX}{partition}" for partition in range(PARTITIONS)]
+
+    @staticmethod
+    def _valid_geo(lat, lon):
+        # Redis GEO only accepts latitudes within +/-85.05 degrees
+        return lat is not None and lon is not None and -85.05 <= lat <= 85.05 and -180 <= lon <= 180
+
+    # ------------------------------------------------------------------
+    # Read path
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def get_meta(cls):
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                raw = r.hgetall(cls.META_KEY)
+                if raw:
+                    return {
+                        'version': int(raw[b'version']),
+                        'updated_at': float(raw[b'updated_at']),
+                        'count': int(raw[b'count'])
+                    }
+            except Exception as e:
+                logger.warning(f"[LiveState] Redis meta read failed: {e}")
+                redis_client.mark_down()
+
+        with cls._lock:
+            return dict(cls._local_meta) or None
+
+    @classmethod
+    def is_warm(cls, max_age=None):
+        """
+        True when a non-empty snapshot was written recently. An empty one
+        (no source configured, a fetch that returned nothing) is cold, so
+        readers fall back to the database picture.
+        """
+        meta = cls.get_meta()
+        if not meta or not meta.get('count'):
+            return False
+        max_age = cls.MAX_AGE_SECONDS if max_age is None else max_age
+        return (time.time() - meta['updated_at']) <= max_age
+
+    @classmethod
+    def get_snapshot(cls):
+        """All aircraft states of the current snapshot"""
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                raw = r.hvals(cls.HASH_KEY)
+                if raw or r.exists(cls.META_KEY):
+                    return [json.loads(v) for v in raw]
+            except Exception as e:
+                logger.warning(f"[LiveState] Redis snapshot read failed: {e}")
+                redis_client.mark_down()
+
+        with cls._lock:
+            return list(cls._local_states.values())
+
+    @classmethod
+    def get_aircraft(cls, key):
+        """State of a single aircraft by icao24 (or 'cs:<CALLSIGN>')"""
+        key = (key or '').strip()
+        if not key.startswith('cs:'):
+            key = key.lower()
+
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                raw = r.hget(cls.HASH_KEY, key)
+                if raw is not None:
+                    return json.loads(raw)
+                if r.exists(cls.META_KEY):
+                    return None
+            except Exception as e:
+                logger.warning(f"[LiveState] Redis aircraft read failed: {e}")
+                redis_client.mark_down()
+
+        with cls._lock:
+            state = cls._local_states.get(key)
+            return dict(state) if state else None
+
+    @classmethod
+    def query_bbox(cls, min_lat, max_lat, min_lon, max_lon):
+        """Aircraft whose position lies within the bounding box"""
+        def inside(s):
+            lat, lon = s.get('latitude'), s.get('longitude')
+            return (lat is not None and lon is not None and
+                    min_lat <= lat <= max_lat and min_lon <= lon <= max_lon)
+
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                candidates = cls._geo_candidates(r, min_lat, max_lat, min_lon, max_lon)
+                if candidates is not None:
+                    if not candidates:
+                        return []
+                    raw = r.hmget(cls.HASH_KEY, candidates)
+                    states = [json.loads(v) for v in raw if v is not None]
+                    return [s for s in states if inside(s)]
+            except Exception as e:
+                logger.warning(f"[LiveState] Redis bbox query failed: {e}")
+                redis_client.mark_down()
+
+        return [s for s in cls.get_snapshot() if inside(s)]
+
+    @classmethod
+    def _geo_candidates(cls, r, min_lat, max_lat, min_lon, max_lon):
+        """
+        Candidate keys from the GEO index (box search is approximate on a
+        sphere, so the caller re-filters exactly). None if the index is unusable.
+        """
+        if not (cls._valid_geo(min_lat, min_lon) and cls._valid_geo(max_lat, max_lon)):
+            return None
+
+        center_lat = (min_lat + max_lat) / 2
+        center_lon = (min_lon + max_lon) / 2
+        height_km = (max_lat - min_lat) * 111.32
+        # Width at the latitude closest to the equator is the widest one
+        widest_lat = 0.0 if min_lat <= 0 <= max_lat else min(abs(min_lat), abs(max_lat))
+        width_km = (max_lon - min_lon) * 111.32 * math.cos(math.radians(widest_lat))
+
+        members = r.geosearch(
+            cls.GEO_KEY,
+            longitude=center_lon,
+            latitude=center_lat,
+            width=max(width_km, 0.001) * 1.05,
+            height=max(height_km, 0.001) * 1.05,
+            unit='km'
+        )
+        return [m.decode('utf-8') if isinstance(m, bytes) else m for m in members]
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._local_states = {}
+            cls._local_meta = {}
+            cls._local_partitions = {}
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                r.delete(cls.HASH_KEY, cls.GEO_KEY, cls.META_KEY, *cls._partition_keys())
+            except Exception as e:
+                logger.warning(f"[LiveState] Redis clear failed: {e}")
+                redis_client.mark_down()
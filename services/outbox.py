@@ -0,0 +1,209 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: outbox.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Transactional outbox for ATM-RDC
+The tracking path records side effects (Telegram messages, billing
+notifications, auto-invoicing) as OutboxEvent rows in the same transaction as
+the state change, then commits and moves on. The drain_outbox Celery task
+delivers them in batches, with retries and exponential backoff.
+
+Delivery is at least once: an event whose consumer died mid-run is claimed
+again after CLAIM_TIMEOUT_SECONDS.
+"""
+import os
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, and_
+
+from models import db, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 100))
+MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))
+CLAIM_TIMEOUT_SECONDS = 300
+RETRY_BASE_SECONDS = 10
+
+_HANDLERS = {}
+
+
+def handler(event_type):
+    """Register the consumer of an event type"""
+    def decorator(f):
+        _HANDLERS[event_type] = f
+        return f
+    return decorator
+
+
+def enqueue(event_type, session=None, **payload):
+    """Add an event to the current transaction (the caller commits)"""
+    event = OutboxEvent(
+        event_type=event_type,
+        payload=payload,
+        status='pending',
+        attempts=0,
+        available_at=datetime.utcnow()
+    )
+    (session or db.session).add(event)
+    return event
+
+
+# ----------------------------------------------------------------------
+# Consumers
+# ----------------------------------------------------------------------
+
+@handler('telegram.entry')
+def _telegram_entry(payload):
+    from models import Flight
+    from services.telegram_service import TelegramService
+    flight = db.session.get(Flight, payload['flight_id'])
+    if flight:
+        TelegramService.notify_entry(flight)
+
+
+@handler('telegram.exit')
+def _telegram_exit(payload):
+    from models import Overflight
+    from services.telegram_service import TelegramService
+    overflight = db.session.get(Overflight, payload['overflight_id'])
+    if overflight:
+        TelegramService.notify_exit(overflight)
+
+
+@handler('billing.notify')
+def _billing_notify(payload):
+    from services.notification_service import NotificationService
+    NotificationService.notify_billing(
+        type=payload['type'],
+        title=payload['title'],
+        message=payload['message'],
+        link=payload.get('link')
+    )
+
+
+@handler('invoice.auto')
+def _auto_invoice(payload):
+    """Returns False when the invoice is left to the landing"""
+    from models import Landing
+    from services.invoice_generator import trigger_auto_invoice
+
+    flight_id = payload['flight_id']
+    if payload.get('unless_landing_active'):
+        # The landing will trigger the invoice once parking completes
+        active_landing = Landing.query.filter(
+            Landing.flight_id == flight_id,
+            Landing.status != 'completed'
+        ).first()
+        if active_landing:
+            return False
+    trigger_auto_invoice(flight_id)
+    return True
+
+
+# ----------------------------------------------------------------------
+# Drain
+# ----------------------------------------------------------------------
+
+def _is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def claim_batch(limit=BATCH_SIZE):
+    """Mark up to `limit` due events as processing and return their ids"""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=CLAIM_TIMEOUT_SECONDS)
+
+    query = OutboxEvent.query.filter(or_(
+        and_(OutboxEvent.status == 'pending', OutboxEvent.available_at <= now),
+        and_(OutboxEvent.status == 'processing', OutboxEvent.claimed_at < stale)
+    )).order_by(OutboxEvent.id).limit(limit)
+    if _is_postgres():
+        # Concurrent consumers take disjoint batches
+        query = query.with_for_update(skip_locked=True)
+
+    events = query.all()
+    for event in events:
+        event.status = 'processing'
+        event.claimed_at = now
+        event.attempts = (event.attempts or 0) + 1
+    db.session.commit()
+    return [event.id for event in events]
+
+
+def drain(limit=BATCH_SIZE):
+    """Deliver one batch of due events. Returns counters."""
+    ids = claim_batch(limit)
+    stats = {'claimed': len(ids), 'done': 0, 'retried': 0, 'failed': 0}
+    if not ids:
+        return stats
+
+    events = OutboxEvent.query.filter(OutboxEvent.id.in_(ids)).order_by(OutboxEvent.id).all()
+    invoiced_flights = set()
+
+    for event in events:
+        try:
+            payload = event.payload or {}
+            # One auto-invoice per flight per batch is enough
+            if event.event_type == 'invoice.auto' and payload.get('flight_id') in invoiced_flights:
+                _mark_done(event)
+                stats['done'] += 1
+                continue
+
+            consumer = _HANDLERS.get(event.event_type)
+            if consumer is None:
+                raise ValueError(f"No handler for outbox event '{event.event_type}'")
+            handled = consumer(payload)
+            # Only an invoice actually triggered covers the flight's later events
+            if event.event_type == 'invoice.auto' and handled is not False:
+                invoiced_flights.add(payload.get('flight_id'))
+            _mark_done(event)
+            stats['done'] += 1
+        except Exception as e:
+            db.session.rollback()
+            if _mark_failed(event, e):
+                stats['failed'] += 1
+            else:
+                stats['retried'] += 1
+
+    return stats
+
+
+def _mark_done(event):
+    event.status = 'done'
+    event.processed_at = datetime.utcnow()
+    event.last_error = None
+    db.session.commit()
+
+
+def _mark_failed(event, error):
+    """Schedule a retry with backoff, or give up. Returns True when given up."""
+    given_up = (event.attempts or 0) >= MAX_ATTEMPTS
+    event.last_error = str(error)[:2000]
+    if given_up:
+        event.status = 'failed'
+        logger.error(f"[Outbox] Event {event.id} ({event.event_type}) failed permanently: {error}")
+    else:
+        event.status = 'pending'
+        delay = RETRY_BASE_SECONDS * (2 ** ((event.attempts or 1) - 1))
+        event.available_at = datetime.utcnow() + timedelta(seconds=delay)
+        logger.warning(f"[Outbox] Event {event.id} ({event.event_type}) failed, retry in {delay}s: {error}")
+    db.session.commit()
+    return given_up
+
+
+def purge_done(older_than_days=7):
+    """Delete delivered events older than the retention window"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    count = OutboxEvent.query.filter(
+        OutboxEvent.status == 'done',
+        OutboxEvent.processed_at < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return count
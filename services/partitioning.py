@@ -0,0 +1,168 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: partitioning.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Partitioning of the tracking pipeline across worker processes
+Aircraft are split into TRACKING_PARTITIONS fixed partitions by a stable hash
+of their icao24 (or callsign). Tracking workers announce themselves with a
+heartbeat; the coordinator (the single-flight fetch task) maps every
+partition to one live worker by rendezvous hashing, and each worker consumes
+the ingestion streams of its partitions (services/ingest_stream.py). When a
+worker stops heartbeating, only its partitions move, and their new owner
+warms them from the database.
+
+Without Redis or without any registered tracking worker, the whole batch is
+processed in-process, as a single partition set.
+"""
+import os
+import time
+import zlib
+import logging
+
+from services.live_state import _state_key
+from utils import redis_client
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS = int(os.environ.get('TRACKING_PARTITIONS', 16))
+
+
+def partition_for(key):
+    """Stable partition of an aircraft key (same result in every process)"""
+    return zlib.crc32(key.encode('utf-8')) % PARTITIONS
+
+
+def split_batch(flights_data):
+    """{partition: [records]} for every record that has an aircraft key"""
+    partitions = {}
+    for flight_data in flights_data:
+        key = _state_key(flight_data)
+        if key:
+            partitions.setdefault(partition_for(key), []).append(flight_data)
+    return partitions
+
+
+class PartitionCoordinator:
+    """
+    Membership and partition assignment, shared through Redis.
+
+    - tracking:workers     sorted set worker_id -> last heartbeat
+    - tracking:assignment  hash partition -> "<worker_id>|<since>"
+
+    `since` changes each time a partition gets a new owner; the worker uses
+    it to drop the in-memory state it may hold from an earlier ownership.
+    """
+
+    WORKERS_KEY = 'tracking:workers'
+    ASSIGNMENT_KEY = 'tracking:assignment'
+
+    HEARTBEAT_SECONDS = 5
+    # A worker silent for longer than this is considered lost
+    WORKER_TTL_SECONDS = int(os.environ.get('TRACKING_WORKER_TTL', 15))
+
+    @classmethod
+    def heartbeat(cls, worker_id):
+        r = redis_client.get_redis()
+        if r is None:
+            return False
+        try:
+            r.zadd(cls.WORKERS_KEY, {worker_id: time.time()})
+            return True
+        except Exception as e:
+            logger.warning(f"[Partitioning] Heartbeat failed for {worker_id}: {e}")
+            return False
+
+    @classmethod
+    def leave(cls, worker_id):
+        r = redis_client.get_redis()
+        if r is None:
+            return
+        try:
+            r.zrem(cls.WORKERS_KEY, worker_id)
+        except Exception as e:
+            logger.warning(f"[Partitioning] Leave failed for {worker_id}: {e}")
+
+    @classmethod
+    def live_workers(cls, r=None):
+        r = r or redis_client.get_redis()
+        if r is None:
+            return []
+        cutoff = time.time() - cls.WORKER_TTL_SECONDS
+        r.zremrangebyscore(cls.WORKERS_KEY, '-inf', cutoff)
+        return sorted(m.decode('utf-8') for m in r.zrangebyscore(cls.WORKERS_KEY, cutoff, '+inf'))
+
+    @staticmethod
+    def owner_of(partition, workers):
+        """Rendezvous hashing: losing a worker only moves that worker's partitions"""
+        return max(workers, key=lambda w: zlib.crc32(f"{w}:{partition}".encode('utf-8')))
+
+    @classmethod
+    def assign(cls):
+        """
+        Current {partition: (worker_id, since)}, updated for membership changes.
+        Empty when Redis is unavailable or no tracking worker is alive.
+        """
+        r = redis_client.get_redis()
+        if r is None:
+            return {}
+        try:
+            workers = cls.live_workers(r)
+            if not workers:
+                return {}
+
+            stored = {}
+            for partition, value in r.hgetall(cls.ASSIGNMENT_KEY).items():
+                worker_id, since = value.decode('utf-8').rsplit('|', 1)
+                stored[int(partition)] = (worker_id, since)
+
+            now = str(int(time.time() * 1000))
+            assignment = {}
+            moved = 0
+            for partition in range(PARTITIONS):
+                owner = cls.owner_of(partition, workers)
+                previous = stored.get(partition)
+                if previous and previous[0] == owner:
+                    assignment[partition] = previous
+                else:
+                    assignment[partition] = (owner, now)
+                    moved += 1
+
+            if moved:
+                r.hset(cls.ASSIGNMENT_KEY, mapping={p: f"{w}|{since}" for p, (w, since) in assignment.items()})
+                logger.info(f"[Partitioning] Rebalanced {moved}/{PARTITIONS} partitions over {len(workers)} workers")
+            return assignment
+        except Exception as e:
+            logger.warning(f"[Partitioning] Assignment failed: {e}")
+            return {}
+
+    @classmethod
+    def owned_by(cls, worker_id):
+        """{partition: since} currently assigned to a worker"""
+        r = redis_client.get_redis()
+        if r is None:
+            return {}
+        try:
+            owned = {}
+            for partition, value in r.hgetall(cls.ASSIGNMENT_KEY).items():
+                owner, since = value.decode('utf-8').rsplit('|', 1)
+                if owner == worker_id:
+                    owned[int(partition)] = since
+            return owned
+        except Exception as e:
+            logger.warning(f"[Partitioning] Assignment read failed for {worker_id}: {e}")
+            return {}
+
+    @classmethod
+    def reset(cls):
+        r = redis_client.get_redis()
+        if r is None:
+            return
+        try:
+            r.delete(cls.WORKERS_KEY, cls.ASSIGNMENT_KEY)
+        except Exception as e:
+            logger.warning(f"[Partitioning] Reset failed: {e}")
@@ -0,0 +1,160 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: radar_feed.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Server push of the radar picture
+The tracking pipeline publishes the picture of each processed cycle on the
+Socket.IO Redis message queue (write-only emitter, no server). Every web
+process runs Flask-SocketIO on the same queue and relays the 'radar_frame'
+event to the browsers of the radar_* rooms, whichever process they are
+connected to.
+
+Rooms: radar_all (every aircraft) and radar_rdc (aircraft inside the RDC),
+each in JSON and, when msgpack is installed, MessagePack (radar_all:msgpack).
+Frames are keyframes or deltas (see services.radar_frames).
+With sharded tracking workers each worker completes only its partitions of
+the picture; the full picture is published at most once per
+RADAR_PUSH_INTERVAL across all of them.
+"""
+import os
+import time
+import logging
+
+from services.live_state import LiveStateStore
+from utils import redis_client
+from services.radar_frames import RadarFrameEncoder, ENCODINGS, pack
+
+logger = logging.getLogger(__name__)
+
+EVENT = 'radar_frame'
+
+# Radar room suffix -> filter of the flights it receives
+ROOMS = {
+    'all': None,
+    'rdc': lambda flight: bool(flight.get('in_rdc'))
+}
+
+
+def room_name(region, encoding='json'):
+    return f'radar_{region}' if encoding == 'json' else f'radar_{region}:{encoding}'
+
+
+def region_flights(flights, region):
+    keep = ROOMS[region]
+    return flights if keep is None else [f for f in flights if keep(f)]
+
+
+class RadarFeed:
+    """Publisher of the radar picture to the Socket.IO message queue"""
+
+    THROTTLE_KEY = 'radar:push'
+    PUSH_INTERVAL_SECONDS = float(os.environ.get('RADAR_PUSH_INTERVAL', 2))
+    # Cadence of the fetch-flight-positions beat (celery_app.py): one picture per cycle
+    CYCLE_SECONDS = 5.0
+
+    # After an emit failure, wait before building a new emitter
+    RETRY_SECONDS = 30
+
+    stats = {'published': 0, 'throttled': 0, 'failed': 0}
+
+    _emitter = None
+    _emitter_down_until = 0.0
+    _last_push = 0.0
+
+    @classmethod
+    def get_emitter(cls):
+        """Write-only Socket.IO emitter on the Redis queue, or None without a queue"""
+        if time.time() < cls._emitter_down_until:
+            return None
+        if cls._emitter is None:
+            queue_url = os.environ.get('REDIS_URL')
+            if not queue_url:
+                # Without a queue no web process can receive what we emit
+                return None
+            try:
+                from flask_socketio import SocketIO
+                cls._emitter = SocketIO(message_queue=queue_url, write_only=True)
+            except Exception as e:
+                logger.error(f"[RadarFeed] Failed to create the Socket.IO emitter: {e}")
+                cls._mark_down()
+                return None
+        return cls._emitter
+
+    @classmethod
+    def _mark_down(cls):
+        cls._emitter = None
+        cls._emitter_down_until = time.time() + cls.RETRY_SECONDS
+
+    @classmethod
+    def _due(cls):
+        """One push per interval, shared by all tracking workers when Redis is up"""
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                return bool(r.set(cls.THROTTLE_KEY, 1, nx=True, px=int(cls.PUSH_INTERVAL_SECONDS * 1000)))
+            except Exception as e:
+                logger.warning(f"[RadarFeed] Throttle check failed: {e}")
+                redis_client.mark_down()
+
+        now = time.time()
+        if now - cls._last_push < cls.PUSH_INTERVAL_SECONDS:
+            return False
+        cls._last_push = now
+        return True
+
+    @classmethod
+    def publish(cls, flights=None, version=None):
+        """
+        Emit the radar picture to every radar room.
+        `flights` are radar payloads (format_radar_flight); when omitted, the
+        full picture is read back from the live-state store.
+        Returns True when the picture was emitted.
+        """
+        emitter = cls.get_emitter()
+        if emitter is None:
+            return False
+        if not cls._due():
+            cls.stats['throttled'] += 1
+            return False
+
+        if flights is None:
+            from services.flight_tracker import format_radar_flight
+            flights = [format_radar_flight(s) for s in LiveStateStore.get_snapshot()]
+            version = version or (LiveStateStore.get_meta() or {}).get('version')
+
+        try:
+            for region in ROOMS:
+                frame = RadarFrameEncoder.encode(region, region_flights(flights, region), version)
+                for encoding in ENCODINGS:
+                    emitter.emit(EVENT, pack(frame, encoding), to=room_name(region, encoding))
+        except Exception as e:
+            logger.warning(f"[RadarFeed] Publish failed: {e}")
+            cls.stats['failed'] += 1
+            cls._mark_down()
+            return False
+
+        cls.stats['published'] += 1
+        return True
+
+    @classmethod
+    def cycle_interval(cls):
+        """Expected seconds between two pushes, sent to the clients so they can detect a silent feed"""
+        return max(cls.CYCLE_SECONDS, cls.PUSH_INTERVAL_SECONDS)
+
+    @staticmethod
+    def resync_frame(region, encoding='json'):
+        """Keyframe of the last pushed picture, for a client that subscribes or missed a frame"""
+        frame = RadarFrameEncoder.keyframe(region)
+        return pack(frame, encoding) if frame is not None else None
+
+    @classmethod
+    def reset(cls):
+        cls._emitter = None
+        cls._emitter_down_until = 0.0
+        cls._last_push = 0.0
+        cls.stats = {'published': 0, 'throttled': 0, 'failed': 0}
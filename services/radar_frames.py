@@ -0,0 +1,233 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: radar_frames.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Compact radar wire format
+Each radar room receives a stream of frames:
+
+- keyframe ('t': 'k'): every aircraft, sent every RADAR_KEYFRAME_INTERVAL
+  seconds and on demand (subscription, client resync);
+- delta ('t': 'd'): only the aircraft whose position/state changed, with
+  null for the fields that did not change, the columns that became null
+  (`cleared`: [id, [columns]] pairs), the ids of departed aircraft and the
+  metadata of new aircraft. A delta applies to frame `base` only; a client
+  that missed a frame asks for a keyframe.
+
+Position/state fields travel as column arrays (one list per field, aligned
+with `ids`), rounded to what the radar displays. Static metadata (callsign,
+route, aircraft, codeshare...) is sent once per aircraft as [id, metadata]
+pairs and again only when it changes.
+
+The last published picture of each room is kept in Redis, so consecutive
+frames can come from different tracking workers (in-process when Redis is
+down). Frames are plain dicts (JSON) or MessagePack bytes when msgpack is
+installed.
+"""
+import os
+import json
+import time
+import logging
+import threading
+
+from services.live_state import LiveStateStore
+from utils import redis_client
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# Radar payload field -> (wire column, decimals kept; None keeps the value as is)
+DYNAMIC_FIELDS = (
+    ('latitude', 'lat', 4),
+    ('longitude', 'lon', 4),
+    ('altitude', 'alt', 0),
+    ('heading', 'hdg', 0),
+    ('ground_speed', 'spd', 0),
+    ('vertical_speed', 'vs', 0),
+    ('status', 'st', None),
+    ('in_rdc', 'rdc', None),
+)
+COLUMNS = [column for _, column, _ in DYNAMIC_FIELDS]
+
+# Derived on the client from `status`
+DERIVED_FIELDS = ('id', 'status_color')
+
+ENCODINGS = ('json', 'msgpack') if msgpack is not None else ('json',)
+
+
+def _wire_value(value, decimals):
+    if decimals is None or value is None:
+        return value
+    value = round(float(value), decimals)
+    return int(value) if decimals == 0 else value
+
+
+def split_flight(flight):
+    """(id, dynamic row, static metadata) of one radar payload (format_radar_flight)"""
+    row = [_wire_value(flight.get(field), decimals) for field, _, decimals in DYNAMIC_FIELDS]
+    static = {k: v for k, v in flight.items()
+              if k not in DERIVED_FIELDS and all(k != field for field, _, _ in DYNAMIC_FIELDS)}
+    return flight['id'], row, static
+
+
+def pack(frame, encoding='json'):
+    if encoding == 'msgpack' and msgpack is not None:
+        return msgpack.packb(frame, use_bin_type=True)
+    return frame
+
+
+class RadarFrameEncoder:
+    """Keyframe / delta encoder of the radar rooms"""
+
+    STATE_PREFIX = 'radar:frames:'
+    KEYFRAME_INTERVAL_SECONDS = float(os.environ.get('RADAR_KEYFRAME_INTERVAL', 30))
+
+    _lock = threading.Lock()
+    _local_states = {}
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def encode(cls, region, flights, version=None, now=None):
+        """
+        Next frame of `region` for the current picture (radar payloads), and
+        remember that picture as the base of the following delta.
+        """
+        now = now or time.time()
+        previous = cls._load(region)
+
+        ids, rows, meta = [], [], []
+        for flight in flights:
+            flight_id, row, static = split_flight(flight)
+            ids.append(flight_id)
+            rows.append(row)
+            meta.append(static)
+
+        keyframe = previous is None or now - previous['keyframe_at'] >= cls.KEYFRAME_INTERVAL_SECONDS
+        state = {
+            'seq': previous['seq'] + 1 if previous else 1,
+            'keyframe_at': now if keyframe else previous['keyframe_at'],
+            'version': version,
+            'ts': now,
+            'ids': ids,
+            'rows': rows,
+            'meta': meta
+        }
+        cls._save(region, state)
+
+        return cls.keyframe_of(state) if keyframe else cls.delta_of(previous, state)
+
+    @staticmethod
+    def keyframe_of(state):
+        return {
+            't': 'k',
+            'seq': state['seq'],
+            'v': state.get('version'),
+            'ts': state['ts'],
+            'cols': COLUMNS,
+            'ids': list(state['ids']),
+            'data': [list(column) for column in zip(*state['rows'])] if state['rows'] else [[] for _ in COLUMNS],
+            'meta': [[flight_id, static] for flight_id, static in zip(state['ids'], state['meta'])]
+        }
+
+    @staticmethod
+    def delta_of(previous, state):
+        before = {flight_id: (row, static) for flight_id, row, static in
+                  zip(previous['ids'], previous['rows'], previous['meta'])}
+
+        ids, rows, meta, cleared = [], [], [], []
+        for flight_id, row, static in zip(state['ids'], state['rows'], state['meta']):
+            old = before.pop(flight_id, None)
+            if old is None:
+                ids.append(flight_id)
+                rows.append(row)
+                meta.append([flight_id, static])
+                continue
+            old_row, old_static = old
+            if row != old_row:
+                ids.append(flight_id)
+                rows.append([None if value == old_value else value for value, old_value in zip(row, old_row)])
+                # null means "unchanged" in the row: a value that went away is listed apart
+                gone_values = [column for column, value, old_value in zip(COLUMNS, row, old_row)
+                               if value is None and old_value is not None]
+                if gone_values:
+                    cleared.append([flight_id, gone_values])
+            if static != old_static:
+                meta.append([flight_id, static])
+
+        return {
+            't': 'd',
+            'seq': state['seq'],
+            'base': previous['seq'],
+            'v': state.get('version'),
+            'ts': state['ts'],
+            'cols': COLUMNS,
+            'ids': ids,
+            'data': [list(column) for column in zip(*rows)] if rows else [[] for _ in COLUMNS],
+            'cleared': cleared,
+            'gone': list(before),
+            'meta': meta
+        }
+
+    @classmethod
+    def keyframe(cls, region):
+        """Keyframe of the last published picture of `region` (resync), or None"""
+        state = cls._load(region)
+        return cls.keyframe_of(state) if state else None
+
+    # ------------------------------------------------------------------
+    # State of the last published picture
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _load(cls, region):
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                raw = r.get(f"{cls.STATE_PREFIX}{region}")
+                return json.loads(raw) if raw else None
+            except Exception as e:
+                logger.warning(f"[RadarFrames] Redis state read failed: {e}")
+                redis_client.mark_down()
+
+        with cls._lock:
+            return cls._local_states.get(region)
+
+    @classmethod
+    def _save(cls, region, state):
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                # Expires with the picture: a restarted feed starts on a keyframe
+                r.set(f"{cls.STATE_PREFIX}{region}", json.dumps(state), ex=LiveStateStore.MAX_AGE_SECONDS)
+                return
+            except Exception as e:
+                logger.warning(f"[RadarFrames] Redis state write failed: {e}")
+                redis_client.mark_down()
+
+        with cls._lock:
+            cls._local_states[region] = state
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._local_states = {}
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                keys = list(r.scan_iter(match=f"{cls.STATE_PREFIX}*"))
+                if keys:
+                    r.delete(*keys)
+            except Exception as e:
+                logger.warning(f"[RadarFrames] Redis clear failed: {e}")
+                redis_client.mark_down()
@@ -0,0 +1,231 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: radar_view.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Viewport-aware radar views
+A view is what one map shows: bounding box, zoom level and filters (altitude
+band, airline, in-RDC only). It is computed from the live state: the
+bounding box goes through the GEO index, then the aircraft are grouped on a
+screen grid (algorithms.grid_clustering) at low zoom or when too many remain,
+so the payload and the client rendering stay bounded whatever the traffic.
+
+Used by /radar/api/flights (query string) and by Socket.IO view
+subscriptions; RadarViews pushes each new live picture to the subscribed
+clients, computing every distinct view once.
+"""
+import os
+import threading
+
+from algorithms.grid_clustering import grid_cluster
+from services.live_state import LiveStateStore
+
+VIEW_EVENT = 'radar_view'
+
+# At or below this zoom the view is clustered
+CLUSTER_MAX_ZOOM = int(os.environ.get('RADAR_CLUSTER_MAX_ZOOM', 4))
+# Above it, individual aircraft up to this many; clustered beyond
+MAX_VIEW_FLIGHTS = int(os.environ.get('RADAR_VIEW_MAX_FLIGHTS', 500))
+
+MAX_ZOOM = 19
+VIEW_PARAMS = ('bbox', 'zoom', 'alt_min', 'alt_max', 'airline', 'in_rdc')
+
+
+def _number(value, name, cast=float):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name}: {value!r}")
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def parse_view(params):
+    """
+    View from request arguments or a socket payload, or None when no view
+    parameter is given. `bbox` is "min_lon,min_lat,max_lon,max_lat" (Leaflet
+    toBBoxString order) or the same four numbers as a list.
+    Raises ValueError on malformed values.
+    """
+    params = params or {}
+    if not any(params.get(k) not in (None, '') for k in VIEW_PARAMS):
+        return None
+
+    bbox = params.get('bbox')
+    if bbox not in (None, ''):
+        parts = bbox.split(',') if isinstance(bbox, str) else list(bbox)
+        if len(parts) != 4:
+            raise ValueError(f"Invalid bbox: {bbox!r}")
+        min_lon, min_lat, max_lon, max_lat = [_number(p, 'bbox') for p in parts]
+        # Leaflet reports longitudes past +/-180 once the world wraps
+        bbox = (max(min_lat, -90.0), min(max_lat, 90.0), max(min_lon, -180.0), min(max_lon, 180.0))
+        if bbox[0] > bbox[1] or bbox[2] > bbox[3]:
+            raise ValueError("Invalid bbox: minimum above maximum")
+    else:
+        bbox = None
+
+    zoom = params.get('zoom')
+    zoom = None if zoom in (None, '') else min(max(_number(zoom, 'zoom', int), 0), MAX_ZOOM)
+
+    alt_min = params.get('alt_min')
+    alt_max = params.get('alt_max')
+    airline = (params.get('airline') or '').strip().upper()
+
+    return {
+        'bbox': bbox,
+        'zoom': zoom,
+        'alt_min': None if alt_min in (None, '') else _number(alt_min, 'alt_min'),
+        'alt_max': None if alt_max in (None, '') else _number(alt_max, 'alt_max'),
+        'airline': None if airline in ('', 'ALL') else airline,
+        'in_rdc': _flag(params.get('in_rdc'))
+    }
+
+
+def view_key(view):
+    return tuple(view[k] for k in VIEW_PARAMS)
+
+
+def matches(flight, view):
+    if view['in_rdc'] and not flight.get('in_rdc'):
+        return False
+    altitude = flight.get('altitude') or 0
+    if view['alt_min'] is not None and altitude < view['alt_min']:
+        return False
+    if view['alt_max'] is not None and altitude > view['alt_max']:
+        return False
+    if view['airline']:
+        aircraft = flight.get('aircraft') or {}
+        names = (aircraft.get('operator'), aircraft.get('airline_iata'))
+        callsign = (flight.get('callsign') or '').upper()
+        # Airline name, IATA code, or ICAO code as the callsign prefix
+        if not (any((n or '').upper() == view['airline'] for n in names) or
+                (len(view['airline']) == 3 and callsign.startswith(view['airline']))):
+            return False
+    return True
+
+
+def _inside(flight, bbox):
+    lat, lon = flight.get('latitude'), flight.get('longitude')
+    return (lat is not None and lon is not None and
+            bbox[0] <= lat <= bbox[1] and bbox[2] <= lon <= bbox[3])
+
+
+def viewport_flights(view):
+    """Radar payloads inside the view's bounding box, from the live state when warm"""
+    from services.flight_tracker import format_radar_flight, get_active_flights
+    from utils.system_gate import SystemGate
+
+    bbox = view['bbox']
+    if LiveStateStore.is_warm():
+        if not SystemGate.is_active():
+            return []
+        states = LiveStateStore.query_bbox(*bbox) if bbox else LiveStateStore.get_snapshot()
+        return [format_radar_flight(s) for s in states]
+
+    flights = get_active_flights(use_external_api=False)
+    return [f for f in flights if _inside(f, bbox)] if bbox else flights
+
+
+def build_view(view, flights=None):
+    """
+    Radar payload of a view: individual aircraft, or clusters (with the
+    aircraft left alone in their cell) at low zoom / high density.
+    """
+    if flights is None:
+        flights = viewport_flights(view)
+    flights = [f for f in flights if matches(f, view)]
+
+    payload = {
+        'zoom': view['zoom'],
+        'bbox': list(view['bbox']) if view['bbox'] else None,
+        'count': len(flights),
+        'clustered': False,
+        'flights': flights,
+        'clusters': []
+    }
+
+    low_zoom = view['zoom'] is not None and view['zoom'] <= CLUSTER_MAX_ZOOM
+    if len(flights) < 2 or not (low_zoom or len(flights) > MAX_VIEW_FLIGHTS):
+        return payload
+
+    # A view without zoom is clustered at the coarsest individual-aircraft zoom
+    zoom = view['zoom'] if view['zoom'] is not None else CLUSTER_MAX_ZOOM + 1
+    cells = grid_cluster(
+        [f['latitude'] for f in flights],
+        [f['longitude'] for f in flights],
+        [f.get('altitude') or 0 for f in flights],
+        zoom=zoom
+    )
+
+    singles, clusters = [], []
+    for cell in cells:
+        members = cell.pop('members')
+        if cell['count'] == 1:
+            singles.append(flights[members[0]])
+            continue
+        cell['in_rdc'] = sum(1 for i in members if flights[i].get('in_rdc'))
+        clusters.append(cell)
+
+    payload.update({'clustered': True, 'flights': singles, 'clusters': clusters})
+    return payload
+
+
+class RadarViews:
+    """
+    View subscriptions of the Socket.IO clients of one web process.
+    push() sends the views again when the live picture has a new version.
+    """
+
+    _lock = threading.Lock()
+    _views = {}      # sid -> view
+    _pushed_version = None
+
+    @classmethod
+    def subscribe(cls, sid, view):
+        with cls._lock:
+            cls._views[sid] = view
+
+    @classmethod
+    def unsubscribe(cls, sid):
+        with cls._lock:
+            cls._views.pop(sid, None)
+
+    @classmethod
+    def groups(cls):
+        """{view key: (view, [sid, ...])}, so identical views are computed once"""
+        with cls._lock:
+            items = list(cls._views.items())
+        groups = {}
+        for sid, view in items:
+            groups.setdefault(view_key(view), (view, []))[1].append(sid)
+        return groups
+
+    @classmethod
+    def push(cls, emit):
+        """Emit each subscribed view once per live version. Returns the number of views computed."""
+        meta = LiveStateStore.get_meta()
+        if not meta or meta['version'] == cls._pushed_version or not LiveStateStore.is_warm():
+            return 0
+        cls._pushed_version = meta['version']
+
+        groups = cls.groups()
+        for view, sids in groups.values():
+            payload = build_view(view)
+            payload['v'] = meta['version']
+            for sid in sids:
+                emit(VIEW_EVENT, payload, to=sid)
+        return len(groups)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._views = {}
+        cls._pushed_version = None
@@ -0,0 +1,193 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: reference_data.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+In-memory reference registry (airports, aircraft)
+Read paths that need an airport or an aircraft per flight (simulation
+fallback of the radar) look them up here instead of querying per flight:
+
+- airports: the whole table, loaded in one query;
+- aircraft: loaded on demand, the ids missing from memory in one query.
+
+Both are plain dicts detached from any session. They are reloaded after
+REFERENCE_DATA_TTL seconds, and at once when a committed session changed an
+Airport / Aircraft row: the change is recorded locally and a version counter
+is bumped in Redis (reference:version:<table>) for the other processes.
+"""
+import os
+import time
+import logging
+import threading
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Airport, Aircraft
+from utils import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def _airport_row(airport):
+    return {
+        'id': airport.id,
+        'icao_code': airport.icao_code,
+        'iata_code': airport.iata_code,
+        'name': airport.name,
+        'city': airport.city,
+        'country': airport.country,
+        'latitude': airport.latitude,
+        'longitude': airport.longitude,
+        'elevation_ft': airport.elevation_ft,
+        'is_domestic': airport.is_domestic
+    }
+
+
+def _aircraft_row(aircraft):
+    return {
+        'id': aircraft.id,
+        'icao24': aircraft.icao24,
+        'registration': aircraft.registration,
+        'model': aircraft.model,
+        'type_code': aircraft.type_code,
+        'operator': aircraft.operator,
+        'operator_iata': aircraft.operator_iata,
+        'mtow': aircraft.mtow
+    }
+
+
+class ReferenceData:
+    """Process-wide airport and aircraft registry"""
+
+    TTL_SECONDS = int(os.environ.get('REFERENCE_DATA_TTL', 300))
+    VERSION_PREFIX = 'reference:version:'
+    TABLES = ('airports', 'aircraft')
+
+    _lock = threading.Lock()
+    _airports = None
+    _aircraft = {}
+    # table -> (loaded_at, shared version at load time)
+    _loaded = {}
+
+    stats = {'airport_loads': 0, 'aircraft_loads': 0}
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def airports(cls):
+        """All airports by ICAO code"""
+        version = cls._shared_version('airports')
+        with cls._lock:
+            if cls._airports is not None and cls._is_fresh('airports', version):
+                return cls._airports
+
+        airports = {a.icao_code: _airport_row(a) for a in Airport.query.all() if a.icao_code}
+        with cls._lock:
+            cls._airports = airports
+            cls._loaded['airports'] = (time.time(), version)
+        cls.stats['airport_loads'] += 1
+        return airports
+
+    @classmethod
+    def airport(cls, icao_code):
+        return cls.airports().get(icao_code) if icao_code else None
+
+    @classmethod
+    def aircraft(cls, aircraft_ids):
+        """Aircraft rows by id for the given ids (unknown ids are left out)"""
+        version = cls._shared_version('aircraft')
+        with cls._lock:
+            if not cls._is_fresh('aircraft', version):
+                cls._aircraft = {}
+                cls._loaded['aircraft'] = (time.time(), version)
+            known = cls._aircraft
+
+        wanted = set(i for i in aircraft_ids if i)
+        missing = [i for i in wanted if i not in known]
+        if missing:
+            rows = {a.id: _aircraft_row(a) for a in Aircraft.query.filter(Aircraft.id.in_(missing)).all()}
+            with cls._lock:
+                cls._aircraft.update(rows)
+                known = cls._aircraft
+            cls.stats['aircraft_loads'] += 1
+
+        return {i: known[i] for i in wanted if i in known}
+
+    # ------------------------------------------------------------------
+    # Freshness
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _is_fresh(cls, table, version):
+        loaded = cls._loaded.get(table)
+        return (loaded is not None and time.time() - loaded[0] <= cls.TTL_SECONDS
+                and loaded[1] == version)
+
+    @classmethod
+    def _shared_version(cls, table):
+        r = redis_client.get_redis()
+        if r is None:
+            return None
+        try:
+            return r.get(f"{cls.VERSION_PREFIX}{table}")
+        except Exception as e:
+            logger.warning(f"[ReferenceData] Redis version read failed: {e}")
+            redis_client.mark_down()
+            return None
+
+    @classmethod
+    def invalidate(cls, tables=TABLES):
+        """Reload `tables` on next use, here and in the other processes"""
+        with cls._lock:
+            for table in tables:
+                cls._loaded.pop(table, None)
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                pipe = r.pipeline(transaction=False)
+                for table in tables:
+                    pipe.incr(f"{cls.VERSION_PREFIX}{table}")
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"[ReferenceData] Redis version bump failed: {e}")
+                redis_client.mark_down()
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._airports = None
+            cls._aircraft = {}
+            cls._loaded = {}
+        cls.stats = {'airport_loads': 0, 'aircraft_loads': 0}
+
+
+# Committed Airport / Aircraft changes invalidate the registry
+_TRACKED_TABLES = {Airport: 'airports', Aircraft: 'aircraft'}
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_reference_changes(session, flush_context):
+    changed = {_TRACKED_TABLES[type(obj)] for obj in chain(session.new, session.dirty, session.deleted)
+               if type(obj) in _TRACKED_TABLES}
+    if changed:
+        session.info.setdefault('reference_changes', set()).update(changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_reference_changes(session):
+    changed = session.info.pop('reference_changes', None)
+    if changed:
+        ReferenceData.invalidate(sorted(changed))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_reference_changes(session):
+    session.info.pop('reference_changes', None)
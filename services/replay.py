@@ -0,0 +1,282 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: replay.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Traffic replay for incident review
+replay_state(t) rebuilds the radar picture at a past instant from the stored
+positions: for each aircraft, the fixes just before and just after `t`
+(within `window` seconds) are interpolated linearly; an aircraft with only an
+earlier fix is dead-reckoned from it, the way the tracking engine predicted
+it when it skipped writing the intermediate fixes.
+
+A frame reads the time buckets of [t - window, t + window] only
+(flight_positions.time_bucket, indexed), never the whole table. play() sends
+the frames of a time range at N times real speed to one Socket.IO client.
+"""
+import os
+import math
+import time
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+
+from algorithms.dead_reckoning import project_position
+from models import db, FlightPosition, position_time_bucket
+
+logger = logging.getLogger(__name__)
+
+FRAME_EVENT = 'replay_frame'
+END_EVENT = 'replay_end'
+
+DEFAULT_WINDOW_SECONDS = int(os.environ.get('REPLAY_WINDOW', 120))
+MAX_WINDOW_SECONDS = 900
+# Longest range a stream may play
+MAX_RANGE_SECONDS = int(os.environ.get('REPLAY_MAX_RANGE', 6 * 3600))
+MAX_SPEED = 120
+# Shortest wall-clock interval between two streamed frames
+MIN_FRAME_INTERVAL_SECONDS = 0.25
+# Instants accepted from clients: away from the ends of datetime
+EARLIEST_INSTANT = datetime(1970, 1, 1)
+LATEST_INSTANT = datetime(9000, 1, 1)
+
+FIX_COLUMNS = (
+    FlightPosition.flight_id, FlightPosition.icao24, FlightPosition.callsign,
+    FlightPosition.latitude, FlightPosition.longitude, FlightPosition.altitude,
+    FlightPosition.heading, FlightPosition.ground_speed, FlightPosition.vertical_rate,
+    FlightPosition.on_ground, FlightPosition.is_in_rdc, FlightPosition.timestamp
+)
+
+
+def _number(value, name):
+    """Finite float of a request value. Raises ValueError."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name}: {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"Invalid {name}: {value!r}")
+    return number
+
+
+def parse_instant(value, name='t'):
+    """Naive UTC datetime from epoch seconds or an ISO 8601 string. Raises ValueError."""
+    if value is None or value == '':
+        raise ValueError(f"Missing {name}")
+    try:
+        if isinstance(value, datetime):
+            instant = value
+        else:
+            try:
+                seconds = float(value)
+            except (TypeError, ValueError):
+                seconds = None
+            if seconds is not None:
+                instant = datetime.fromtimestamp(_number(seconds, name), tz=timezone.utc)
+            else:
+                try:
+                    instant = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+                except ValueError:
+                    raise ValueError(f"Invalid {name}: {value!r}")
+        if instant.tzinfo is not None:
+            instant = instant.astimezone(timezone.utc).replace(tzinfo=None)
+    except (OverflowError, OSError):
+        raise ValueError(f"{name} out of range: {value!r}")
+    # Windows and stream steps are added around the instant
+    if not EARLIEST_INSTANT <= instant <= LATEST_INSTANT:
+        raise ValueError(f"{name} out of range: {value!r}")
+    return instant
+
+
+def parse_window(value):
+    if value in (None, ''):
+        return DEFAULT_WINDOW_SECONDS
+    # Clamped as a float: int() of a huge value is a huge timedelta later
+    return int(min(max(_number(value, 'window'), 1), MAX_WINDOW_SECONDS))
+
+
+# ----------------------------------------------------------------------
+# One instant
+# ----------------------------------------------------------------------
+
+def fixes_around(t, window):
+    """Stored fixes within `window` seconds of `t`, by aircraft then time"""
+    try:
+        start, end = t - timedelta(seconds=window), t + timedelta(seconds=window)
+    except OverflowError:
+        raise ValueError(f"Window of {window} seconds around {t} is out of range")
+    return db.session.query(*FIX_COLUMNS).filter(
+        FlightPosition.time_bucket.between(position_time_bucket(start), position_time_bucket(end)),
+        FlightPosition.timestamp.between(start, end)
+    ).order_by(FlightPosition.flight_id, FlightPosition.icao24, FlightPosition.timestamp).all()
+
+
+def _aircraft_key(fix):
+    return fix.flight_id if fix.flight_id is not None else fix.icao24
+
+
+def _lerp(a, b, ratio):
+    if a is None or b is None:
+        return a if b is None else b
+    return a + (b - a) * ratio
+
+
+def _lerp_heading(a, b, ratio):
+    if a is None or b is None:
+        return a if b is None else b
+    # Shortest way round
+    return (a + ((b - a + 540) % 360 - 180) * ratio) % 360
+
+
+def aircraft_state(before, after, t):
+    """State at `t` from the last fix before it and the first one after it (either may be None)"""
+    if before is None:
+        return None
+
+    if after is None or after.timestamp == before.timestamp:
+        age = (t - before.timestamp).total_seconds()
+        lat, lon = before.latitude, before.longitude
+        if not before.on_ground:
+            lat, lon = project_position(lat, lon, before.heading, before.ground_speed, age)
+        base, ratio, mode = before, 0.0, 'projected' if age > 0 else 'fix'
+        other = before
+    else:
+        span = (after.timestamp - before.timestamp).total_seconds()
+        ratio = (t - before.timestamp).total_seconds() / span
+        lat = _lerp(before.latitude, after.latitude, ratio)
+        lon = _lerp(before.longitude, after.longitude, ratio)
+        base, other, mode = before, after, 'interpolated' if ratio > 0 else 'fix'
+
+    return {
+        'id': base.flight_id,
+        'icao24': base.icao24,
+        'callsign': base.callsign or other.callsign,
+        'latitude': round(lat, 5),
+        'longitude': round(lon, 5),
+        'altitude': _lerp(base.altitude, other.altitude, ratio),
+        'heading': _lerp_heading(base.heading, other.heading, ratio),
+        'ground_speed': _lerp(base.ground_speed, other.ground_speed, ratio),
+        'vertical_speed': base.vertical_rate,
+        'on_ground': bool(base.on_ground),
+        'in_rdc': bool(base.is_in_rdc),
+        'mode': mode,
+        'fix_age': round((t - before.timestamp).total_seconds(), 1)
+    }
+
+
+def replay_state(t, window=DEFAULT_WINDOW_SECONDS, fixes=None):
+    """
+    Every aircraft known at `t`: seen within `window` seconds before it.
+    Aircraft first seen after `t` are left out.
+    """
+    fixes = fixes_around(t, window) if fixes is None else fixes
+    states = []
+    for _, track in groupby(fixes, key=_aircraft_key):
+        before = after = None
+        for fix in track:
+            if fix.timestamp <= t:
+                before = fix
+            else:
+                after = fix
+                break
+        state = aircraft_state(before, after, t)
+        if state is not None:
+            states.append(state)
+    return states
+
+
+def replay_frame(t, window=DEFAULT_WINDOW_SECONDS):
+    flights = replay_state(t, window)
+    return {
+        't': t.isoformat() + 'Z',
+        'window': window,
+        'count': len(flights),
+        'flights': flights
+    }
+
+
+# ----------------------------------------------------------------------
+# Streams
+# ----------------------------------------------------------------------
+
+class ReplaySessions:
+    """Stream currently played for each Socket.IO client (a new start replaces it)"""
+
+    _lock = threading.Lock()
+    _tokens = {}
+
+    @classmethod
+    def start(cls, sid):
+        token = object()
+        with cls._lock:
+            cls._tokens[sid] = token
+        return token
+
+    @classmethod
+    def stop(cls, sid):
+        with cls._lock:
+            cls._tokens.pop(sid, None)
+
+    @classmethod
+    def is_current(cls, sid, token):
+        with cls._lock:
+            return cls._tokens.get(sid) is token
+
+    @classmethod
+    def finish(cls, sid, token):
+        with cls._lock:
+            if cls._tokens.get(sid) is token:
+                del cls._tokens[sid]
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._tokens = {}
+
+
+def parse_stream(data):
+    """(start, end, speed, step) of a stream request. Raises ValueError."""
+    data = data or {}
+    start = parse_instant(data.get('start'), 'start')
+    end = parse_instant(data.get('end'), 'end')
+    if end <= start:
+        raise ValueError("end must be after start")
+    if (end - start).total_seconds() > MAX_RANGE_SECONDS:
+        raise ValueError(f"Range longer than {MAX_RANGE_SECONDS} seconds")
+    speed = min(max(_number(data.get('speed') or 1, 'speed'), 0.1), MAX_SPEED)
+    step = min(max(_number(data.get('step') or 5, 'step'), 1.0), MAX_RANGE_SECONDS)
+    # Frames never closer than MIN_FRAME_INTERVAL_SECONDS: fast replays skip instants instead
+    step = max(step, speed * MIN_FRAME_INTERVAL_SECONDS)
+    return start, end, speed, step
+
+
+def play(sid, token, start, end, speed, step, emit, sleep=time.sleep, window=DEFAULT_WINDOW_SECONDS):
+    """
+    Emit the frames of [start, end] every `step` seconds of replayed time,
+    `speed` times faster than real time, until done or replaced/stopped.
+    Returns the number of frames sent.
+    """
+    window = max(window, int(step))
+    frames = 0
+    t = start
+    try:
+        while t <= end and ReplaySessions.is_current(sid, token):
+            began = time.monotonic()
+            frame = replay_frame(t, window)
+            # The stream sleeps between frames: no connection held meanwhile
+            db.session.remove()
+            frame['speed'] = speed
+            emit(FRAME_EVENT, frame, to=sid)
+            frames += 1
+            t += timedelta(seconds=step)
+            sleep(max(0.0, step / speed - (time.monotonic() - began)))
+        if ReplaySessions.is_current(sid, token):
+            emit(END_EVENT, {'frames': frames, 'end': end.isoformat() + 'Z'}, to=sid)
+    finally:
+        ReplaySessions.finish(sid, token)
+    return frames
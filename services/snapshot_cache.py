@@ -0,0 +1,142 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: snapshot_cache.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Serialized snapshot cache for ATM-RDC
+Views that every user asks for between two pushes (active flights, summary
+statistics) are built once per tracking cycle and kept serialized, with a
+version id and an ETag (hash of the body):
+
+- in process memory, so repeated requests of one process cost a lookup;
+- in Redis (snapshot:<name>), so the other web processes reuse the bytes
+  instead of building the view again.
+
+The version of a snapshot is the live picture version while the tracking
+pipeline runs, and a SNAPSHOT_COLD_TTL time bucket otherwise. HTTP endpoints
+answer If-None-Match with 304 (snapshot_response); socket handlers emit the
+serialized body as is.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+
+from services.live_state import LiveStateStore
+from utils import redis_client
+
+logger = logging.getLogger(__name__)
+
+Snapshot = namedtuple('Snapshot', ['name', 'version', 'etag', 'body'])
+
+# Lifetime of a snapshot version when the live picture is cold
+COLD_TTL_SECONDS = float(os.environ.get('SNAPSHOT_COLD_TTL', 10))
+
+
+def cycle_version():
+    """Version id of the current cycle"""
+    meta = LiveStateStore.get_meta()
+    if meta and LiveStateStore.is_warm():
+        return f"live-{meta['version']}"
+    return f"cold-{int(time.time() // COLD_TTL_SECONDS)}"
+
+
+def serialize(data):
+    return json.dumps(data, separators=(',', ':'), default=str).encode('utf-8')
+
+
+class SnapshotCache:
+    """Build-once store of serialized views, keyed by name and version"""
+
+    PREFIX = 'snapshot:'
+    # Redis expiry of a stored snapshot (a new version replaces it long before)
+    TTL_SECONDS = 300
+
+    _lock = threading.Lock()
+    _local = {}
+
+    stats = {'hits': 0, 'shared': 0, 'builds': 0}
+
+    @classmethod
+    def get(cls, name, version, build):
+        """
+        Snapshot `name` at `version`; `build()` returns the data to serialize
+        and is only called when no process has stored this version yet.
+        """
+        version = str(version)
+        with cls._lock:
+            snapshot = cls._local.get(name)
+        if snapshot is not None and snapshot.version == version:
+            cls.stats['hits'] += 1
+            return snapshot
+
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                stored_version, etag, body = r.hmget(f"{cls.PREFIX}{name}", 'version', 'etag', 'body')
+                if stored_version is not None and stored_version.decode('utf-8') == version:
+                    snapshot = Snapshot(name, version, etag.decode('utf-8'), body)
+                    cls._remember(snapshot)
+                    cls.stats['shared'] += 1
+                    return snapshot
+            except Exception as e:
+                logger.warning(f"[SnapshotCache] Redis read failed: {e}")
+                redis_client.mark_down()
+                r = None
+
+        body = serialize(build())
+        snapshot = Snapshot(name, version, hashlib.sha1(body).hexdigest()[:20], body)
+        cls._remember(snapshot)
+        cls.stats['builds'] += 1
+
+        if r is not None:
+            try:
+                pipe = r.pipeline()
+                pipe.hset(f"{cls.PREFIX}{name}", mapping={'version': version, 'etag': snapshot.etag, 'body': body})
+                pipe.expire(f"{cls.PREFIX}{name}", cls.TTL_SECONDS)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"[SnapshotCache] Redis write failed: {e}")
+                redis_client.mark_down()
+        return snapshot
+
+    @classmethod
+    def _remember(cls, snapshot):
+        with cls._lock:
+            cls._local[snapshot.name] = snapshot
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._local = {}
+        cls.stats = {'hits': 0, 'shared': 0, 'builds': 0}
+
+
+def active_flights_snapshot():
+    """Serialized get_active_flights() of the current cycle (no external API call)"""
+    from services.flight_tracker import get_active_flights
+    from utils.system_gate import SystemGate
+
+    # Switching the system off empties the view before the live picture goes cold
+    version = f"{cycle_version()}-{'on' if SystemGate.is_active() else 'off'}"
+    return SnapshotCache.get('active_flights', version, lambda: get_active_flights(use_external_api=False))
+
+
+def snapshot_response(snapshot, cache_control='private, no-cache'):
+    """
+    JSON response of a snapshot, 304 when the client already holds it.
+    By default the browser keeps it but revalidates it on every use.
+    """
+    from flask import Response, request
+
+    response = Response(snapshot.body, mimetype='application/json')
+    response.set_etag(snapshot.etag)
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request)
@@ -0,0 +1,268 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: spatial_query.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Spatial queries over stored flight positions for ATM-RDC
+Answers questions such as "which aircraft crossed restricted zone X last week"
+inside PostgreSQL/PostGIS (ST_Intersects / ST_DWithin on GiST-indexed geometry
+columns). Results are streamed through server-side cursors, so large historical
+ranges never have to be loaded into Python at once.
+
+When DISABLE_POSTGIS is set (SQLite / development), the same API is served by a
+pure-Shapely fallback that streams candidate rows and tests them in batches.
+"""
+import os
+import math
+from datetime import datetime
+
+import shapely
+from shapely import wkt
+from sqlalchemy import select, func, cast, and_
+from geoalchemy2 import Geography
+from geoalchemy2.shape import to_shape
+
+from models import db, FlightPosition, Airspace
+
+POSTGIS_ENABLED = not os.environ.get('DISABLE_POSTGIS')
+
+DEFAULT_BATCH_SIZE = 1000
+
+POSITION_COLUMNS = (
+    FlightPosition.id,
+    FlightPosition.flight_id,
+    FlightPosition.overflight_id,
+    FlightPosition.icao24,
+    FlightPosition.callsign,
+    FlightPosition.latitude,
+    FlightPosition.longitude,
+    FlightPosition.altitude,
+    FlightPosition.ground_speed,
+    FlightPosition.timestamp,
+)
+
+
+def _row_to_dict(row):
+    data = dict(row._mapping)
+    for key, value in data.items():
+        if isinstance(value, datetime):
+            data[key] = value.isoformat()
+    return data
+
+
+def _stream(stmt, batch_size):
+    """Execute with a server-side cursor and yield rows as dicts"""
+    result = db.session.execute(
+        stmt.execution_options(stream_results=True, yield_per=batch_size)
+    )
+    try:
+        for row in result:
+            yield _row_to_dict(row)
+    finally:
+        result.close()
+
+
+def _time_filters(start, end):
+    filters = []
+    if start is not None:
+        filters.append(FlightPosition.timestamp >= start)
+    if end is not None:
+        filters.append(FlightPosition.timestamp <= end)
+    return filters
+
+
+def load_airspace_shape(airspace):
+    """Shapely geometry of an Airspace row (WKT text or PostGIS WKB)"""
+    if airspace is None or airspace.geom is None:
+        return None
+    if isinstance(airspace.geom, str):
+        return wkt.loads(airspace.geom)
+    return to_shape(airspace.geom)
+
+
+# ----------------------------------------------------------------------
+# Positions inside an airspace
+# ----------------------------------------------------------------------
+
+def positions_in_airspace(airspace_id, start=None, end=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Stream every stored position that lies inside the airspace.
+    Yields dicts with the POSITION_COLUMNS fields.
+    """
+    if POSTGIS_ENABLED:
+        stmt = (
+            select(*POSITION_COLUMNS)
+            .join(Airspace, func.ST_Intersects(FlightPosition.geom, Airspace.geom))
+            .where(Airspace.id == airspace_id, *_time_filters(start, end))
+            .order_by(FlightPosition.timestamp)
+        )
+        yield from _stream(stmt, batch_size)
+        return
+
+    airspace = db.session.get(Airspace, airspace_id)
+    geom = load_airspace_shape(airspace)
+    if geom is None:
+        return
+
+    min_lon, min_lat, max_lon, max_lat = geom.bounds
+    stmt = (
+        select(*POSITION_COLUMNS)
+        .where(
+            FlightPosition.latitude.between(min_lat, max_lat),
+            FlightPosition.longitude.between(min_lon, max_lon),
+            *_time_filters(start, end)
+        )
+        .order_by(FlightPosition.timestamp)
+    )
+    yield from _filter_by_shape(_stream(stmt, batch_size), geom, batch_size)
+
+
+def _filter_by_shape(rows, geom, batch_size):
+    """Vectorized point-in-polygon over a row stream, one batch at a time"""
+    shapely.prepare(geom)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from _contained(batch, geom)
+            batch = []
+    if batch:
+        yield from _contained(batch, geom)
+
+
+def _contained(batch, geom):
+    inside = shapely.contains_xy(
+        geom,
+        [r['longitude'] for r in batch],
+        [r['latitude'] for r in batch]
+    )
+    for row, flag in zip(batch, inside):
+        if flag:
+            yield row
+
+
+def flights_crossing_airspace(airspace_id, start=None, end=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    One summary per flight that crossed the airspace: first/last fix time and
+    number of fixes inside. Aggregated by the database when PostGIS is available.
+    """
+    if POSTGIS_ENABLED:
+        stmt = (
+            select(
+                FlightPosition.flight_id,
+                func.max(FlightPosition.callsign).label('callsign'),
+                func.max(FlightPosition.icao24).label('icao24'),
+                func.min(FlightPosition.timestamp).label('first_seen'),
+                func.max(FlightPosition.timestamp).label('last_seen'),
+                func.count(FlightPosition.id).label('position_count'),
+                func.min(FlightPosition.altitude).label('min_altitude'),
+                func.max(FlightPosition.altitude).label('max_altitude'),
+            )
+            .join(Airspace, func.ST_Intersects(FlightPosition.geom, Airspace.geom))
+            .where(Airspace.id == airspace_id, *_time_filters(start, end))
+            .group_by(FlightPosition.flight_id)
+            .order_by(func.min(FlightPosition.timestamp))
+        )
+        yield from _stream(stmt, batch_size)
+        return
+
+    summaries = {}
+    for row in positions_in_airspace(airspace_id, start, end, batch_size):
+        summary = summaries.get(row['flight_id'])
+        if summary is None:
+            summaries[row['flight_id']] = {
+                'flight_id': row['flight_id'],
+                'callsign': row['callsign'],
+                'icao24': row['icao24'],
+                'first_seen': row['timestamp'],
+                'last_seen': row['timestamp'],
+                'position_count': 1,
+                'min_altitude': row['altitude'],
+                'max_altitude': row['altitude'],
+            }
+            continue
+        summary['last_seen'] = row['timestamp']
+        summary['position_count'] += 1
+        if row['altitude'] is not None:
+            summary['min_altitude'] = min(a for a in (summary['min_altitude'], row['altitude']) if a is not None)
+            summary['max_altitude'] = max(a for a in (summary['max_altitude'], row['altitude']) if a is not None)
+    yield from summaries.values()
+
+
+# ----------------------------------------------------------------------
+# Positions near a point
+# ----------------------------------------------------------------------
+
+def positions_near(lat, lon, radius_m, start=None, end=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Stream stored positions within radius_m metres of (lat, lon)"""
+    # Bounding box of the circle in degrees: prefilter, then exact distance
+    dlat = math.degrees(radius_m / 6371000.0)
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+
+    if POSTGIS_ENABLED:
+        center = func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326)
+        envelope = func.ST_MakeEnvelope(lon - dlon, lat - dlat, lon + dlon, lat + dlat, 4326)
+        stmt = (
+            select(*POSITION_COLUMNS)
+            .where(
+                # && on the geometry uses the GiST index; the geography cast alone cannot
+                FlightPosition.geom.op('&&')(envelope),
+                func.ST_DWithin(cast(FlightPosition.geom, Geography), cast(center, Geography), radius_m),
+                *_time_filters(start, end)
+            )
+            .order_by(FlightPosition.timestamp)
+        )
+        yield from _stream(stmt, batch_size)
+        return
+
+    stmt = (
+        select(*POSITION_COLUMNS)
+        .where(
+            and_(
+                FlightPosition.latitude.between(lat - dlat, lat + dlat),
+                FlightPosition.longitude.between(lon - dlon, lon + dlon),
+            ),
+            *_time_filters(start, end)
+        )
+        .order_by(FlightPosition.timestamp)
+    )
+    for row in _stream(stmt, batch_size):
+        if _haversine_m(lat, lon, row['latitude'], row['longitude']) <= radius_m:
+            yield row
+
+
+def positions_in_bbox(min_lat, max_lat, min_lon, max_lon, start=None, end=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Stream stored positions inside a lat/lon bounding box"""
+    if POSTGIS_ENABLED:
+        envelope = func.ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326)
+        stmt = (
+            select(*POSITION_COLUMNS)
+            .where(func.ST_Intersects(FlightPosition.geom, envelope), *_time_filters(start, end))
+            .order_by(FlightPosition.timestamp)
+        )
+        yield from _stream(stmt, batch_size)
+        return
+
+    # A lat/lon box is exact on the plain coordinate columns
+    stmt = (
+        select(*POSITION_COLUMNS)
+        .where(
+            FlightPosition.latitude.between(min_lat, max_lat),
+            FlightPosition.longitude.between(min_lon, max_lon),
+            *_time_filters(start, end)
+        )
+        .order_by(FlightPosition.timestamp)
+    )
+    yield from _stream(stmt, batch_size)
+
+
+def _haversine_m(lat1, lon1, lat2, lon2):
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    a = (math.sin(math.radians(lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 6371000.0 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
@@ -0,0 +1,426 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: tracking_engine.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Streaming tracking engine for ATM-RDC
+Every ingested batch flows through one pass:
+
+    normalize -> geofence -> overflight state machine -> landing state machine
+    -> persistence (single commit) -> live state / radar push / trails
+
+Per-aircraft state (active overflight, active landing, last geofence result) is
+kept in memory between batches, so the database is only read to warm aircraft
+seen for the first time. Detection runs as soon as a batch arrives instead of
+on separate beat intervals.
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+
+from models import db, FlightPosition, Overflight, Landing
+from services.flight_tracker import (
+    are_points_in_rdc, zones_for_points, process_landing_batch,
+    open_overflights, close_overflight, notify_overflight_entry, notify_overflight_exit,
+    format_radar_flight
+)
+from services.live_state import LiveStateStore, normalize_state
+from services.partitioning import partition_for
+from services.radar_feed import RadarFeed
+from services.flight_identity import FlightIdentityResolver
+from services.trail_buffer import TrailBuffer, trail_point
+from algorithms.dead_reckoning import position_change_detector
+from algorithms.overflight_stats import OverflightAccumulator
+
+logger = logging.getLogger(__name__)
+
+# Flight status implied by each landing state
+LANDING_FLIGHT_STATUS = {
+    'approach': 'approaching',
+    'landed': 'on_ground',
+    'parking': 'on_ground',
+    'completed': 'in_flight'
+}
+
+
+class AircraftTrack:
+    """In-memory tracking state of one aircraft"""
+
+    __slots__ = ('key', 'flight_id', 'overflight_id', 'stats', 'landing_id', 'landing_status', 'in_rdc', 'last_seen')
+
+    def __init__(self, key, flight_id):
+        self.key = key
+        self.flight_id = flight_id
+        self.overflight_id = None
+        # Running metrics of the active overflight (OverflightAccumulator)
+        self.stats = None
+        self.landing_id = None
+        self.landing_status = None
+        self.in_rdc = False
+        self.last_seen = 0.0
+
+
+class TrackingEngine:
+    """
+    Single-pass processor for ingestion batches.
+    One instance lives per worker process (see `tracking_engine` below).
+    """
+
+    # Tracks not refreshed for this long are dropped (re-warmed from the DB if seen again)
+    TRACK_TTL_SECONDS = int(os.environ.get('TRACK_TTL', 900))
+
+    def __init__(self, detector=None, identity=None):
+        self.detector = detector or position_change_detector
+        self.identity = identity or FlightIdentityResolver()
+        self.tracks = {}
+        # Sharded mode: partition -> ownership token ("since") of this worker
+        self.owned_partitions = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.tracks = {}
+            self.owned_partitions = {}
+            self.identity.reset()
+
+    # ------------------------------------------------------------------
+    # Batch pipeline
+    # ------------------------------------------------------------------
+
+    def process_batch(self, flights_data, partitions=None):
+        """
+        Run one ingested batch (records from fetch_external_flight_data) through
+        the whole pipeline. Returns a summary dict.
+
+        `partitions` ({partition: since}) is given by sharded tracking workers:
+        the batch holds all the records of those partitions, and only their
+        part of the live picture is replaced.
+        """
+        with self._lock:
+            if partitions is not None:
+                self._take_ownership(partitions)
+            return self._process(flights_data, partitions)
+
+    def _take_ownership(self, partitions):
+        """Forget what we knew about partitions another worker owned meanwhile"""
+        changed = {p for p, since in partitions.items() if self.owned_partitions.get(p) != since}
+        if changed:
+            for key in [k for k in self.tracks if partition_for(k) in changed]:
+                del self.tracks[key]
+                self.detector.forget(key)
+        self.owned_partitions.update(partitions)
+
+    def _process(self, flights_data, partitions=None):
+        now = datetime.utcnow()
+        clock = time.time()
+        stats_before = dict(self.detector.stats)
+
+        # 1. Resolve every positioned record to its flight (unseen aircraft are created)
+        positioned = [i for i, fd in enumerate(flights_data)
+                      if fd.get('latitude') is not None and fd.get('longitude') is not None]
+        flight_of = dict(zip(positioned, self.identity.resolve([flights_data[i] for i in positioned], now)))
+
+        # 2. Geofence the whole batch at once
+        in_rdc_flags = are_points_in_rdc(
+            [fd.get('latitude') for fd in flights_data],
+            [fd.get('longitude') for fd in flights_data]
+        )
+
+        records = []
+        live_states = []
+        for i, (flight_data, in_rdc) in enumerate(zip(flights_data, in_rdc_flags)):
+            flight = flight_of.get(i)
+            state = normalize_state(flight_data, in_rdc=in_rdc, flight_id=flight.id if flight else None)
+            live_states.append(state)
+            if flight and state:
+                records.append((flight, flight_data, state, bool(in_rdc)))
+
+        tracks = self._get_tracks(records, clock)
+
+        # 3. Overflight state machine
+        entries, exits = self._run_overflights(records, tracks, now)
+
+        # 4. Landing state machine
+        movements = self._run_landings(records, tracks, now)
+
+        # 5. Persistence; side effects go to the outbox in the same transaction
+        trail_points = self._persist_positions(records, tracks, now)
+        for flight, _ in entries:
+            notify_overflight_entry(flight)
+        for flight, overflight in exits:
+            notify_overflight_exit(overflight, flight)
+        db.session.commit()
+
+        # 6. Publish the cycle's picture for the radar views
+        try:
+            if partitions is None:
+                version = LiveStateStore.write_snapshot(live_states)
+            else:
+                states_by_partition = {p: [] for p in partitions}
+                for state in live_states:
+                    if state:
+                        states_by_partition.setdefault(partition_for(state['key']), []).append(state)
+                version = LiveStateStore.write_partitions(states_by_partition)
+        except Exception as e:
+            logger.warning(f"[TrackingEngine] Live state write failed: {e}")
+        else:
+            try:
+                # Sharded workers hold part of the picture: the feed reads the whole of it back
+                RadarFeed.publish(
+                    [format_radar_flight(s) for s in live_states if s] if partitions is None else None,
+                    version
+                )
+            except Exception as e:
+                logger.warning(f"[TrackingEngine] Radar push failed: {e}")
+        try:
+            TrailBuffer.push_many(trail_points)
+        except Exception as e:
+            logger.warning(f"[TrackingEngine] Trail buffer write failed: {e}")
+
+        self._evict(clock)
+
+        cycle_stats = {k: self.detector.stats[k] - stats_before.get(k, 0) for k in self.detector.stats}
+        suppressed = cycle_stats['suppressed_duplicate'] + cycle_stats['suppressed_predicted']
+        logger.info(
+            f"[TrackingEngine] batch={len(flights_data)} tracked={len(records)} "
+            f"written={cycle_stats['written']} suppressed={suppressed} "
+            f"entries={len(entries)} exits={len(exits)} movements={len(movements)}"
+        )
+
+        return {
+            'status': 'success',
+            'positions_updated': len(flights_data),
+            'positions_written': cycle_stats['written'],
+            'positions_suppressed': suppressed,
+            'suppression_ratio': round(self.detector.suppression_ratio(cycle_stats), 3),
+            'entries': [flight.callsign for flight, _ in entries],
+            'exits': [flight.callsign for flight, _ in exits],
+            'movements': movements
+        }
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+
+    def _get_tracks(self, records, clock):
+        """Tracks of the batch's aircraft; first-seen aircraft are warmed with two queries"""
+        tracks = {}
+        cold = []
+        for flight, _, state, _ in records:
+            track = self.tracks.get(state['key'])
+            if track is None or track.flight_id != flight.id:
+                track = AircraftTrack(state['key'], flight.id)
+                self.tracks[state['key']] = track
+                cold.append(track)
+            track.last_seen = clock
+            tracks[state['key']] = track
+
+        if cold:
+            flight_ids = [t.flight_id for t in cold]
+            overflights = Overflight.query.filter(
+                Overflight.flight_id.in_(flight_ids),
+                Overflight.status == 'active'
+            ).all()
+            overflight_map = {ovf.flight_id: ovf.id for ovf in overflights}
+
+            landings = Landing.query.filter(
+                Landing.flight_id.in_(flight_ids),
+                Landing.status != 'completed'
+            ).order_by(Landing.created_at).all()
+            # Latest active landing per flight wins
+            landing_map = {l.flight_id: l for l in landings}
+
+            for track in cold:
+                track.overflight_id = overflight_map.get(track.flight_id)
+                track.in_rdc = track.overflight_id is not None
+                landing = landing_map.get(track.flight_id)
+                if landing:
+                    track.landing_id = landing.id
+                    track.landing_status = landing.status
+
+            self._rebuild_stats([t for t in cold if t.overflight_id])
+
+        return tracks
+
+    @staticmethod
+    def _rebuild_stats(tracks):
+        """Metrics of overflights that started before this worker saw them, in one query"""
+        if not tracks:
+            return
+        positions = FlightPosition.query.filter(
+            FlightPosition.overflight_id.in_([t.overflight_id for t in tracks])
+        ).order_by(FlightPosition.overflight_id, FlightPosition.timestamp).all()
+
+        by_overflight = {}
+        for position in positions:
+            by_overflight.setdefault(position.overflight_id, []).append(position)
+        for track in tracks:
+            track.stats = OverflightAccumulator.from_positions(by_overflight.get(track.overflight_id, []))
+
+    def _run_overflights(self, records, tracks, now):
+        entering = []
+        exiting = []
+        for flight, flight_data, state, in_rdc in records:
+            track = tracks[state['key']]
+            lat, lon, alt = state['latitude'], state['longitude'], flight_data.get('altitude')
+            # Aircraft on the ground at an RDC airport are not overflying
+            on_ground = state['on_ground'] or track.landing_status in ('landed', 'parking')
+            if in_rdc and not track.overflight_id and not on_ground:
+                entering.append((flight, lat, lon, alt))
+            elif not in_rdc and track.overflight_id:
+                exiting.append((flight, track, lat, lon, alt))
+            track.in_rdc = in_rdc
+
+        exits = []
+        if exiting:
+            overflights = Overflight.query.filter(
+                Overflight.id.in_([track.overflight_id for _, track, _, _, _ in exiting])
+            ).all()
+            overflight_map = {ovf.id: ovf for ovf in overflights}
+            for flight, track, lat, lon, alt in exiting:
+                overflight = overflight_map.get(track.overflight_id)
+                stats, track.overflight_id, track.stats = track.stats, None, None
+                if overflight is None or overflight.status != 'active':
+                    continue
+                if stats is not None:
+                    # Close the along-track distance at the exit fix
+                    stats.extend_to(lat, lon)
+                exits.append((flight, close_overflight(overflight, lat, lon, alt, now, stats=stats)))
+
+        entries = []
+        if entering:
+            # One INSERT ... ON CONFLICT DO NOTHING RETURNING for every entry of the cycle
+            opened = open_overflights(entering, now)
+            for flight, _, _, _ in entering:
+                overflight_id, created = opened.get(flight.id, (None, False))
+                if overflight_id is None:
+                    continue
+                for track in tracks.values():
+                    if track.flight_id == flight.id and track.overflight_id is None:
+                        track.overflight_id = overflight_id
+                        track.stats = OverflightAccumulator()
+                # A session another worker opened meanwhile is linked, not announced again
+                if created:
+                    entries.append((flight, overflight_id))
+                    opened[flight.id] = (overflight_id, False)
+
+        return entries, exits
+
+    def _run_landings(self, records, tracks, now):
+        """Landing/parking transitions of the whole batch, applied in one flush"""
+        if not records:
+            return []
+
+        landing_ids = [tracks[state['key']].landing_id for _, _, state, _ in records
+                       if tracks[state['key']].landing_id]
+        landings = Landing.query.filter(Landing.id.in_(landing_ids)).all() if landing_ids else []
+        landings_by_id = {l.id: l for l in landings}
+        # Flights without a known landing have none: the tracks were warmed from the DB
+        landing_map = {
+            flight.id: landings_by_id[tracks[state['key']].landing_id]
+            for flight, _, state, _ in records
+            if tracks[state['key']].landing_id in landings_by_id
+        }
+
+        transitions = process_landing_batch(
+            [flight for flight, _, _, _ in records],
+            [state['latitude'] for _, _, state, _ in records],
+            [state['longitude'] for _, _, state, _ in records],
+            [flight_data.get('altitude') for _, flight_data, _, _ in records],
+            [flight_data.get('ground_speed') for _, flight_data, _, _ in records],
+            landing_map=landing_map,
+            commit=False,
+            now=now,
+            overflight_stats={flight.id: tracks[state['key']].stats for flight, _, state, _ in records
+                              if tracks[state['key']].stats is not None}
+        )
+
+        movements = []
+        for index, landing in transitions:
+            flight, _, state, _ = records[index]
+            track = tracks[state['key']]
+
+            if landing.status in LANDING_FLIGHT_STATUS:
+                flight.flight_status = LANDING_FLIGHT_STATUS[landing.status]
+            if landing.status == 'landed':
+                # Touchdown closes the overflight session
+                track.overflight_id = None
+                track.stats = None
+            if landing.status == 'completed':
+                track.landing_id = None
+                track.landing_status = None
+            else:
+                track.landing_id = landing.id
+                track.landing_status = landing.status
+
+            movements.append({
+                'callsign': flight.callsign,
+                'status': landing.status,
+                'airport': landing.airport_icao
+            })
+        return movements
+
+    def _persist_positions(self, records, tracks, now):
+        # Zones crossed by the fixes of active overflights, one vectorized test per zone
+        overflying = [i for i, (_, _, state, in_rdc) in enumerate(records)
+                      if in_rdc and tracks[state['key']].stats is not None]
+        zones = dict(zip(overflying, zones_for_points(
+            [records[i][2]['latitude'] for i in overflying],
+            [records[i][2]['longitude'] for i in overflying]
+        )))
+
+        trail_points = []
+        for i, (flight, flight_data, state, in_rdc) in enumerate(records):
+            track = tracks[state['key']]
+            # Skip fixes that repeat the source or match the dead-reckoned track
+            write, reason = self.detector.should_write(state['key'], flight_data)
+
+            # Suppressed fixes still count towards the metrics, repeated ones do not
+            if i in zones and reason != 'duplicate':
+                track.stats.add_fix(state['latitude'], state['longitude'], flight_data.get('altitude'),
+                                    flight_data.get('ground_speed'), zones[i])
+            if track.stats is not None:
+                state['overflight_stats'] = track.stats.summary()
+
+            if not write:
+                continue
+
+            lat, lon = state['latitude'], state['longitude']
+            position = FlightPosition(
+                flight_id=flight.id,
+                overflight_id=track.overflight_id if in_rdc else None,
+                icao24=flight_data.get('icao24'),
+                callsign=flight_data.get('callsign'),
+                latitude=lat,
+                longitude=lon,
+                altitude=flight_data.get('altitude'),
+                heading=flight_data.get('heading'),
+                ground_speed=flight_data.get('ground_speed'),
+                vertical_rate=flight_data.get('vertical_speed'),
+                squawk=flight_data.get('squawk'),
+                on_ground=bool(flight_data.get('on_ground')),
+                is_in_rdc=in_rdc,
+                source=flight_data.get('source'),
+                timestamp=now,
+                geom=f'POINT({lon} {lat})'
+            )
+            db.session.add(position)
+            trail_points.append((flight.id, trail_point(
+                lat, lon, position.altitude, position.ground_speed, now
+            )))
+        return trail_points
+
+    def _evict(self, clock):
+        stale = [key for key, track in self.tracks.items() if clock - track.last_seen > self.TRACK_TTL_SECONDS]
+        for key in stale:
+            del self.tracks[key]
+            self.detector.forget(key)
+
+
+tracking_engine = TrackingEngine()
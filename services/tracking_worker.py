@@ -0,0 +1,112 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: tracking_worker.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Tracking worker loop for ATM-RDC
+One process per worker: heartbeat, follow the partitions the coordinator
+assigns to it, consume their ingestion streams and run each round of batches
+through the tracking engine. A batch is acknowledged only after the engine
+committed it; a failed batch stays pending and is replayed until it goes stale.
+"""
+import time
+import logging
+import threading
+
+from models import db
+from services.ingest_stream import IngestStream
+from services.partitioning import PartitionCoordinator
+from services.tracking_engine import tracking_engine
+from utils import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class TrackingWorker:
+
+    def __init__(self, worker_id, app, engine=None):
+        self.worker_id = worker_id
+        self.app = app
+        self.engine = engine or tracking_engine
+        self.owned = {}
+        self.replay_pending = True
+        self.stop_event = threading.Event()
+        self._last_heartbeat = 0.0
+
+    def run(self, block_ms=2000):
+        logger.info(f"[TrackingWorker] {self.worker_id} started")
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.step(block_ms)
+                except Exception as e:
+                    logger.error(f"[TrackingWorker] {self.worker_id}: {e}")
+                    self.stop_event.wait(1)
+        finally:
+            PartitionCoordinator.leave(self.worker_id)
+            logger.info(f"[TrackingWorker] {self.worker_id} stopped")
+
+    def stop(self):
+        self.stop_event.set()
+
+    def step(self, block_ms=2000):
+        """One iteration: refresh membership if due, then process what is available"""
+        if time.time() - self._last_heartbeat >= PartitionCoordinator.HEARTBEAT_SECONDS:
+            self._refresh_assignment()
+
+        if not self.owned:
+            self.stop_event.wait(1)
+            return 0
+
+        partitions = list(self.owned)
+        if self.replay_pending:
+            # Our own unacknowledged batches first (restart, failed round)
+            self.replay_pending = False
+            batches = IngestStream.read(self.worker_id, partitions, replay=True)
+            if batches:
+                return self.process(batches)
+
+        return self.process(IngestStream.read(self.worker_id, partitions, block_ms=block_ms))
+
+    def _refresh_assignment(self):
+        PartitionCoordinator.heartbeat(self.worker_id)
+        self._last_heartbeat = time.time()
+
+        owned = PartitionCoordinator.owned_by(self.worker_id)
+        gained = [p for p, since in owned.items() if self.owned.get(p) != since]
+        if gained:
+            r = redis_client.get_redis()
+            for partition in gained:
+                IngestStream.ensure_group(r, partition)
+            if IngestStream.claim_abandoned(self.worker_id, gained):
+                self.replay_pending = True
+            logger.info(f"[TrackingWorker] {self.worker_id} now owns partitions {sorted(owned)}")
+        self.owned = owned
+
+    def process(self, batches):
+        """Run read batches through the engine, one round at a time. Returns rounds processed."""
+        rounds, stale = IngestStream.rounds(batches)
+        if stale:
+            IngestStream.ack(stale)
+
+        processed = 0
+        for batch_round in rounds:
+            partitions = {p: self.owned[p] for p in batch_round if p in self.owned}
+            records = [record for p in partitions for record in batch_round[p][1]]
+            try:
+                with self.app.app_context():
+                    self.engine.process_batch(records, partitions=partitions)
+            except Exception as e:
+                logger.error(f"[TrackingWorker] {self.worker_id}: batch failed, left pending: {e}")
+                with self.app.app_context():
+                    db.session.rollback()
+                self.replay_pending = True
+                break
+            IngestStream.ack({p: [batch_round[p][0]] for p in batch_round})
+            IngestStream.stats['processed'] += len(batch_round)
+            processed += 1
+        return processed
@@ -0,0 +1,284 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: traffic_density.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Traffic density heatmap for ATM-RDC
+Where aircraft actually fly is kept as a maintained aggregate
+(traffic_density_tiles): position counts per map tile cell, per zoom level
+and per UTC day. aggregate() folds the positions stored since its last run
+into the tiles (one histogram per zoom and day, see algorithms.density_grid)
+and moves a cursor (SystemConfig traffic_density_cursor) in the same
+transaction, together with the ids still missing behind it
+(traffic_density_gaps); the aggregate_traffic_density task runs it every
+minute.
+
+Heatmap tiles (PNG or JSON) are summed over the last `days` days from the
+aggregate only, rendered once per aggregate state and served with an ETag.
+"""
+import io
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import or_, func
+
+from algorithms.density_grid import GRID, bin_positions, render_rgba
+from models import db, FlightPosition, SystemConfig, TrafficDensityTile
+
+logger = logging.getLogger(__name__)
+
+MIN_ZOOM = int(os.environ.get('HEATMAP_MIN_ZOOM', 3))
+MAX_ZOOM = int(os.environ.get('HEATMAP_MAX_ZOOM', 9))
+# Positions folded into the aggregate per run of aggregate()
+BATCH_SIZE = int(os.environ.get('HEATMAP_BATCH_SIZE', 20000))
+# Browser cache lifetime of a tile; the aggregate moves once a minute
+CACHE_MAX_AGE_SECONDS = int(os.environ.get('HEATMAP_CACHE_MAX_AGE', 300))
+
+DEFAULT_DAYS = 7
+MAX_DAYS = 90
+CURSOR_KEY = 'traffic_density_cursor'
+GAPS_KEY = 'traffic_density_gaps'
+# How long a hole below the cursor is re-read: longer than any transaction
+# inserting positions stays open
+GAP_SECONDS = int(os.environ.get('HEATMAP_GAP_SECONDS', 300))
+MAX_GAPS = 1000
+FORMATS = ('png', 'json')
+
+
+def pack_counts(counts):
+    return zlib.compress(np.ascontiguousarray(counts, dtype=np.uint32).tobytes())
+
+
+def unpack_counts(blob):
+    return np.frombuffer(zlib.decompress(blob), dtype=np.uint32).reshape(GRID, GRID).copy()
+
+
+# ----------------------------------------------------------------------
+# Aggregation
+# ----------------------------------------------------------------------
+
+def _state_rows():
+    """(cursor row, gaps row), created on first use"""
+    rows = {row.key: row for row in SystemConfig.query.filter(SystemConfig.key.in_((CURSOR_KEY, GAPS_KEY)))}
+    if CURSOR_KEY not in rows:
+        rows[CURSOR_KEY] = SystemConfig(
+            key=CURSOR_KEY, value='0', value_type='int', category='system', is_editable=False,
+            description='Last flight position folded into the traffic density heatmap'
+        )
+        db.session.add(rows[CURSOR_KEY])
+    if GAPS_KEY not in rows:
+        rows[GAPS_KEY] = SystemConfig(
+            key=GAPS_KEY, value=json.dumps({'late': 0, 'gaps': []}), value_type='json', category='system',
+            is_editable=False, description='Position ids below the heatmap cursor not committed yet when scanned'
+        )
+        db.session.add(rows[GAPS_KEY])
+    return rows[CURSOR_KEY], rows[GAPS_KEY]
+
+
+def aggregate_version():
+    """(cursor, late positions folded): changes whenever the aggregate does"""
+    values = dict(db.session.query(SystemConfig.key, SystemConfig.value).filter(
+        SystemConfig.key.in_((CURSOR_KEY, GAPS_KEY))
+    ))
+    cursor = int(values.get(CURSOR_KEY) or 0)
+    late = json.loads(values[GAPS_KEY])['late'] if values.get(GAPS_KEY) else 0
+    return cursor, late
+
+
+def current_cursor():
+    return aggregate_version()[0]
+
+
+def _missing_ranges(lo, hi, present):
+    """Sub-ranges of [lo, hi] holding none of the sorted ids `present`"""
+    ranges = []
+    expected = lo
+    for position_id in present:
+        if position_id > hi:
+            break
+        if position_id > expected:
+            ranges.append((expected, position_id - 1))
+        expected = max(expected, position_id + 1)
+    if expected <= hi:
+        ranges.append((expected, hi))
+    return ranges
+
+
+def aggregate(batch_size=None):
+    """
+    Fold the next positions into the density tiles: those with an id after
+    the cursor, and those since committed in the gaps left behind it.
+
+    Ids are allocated when a transaction inserts, not when it commits, so the
+    partition workers and Celery commit them out of order: a scan can see id
+    n+1 before n. Every hole below the cursor is remembered (with the time it
+    was seen) and re-read on the next runs until GAP_SECONDS passed; an id is
+    read once from the range it fills, so nothing is counted twice.
+
+    Returns {'scanned', 'positions', 'late', 'tiles', 'cursor'}; 'scanned'
+    below the batch size means the aggregate caught up.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    cursor_row, gaps_row = _state_rows()
+    cursor = int(cursor_row.value or 0)
+    state = json.loads(gaps_row.value)
+    now = time.time()
+    gaps = [gap for gap in state['gaps'] if now - gap[2] < GAP_SECONDS]
+
+    # On-ground fixes are filtered here rather than in SQL: their ids are no gaps
+    rows = db.session.query(
+        FlightPosition.id, FlightPosition.latitude, FlightPosition.longitude, FlightPosition.timestamp,
+        FlightPosition.on_ground
+    ).filter(
+        or_(FlightPosition.id > cursor, *[FlightPosition.id.between(lo, hi) for lo, hi, _ in gaps])
+    ).order_by(FlightPosition.id).limit(batch_size).all()
+
+    ids = [row.id for row in rows]
+    # A full batch stops at its last id: the ranges after it were not read
+    read_up_to = ids[-1] if len(rows) >= batch_size else float('inf')
+    remaining = []
+    for lo, hi, seen in gaps:
+        remaining += [(a, b, seen) for a, b in _missing_ranges(lo, min(hi, read_up_to), ids)]
+        if hi > read_up_to:
+            remaining.append((max(lo, read_up_to + 1), hi, seen))
+    new_cursor = max([cursor] + ids)
+    remaining += [(a, b, now) for a, b in _missing_ranges(cursor + 1, new_cursor, ids)]
+
+    airborne = [row for row in rows if not row.on_ground]
+    late = sum(1 for row in airborne if row.id <= cursor)
+    touched = 0
+    if airborne:
+        lats = np.array([row.latitude for row in airborne], dtype=float)
+        lons = np.array([row.longitude for row in airborne], dtype=float)
+        days = np.array([(row.timestamp or datetime.utcnow()).date().toordinal() for row in airborne])
+        for ordinal in np.unique(days):
+            day = datetime.fromordinal(int(ordinal)).date()
+            in_day = days == ordinal
+            for zoom in range(MIN_ZOOM, MAX_ZOOM + 1):
+                touched += _add_counts(zoom, day, bin_positions(lats[in_day], lons[in_day], zoom))
+
+    cursor_row.value = str(new_cursor)
+    remaining = sorted(remaining, key=lambda gap: gap[2])[-MAX_GAPS:]
+    gaps_row.value = json.dumps({'late': state['late'] + late, 'gaps': [list(gap) for gap in remaining]})
+    db.session.commit()
+    return {'scanned': len(rows), 'positions': len(airborne), 'late': late, 'tiles': touched,
+            'cursor': new_cursor}
+
+
+def _add_counts(zoom, day, tiles):
+    """Add per-tile counts of one zoom and day to the stored tiles (one read query)"""
+    if not tiles:
+        return 0
+    xs = [x for x, _ in tiles]
+    ys = [y for _, y in tiles]
+    existing = {
+        (tile.tile_x, tile.tile_y): tile
+        for tile in TrafficDensityTile.query.filter(
+            TrafficDensityTile.zoom == zoom,
+            TrafficDensityTile.day == day,
+            TrafficDensityTile.tile_x.between(min(xs), max(xs)),
+            TrafficDensityTile.tile_y.between(min(ys), max(ys))
+        )
+    }
+
+    for (x, y), counts in tiles.items():
+        tile = existing.get((x, y))
+        if tile is None:
+            tile = TrafficDensityTile(zoom=zoom, tile_x=x, tile_y=y, day=day)
+            db.session.add(tile)
+        else:
+            counts = counts + unpack_counts(tile.counts)
+        tile.counts = pack_counts(counts)
+        tile.total = int(counts.sum())
+        tile.max_count = int(counts.max())
+    return len(tiles)
+
+
+# ----------------------------------------------------------------------
+# Tiles
+# ----------------------------------------------------------------------
+
+def _first_day(days, today):
+    return today - timedelta(days=days - 1)
+
+
+def tile_counts(zoom, x, y, days=DEFAULT_DAYS, today=None):
+    """Counts of one tile summed over the last `days` days, or None without traffic"""
+    today = today or datetime.utcnow().date()
+    tiles = TrafficDensityTile.query.filter(
+        TrafficDensityTile.zoom == zoom,
+        TrafficDensityTile.tile_x == x,
+        TrafficDensityTile.tile_y == y,
+        TrafficDensityTile.day.between(_first_day(days, today), today)
+    ).all()
+    if not tiles:
+        return None
+    return sum(unpack_counts(tile.counts) for tile in tiles)
+
+
+def zoom_scale(zoom, days=DEFAULT_DAYS, today=None):
+    """
+    Color scale shared by every tile of a zoom level (so tiles join without
+    seams): the sum of the daily maxima of the period
+    """
+    today = today or datetime.utcnow().date()
+    maxima = db.session.query(func.max(TrafficDensityTile.max_count)).filter(
+        TrafficDensityTile.zoom == zoom,
+        TrafficDensityTile.day.between(_first_day(days, today), today)
+    ).group_by(TrafficDensityTile.day).all()
+    return sum(m for m, in maxima if m)
+
+
+def _encode_png(rgba):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(rgba, 'RGBA').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=1024)
+def _rendered_tile(zoom, x, y, days, fmt, version):
+    """(body, mimetype) of a tile; `version` (aggregate version, day) keys the cache"""
+    today = datetime.fromisoformat(version[-1]).date()
+    counts = tile_counts(zoom, x, y, days, today)
+    grid = counts if counts is not None else np.zeros((GRID, GRID), dtype=np.uint32)
+    scale = zoom_scale(zoom, days, today) if counts is not None else 0
+
+    if fmt == 'json':
+        rows, cols = np.nonzero(grid)
+        body = json.dumps({
+            'zoom': zoom, 'x': x, 'y': y, 'days': days, 'grid': GRID,
+            'scale': scale, 'total': int(grid.sum()),
+            'cells': [[int(r), int(c), int(grid[r, c])] for r, c in zip(rows, cols)]
+        }, separators=(',', ':')).encode('utf-8')
+        return body, 'application/json'
+    return _encode_png(render_rgba(grid, scale)), 'image/png'
+
+
+def render_tile(zoom, x, y, days=DEFAULT_DAYS, fmt='png'):
+    """(body, mimetype) of a heatmap tile for the current state of the aggregate"""
+    version = (*aggregate_version(), datetime.utcnow().date().isoformat())
+    return _rendered_tile(zoom, x, y, days, fmt, version)
+
+
+def tile_response(zoom, x, y, days=DEFAULT_DAYS, fmt='png'):
+    """HTTP response of a tile: ETag of the body, cached for CACHE_MAX_AGE_SECONDS"""
+    from flask import Response, request
+
+    body, mimetype = render_tile(zoom, x, y, days, fmt)
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(hashlib.sha1(body).hexdigest()[:20])
+    response.headers['Cache-Control'] = f"private, max-age={CACHE_MAX_AGE_SECONDS}"
+    return response.make_conditional(request)
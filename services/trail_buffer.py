@@ -0,0 +1,210 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: trail_buffer.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Per-aircraft trail ring buffers for ATM-RDC
+Keeps the most recent fixes of every tracked flight so the overflight radar can
+draw trajectories without querying flight_positions once per overflight.
+
+Storage layout (Redis):
+- trail:<flight_id>  LIST  JSON fixes, oldest first, capped at TRAIL_LENGTH
+
+Without Redis the buffers live in process memory (one deque per flight).
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+from utils import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def trail_point(lat, lon, altitude=None, ground_speed=None, timestamp=None):
+    """Compact trail fix as stored in the buffers"""
+    return {
+        'lat': lat,
+        'lon': lon,
+        'alt': altitude or 0,
+        'gs': ground_speed or 0,
+        'time': timestamp.isoformat() if hasattr(timestamp, 'isoformat') else timestamp
+    }
+
+
+class TrailBuffer:
+    """Fixed-size ring buffer of recent fixes per flight"""
+
+    KEY_PREFIX = 'trail:'
+
+    TRAIL_LENGTH = int(os.environ.get('TRAIL_LENGTH', 50))
+
+    # Trails of aircraft no longer reported expire on their own
+    TTL_SECONDS = int(os.environ.get('TRAIL_TTL', 1800))
+
+    _lock = threading.Lock()
+    _local = {}
+    _local_touched = {}
+
+    @classmethod
+    def _key(cls, flight_id):
+        return f"{cls.KEY_PREFIX}{flight_id}"
+
+    @classmethod
+    def push_many(cls, points):
+        """
+        Append fixes to their trails. `points` is a list of (flight_id, point)
+        in chronological order. All trails are updated in one round trip.
+        """
+        if not points:
+            return
+
+        now = time.time()
+        with cls._lock:
+            for flight_id, point in points:
+                trail = cls._local.get(flight_id)
+                if trail is None:
+                    trail = cls._local[flight_id] = deque(maxlen=cls.TRAIL_LENGTH)
+                trail.append(point)
+                cls._local_touched[flight_id] = now
+            cls._expire_local(now)
+
+        r = redis_client.get_redis()
+        if r is None:
+            return
+
+        try:
+            pipe = r.pipeline(transaction=False)
+            for flight_id, point in points:
+                pipe.rpush(cls._key(flight_id), json.dumps(point))
+            for flight_id in {fid for fid, _ in points}:
+                key = cls._key(flight_id)
+                pipe.ltrim(key, -cls.TRAIL_LENGTH, -1)
+                pipe.expire(key, cls.TTL_SECONDS)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"[TrailBuffer] Redis push failed: {e}")
+            redis_client.mark_down()
+
+    @classmethod
+    def _expire_local(cls, now):
+        expired = [fid for fid, ts in cls._local_touched.items() if now - ts > cls.TTL_SECONDS]
+        for flight_id in expired:
+            cls._local.pop(flight_id, None)
+            cls._local_touched.pop(flight_id, None)
+
+    @classmethod
+    def get_many(cls, flight_ids):
+        """
+        Trails of several flights in one pipelined read.
+        Returns {flight_id: [points]}; flights without a buffer are omitted.
+        """
+        flight_ids = list(flight_ids)
+        if not flight_ids:
+            return {}
+
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                pipe = r.pipeline(transaction=False)
+                for flight_id in flight_ids:
+                    pipe.lrange(cls._key(flight_id), 0, -1)
+                results = pipe.execute()
+                return {
+                    flight_id: [json.loads(p) for p in raw]
+                    for flight_id, raw in zip(flight_ids, results) if raw
+                }
+            except Exception as e:
+                logger.warning(f"[TrailBuffer] Redis read failed: {e}")
+                redis_client.mark_down()
+
+        with cls._lock:
+            return {
+                flight_id: list(cls._local[flight_id])
+                for flight_id in flight_ids if cls._local.get(flight_id)
+            }
+
+    @classmethod
+    def clear(cls, flight_id=None):
+        with cls._lock:
+            if flight_id is None:
+                cls._local = {}
+                cls._local_touched = {}
+            else:
+                cls._local.pop(flight_id, None)
+                cls._local_touched.pop(flight_id, None)
+
+        r = redis_client.get_redis()
+        if r is None:
+            return
+        try:
+            if flight_id is None:
+                keys = list(r.scan_iter(match=f"{cls.KEY_PREFIX}*"))
+                if keys:
+                    r.delete(*keys)
+            else:
+                r.delete(cls._key(flight_id))
+        except Exception as e:
+            logger.warning(f"[TrailBuffer] Redis clear failed: {e}")
+            redis_client.mark_down()
+
+
+def load_trails_from_db(flight_ids, limit=None):
+    """
+    Latest `limit` stored positions per flight in a single query
+    (ROW_NUMBER() OVER (PARTITION BY flight_id ORDER BY timestamp DESC)).
+    Returns {flight_id: [points]} oldest first.
+    """
+    from sqlalchemy import select, func
+    from models import db, FlightPosition
+
+    flight_ids = list(flight_ids)
+    if not flight_ids:
+        return {}
+    limit = limit or TrailBuffer.TRAIL_LENGTH
+
+    ranked = (
+        select(
+            FlightPosition.flight_id,
+            FlightPosition.latitude,
+            FlightPosition.longitude,
+            FlightPosition.altitude,
+            FlightPosition.ground_speed,
+            FlightPosition.timestamp,
+            func.row_number().over(
+                partition_by=FlightPosition.flight_id,
+                order_by=(FlightPosition.timestamp.desc(), FlightPosition.id.desc())
+            ).label('rn')
+        )
+        .where(FlightPosition.flight_id.in_(flight_ids))
+        .subquery()
+    )
+    stmt = (
+        select(ranked)
+        .where(ranked.c.rn <= limit)
+        .order_by(ranked.c.flight_id, ranked.c.timestamp, ranked.c.rn.desc())
+    )
+
+    trails = {}
+    for row in db.session.execute(stmt):
+        trails.setdefault(row.flight_id, []).append(
+            trail_point(row.latitude, row.longitude, row.altitude, row.ground_speed, row.timestamp)
+        )
+    return trails
+
+
+def get_trails(flight_ids):
+    """Trails from the ring buffers, with one SQL query for the flights whose buffer is cold"""
+    flight_ids = list(flight_ids)
+    trails = TrailBuffer.get_many(flight_ids)
+    missing = [fid for fid in flight_ids if fid not in trails]
+    if missing:
+        trails.update(load_trails_from_db(missing))
+    return trails
@@ -207,6 +207,29 @@
         loadTrafficChart();
     }
 
+    let heatmapMap, densityLayer;
+
+    async function initHeatmap() {
+        heatmapMap = L.map('heatmap-map', {
+            center: [-2.5, 23.5],
+            zoom: 5,
+            attributionControl: false
+        });
+        L.tileLayer('https://{s}.basemaps.cartocdn.com/dark_all/{z}/{x}/{y}{r}.png', { maxZoom: 19 }).addTo(heatmapMap);
+        await updateHeatmap();
+    }
+
+    async function updateHeatmap() {
+        const days = document.getElementById('heatmap-period').value;
+        try {
+            const layer = await createHeatmapLayer(days);
+            if (densityLayer) heatmapMap.removeLayer(densityLayer);
+            densityLayer = layer.addTo(heatmapMap);
+        } catch (e) {
+            console.error('Error loading heatmap:', e);
+        }
+    }
+
     function exportData(format) {
         const type = document.getElementById('export-type').value;
         const start = document.getElementById('export-start').value;
@@ -220,3 +243,4 @@
     }
 
     document.addEventListener('DOMContentLoaded', initCharts);
+    document.addEventListener('DOMContentLoaded', initHeatmap);
@@ -0,0 +1,24 @@
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: heatmap.js
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+
+    // Traffic density tiles (/radar/api/heatmap), shared by the radar and analytics maps
+    let heatmapConfig = null;
+
+    async function createHeatmapLayer(days) {
+        if (!heatmapConfig) {
+            const response = await fetch('/radar/api/heatmap/config');
+            heatmapConfig = await response.json();
+        }
+        // Outside the aggregated zoom levels Leaflet scales the nearest tiles
+        return L.tileLayer(`/radar/api/heatmap/{z}/{x}/{y}.png?days=${days || heatmapConfig.default_days}`, {
+            minNativeZoom: heatmapConfig.min_zoom,
+            maxNativeZoom: heatmapConfig.max_zoom,
+            maxZoom: 19,
+            opacity: 0.85,
+            zIndex: 250
+        });
+    }
@@ -46,6 +46,7 @@
     let airportsLayer;
     let weatherLayer;
     let precipitationLayer;
+    let heatmapLayer = null;
     let basemapLayer;
     let flights = [];
     let filteredFlights = [];
@@ -84,6 +85,7 @@
         // Add zoom listener for dynamic icon scaling
         map.on('zoomend', () => {
             updateFlightsOnMap();
+            loadBoundary();
         });
 
         // Add Immersive Controls on the map
@@ -107,7 +109,7 @@
 
         map.addControl(new ImmersiveControl({ position: 'topright' }));
 
-        setInterval(loadFlights, 10000);
+        connectFlightFeed();
         updateTime();
         setInterval(updateTime, 1000);
     }
@@ -137,22 +139,39 @@
         }
     }
 
+    // Detail levels of /radar/api/airspaces by highest map zoom (services/airspace_geometry.py)
+    const airspaceLevels = [[4, 'low'], [7, 'medium'], [10, 'high']];
+    let airspaceLevel = null;
+
+    function airspaceStyle(feature) {
+        const type = feature.properties.type;
+        const color = type === 'boundary' ? '#3b82f6' : (type === 'restricted' ? '#ef4444' : '#a855f7');
+        return {
+            color: color,
+            weight: type === 'boundary' ? 2 : 1,
+            opacity: 0.8,
+            fillColor: color,
+            fillOpacity: 0.05,
+            dashArray: type === 'boundary' ? '5, 5' : null
+        };
+    }
+
     async function loadBoundary() {
+        const match = airspaceLevels.find(([maxZoom]) => map.getZoom() <= maxZoom);
+        const level = match ? match[1] : 'full';
+        if (level === airspaceLevel) return;
+        airspaceLevel = level;
+
         try {
-            const response = await fetch('/radar/api/boundary');
-            const boundary = await response.json();
+            // Kept by the browser, revalidated with its ETag once stale
+            const response = await fetch(`/radar/api/airspaces?level=${level}`);
+            const airspaces = await response.json();
+            if (level !== airspaceLevel) return;
 
-            L.geoJSON(boundary, {
-                style: {
-                    color: '#3b82f6',
-                    weight: 2,
-                    opacity: 0.8,
-                    fillColor: '#3b82f6',
-                    fillOpacity: 0.05,
-                    dashArray: '5, 5'
-                }
-            }).addTo(boundaryLayer);
+            boundaryLayer.clearLayers();
+            L.geoJSON(airspaces, { style: airspaceStyle }).addTo(boundaryLayer);
         } catch (e) {
+            airspaceLevel = null;
             console.error('Error loading boundary:', e);
         }
     }
@@ -222,20 +241,206 @@
         }
     }
 
+    function renderFlights(data) {
+        flights = data;
+
+        updateOperatorFilter();
+        applyFilters();
+
+        document.getElementById('flights-count').textContent = `${flights.length} ${i18n.flights_active}`;
+    }
+
     async function loadFlights() {
         try {
             const response = await fetch('/radar/api/flights');
-            flights = await response.json();
-
-            updateOperatorFilter();
-            applyFilters();
-
-            document.getElementById('flights-count').textContent = `${flights.length} ${i18n.flights_active}`;
+            renderFlights(await response.json());
         } catch (e) {
             console.error('Error loading flights:', e);
         }
     }
 
+    // Live feed: the tracking pipeline pushes radar frames over Socket.IO
+    // (keyframes, then deltas of the changed aircraft; see services/radar_frames.py).
+    // Zoomed out, the page subscribes to its viewport instead and receives
+    // server-side clusters (services/radar_view.py).
+    // The HTTP endpoint is polled until the pipeline pushes, and again when
+    // pushes stop (no message queue, no tracking pipeline, simulation mode).
+    let pollTimer = null;
+    let pushWatchdog = null;
+    let clusters = [];
+    const feed = {
+        socket: null,
+        region: 'all',
+        encoding: (typeof MessagePack !== 'undefined') ? 'msgpack' : 'json',
+        mode: 'frames',
+        clusterMaxZoom: null,
+        cycleInterval: 5,
+        subscribed: null,
+        seq: null,
+        aircraft: new Map()
+    };
+    const statusColors = { approaching: 'yellow', on_ground: 'blue' };
+    // Wire column -> radar flight field
+    const frameFields = {
+        lat: 'latitude', lon: 'longitude', alt: 'altitude', hdg: 'heading',
+        spd: 'ground_speed', vs: 'vertical_speed', st: 'status', rdc: 'in_rdc'
+    };
+
+    function keepPolling() {
+        if (!pollTimer) {
+            pollTimer = setInterval(loadFlights, 10000);
+        }
+    }
+
+    function startPolling() {
+        clearTimeout(pushWatchdog);
+        feed.seq = null;
+        feed.subscribed = null;
+        keepPolling();
+    }
+
+    // A push arrived: stop polling, and poll again if none follows within two cycles
+    function pushReceived() {
+        stopPolling();
+        clearTimeout(pushWatchdog);
+        pushWatchdog = setTimeout(keepPolling, 2 * feed.cycleInterval * 1000);
+    }
+
+    function stopPolling() {
+        if (pollTimer) {
+            clearInterval(pollTimer);
+            pollTimer = null;
+        }
+    }
+
+    function decodeFrame(data) {
+        if (data instanceof ArrayBuffer) {
+            return MessagePack.decode(new Uint8Array(data));
+        }
+        return data;
+    }
+
+    function applyFrame(frame) {
+        if (frame.t === 'k') {
+            feed.aircraft = new Map();
+        } else if (feed.seq === null || frame.base !== feed.seq) {
+            // Missed a frame: the delta does not apply to what we hold
+            return false;
+        }
+
+        (frame.meta || []).forEach(([id, meta]) => {
+            feed.aircraft.set(id, Object.assign(feed.aircraft.get(id) || { id }, meta));
+        });
+        // Fields that became null (null in `data` means unchanged)
+        (frame.cleared || []).forEach(([id, cols]) => {
+            const flight = feed.aircraft.get(id);
+            if (flight) {
+                cols.forEach(col => { flight[frameFields[col]] = null; });
+            }
+        });
+        frame.ids.forEach((id, row) => {
+            const flight = feed.aircraft.get(id) || { id };
+            frame.cols.forEach((col, c) => {
+                const value = frame.data[c][row];
+                if (value !== null && value !== undefined) {
+                    flight[frameFields[col]] = value;
+                }
+            });
+            flight.status_color = statusColors[flight.status] || 'green';
+            feed.aircraft.set(id, flight);
+        });
+        (frame.gone || []).forEach(id => feed.aircraft.delete(id));
+
+        feed.seq = frame.seq;
+        return true;
+    }
+
+    function feedSubscription() {
+        const subscription = { region: feed.region, encoding: feed.encoding };
+        if (feed.clusterMaxZoom === null || !map || map.getZoom() > feed.clusterMaxZoom) {
+            return subscription;
+        }
+        const operator = document.getElementById('filter-operator').value;
+        subscription.view = {
+            bbox: map.getBounds().toBBoxString(),
+            zoom: map.getZoom(),
+            alt_min: parseInt(document.getElementById('filter-altitude-min').value),
+            alt_max: parseInt(document.getElementById('filter-altitude-max').value),
+            airline: operator !== 'all' ? operator : null,
+            in_rdc: document.querySelector('[data-status="in_rdc"]').checked
+        };
+        return subscription;
+    }
+
+    // Subscribe again only when the viewport, zoom mode or filters changed
+    function updateFeedSubscription() {
+        if (!feed.socket || !feed.socket.connected) return;
+        const subscription = feedSubscription();
+        const key = JSON.stringify(subscription);
+        if (key === feed.subscribed) return;
+        feed.subscribed = key;
+        feed.socket.emit('subscribe_radar', subscription);
+    }
+
+    function connectFlightFeed() {
+        if (typeof io === 'undefined') {
+            startPolling();
+            return;
+        }
+
+        const socket = io();
+        feed.socket = socket;
+
+        socket.on('connect', () => {
+            feed.subscribed = null;
+            updateFeedSubscription();
+        });
+        socket.on('subscribed', (data) => {
+            if (data.error) {
+                startPolling();
+                return;
+            }
+            if (data.encoding) feed.encoding = data.encoding;
+            if (data.cycle_interval) feed.cycleInterval = data.cycle_interval;
+            feed.mode = data.view ? 'view' : 'frames';
+            feed.seq = null;
+            // Nothing may ever be pushed: keep polling until the first frame
+            keepPolling();
+            if (feed.clusterMaxZoom === null && data.cluster_max_zoom !== undefined) {
+                feed.clusterMaxZoom = data.cluster_max_zoom;
+                updateFeedSubscription();
+            }
+        });
+        socket.on('radar_frame', (data) => {
+            if (feed.mode !== 'frames') return;
+            const frame = decodeFrame(data);
+            if (!applyFrame(frame)) {
+                socket.emit('radar_resync', { region: feed.region, encoding: feed.encoding });
+                return;
+            }
+            pushReceived();
+            clusters = [];
+            renderFlights(Array.from(feed.aircraft.values()));
+        });
+        socket.on('radar_view', (data) => {
+            if (feed.mode !== 'view') return;
+            // Pushed views carry the live version; the one answering the subscription does not
+            if (data.v !== undefined) pushReceived();
+            clusters = data.clusters || [];
+            renderFlights(data.flights || []);
+            // Clustered aircraft are counted too
+            document.getElementById('flights-count').textContent = `${data.count} ${i18n.flights_active}`;
+        });
+        socket.on('disconnect', startPolling);
+        socket.on('connect_error', startPolling);
+
+        let moveTimer = null;
+        map.on('moveend', () => {
+            clearTimeout(moveTimer);
+            moveTimer = setTimeout(updateFeedSubscription, 300);
+        });
+    }
+
     function updateOperatorFilter() {
         const select = document.getElementById('filter-operator');
         const operators = [...new Set(flights.map(f => f.aircraft?.operator).filter(Boolean))];
@@ -282,6 +487,7 @@
 
         updateFlightsOnMap();
         updateFlightsList();
+        updateFeedSubscription();
 
         document.getElementById('filtered-count').textContent =
             filteredFlights.length !== flights.length ?
@@ -418,6 +624,21 @@
 
             marker.addTo(flightsLayer);
         });
+
+        clusters.forEach(cluster => {
+            const size = Math.min(56, 24 + Math.round(Math.log2(cluster.count) * 6));
+            const icon = L.divIcon({
+                className: 'aircraft-cluster',
+                html: `<div style="width: ${size}px; height: ${size}px; line-height: ${size}px; border-radius: 50%; text-align: center; font-size: 11px; font-weight: 600; color: white; background: rgba(14, 165, 233, 0.55); border: 2px solid rgba(14, 165, 233, 0.9);">${cluster.count}</div>`,
+                iconSize: [size, size],
+                iconAnchor: [size / 2, size / 2]
+            });
+            const [minLat, minLon, maxLat, maxLon] = cluster.bounds;
+            L.marker([cluster.latitude, cluster.longitude], { icon })
+                .bindTooltip(`${cluster.count} ${i18n.flights_active} · ${formatAltitude(cluster.min_altitude, true)}-${formatAltitude(cluster.max_altitude, true)}`)
+                .on('click', () => map.fitBounds([[minLat, minLon], [maxLat, maxLon]], { padding: [40, 40] }))
+                .addTo(flightsLayer);
+        });
     }
 
     function toggleFullscreen() {
@@ -539,6 +760,22 @@
                 if (map.hasLayer(precipitationLayer)) map.removeLayer(precipitationLayer);
                 else map.addLayer(precipitationLayer);
                 break;
+            case 'heatmap':
+                toggleHeatmap();
+                break;
+        }
+    }
+
+    async function toggleHeatmap() {
+        if (heatmapLayer && map.hasLayer(heatmapLayer)) {
+            map.removeLayer(heatmapLayer);
+            return;
+        }
+        try {
+            if (!heatmapLayer) heatmapLayer = await createHeatmapLayer();
+            if (document.getElementById('layer-heatmap').checked) map.addLayer(heatmapLayer);
+        } catch (e) {
+            console.error('Error loading heatmap:', e);
         }
     }
 
@@ -30,6 +30,7 @@
 
         loadBoundary();
         loadActiveTrajectories();
+        map.on('zoomend', loadBoundary);
 
         setInterval(updateDurations, 1000);
         setInterval(loadActiveTrajectories, 5000);
@@ -91,22 +92,39 @@
         return (brng + 360) % 360;
     }
 
+    // Detail levels of /radar/api/airspaces by highest map zoom (services/airspace_geometry.py)
+    const airspaceLevels = [[4, 'low'], [7, 'medium'], [10, 'high']];
+    let airspaceLevel = null;
+
+    function airspaceStyle(feature) {
+        const type = feature.properties.type;
+        const color = type === 'boundary' ? '#3b82f6' : (type === 'restricted' ? '#ef4444' : '#a855f7');
+        return {
+            color: color,
+            weight: type === 'boundary' ? 2 : 1,
+            opacity: 0.6,
+            fillColor: color,
+            fillOpacity: 0.05,
+            dashArray: type === 'boundary' ? '5, 5' : null
+        };
+    }
+
     async function loadBoundary() {
+        const match = airspaceLevels.find(([maxZoom]) => map.getZoom() <= maxZoom);
+        const level = match ? match[1] : 'full';
+        if (level === airspaceLevel) return;
+        airspaceLevel = level;
+
         try {
-            const response = await fetch('/radar/api/boundary');
-            const boundary = await response.json();
+            // Kept by the browser, revalidated with its ETag once stale
+            const response = await fetch(`/radar/api/airspaces?level=${level}`);
+            const airspaces = await response.json();
+            if (level !== airspaceLevel) return;
 
-            L.geoJSON(boundary, {
-                style: {
-                    color: '#3b82f6',
-                    weight: 2,
-                    opacity: 0.6,
-                    fillColor: '#3b82f6',
-                    fillOpacity: 0.05,
-                    dashArray: '5, 5'
-                }
-            }).addTo(boundaryLayer);
+            boundaryLayer.clearLayers();
+            L.geoJSON(airspaces, { style: airspaceStyle }).addTo(boundaryLayer);
         } catch (e) {
+            airspaceLevel = null;
             console.error('Error loading boundary:', e);
         }
     }
@@ -8,251 +8,110 @@
 """
 """
 Flight-related Celery tasks for ATM-RDC
-Handles asynchronous flight position fetching and overflight detection
+Fetches flight positions and feeds each batch to the tracking engine, which
+handles geofencing, overflight and landing detection and persistence in one pass.
+
+With tracking workers running (scripts/run_tracking_worker.py), the batch is
+only published to the ingestion streams and each worker processes the
+partitions it owns; see services/partitioning.py and services/ingest_stream.py.
 """
 import os
+import logging
 from datetime import datetime
 from celery_app import celery
 from utils.system_gate import SystemGate
+from utils.task_lease import single_flight
+
+logger = logging.getLogger(__name__)
 
 
 @celery.task(bind=True, max_retries=3)
+@single_flight('fetch_flight_positions', ttl=60, interval=5)
 def fetch_flight_positions(self):
     """
-    Fetch real-time flight positions from external API
-    This task runs every 5 seconds via Celery Beat
+    Fetch real-time flight positions from external API and process them
+    This task runs every 5 seconds via Celery Beat; a tick that overlaps a
+    running fetch is skipped
     """
     try:
-        from app import app
-        from models import db, Flight, FlightPosition
+        from worker_app import worker_context
         from services.api_client import fetch_external_flight_data
-        
-        with app.app_context():
+
+        with worker_context():
             if not SystemGate.is_active():
                 return {'status': 'skipped', 'reason': 'System Offline'}
 
             flights_data = fetch_external_flight_data()
-            
-            # Optimization: Batch fetch flights to avoid N+1 queries
-            # Use set to deduplicate callsigns and avoid redundant work
-            callsigns = list(set(fd.get('callsign') for fd in flights_data if fd.get('callsign')))
-
-            flight_map = {}
-            if callsigns:
-                flights = Flight.query.filter(Flight.callsign.in_(callsigns)).all()
-                flight_map = {f.callsign: f for f in flights}
+            return dispatch_batch(flights_data)
 
-            for flight_data in flights_data:
-                flight = flight_map.get(flight_data.get('callsign'))
-                
-                if flight:
-                    lat = flight_data.get('latitude')
-                    lon = flight_data.get('longitude')
-
-                    position = FlightPosition(
-                        flight_id=flight.id,
-                        latitude=lat,
-                        longitude=lon,
-                        altitude=flight_data.get('altitude'),
-                        heading=flight_data.get('heading'),
-                        ground_speed=flight_data.get('ground_speed'),
-                        timestamp=datetime.utcnow(),
-                        geom=f'POINT({lon} {lat})' if lat is not None and lon is not None else None
-                    )
-                    db.session.add(position)
-                    
-                    flight.current_latitude = flight_data.get('latitude')
-                    flight.current_longitude = flight_data.get('longitude')
-                    flight.current_altitude = flight_data.get('altitude')
-                    flight.current_heading = flight_data.get('heading')
-                    flight.current_speed = flight_data.get('ground_speed')
-                    flight.last_position_update = datetime.utcnow()
-            
-            db.session.commit()
-            return {'status': 'success', 'positions_updated': len(flights_data)}
-            
     except Exception as exc:
         self.retry(exc=exc, countdown=5)
 
 
-@celery.task(bind=True, max_retries=3)
-def check_airspace_entries(self):
+def dispatch_batch(flights_data):
     """
-    Check for aircraft entering or exiting RDC airspace
-    Uses Shapely for geofencing calculations
+    Publish the batch to the ingestion streams of the tracking workers, or
+    process it here when no tracking worker is registered (or Redis is down)
     """
-    try:
-        from app import app
-        from models import db, Flight, Overflight
-        from services.flight_tracker import is_point_in_rdc, get_rdc_boundary
-        
-        with app.app_context():
-            if not SystemGate.is_active():
-                return {'status': 'skipped', 'reason': 'System Offline'}
+    from services.partitioning import PartitionCoordinator
+    from services.ingest_stream import IngestStream
+    from services.tracking_engine import tracking_engine
 
-            active_flights = Flight.query.filter(
-                Flight.flight_status.in_(['in_flight', 'approaching'])
-            ).all()
-            
-            # Optimization: Pre-fetch active overflights to avoid N+1 queries
-            flight_ids = [f.id for f in active_flights]
-            overflights = Overflight.query.filter(
-                Overflight.flight_id.in_(flight_ids),
-                Overflight.status == 'active'
-            ).all()
-            overflight_map = {ovf.flight_id: ovf for ovf in overflights}
+    assignment = PartitionCoordinator.assign()
+    if assignment and IngestStream.publish(flights_data, list(assignment)) is not None:
+        return {
+            'status': 'published',
+            'positions_updated': len(flights_data),
+            'workers': len(set(worker_id for worker_id, _ in assignment.values())),
+            'partitions': len(assignment)
+        }
 
-            entries = []
-            exits = []
-            
-            for flight in active_flights:
-                if not flight.current_latitude or not flight.current_longitude:
-                    continue
-                
-                is_in_rdc = is_point_in_rdc(
-                    flight.current_latitude, 
-                    flight.current_longitude
-                )
-                
-                existing_overflight = overflight_map.get(flight.id)
-                
-                if is_in_rdc and not existing_overflight:
-                    from uuid import uuid4
-                    session_id = f"OVF-{datetime.now().strftime('%Y%m%d')}-{uuid4().hex[:8].upper()}"
-                    
-                    overflight = Overflight(
-                        session_id=session_id,
-                        flight_id=flight.id,
-                        aircraft_id=flight.aircraft_id,
-                        entry_lat=flight.current_latitude,
-                        entry_lon=flight.current_longitude,
-                        entry_alt=flight.current_altitude,
-                        entry_time=datetime.utcnow(),
-                        status='active'
-                    )
-                    db.session.add(overflight)
-                    entries.append(flight.callsign)
-                    
-                elif not is_in_rdc and existing_overflight:
-                    existing_overflight.exit_lat = flight.current_latitude
-                    existing_overflight.exit_lon = flight.current_longitude
-                    existing_overflight.exit_alt = flight.current_altitude
-                    existing_overflight.exit_time = datetime.utcnow()
-                    existing_overflight.status = 'completed'
-                    
-                    if existing_overflight.entry_time:
-                        duration = (existing_overflight.exit_time - existing_overflight.entry_time).total_seconds() / 60
-                        existing_overflight.duration_minutes = duration
-                    
-                    exits.append(flight.callsign)
-            
-            db.session.commit()
-            return {
-                'status': 'success',
-                'entries': entries,
-                'exits': exits
-            }
-            
-    except Exception as exc:
-        self.retry(exc=exc, countdown=10)
+    return tracking_engine.process_batch(flights_data)
 
 
 @celery.task
-def process_flight_data(flight_data: dict):
+def process_flight_batch(flights_data: list):
     """
-    Process incoming flight data from external API
+    Process a batch of flight records pushed by a source (instead of polled)
     """
-    from app import app
-    from models import db, Flight
-    
-    with app.app_context():
+    from worker_app import worker_context
+    from services.tracking_engine import tracking_engine
+
+    with worker_context():
         if not SystemGate.is_active():
             return {'status': 'skipped', 'reason': 'System Offline'}
 
-        flight = Flight.query.filter_by(callsign=flight_data.get('callsign')).first()
-        
-        if flight:
-            flight.current_latitude = flight_data.get('latitude')
-            flight.current_longitude = flight_data.get('longitude')
-            flight.current_altitude = flight_data.get('altitude')
-            flight.current_heading = flight_data.get('heading')
-            flight.current_speed = flight_data.get('speed')
-            flight.last_position_update = datetime.utcnow()
-            db.session.commit()
-            
-        return {'status': 'updated', 'callsign': flight_data.get('callsign')}
+        return tracking_engine.process_batch(flights_data)
 
 
-@celery.task(bind=True, max_retries=3)
-def check_airport_movements(self):
+@celery.task
+def process_flight_data(flight_data: dict):
     """
-    Check for aircraft landings and parking at RDC airports
+    Process incoming flight data from external API
     """
-    try:
-        from app import app
-        from models import db, Flight, Landing
-        from services.flight_tracker import check_landing_events
-
-        with app.app_context():
-            if not SystemGate.is_active():
-                return {'status': 'skipped', 'reason': 'System Offline'}
-
-            # Check flights that are approaching or on ground
-            # We also include in_flight just in case they are descending near an airport
-            active_flights = Flight.query.filter(
-                Flight.flight_status.in_(['in_flight', 'approaching', 'on_ground'])
-            ).all()
-
-            # Optimization: Pre-fetch active landings to avoid N+1 queries
-            flight_ids = [f.id for f in active_flights]
-            active_landings = Landing.query.filter(
-                Landing.flight_id.in_(flight_ids),
-                Landing.status != 'completed'
-            ).all()
-
-            landing_map = {}
-            for l in active_landings:
-                # Store the latest active landing for each flight
-                if l.flight_id not in landing_map or l.created_at > landing_map[l.flight_id].created_at:
-                    landing_map[l.flight_id] = l
+    result = process_flight_batch(flights_data=[flight_data])
+    if result.get('status') == 'skipped':
+        return result
+    return {'status': 'updated', 'callsign': flight_data.get('callsign')}
 
-            movements = []
 
-            for flight in active_flights:
-                if flight.current_latitude is None or flight.current_longitude is None:
-                    continue
 
-                active_landing = landing_map.get(flight.id)
-                landing = check_landing_events(
-                    flight.id,
-                    flight.current_latitude,
-                    flight.current_longitude,
-                    flight.current_altitude,
-                    flight.current_speed,
-                    active_landing=active_landing,
-                    skip_db_lookup=True
-                )
-
-                if landing:
-                    # Update flight status based on landing status
-                    if landing.status == 'approach':
-                        flight.flight_status = 'approaching'
-                    elif landing.status in ['landed', 'parking']:
-                         flight.flight_status = 'on_ground'
-                    elif landing.status == 'completed':
-                         flight.flight_status = 'in_flight'
-
-                    movements.append({
-                        'callsign': flight.callsign,
-                        'status': landing.status,
-                        'airport': landing.airport_icao
-                    })
-
-            db.session.commit()
-            return {
-                'status': 'success',
-                'movements': movements
-            }
-
-    except Exception as exc:
-        self.retry(exc=exc, countdown=10)
+@celery.task
+@single_flight('aggregate_traffic_density', ttl=300, interval=60)
+def aggregate_traffic_density(max_batches: int = 50):
+    """
+    Fold the positions stored since the last run into the traffic density
+    heatmap tiles. This task runs every minute via Celery Beat
+    """
+    from worker_app import worker_context
+    from services import traffic_density
+
+    with worker_context():
+        totals = {'positions': 0, 'tiles': 0}
+        for _ in range(max_batches):
+            stats = traffic_density.aggregate()
+            totals['positions'] += stats['positions']
+            totals['tiles'] += stats['tiles']
+            if stats['scanned'] < traffic_density.BATCH_SIZE:
+                break
+        return {'status': 'success', 'cursor': stats['cursor'], **totals}
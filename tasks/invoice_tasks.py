@@ -13,20 +13,22 @@ Handles asynchronous invoice generation and processing
 from datetime import datetime, timedelta
 from celery_app import celery
 from utils.system_gate import SystemGate
+from utils.task_lease import single_flight
 
 
 @celery.task(bind=True, max_retries=3)
+@single_flight('generate_pending_invoices', ttl=1800, interval=3600, coalesce=True)
 def generate_pending_invoices(self):
     """
     Generate invoices for completed overflights and landings
     This task runs hourly via Celery Beat
     """
     try:
-        from app import app
+        from worker_app import worker_context
         from models import db, Overflight, Landing, Invoice
         from services.invoice_generator import generate_overflight_invoice, generate_landing_invoice
         
-        with app.app_context():
+        with worker_context():
             if not SystemGate.is_active():
                 return {'status': 'skipped', 'reason': 'System Offline'}
 
@@ -68,10 +70,10 @@ def generate_single_invoice(invoice_type: str, reference_id: int):
     """
     Generate a single invoice on demand
     """
-    from app import app
+    from worker_app import worker_context
     from services.invoice_generator import generate_overflight_invoice, generate_landing_invoice
     
-    with app.app_context():
+    with worker_context():
         if invoice_type == 'overflight':
             invoice = generate_overflight_invoice(reference_id)
         elif invoice_type == 'landing':
@@ -94,10 +96,10 @@ def send_invoice_notification(invoice_id: int):
     """
     Send notification for a generated invoice
     """
-    from app import app
+    from worker_app import worker_context
     from models import db, Invoice
     
-    with app.app_context():
+    with worker_context():
         invoice = Invoice.query.get(invoice_id)
         
         if invoice:
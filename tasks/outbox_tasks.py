@@ -0,0 +1,55 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: outbox_tasks.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Outbox consumer tasks for ATM-RDC
+Delivers the side effects recorded by the tracking path (Telegram, billing
+notifications, auto-invoicing) outside of the tracking loop
+"""
+import time
+from celery_app import celery
+from utils.task_lease import single_flight
+
+# Stop draining after this long so the next tick can take over
+DRAIN_TIME_BUDGET_SECONDS = 20
+
+
+@celery.task(bind=True)
+@single_flight('drain_outbox', ttl=120, interval=5)
+def drain_outbox(self):
+    """
+    Deliver pending outbox events in batches
+    This task runs every 5 seconds via Celery Beat
+    """
+    from worker_app import worker_context
+    from services import outbox
+
+    with worker_context():
+        totals = {'claimed': 0, 'done': 0, 'retried': 0, 'failed': 0}
+        deadline = time.time() + DRAIN_TIME_BUDGET_SECONDS
+
+        while time.time() < deadline:
+            stats = outbox.drain()
+            for key in totals:
+                totals[key] += stats[key]
+            if stats['claimed'] < outbox.BATCH_SIZE:
+                break
+
+        return {'status': 'success', **totals}
+
+
+@celery.task
+def purge_outbox(older_than_days: int = 7):
+    """
+    Delete delivered outbox events past the retention window
+    """
+    from worker_app import worker_context
+    from services import outbox
+
+    with worker_context():
+        return {'status': 'success', 'deleted': outbox.purge_done(older_than_days)}
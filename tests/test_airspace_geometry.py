@@ -0,0 +1,154 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_airspace_geometry.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import json
+import math
+import unittest
+from unittest.mock import patch
+
+os.environ['DISABLE_POSTGIS'] = '1'
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from shapely.geometry import Polygon, shape
+from models import db, Airspace
+from services.snapshot_cache import SnapshotCache
+from services.airspace_geometry import AirspaceGeometry, SYNC_SECONDS, build_collection, level_for_zoom
+from services import flight_tracker
+from routes.radar import api_airspaces
+from utils import redis_client
+
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret'
+    db.init_app(app)
+    return app
+
+
+def detailed_polygon(center_lon, center_lat, radius, vertices=2000):
+    """Circle with a small ripple, many vertices"""
+    return Polygon([
+        (center_lon + (radius + 0.02 * math.sin(40 * a)) * math.cos(a),
+         center_lat + (radius + 0.02 * math.sin(40 * a)) * math.sin(a))
+        for a in (2 * math.pi * i / vertices for i in range(vertices))
+    ])
+
+
+def vertex_count(feature):
+    return len(shape(feature['geometry']).exterior.coords)
+
+
+class TestAirspaceGeometry(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_patcher = patch.object(redis_client, 'get_redis', return_value=None)
+        self.redis_patcher.start()
+        SnapshotCache.clear()
+        AirspaceGeometry._synced_version = None
+        AirspaceGeometry._synced_at = 0.0
+
+        self.app = create_test_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.add_all([
+            Airspace(name='RDC Airspace', type='boundary', geom=detailed_polygon(23.5, -2.5, 8).wkt),
+            Airspace(name='Kinshasa R1', type='restricted', geom=detailed_polygon(15.4, -4.4, 0.5).wkt),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        SnapshotCache.clear()
+        flight_tracker.clear_airspace_cache()
+        self.redis_patcher.stop()
+
+    def test_levels_by_zoom(self):
+        self.assertEqual([level_for_zoom(z) for z in (2, 4, 5, 7, 9, 12)],
+                         ['low', 'low', 'medium', 'medium', 'high', 'full'])
+        self.assertEqual(level_for_zoom(None), 'full')
+
+    def test_every_airspace_simplified_per_level(self):
+        low, full = build_collection('low'), build_collection('full')
+        self.assertEqual([f['properties']['name'] for f in low['features']], ['RDC Airspace', 'Kinshasa R1'])
+        self.assertEqual(vertex_count(full['features'][0]), 2001)
+        self.assertLess(vertex_count(low['features'][0]), vertex_count(build_collection('medium')['features'][0]))
+        self.assertLess(vertex_count(low['features'][0]), 500)
+        for feature in low['features']:
+            self.assertTrue(shape(feature['geometry']).is_valid)
+
+    def test_hardcoded_boundary_without_airspaces(self):
+        Airspace.query.delete()
+        db.session.commit()
+        collection = build_collection('full')
+        self.assertEqual(len(collection['features']), 1)
+        self.assertEqual(collection['features'][0]['properties']['type'], 'boundary')
+
+    def test_built_once_until_an_airspace_changes(self):
+        with patch('services.airspace_geometry.build_collection', wraps=build_collection) as build:
+            first = AirspaceGeometry.snapshot('low')
+            self.assertIs(AirspaceGeometry.snapshot('low'), first)
+            self.assertEqual(build.call_count, 1)
+
+            airspace = Airspace.query.filter_by(name='Kinshasa R1').first()
+            airspace.name = 'Kinshasa R2'
+            db.session.commit()
+
+            changed = AirspaceGeometry.snapshot('low')
+            self.assertEqual(build.call_count, 2)
+        self.assertNotEqual(changed.etag, first.etag)
+        self.assertIn('Kinshasa R2', [f['properties']['name'] for f in json.loads(changed.body)['features']])
+
+    def test_airspace_change_drops_the_geofencing_cache(self):
+        flight_tracker.get_rdc_boundary_geom()
+        self.assertIsNotNone(flight_tracker.CACHED_RDC_BOUNDARY_GEOM)
+        Airspace.query.filter_by(name='Kinshasa R1').first().max_altitude = 20000
+        db.session.commit()
+        self.assertIsNone(flight_tracker.CACHED_RDC_BOUNDARY_GEOM)
+
+    def test_change_in_another_process_drops_the_geofencing_cache(self):
+        with patch.object(AirspaceGeometry, 'version', return_value='4'):
+            flight_tracker.get_rdc_boundary_geom()
+        checked_at = AirspaceGeometry._synced_at
+        with patch.object(AirspaceGeometry, 'version', return_value='5'):
+            # Not checked again before SYNC_SECONDS
+            AirspaceGeometry.sync_geofencing_cache(now=checked_at + 1)
+            self.assertIsNotNone(flight_tracker.CACHED_RDC_BOUNDARY_GEOM)
+            AirspaceGeometry.sync_geofencing_cache(now=checked_at + SYNC_SECONDS)
+        self.assertIsNone(flight_tracker.CACHED_RDC_BOUNDARY_GEOM)
+
+    def test_response_carries_etag_and_is_revalidated(self):
+        view = api_airspaces.__wrapped__
+        with self.app.test_request_context('/radar/api/airspaces?zoom=3'):
+            response = view()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.get_data())['level'], 'low')
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+
+        with self.app.test_request_context('/radar/api/airspaces?level=low', headers={'If-None-Match': etag}):
+            self.assertEqual(view().status_code, 304)
+
+        with self.app.test_request_context('/radar/api/airspaces?level=huge'):
+            _, status = view()
+        self.assertEqual(status, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
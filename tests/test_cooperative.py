@@ -0,0 +1,53 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_cooperative.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+os.environ['DISABLE_POSTGIS'] = '1'
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import cooperative
+from services.invoice_generator import render_invoice_pdf
+from scripts.benchmark_socketio_latency import sample_invoice_data
+
+
+class TestCooperative(unittest.TestCase):
+
+    def tearDown(self):
+        cooperative.shutdown_pool()
+
+    def test_inline_without_eventlet(self):
+        with patch.object(cooperative, 'eventlet_active', return_value=False), \
+                patch.object(cooperative, '_get_pool') as get_pool:
+            self.assertEqual(cooperative.run_cpu_bound(pow, 2, 10), 1024)
+        get_pool.assert_not_called()
+        self.assertFalse(cooperative.make_psycopg2_green())
+
+    def test_pool_under_eventlet(self):
+        with patch.object(cooperative, 'eventlet_active', return_value=True):
+            self.assertEqual(cooperative.run_cpu_bound(pow, 2, 10), 1024)
+            with self.assertRaises(ZeroDivisionError):
+                cooperative.run_cpu_bound(divmod, 1, 0)
+        self.assertIsNotNone(cooperative._pool)
+
+    def test_invoice_rendered_in_the_pool(self):
+        path = os.path.join(tempfile.mkdtemp(), 'invoice.pdf')
+        with patch.object(cooperative, 'eventlet_active', return_value=True):
+            self.assertEqual(cooperative.run_cpu_bound(render_invoice_pdf, path, sample_invoice_data(20)), path)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(5), b'%PDF-')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_dead_reckoning.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from algorithms.dead_reckoning import PositionChangeDetector, project_position, distance_m
+
+
+class TestPositionChangeDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = PositionChangeDetector(tolerance_m=250, altitude_tolerance_ft=200, max_silence_seconds=60)
+        self.fix = {'latitude': -4.0, 'longitude': 20.0, 'altitude': 35000,
+                    'heading': 90, 'ground_speed': 450, 'live_updated': '2026-01-01T10:00:00+00:00'}
+
+    def test_first_fix_is_written(self):
+        self.assertEqual(self.detector.should_write('abc', self.fix, now=0), (True, 'new'))
+
+    def test_same_source_timestamp_is_duplicate(self):
+        self.detector.should_write('abc', self.fix, now=0)
+        self.assertEqual(self.detector.should_write('abc', dict(self.fix), now=5), (False, 'duplicate'))
+        # Still a duplicate after the heartbeat delay: the source has nothing new
+        self.assertEqual(self.detector.should_write('abc', dict(self.fix), now=120), (False, 'duplicate'))
+
+    def test_fix_on_predicted_track_is_suppressed(self):
+        self.detector.should_write('abc', self.fix, now=0)
+        lat, lon = project_position(-4.0, 20.0, 90, 450, 10)
+        nxt = dict(self.fix, latitude=lat, longitude=lon + 0.001, live_updated='2026-01-01T10:00:10+00:00')
+        self.assertEqual(self.detector.should_write('abc', nxt, now=10), (False, 'predicted'))
+
+    def test_manoeuvre_is_written(self):
+        self.detector.should_write('abc', self.fix, now=0)
+        # Turned north instead of continuing east
+        lat, lon = project_position(-4.0, 20.0, 0, 450, 10)
+        nxt = dict(self.fix, latitude=lat, longitude=lon, live_updated='2026-01-01T10:00:10+00:00')
+        self.assertEqual(self.detector.should_write('abc', nxt, now=10), (True, 'moved'))
+
+    def test_altitude_and_heartbeat(self):
+        self.detector.should_write('abc', dict(self.fix, live_updated=None), now=0)
+        self.assertEqual(self.detector.should_write('abc', dict(self.fix, live_updated=None, altitude=34000), now=1)[1], 'altitude')
+        self.assertEqual(self.detector.should_write('abc', dict(self.fix, live_updated=None, altitude=34000), now=100)[1], 'heartbeat')
+
+    def test_suppression_ratio(self):
+        self.detector.should_write('abc', self.fix, now=0)
+        self.detector.should_write('abc', self.fix, now=5)
+        self.detector.should_write('abc', self.fix, now=10)
+        self.assertAlmostEqual(self.detector.suppression_ratio(), 2 / 3)
+
+    def test_distance_helper(self):
+        # 1 degree of latitude ~ 111 km
+        self.assertAlmostEqual(distance_m(0, 0, 1, 0) / 1000, 111.19, places=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
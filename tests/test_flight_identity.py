@@ -0,0 +1,181 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_flight_identity.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import unittest
+from unittest.mock import patch
+from datetime import date, datetime
+
+os.environ['DISABLE_POSTGIS'] = '1'
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import event
+from models import db, Flight, Aircraft
+from services.flight_identity import FlightIdentityResolver
+
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret'
+    db.init_app(app)
+    return app
+
+
+NOW = datetime(2026, 3, 2, 12, 0)
+
+
+class TestFlightIdentityResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_test_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.aircraft = Aircraft(icao24='04c1d2', registration='9Q-CHC')
+        db.session.add(self.aircraft)
+        db.session.flush()
+        # The same callsign flown on two days
+        self.yesterday = Flight(callsign='ETH801', flight_iata='ET801', aircraft_id=self.aircraft.id,
+                                flight_date=date(2026, 3, 1))
+        self.today = Flight(callsign='ETH801', flight_iata='ET801', aircraft_id=self.aircraft.id,
+                            flight_date=date(2026, 3, 2))
+        db.session.add_all([self.yesterday, self.today])
+        db.session.commit()
+
+        self.resolver = FlightIdentityResolver()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _statements(self, f):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement.lstrip().upper())
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = f()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return result, statements
+
+    def test_matches_aircraft_and_date(self):
+        flights = self.resolver.resolve([{'icao24': '04C1D2', 'callsign': 'ETH801'}], now=NOW)
+        self.assertEqual(flights[0].id, self.today.id)
+
+        dated = self.resolver.resolve([{'icao24': '04c1d2', 'flight_date': '2026-03-01'}], now=NOW)
+        self.assertEqual(dated[0].id, self.yesterday.id)
+
+    def test_matches_flight_number_alias(self):
+        flights = self.resolver.resolve([{'flight_iata': 'ET801', 'flight_date': '2026-03-01'}], now=NOW)
+        self.assertEqual(flights[0].id, self.yesterday.id)
+
+    def test_unseen_aircraft_created_in_bulk(self):
+        batch = [{'icao24': f'a0000{i}', 'callsign': f'NEW{i}', 'registration': f'9Q-N{i}'} for i in range(5)]
+
+        flights, statements = self._statements(lambda: self.resolver.resolve(batch, now=NOW))
+
+        self.assertEqual([f.callsign for f in flights], [f'NEW{i}' for i in range(5)])
+        self.assertTrue(all(f.aircraft.icao24 == f'a0000{i}' for i, f in enumerate(flights)))
+        self.assertEqual(len([s for s in statements if s.startswith('INSERT INTO AIRCRAFT')]), 1)
+        # Ids in row order: one statement on PostgreSQL, one per row on SQLite
+        expected = 1 if db.engine.dialect.name == 'postgresql' else len(batch)
+        self.assertEqual(len([s for s in statements if s.startswith('INSERT INTO FLIGHTS')]), expected)
+        self.assertEqual(Flight.query.filter(Flight.flight_date == NOW.date()).count(), 6)
+
+    def test_new_flights_sharing_a_callsign_keep_their_aircraft(self):
+        batch = [{'icao24': 'a00041', 'callsign': 'SHARED1', 'flight_iata': 'SH1'},
+                 {'icao24': 'a00042', 'callsign': 'SHARED1', 'flight_iata': 'SH2'}]
+        flights = self.resolver.resolve(batch, now=NOW)
+
+        self.assertNotEqual(flights[0].id, flights[1].id)
+        self.assertEqual([(f.aircraft.icao24, f.flight_iata) for f in flights], [('a00041', 'SH1'), ('a00042', 'SH2')])
+
+    def test_registration_conflict_is_not_retried(self):
+        record = {'icao24': 'a00051', 'callsign': 'DUP1', 'registration': '9Q-CHC'}
+        with self.assertLogs('services.flight_identity', level='WARNING') as logs:
+            flight = self.resolver.resolve([record], now=NOW)[0]
+        self.assertIn('a00051 (9Q-CHC)', logs.output[0])
+        self.assertIsNone(flight.aircraft_id)
+        db.session.commit()
+
+        _, statements = self._statements(lambda: self.resolver.resolve([record], now=NOW))
+        self.assertFalse([s for s in statements if s.startswith('INSERT INTO AIRCRAFT')])
+
+    def test_aircraft_loaded_with_the_flights(self):
+        db.session.add(Flight(callsign='BARE1', flight_date=NOW.date()))
+        db.session.commit()
+        batch = [{'icao24': '04c1d2', 'callsign': 'ETH801'}, {'icao24': 'a00031', 'callsign': 'BARE1'}]
+        flights = self.resolver.resolve(batch, now=NOW)
+
+        # What process_landing_batch reads for a new landing costs no query
+        registrations, statements = self._statements(lambda: [f.aircraft and f.aircraft.registration for f in flights])
+        self.assertEqual(statements, [])
+        self.assertEqual(registrations[0], '9Q-CHC')
+        # A flight created without aircraft gets the one of its record
+        self.assertEqual(flights[1].aircraft.icao24, 'a00031')
+
+    def test_known_aircraft_resolve_from_memory(self):
+        batch = [{'icao24': '04c1d2', 'callsign': 'ETH801'}, {'icao24': 'a00001', 'callsign': 'NEW1'}]
+        self.resolver.resolve(batch, now=NOW)
+        db.session.commit()
+
+        flights, statements = self._statements(lambda: self.resolver.resolve(batch, now=NOW))
+
+        # Only the load of the resolved rows
+        self.assertEqual(len(statements), 1)
+        self.assertIn('WHERE FLIGHTS.ID IN', statements[0])
+        self.assertEqual(flights[0].id, self.today.id)
+
+    def test_undated_source_keeps_yesterdays_flight_across_midnight(self):
+        late = datetime(2026, 3, 1, 23, 50)
+        first = self.resolver.resolve([{'icao24': 'a00009', 'callsign': 'NIGHT1'}], now=late)
+        db.session.commit()
+
+        after_midnight = self.resolver.resolve([{'icao24': 'a00009', 'callsign': 'NIGHT1'}],
+                                               now=datetime(2026, 3, 2, 0, 10))
+
+        self.assertEqual(after_midnight[0].id, first[0].id)
+
+    def test_long_flight_numbers_fit_their_columns(self):
+        record = {'icao24': 'a00011', 'callsign': 'LONG1', 'flight_iata': 'XY12345678901', 'flight_icao': 'XYZ123456789'}
+        first = self.resolver.resolve([record], now=NOW)[0]
+        db.session.commit()
+        self.assertEqual((first.flight_iata, first.flight_icao), ('XY12345678', 'XYZ1234567'))
+
+        # A fresh resolver finds the flight back by its stored (cut) number
+        again = FlightIdentityResolver().resolve([{'flight_iata': 'XY12345678901'}], now=NOW)[0]
+        self.assertEqual(again.id, first.id)
+
+    def test_flight_created_while_waiting_for_the_partition_is_reused(self):
+        def concurrent_resolver_commits(keys):
+            aircraft = Aircraft.query.filter_by(icao24='a00021').one()
+            db.session.add(Flight(callsign='RACE1', aircraft_id=aircraft.id, flight_date=NOW.date()))
+            db.session.flush()
+            return True
+
+        with patch.object(FlightIdentityResolver, '_lock_partitions', side_effect=concurrent_resolver_commits):
+            flight = self.resolver.resolve([{'icao24': 'a00021', 'callsign': 'RACE1'}], now=NOW)[0]
+
+        self.assertEqual(Flight.query.filter_by(callsign='RACE1').count(), 1)
+        self.assertEqual(flight.callsign, 'RACE1')
+
+    def test_records_without_identity(self):
+        self.assertEqual(self.resolver.resolve([{'callsign': ' '}], now=NOW), [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
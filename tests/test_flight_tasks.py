@@ -14,38 +14,28 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Mock modules to avoid real imports
-mock_app_module = MagicMock()
-mock_models_module = MagicMock()
+mock_worker_app_module = MagicMock()
 mock_services_module = MagicMock()
-mock_flight_tracker_module = MagicMock()
+mock_tracking_engine_module = MagicMock()
 mock_celery_app_module = MagicMock()
 
 # We need to setup the specific attributes that are imported from these modules
-mock_app = MagicMock()
-mock_app_module.app = mock_app
-
-mock_db = MagicMock()
-mock_flight = MagicMock()
-mock_flight_pos = MagicMock()
-mock_overflight = MagicMock()
-mock_landing = MagicMock()
-mock_models_module.db = mock_db
-mock_models_module.Flight = mock_flight
-mock_models_module.FlightPosition = mock_flight_pos
-mock_models_module.Overflight = mock_overflight
-mock_models_module.Landing = mock_landing
+mock_worker_context = MagicMock()
+mock_worker_app_module.worker_context = mock_worker_context
 
 mock_fetch_data = MagicMock()
 mock_services_module.fetch_external_flight_data = mock_fetch_data
 
-mock_is_point_in_rdc = MagicMock()
-mock_check_landing_events = MagicMock()
-mock_flight_tracker_module.is_point_in_rdc = mock_is_point_in_rdc
-mock_flight_tracker_module.get_rdc_boundary = MagicMock()
-mock_flight_tracker_module.check_landing_events = mock_check_landing_events
+mock_engine = MagicMock()
+mock_tracking_engine_module.tracking_engine = mock_engine
 
 # Mock celery decorator
 def mock_task_decorator(*args, **kwargs):
+    # Bare @celery.task
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+        args[0].retry = MagicMock()
+        return args[0]
+
     def decorator(f):
         f.retry = MagicMock()
         return f
@@ -60,191 +50,99 @@ class TestFlightTasksLogic(unittest.TestCase):
     def setUp(self):
         # Apply patches manually in setUp to be sure
         self.patcher = patch.dict(sys.modules, {
-            'app': mock_app_module,
-            'models': mock_models_module,
+            'worker_app': mock_worker_app_module,
             'services.api_client': mock_services_module,
-            'services.flight_tracker': mock_flight_tracker_module,
+            'services.tracking_engine': mock_tracking_engine_module,
             'celery_app': mock_celery_app_module
         })
         self.patcher.start()
+        self.gate_patcher = patch('utils.system_gate.SystemGate.is_active', return_value=True)
+        self.gate_patcher.start()
+        # No tracking worker registered: batches are processed in-process
+        self.assign_patcher = patch('services.partitioning.PartitionCoordinator.assign', return_value={})
+        self.mock_assign = self.assign_patcher.start()
 
         # Clear module cache to force reload with mocks
         if 'tasks.flight_tasks' in sys.modules:
             del sys.modules['tasks.flight_tasks']
 
-        from tasks.flight_tasks import fetch_flight_positions, check_airspace_entries, check_airport_movements
-        self.fetch_flight_positions = fetch_flight_positions
-        self.check_airspace_entries = check_airspace_entries
-        self.check_airport_movements = check_airport_movements
+        import tasks.flight_tasks as flight_tasks
+        self.flight_tasks = flight_tasks
+        self.fetch_flight_positions = flight_tasks.fetch_flight_positions
+        self.process_flight_data = flight_tasks.process_flight_data
 
         # Reset mocks
-        mock_app.reset_mock()
-        mock_db.reset_mock()
-        mock_flight.reset_mock()
-        mock_flight_pos.reset_mock()
-        mock_overflight.reset_mock()
-        mock_landing.reset_mock()
+        mock_worker_context.reset_mock()
         mock_fetch_data.reset_mock()
-        mock_is_point_in_rdc.reset_mock()
-        mock_check_landing_events.reset_mock()
+        mock_engine.reset_mock()
 
-        # Setup app context mock
-        mock_app.app_context.return_value.__enter__.return_value = None
+        # Setup worker context mock
+        mock_worker_context.return_value.__enter__.return_value = None
 
     def tearDown(self):
+        self.assign_patcher.stop()
+        self.gate_patcher.stop()
         self.patcher.stop()
 
-    def test_fetch_flight_positions_logic(self):
-        # 3 Flights from API
-        mock_fetch_data.return_value = [
+    def test_fetch_flight_positions_feeds_engine(self):
+        batch = [
             {'callsign': 'FLT1', 'latitude': 10, 'longitude': 10, 'altitude': 1000, 'heading': 100, 'ground_speed': 100},
             {'callsign': 'FLT2', 'latitude': 20, 'longitude': 20, 'altitude': 2000, 'heading': 200, 'ground_speed': 200},
-            {'callsign': 'FLT3', 'latitude': 30, 'longitude': 30, 'altitude': 3000, 'heading': 300, 'ground_speed': 300},
         ]
+        mock_fetch_data.return_value = batch
+        mock_engine.process_batch.return_value = {'status': 'success', 'positions_updated': 2}
 
-        # 2 Flights in DB (FLT3 is missing in DB)
-        f1 = MagicMock(); f1.callsign = 'FLT1'; f1.id=1
-        f2 = MagicMock(); f2.callsign = 'FLT2'; f2.id=2
-
-        # When querying filtered flights, return these two
-        # The code calls: Flight.query.filter(...).all()
-        mock_flight.query.filter.return_value.all.return_value = [f1, f2]
-
-        # Call the task
-        # Since we mocked the decorator to return the raw function, we pass mock_self manually
         mock_self = MagicMock()
         result = self.fetch_flight_positions(mock_self)
 
-        # Verifications
-
-        # 1. Verify fetch_external_flight_data called
+        # One fetch, one pass through the engine with the whole batch
         mock_fetch_data.assert_called_once()
+        mock_engine.process_batch.assert_called_once_with(batch)
+        self.assertEqual(result['positions_updated'], 2)
+        mock_self.retry.assert_not_called()
 
-        # 2. Verify Flight.query.filter called
-        # The optimized code calls filter() NOT filter_by()
-        mock_flight.query.filter.assert_called_once()
+    def test_fetch_flight_positions_publishes_for_tracking_workers(self):
+        from services.partitioning import PARTITIONS
+        batch = [{'callsign': 'FLT1', 'icao24': 'abc001', 'latitude': 0, 'longitude': 20}]
+        mock_fetch_data.return_value = batch
+        self.mock_assign.return_value = {p: ('w1' if p % 2 else 'w2', '1') for p in range(PARTITIONS)}
 
-        # 3. Verify positions created for FLT1 and FLT2 only
-        # FlightPosition(...) call count
-        self.assertEqual(mock_flight_pos.call_count, 2)
+        with patch('services.ingest_stream.IngestStream.publish', return_value=PARTITIONS) as publish:
+            result = self.fetch_flight_positions(MagicMock())
 
-        # 4. Verify DB add and commit
-        self.assertEqual(mock_db.session.add.call_count, 2)
-        mock_db.session.commit.assert_called_once()
+        # Fetching returns as soon as the batch is on the bus
+        self.assertEqual(result['status'], 'published')
+        self.assertEqual(result['workers'], 2)
+        publish.assert_called_once_with(batch, list(range(PARTITIONS)))
+        mock_engine.process_batch.assert_not_called()
 
-        # 5. Verify flight objects updated
-        self.assertEqual(f1.current_latitude, 10)
-        self.assertEqual(f2.current_latitude, 20)
+    def test_fetch_flight_positions_processes_inline_when_bus_down(self):
+        mock_fetch_data.return_value = []
+        self.mock_assign.return_value = {0: ('w1', '1')}
+        mock_engine.process_batch.return_value = {'status': 'success'}
 
-        # 6. Verify result
-        self.assertEqual(result['positions_updated'], 3)
+        with patch('services.ingest_stream.IngestStream.publish', return_value=None):
+            result = self.fetch_flight_positions(MagicMock())
 
-    def test_check_airspace_entries(self):
-        # Setup flights
-        f1 = MagicMock(id=1, callsign='F1', current_latitude=1, current_longitude=1)
-        f2 = MagicMock(id=2, callsign='F2', current_latitude=2, current_longitude=2) # Already has overflight
-        f3 = MagicMock(id=3, callsign='F3', current_latitude=3, current_longitude=3) # Outside RDC
+        self.assertEqual(result['status'], 'success')
+        mock_engine.process_batch.assert_called_once_with([])
 
-        mock_flight.query.filter.return_value.all.return_value = [f1, f2, f3]
+    def test_fetch_flight_positions_skipped_when_offline(self):
+        with patch('utils.system_gate.SystemGate.is_active', return_value=False):
+            result = self.fetch_flight_positions(MagicMock())
 
-        # Setup existing overflights
-        ovf2 = MagicMock(flight_id=2, status='active')
-        mock_overflight.query.filter.return_value.all.return_value = [ovf2]
+        self.assertEqual(result['status'], 'skipped')
+        mock_fetch_data.assert_not_called()
+        mock_engine.process_batch.assert_not_called()
 
-        # Setup is_point_in_rdc
-        # F1: inside, F2: inside, F3: outside
-        def side_effect(lat, lon):
-            if lat == 1: return True
-            if lat == 2: return True
-            if lat == 3: return False
-            return False
-        mock_is_point_in_rdc.side_effect = side_effect
+    def test_process_flight_data_single_record(self):
+        mock_engine.process_batch.return_value = {'status': 'success'}
+        record = {'callsign': 'FLT9', 'latitude': -4.3, 'longitude': 15.3}
 
-        # Call task
-        mock_self = MagicMock()
-        result = self.check_airspace_entries(mock_self)
-
-        # Verify
-        # 1. Overflight query should be called ONCE (optimization check)
-        # It calls Overflight.query.filter(Overflight.flight_id.in_(...), ...).all()
-        # So filter is called, then all()
-        self.assertTrue(mock_overflight.query.filter.called)
-
-        # 2. New overflight created for F1
-        # db.session.add called once
-        self.assertEqual(mock_db.session.add.call_count, 1)
-        # Check args
-        created_ovf = mock_db.session.add.call_args[0][0]
-        # We can check simple attributes on the mock object if constructor set them
-        # But MagicMock constructor returns a new mock, so we can't easily check attributes unless we look at call args
-        # The Overflight class is mocked, so Overflight(...) creates a mock.
-        # But we passed mock_overflight as Overflight class.
-
-        # 3. Existing overflight updated for F2?
-        # F2 is inside and has existing overflight -> nothing happens in this logic block?
-        # Wait, check logic:
-        # if is_in_rdc and not existing_overflight: create new
-        # elif not is_in_rdc and existing_overflight: close existing
-        # So for F2 (inside + existing), nothing happens.
-
-        # 4. What if F3 had existing overflight?
-        # Let's say we have F4 outside with existing overflight.
-
-        # Let's verify result dict
-        self.assertIn('F1', result['entries'])
-
-        # 5. Verify NO lookup query inside loop
-        # The code uses overflight_map.get(flight.id)
-        # If there was a query inside loop it would look like Overflight.query.filter_by(...)
-        self.assertFalse(mock_overflight.query.filter_by.called)
-
-    def test_check_airport_movements(self):
-        # Setup flights
-        f1 = MagicMock(id=1, callsign='F1', current_latitude=1, current_longitude=1, current_altitude=1000, current_speed=100)
-        f2 = MagicMock(id=2, callsign='F2', current_latitude=2, current_longitude=2, current_altitude=2000, current_speed=200)
-
-        mock_flight.query.filter.return_value.all.return_value = [f1, f2]
-
-        # Setup existing landings
-        l2 = MagicMock(flight_id=2, status='approach', created_at=100)
-        mock_landing.query.filter.return_value.all.return_value = [l2]
-
-        # Setup check_landing_events return values
-        # For F1: New landing
-        landing_res1 = MagicMock(status='approach', airport_icao='FZAA')
-        # For F2: Updated landing
-        landing_res2 = MagicMock(status='landed', airport_icao='FZAA')
-
-        mock_check_landing_events.side_effect = [landing_res1, landing_res2]
-
-        # Call task
-        mock_self = MagicMock()
-        result = self.check_airport_movements(mock_self)
-
-        # Verify
-        # 1. Landing query called ONCE (optimization)
-        self.assertTrue(mock_landing.query.filter.called)
-
-        # 2. check_landing_events called for both
-        self.assertEqual(mock_check_landing_events.call_count, 2)
-
-        # 3. Check arguments passed to check_landing_events
-        # Call 1 (F1): active_landing should be None, skip_db_lookup=True
-        args1, kwargs1 = mock_check_landing_events.call_args_list[0]
-        self.assertEqual(kwargs1.get('active_landing'), None)
-        self.assertEqual(kwargs1.get('skip_db_lookup'), True)
-
-        # Call 2 (F2): active_landing should be l2, skip_db_lookup=True
-        args2, kwargs2 = mock_check_landing_events.call_args_list[1]
-        self.assertEqual(kwargs2.get('active_landing'), l2)
-        self.assertEqual(kwargs2.get('skip_db_lookup'), True)
-
-        # 4. Result check
-        self.assertEqual(len(result['movements']), 2)
-        self.assertEqual(result['movements'][0]['callsign'], 'F1')
-        self.assertEqual(result['movements'][0]['status'], 'approach')
-        self.assertEqual(result['movements'][1]['callsign'], 'F2')
-        self.assertEqual(result['movements'][1]['status'], 'landed')
+        result = self.process_flight_data(record)
+
+        mock_engine.process_batch.assert_called_once_with([record])
+        self.assertEqual(result, {'status': 'updated', 'callsign': 'FLT9'})
 
 if __name__ == '__main__':
     unittest.main()
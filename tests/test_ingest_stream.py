@@ -0,0 +1,96 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_ingest_stream.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import json
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ingest_stream import IngestStream
+from services.partitioning import partition_for
+from utils import redis_client
+
+
+class TestIngestStream(unittest.TestCase):
+
+    def test_publish_one_capped_entry_per_partition(self):
+        r = MagicMock()
+        pipe = r.pipeline.return_value
+        record = {'icao24': 'abc001', 'callsign': 'FLT1'}
+        partition = partition_for('abc001')
+        other = (partition + 1) % 16
+
+        with patch.object(redis_client, 'get_redis', return_value=r):
+            written = IngestStream.publish([record], [partition, other])
+
+        self.assertEqual(written, 2)
+        calls = {c.args[0]: c for c in pipe.xadd.call_args_list}
+        self.assertEqual(json.loads(calls[IngestStream.stream_key(partition)].args[1]['records']), [record])
+        self.assertEqual(json.loads(calls[IngestStream.stream_key(other)].args[1]['records']), [])
+        self.assertTrue(all(c.kwargs['maxlen'] == IngestStream.MAXLEN and c.kwargs['approximate']
+                            for c in pipe.xadd.call_args_list))
+
+    def test_publish_without_redis(self):
+        with patch.object(redis_client, 'get_redis', return_value=None):
+            self.assertIsNone(IngestStream.publish([{'icao24': 'abc001'}], [0]))
+
+    def test_read_decodes_consumer_group_entries(self):
+        r = MagicMock()
+        r.xreadgroup.return_value = [
+            [b'ingest:flights:3', [(b'1-0', {b'ts': b'100.0', b'records': b'[{"icao24": "abc001"}]'})]]
+        ]
+        with patch.object(redis_client, 'get_redis', return_value=r):
+            batches = IngestStream.read('w1', [3])
+
+        self.assertEqual(batches, {3: [('1-0', 100.0, [{'icao24': 'abc001'}])]})
+        r.xreadgroup.assert_called_once_with('tracking', 'w1', {'ingest:flights:3': '>'}, count=10, block=2000)
+
+    def test_replay_pages_through_pending_and_acks_trimmed(self):
+        r = MagicMock()
+        # Two pending pages on partition 3, then nothing; 2-0 was trimmed by MAXLEN
+        r.xreadgroup.side_effect = [
+            [[b'ingest:flights:3', [(b'1-0', {b'ts': b'100.0', b'records': b'[]'}), (b'2-0', None)]]],
+            [[b'ingest:flights:3', [(b'3-0', {b'ts': b'101.0', b'records': b'[]'})]]],
+            [[b'ingest:flights:3', []]],
+        ]
+        with patch.object(redis_client, 'get_redis', return_value=r):
+            batches = IngestStream.read('w1', [3], count=2, replay=True)
+
+        self.assertEqual(batches, {3: [('1-0', 100.0, []), ('3-0', 101.0, [])]})
+        starts = [c.args[2] for c in r.xreadgroup.call_args_list]
+        self.assertEqual(starts, [{'ingest:flights:3': '0'}, {'ingest:flights:3': b'2-0'},
+                                  {'ingest:flights:3': b'3-0'}])
+        r.pipeline.return_value.xack.assert_called_once_with('ingest:flights:3', 'tracking', b'2-0')
+
+    def test_claim_scans_the_whole_pending_list(self):
+        r = MagicMock()
+        r.xautoclaim.side_effect = [[b'5-0', [b'1-0', b'2-0'], []], [b'0-0', [b'5-0'], []]]
+        with patch.object(redis_client, 'get_redis', return_value=r):
+            self.assertEqual(IngestStream.claim_abandoned('w2', [3]), 3)
+        self.assertEqual(r.xautoclaim.call_args_list[1].kwargs['start_id'], '5-0')
+
+    def test_rounds_keep_order_and_drop_stale(self):
+        now = time.time()
+        stale_ts = now - IngestStream.MAX_BATCH_AGE_SECONDS - 1
+        batches = {
+            0: [('1-0', stale_ts, ['old']), ('2-0', now, ['a1']), ('3-0', now, ['a2'])],
+            1: [('2-0', now, ['b1'])],
+        }
+
+        rounds, stale = IngestStream.rounds(batches, now=now)
+
+        self.assertEqual(stale, {0: ['1-0']})
+        self.assertEqual(rounds, [{0: ('2-0', ['a1']), 1: ('2-0', ['b1'])}, {0: ('3-0', ['a2'])}])
+
+
+if __name__ == '__main__':
+    unittest.main()
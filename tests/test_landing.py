@@ -19,12 +19,13 @@ from services.flight_tracker import check_landing_events
 
 class TestLandingLogic(unittest.TestCase):
 
+    @patch('services.flight_tracker.Overflight')
     @patch('services.flight_tracker.Flight')
     @patch('services.flight_tracker.Airport')
     @patch('services.flight_tracker.Landing')
     @patch('services.flight_tracker.TariffConfig')
     @patch('services.flight_tracker.db')
-    def test_landing_sequence(self, mock_db, mock_tariff_config, mock_landing_model, mock_airport_model, mock_flight_model):
+    def test_landing_sequence(self, mock_db, mock_tariff_config, mock_landing_model, mock_airport_model, mock_flight_model, mock_overflight_model):
         # Setup Tariff
         mock_tariff = MagicMock()
         mock_tariff.value = 100.0
@@ -0,0 +1,95 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_live_state.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.live_state import LiveStateStore, normalize_state
+from services.partitioning import PARTITIONS
+from utils import redis_client
+
+
+class TestLiveStateStore(unittest.TestCase):
+
+    def setUp(self):
+        # Exercise the in-process fallback (no Redis in tests)
+        self.patcher = patch.object(redis_client, 'get_redis', return_value=None)
+        self.patcher.start()
+        LiveStateStore.clear()
+
+        self.states = [
+            normalize_state({'icao24': 'ABC123', 'callsign': 'ACA1', 'latitude': -4.3, 'longitude': 15.4, 'altitude': 3000}, in_rdc=True, flight_id=7),
+            normalize_state({'icao24': 'def456', 'callsign': 'ETH2', 'latitude': 9.0, 'longitude': 38.7, 'altitude': 35000}),
+            normalize_state({'callsign': 'NOHEX', 'latitude': -11.5, 'longitude': 27.5, 'on_ground': True}),
+        ]
+
+    def tearDown(self):
+        LiveStateStore.clear()
+        self.patcher.stop()
+
+    def test_normalize_state(self):
+        state = self.states[0]
+        self.assertEqual(state['key'], 'abc123')
+        self.assertEqual(state['flight_id'], 7)
+        self.assertEqual(state['status'], 'approaching')
+        self.assertTrue(state['in_rdc'])
+
+        self.assertEqual(self.states[2]['key'], 'cs:NOHEX')
+        self.assertEqual(self.states[2]['status'], 'on_ground')
+
+        # No position -> not tracked
+        self.assertIsNone(normalize_state({'icao24': 'aaa111'}))
+
+    def test_cold_store(self):
+        self.assertFalse(LiveStateStore.is_warm())
+        self.assertEqual(LiveStateStore.get_snapshot(), [])
+
+    def test_snapshot_and_reads(self):
+        version = LiveStateStore.write_snapshot(self.states + [None])
+        self.assertTrue(LiveStateStore.is_warm())
+        self.assertEqual(LiveStateStore.get_meta()['version'], version)
+        self.assertEqual(len(LiveStateStore.get_snapshot()), 3)
+
+        self.assertEqual(LiveStateStore.get_aircraft('ABC123')['callsign'], 'ACA1')
+        self.assertEqual(LiveStateStore.get_aircraft('cs:NOHEX')['status'], 'on_ground')
+        self.assertIsNone(LiveStateStore.get_aircraft('zzz999'))
+
+        # RDC bounding box excludes Addis Ababa
+        in_box = LiveStateStore.query_bbox(-14.0, 6.0, 12.0, 32.0)
+        self.assertEqual(sorted(s['key'] for s in in_box), ['abc123', 'cs:NOHEX'])
+
+    def test_empty_snapshot_is_cold(self):
+        LiveStateStore.write_snapshot(self.states)
+        LiveStateStore.write_snapshot([])
+        self.assertFalse(LiveStateStore.is_warm())
+        self.assertEqual(LiveStateStore.get_snapshot(), [])
+
+    def test_snapshot_replaces_previous(self):
+        LiveStateStore.write_snapshot(self.states)
+        LiveStateStore.write_snapshot(self.states[:1])
+        self.assertEqual([s['key'] for s in LiveStateStore.get_snapshot()], ['abc123'])
+
+    def test_snapshot_and_clear_drop_the_partition_keys(self):
+        r = MagicMock()
+        partition_keys = [f"{LiveStateStore.PARTITION_PREFIX}{p}" for p in range(PARTITIONS)]
+        with patch.object(redis_client, 'get_redis', return_value=r):
+            LiveStateStore.write_snapshot(self.states)
+            r.pipeline.return_value.delete.assert_any_call(*partition_keys)
+
+            LiveStateStore.clear()
+            deleted = r.delete.call_args.args
+        self.assertIn(LiveStateStore.HASH_KEY, deleted)
+        self.assertEqual(list(deleted[-PARTITIONS:]), partition_keys)
+
+
+if __name__ == '__main__':
+    unittest.main()
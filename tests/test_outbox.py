@@ -0,0 +1,135 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_outbox.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta
+
+os.environ['DISABLE_POSTGIS'] = '1'
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from models import db, OutboxEvent, Landing
+from services import outbox
+
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret'
+    db.init_app(app)
+    return app
+
+
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_test_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.telegram = MagicMock()
+        self.invoice = MagicMock()
+        self.handlers = patch.dict(outbox._HANDLERS, {
+            'telegram.entry': self.telegram,
+            'invoice.auto': self.invoice
+        })
+        self.handlers.start()
+
+    def tearDown(self):
+        self.handlers.stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_events_are_delivered_once_committed(self):
+        outbox.enqueue('telegram.entry', flight_id=1)
+        db.session.rollback()
+        self.assertEqual(outbox.drain()['claimed'], 0)
+
+        outbox.enqueue('telegram.entry', flight_id=1)
+        db.session.commit()
+        stats = outbox.drain()
+
+        self.assertEqual(stats['done'], 1)
+        self.telegram.assert_called_once_with({'flight_id': 1})
+        self.assertEqual(OutboxEvent.query.one().status, 'done')
+        # Nothing left to deliver
+        self.assertEqual(outbox.drain()['claimed'], 0)
+
+    def test_auto_invoice_batched_per_flight(self):
+        for _ in range(3):
+            outbox.enqueue('invoice.auto', flight_id=7)
+        outbox.enqueue('invoice.auto', flight_id=8)
+        db.session.commit()
+
+        stats = outbox.drain()
+
+        self.assertEqual(stats['done'], 4)
+        self.assertEqual(self.invoice.call_count, 2)
+
+    def test_deferred_auto_invoice_does_not_cover_the_flight(self):
+        # First event left to the active landing, second one unconditional
+        db.session.add(Landing(flight_id=7, airport_icao='FZAA', status='parking'))
+        outbox.enqueue('invoice.auto', flight_id=7, unless_landing_active=True)
+        outbox.enqueue('invoice.auto', flight_id=7)
+        outbox.enqueue('invoice.auto', flight_id=7)
+        db.session.commit()
+
+        with patch.dict(outbox._HANDLERS, {'invoice.auto': outbox._auto_invoice}), \
+                patch('services.invoice_generator.trigger_auto_invoice') as trigger:
+            stats = outbox.drain()
+
+        self.assertEqual(stats['done'], 3)
+        trigger.assert_called_once_with(7)
+
+    def test_failure_is_retried_with_backoff_then_given_up(self):
+        self.telegram.side_effect = RuntimeError('telegram down')
+        outbox.enqueue('telegram.entry', flight_id=1)
+        db.session.commit()
+
+        stats = outbox.drain()
+        event = OutboxEvent.query.one()
+        self.assertEqual(stats['retried'], 1)
+        self.assertEqual(event.status, 'pending')
+        self.assertGreater(event.available_at, datetime.utcnow())
+        self.assertIn('telegram down', event.last_error)
+
+        # Not due yet
+        self.assertEqual(outbox.drain()['claimed'], 0)
+
+        for _ in range(outbox.MAX_ATTEMPTS):
+            event.available_at = datetime.utcnow() - timedelta(seconds=1)
+            db.session.commit()
+            outbox.drain()
+        self.assertEqual(OutboxEvent.query.one().status, 'failed')
+
+    def test_stale_claim_is_redelivered(self):
+        outbox.enqueue('telegram.entry', flight_id=1)
+        db.session.commit()
+        outbox.claim_batch()
+
+        # A consumer that died mid-batch leaves the event in 'processing'
+        self.assertEqual(outbox.drain()['claimed'], 0)
+        event = OutboxEvent.query.one()
+        event.claimed_at = datetime.utcnow() - timedelta(seconds=outbox.CLAIM_TIMEOUT_SECONDS + 1)
+        db.session.commit()
+
+        self.assertEqual(outbox.drain()['done'], 1)
+        self.telegram.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_overflight_stats.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from algorithms.overflight_stats import OverflightAccumulator, haversine_km, KM_TO_NM
+
+
+class TestOverflightAccumulator(unittest.TestCase):
+
+    def test_running_metrics(self):
+        acc = OverflightAccumulator()
+        acc.add_fix(0.0, 20.0, 35000, 440, zones=('FIR Kinshasa',))
+        acc.add_fix(0.0, 21.0, 33000, 460, zones=('FIR Kinshasa', 'TMA Kisangani'))
+        acc.add_fix(0.0, 22.0, 37000, None)
+
+        self.assertAlmostEqual(acc.distance_km, 2 * haversine_km(0.0, 20.0, 0.0, 21.0), places=6)
+        self.assertEqual(acc.min_altitude, 33000)
+        self.assertEqual(acc.max_altitude, 37000)
+        self.assertEqual(acc.avg_speed, 450.0)
+        self.assertEqual(acc.position_count, 3)
+        self.assertEqual(acc.zones, ['FIR Kinshasa', 'TMA Kisangani'])
+
+    def test_apply_to_overflight(self):
+        acc = OverflightAccumulator()
+        acc.add_fix(0.0, 20.0, 35000, 450, zones=('FIR Kinshasa',))
+        acc.add_fix(1.0, 20.0, 35000, 450)
+        overflight = SimpleNamespace(distance_km=5.0, distance_nm=2.7)
+
+        acc.apply_to(overflight)
+
+        self.assertAlmostEqual(overflight.distance_km, 111.19, places=1)
+        self.assertAlmostEqual(overflight.distance_nm, overflight.distance_km * KM_TO_NM)
+        self.assertEqual(overflight.position_count, 2)
+        self.assertEqual(overflight.fir_crossed, 'FIR Kinshasa')
+
+    def test_single_fix_keeps_straight_line_distance(self):
+        acc = OverflightAccumulator()
+        acc.add_fix(0.0, 20.0, 35000, 450)
+        overflight = SimpleNamespace(distance_km=5.0, distance_nm=2.7)
+
+        acc.apply_to(overflight)
+
+        self.assertEqual(overflight.distance_km, 5.0)
+        self.assertEqual(overflight.position_count, 1)
+
+    def test_rebuild_from_positions(self):
+        positions = [SimpleNamespace(latitude=0.0, longitude=20.0 + i, altitude=30000 + i * 1000, ground_speed=400)
+                     for i in range(3)]
+        acc = OverflightAccumulator.from_positions(positions)
+
+        self.assertEqual(acc.position_count, 3)
+        self.assertEqual(acc.max_altitude, 32000)
+        self.assertEqual((acc.last_lat, acc.last_lon), (0.0, 22.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
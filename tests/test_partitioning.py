@@ -0,0 +1,95 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_partitioning.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.live_state import LiveStateStore
+from services.partitioning import PARTITIONS, PartitionCoordinator, partition_for, split_batch
+from utils import redis_client
+
+
+class TestPartitioning(unittest.TestCase):
+
+    def test_split_batch_by_aircraft(self):
+        batch = [{'icao24': f'abc{i:03d}', 'callsign': f'FLT{i}'} for i in range(50)]
+        batch.append({'callsign': None})
+
+        parts = split_batch(batch)
+
+        self.assertEqual(sum(len(records) for records in parts.values()), 50)
+        for partition, records in parts.items():
+            self.assertTrue(0 <= partition < PARTITIONS)
+            self.assertTrue(all(partition_for(r['icao24']) == partition for r in records))
+
+    def test_worker_loss_only_moves_its_partitions(self):
+        workers = ['w1', 'w2', 'w3']
+        before = {p: PartitionCoordinator.owner_of(p, workers) for p in range(PARTITIONS)}
+        after = {p: PartitionCoordinator.owner_of(p, ['w1', 'w3']) for p in range(PARTITIONS)}
+
+        for partition in range(PARTITIONS):
+            if before[partition] != 'w2':
+                self.assertEqual(after[partition], before[partition])
+            else:
+                self.assertIn(after[partition], ('w1', 'w3'))
+
+    def _redis(self, workers, stored=None):
+        r = MagicMock()
+        r.zrangebyscore.return_value = [w.encode('utf-8') for w in workers]
+        r.hgetall.return_value = {str(p).encode(): v.encode() for p, v in (stored or {}).items()}
+        return r
+
+    def test_assign_keeps_ownership_token_of_unmoved_partitions(self):
+        stored = {p: f"{PartitionCoordinator.owner_of(p, ['w1', 'w2'])}|100" for p in range(PARTITIONS)}
+        r = self._redis(['w1', 'w2', 'w3'], stored)
+
+        with patch.object(redis_client, 'get_redis', return_value=r):
+            assignment = PartitionCoordinator.assign()
+
+        self.assertEqual(len(assignment), PARTITIONS)
+        for partition, (owner, since) in assignment.items():
+            if owner == 'w3':
+                self.assertNotEqual(since, '100')
+            else:
+                self.assertEqual(since, '100')
+        r.hset.assert_called_once()
+
+    def test_no_worker_means_local_processing(self):
+        with patch.object(redis_client, 'get_redis', return_value=self._redis([])):
+            self.assertEqual(PartitionCoordinator.assign(), {})
+        with patch.object(redis_client, 'get_redis', return_value=None):
+            self.assertEqual(PartitionCoordinator.assign(), {})
+
+
+class TestPartitionedLiveState(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_patcher = patch.object(redis_client, 'get_redis', return_value=None)
+        self.redis_patcher.start()
+        LiveStateStore.clear()
+
+    def tearDown(self):
+        LiveStateStore.clear()
+        self.redis_patcher.stop()
+
+    def test_partition_write_leaves_other_partitions(self):
+        state = lambda key: {'key': key, 'latitude': 0.0, 'longitude': 20.0}
+        LiveStateStore.write_partitions({0: [state('a'), state('b')], 1: [state('c')]})
+        LiveStateStore.write_partitions({0: [state('a')]})
+
+        keys = sorted(s['key'] for s in LiveStateStore.get_snapshot())
+        self.assertEqual(keys, ['a', 'c'])
+        self.assertEqual(LiveStateStore.get_meta()['count'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
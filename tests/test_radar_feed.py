@@ -0,0 +1,110 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_radar_feed.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.live_state import LiveStateStore, normalize_state
+from services.radar_feed import RadarFeed
+from services.radar_frames import RadarFrameEncoder
+from utils import redis_client
+
+
+class TestRadarFeed(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_patcher = patch.object(redis_client, 'get_redis', return_value=None)
+        self.redis_patcher.start()
+        LiveStateStore.clear()
+        RadarFeed.reset()
+        RadarFrameEncoder.clear()
+
+        self.emitter = MagicMock()
+        self.emitter_patcher = patch.object(RadarFeed, 'get_emitter', return_value=self.emitter)
+        self.emitter_patcher.start()
+
+        self.flights = [
+            {'id': 1, 'callsign': 'ACA1', 'in_rdc': True},
+            {'id': 2, 'callsign': 'ETH2', 'in_rdc': False},
+        ]
+
+    def tearDown(self):
+        self.emitter_patcher.stop()
+        RadarFeed.reset()
+        RadarFrameEncoder.clear()
+        LiveStateStore.clear()
+        self.redis_patcher.stop()
+
+    def emitted(self):
+        return {c.kwargs['to']: c.args[1] for c in self.emitter.emit.call_args_list}
+
+    def test_each_room_gets_its_flights(self):
+        self.assertTrue(RadarFeed.publish(self.flights, version=42))
+
+        emitted = self.emitted()
+        self.assertEqual(emitted['radar_all']['ids'], [1, 2])
+        self.assertEqual(emitted['radar_rdc']['ids'], [1])
+        self.assertEqual(emitted['radar_all']['t'], 'k')
+        self.assertEqual(emitted['radar_all']['v'], 42)
+        self.assertEqual(self.emitter.emit.call_args.args[0], 'radar_frame')
+
+    def test_resync_returns_last_pushed_picture(self):
+        self.assertIsNone(RadarFeed.resync_frame('all'))
+        RadarFeed.publish(self.flights)
+
+        frame = RadarFeed.resync_frame('rdc')
+        self.assertEqual(frame['t'], 'k')
+        self.assertEqual(frame['ids'], [1])
+
+    def test_pushes_are_throttled(self):
+        self.assertTrue(RadarFeed.publish(self.flights))
+        self.assertFalse(RadarFeed.publish(self.flights))
+        self.assertEqual(self.emitter.emit.call_count, 2)
+        self.assertEqual(RadarFeed.stats['throttled'], 1)
+
+    def test_full_picture_is_read_back_from_the_store(self):
+        LiveStateStore.write_partitions({
+            0: [normalize_state({'icao24': 'abc123', 'callsign': 'ACA1', 'latitude': -4.3, 'longitude': 15.4}, in_rdc=True)],
+            1: [normalize_state({'icao24': 'def456', 'callsign': 'ETH2', 'latitude': 9.0, 'longitude': 38.7})],
+        })
+
+        self.assertTrue(RadarFeed.publish())
+
+        emitted = self.emitted()
+        self.assertEqual(sorted(static['callsign'] for _, static in emitted['radar_all']['meta']), ['ACA1', 'ETH2'])
+        self.assertEqual(emitted['radar_all']['v'], LiveStateStore.get_meta()['version'])
+
+    def test_emit_failure_backs_off(self):
+        self.emitter.emit.side_effect = ConnectionError('queue down')
+        self.assertFalse(RadarFeed.publish(self.flights))
+        self.assertEqual(RadarFeed.stats['failed'], 1)
+        self.assertGreater(RadarFeed._emitter_down_until, 0)
+
+    def test_no_queue_no_emitter(self):
+        self.emitter_patcher.stop()
+        try:
+            with patch.dict(os.environ, {}, clear=False):
+                os.environ.pop('REDIS_URL', None)
+                self.assertIsNone(RadarFeed.get_emitter())
+                self.assertFalse(RadarFeed.publish(self.flights))
+        finally:
+            self.emitter_patcher.start()
+
+    def test_cycle_interval_covers_the_push_throttle(self):
+        # Clients fall back to polling after two silent cycles
+        with patch.object(RadarFeed, 'PUSH_INTERVAL_SECONDS', 10.0):
+            self.assertEqual(RadarFeed.cycle_interval(), 10.0)
+        self.assertEqual(RadarFeed.cycle_interval(), max(RadarFeed.CYCLE_SECONDS, RadarFeed.PUSH_INTERVAL_SECONDS))
+
+
+if __name__ == '__main__':
+    unittest.main()
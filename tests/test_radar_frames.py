@@ -0,0 +1,160 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_radar_frames.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.live_state import normalize_state
+from services.flight_tracker import format_radar_flight
+from services.radar_frames import RadarFrameEncoder, COLUMNS, msgpack, pack
+from utils import redis_client
+
+FIELDS = {'lat': 'latitude', 'lon': 'longitude', 'alt': 'altitude', 'hdg': 'heading',
+          'spd': 'ground_speed', 'vs': 'vertical_speed', 'st': 'status', 'rdc': 'in_rdc'}
+
+
+def radar_flight(icao24, callsign, lat, lon, altitude=35000, **extra):
+    data = {'icao24': icao24, 'callsign': callsign, 'latitude': lat, 'longitude': lon,
+            'altitude': altitude, 'ground_speed': 450, 'heading': 90}
+    data.update(extra)
+    return format_radar_flight(normalize_state(data, in_rdc=True))
+
+
+def apply_frame(picture, frame):
+    """What the radar client does with a frame"""
+    if frame['t'] == 'k':
+        picture = {}
+    for flight_id, meta in frame['meta']:
+        picture.setdefault(flight_id, {'id': flight_id}).update(meta)
+    for row, flight_id in enumerate(frame['ids']):
+        flight = picture.setdefault(flight_id, {'id': flight_id})
+        for c, column in enumerate(frame['cols']):
+            value = frame['data'][c][row]
+            if value is not None:
+                flight[FIELDS[column]] = value
+    for flight_id, columns in frame.get('cleared', []):
+        for column in columns:
+            picture[flight_id][FIELDS[column]] = None
+    for flight_id in frame.get('gone', []):
+        picture.pop(flight_id, None)
+    return picture
+
+
+class TestRadarFrames(unittest.TestCase):
+
+    def setUp(self):
+        self.patcher = patch.object(redis_client, 'get_redis', return_value=None)
+        self.patcher.start()
+        RadarFrameEncoder.clear()
+        self.flights = [
+            radar_flight('abc123', 'ACA1', -4.30001, 15.4),
+            radar_flight('def456', 'ETH2', 1.2, 22.0, registration='ET-AOS'),
+        ]
+
+    def tearDown(self):
+        RadarFrameEncoder.clear()
+        self.patcher.stop()
+
+    def test_first_frame_is_a_keyframe(self):
+        frame = RadarFrameEncoder.encode('all', self.flights, version=7, now=1000)
+        self.assertEqual(frame['t'], 'k')
+        self.assertEqual(frame['seq'], 1)
+        self.assertEqual(frame['cols'], COLUMNS)
+        self.assertEqual(frame['ids'], ['abc123', 'def456'])
+        # Column arrays, rounded to what the radar shows
+        self.assertEqual(frame['data'][COLUMNS.index('lat')], [-4.3, 1.2])
+        self.assertEqual(frame['data'][COLUMNS.index('alt')], [35000, 35000])
+        meta = dict(frame['meta'])
+        self.assertEqual(meta['def456']['aircraft']['registration'], 'ET-AOS')
+        self.assertNotIn('latitude', meta['abc123'])
+
+    def test_delta_carries_changed_fields_only(self):
+        RadarFrameEncoder.encode('all', self.flights, now=1000)
+        moved = [radar_flight('abc123', 'ACA1', -4.3, 15.5), self.flights[1]]
+
+        frame = RadarFrameEncoder.encode('all', moved, now=1005)
+        self.assertEqual(frame['t'], 'd')
+        self.assertEqual((frame['base'], frame['seq']), (1, 2))
+        self.assertEqual(frame['ids'], ['abc123'])
+        row = [column[0] for column in frame['data']]
+        self.assertEqual(row[COLUMNS.index('lon')], 15.5)
+        self.assertEqual([v for i, v in enumerate(row) if i != COLUMNS.index('lon')], [None] * (len(COLUMNS) - 1))
+        # Metadata already sent
+        self.assertEqual(frame['meta'], [])
+        self.assertEqual(frame['cleared'], [])
+
+    def test_field_becoming_null_is_cleared(self):
+        picture = apply_frame({}, RadarFrameEncoder.encode('all', self.flights, now=1000))
+        self.assertEqual(picture['abc123']['altitude'], 35000)
+        # Payload of an aircraft whose altitude is no longer reported
+        lost = [dict(self.flights[0], altitude=None), self.flights[1]]
+
+        frame = RadarFrameEncoder.encode('all', lost, now=1005)
+        self.assertEqual(frame['ids'], ['abc123'])
+        self.assertEqual(frame['cleared'], [['abc123', ['alt']]])
+        picture = apply_frame(picture, frame)
+        self.assertIsNone(picture['abc123']['altitude'])
+        self.assertEqual(picture['abc123']['latitude'], -4.3)
+
+    def test_delta_reports_new_and_departed_aircraft(self):
+        RadarFrameEncoder.encode('all', self.flights, now=1000)
+        newcomer = radar_flight('aaa111', 'KQA5', -1.0, 25.0)
+
+        frame = RadarFrameEncoder.encode('all', [self.flights[0], newcomer], now=1005)
+        self.assertEqual(frame['ids'], ['aaa111'])
+        self.assertEqual([flight_id for flight_id, _ in frame['meta']], ['aaa111'])
+        self.assertEqual(frame['gone'], ['def456'])
+
+    def test_client_rebuilds_the_picture(self):
+        picture = {}
+        pictures = [
+            self.flights,
+            [radar_flight('abc123', 'ACA1', -4.2, 15.6, altitude=33000), self.flights[1]],
+            [radar_flight('abc123', 'ACA1X', -4.1, 15.7, altitude=31000)],
+        ]
+        for i, flights in enumerate(pictures):
+            picture = apply_frame(picture, RadarFrameEncoder.encode('all', flights, now=1000 + i))
+
+        self.assertEqual(list(picture), ['abc123'])
+        self.assertEqual(picture['abc123']['callsign'], 'ACA1X')
+        self.assertEqual(picture['abc123']['altitude'], 31000)
+        self.assertEqual(picture['abc123']['latitude'], -4.1)
+
+    def test_keyframe_interval_and_resync(self):
+        RadarFrameEncoder.encode('all', self.flights, now=1000)
+        self.assertEqual(RadarFrameEncoder.encode('all', self.flights, now=1010)['t'], 'd')
+        late = RadarFrameEncoder.encode('all', self.flights, now=1000 + RadarFrameEncoder.KEYFRAME_INTERVAL_SECONDS)
+        self.assertEqual(late['t'], 'k')
+
+        resync = RadarFrameEncoder.keyframe('all')
+        self.assertEqual((resync['t'], resync['seq']), ('k', late['seq']))
+        self.assertIsNone(RadarFrameEncoder.keyframe('rdc'))
+
+    def test_delta_is_smaller_than_the_full_payload(self):
+        import json
+        RadarFrameEncoder.encode('all', self.flights, now=1000)
+        moved = [radar_flight('abc123', 'ACA1', -4.3, 15.5), self.flights[1]]
+        frame = RadarFrameEncoder.encode('all', moved, now=1005)
+        self.assertLess(len(json.dumps(frame)) * 3, len(json.dumps(moved)))
+
+    @unittest.skipIf(msgpack is None, 'msgpack not installed')
+    def test_msgpack_round_trip(self):
+        frame = RadarFrameEncoder.encode('all', self.flights, now=1000)
+        self.assertEqual(msgpack.unpackb(pack(frame, 'msgpack'), raw=False), frame)
+
+    def test_json_encoding_is_the_frame(self):
+        frame = RadarFrameEncoder.encode('all', self.flights, now=1000)
+        self.assertIs(pack(frame, 'json'), frame)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_radar_view.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from algorithms.grid_clustering import grid_cluster, cell_size_degrees
+from services.live_state import LiveStateStore, normalize_state
+from services.flight_tracker import format_radar_flight
+from services import radar_view
+from services.radar_view import parse_view, build_view, viewport_flights, RadarViews
+from utils import redis_client
+
+
+def flight(icao24, lat, lon, altitude=35000, in_rdc=True, **extra):
+    data = {'icao24': icao24, 'callsign': extra.pop('callsign', icao24.upper()),
+            'latitude': lat, 'longitude': lon, 'altitude': altitude}
+    data.update(extra)
+    return format_radar_flight(normalize_state(data, in_rdc=in_rdc))
+
+
+class TestGridClustering(unittest.TestCase):
+
+    def test_nearby_points_share_a_cell(self):
+        cells = grid_cluster([-4.30, -4.31, 9.0], [15.40, 15.41, 38.7], [1000, 3000, 35000], zoom=4)
+        by_count = sorted(cells, key=lambda c: c['count'])
+        self.assertEqual([c['count'] for c in by_count], [1, 2])
+        pair = by_count[1]
+        self.assertEqual(sorted(pair['members']), [0, 1])
+        self.assertAlmostEqual(pair['latitude'], -4.305)
+        self.assertEqual((pair['min_altitude'], pair['max_altitude']), (1000, 3000))
+        self.assertEqual(pair['bounds'], [-4.31, 15.40, -4.30, 15.41])
+
+    def test_cells_shrink_with_zoom(self):
+        self.assertAlmostEqual(cell_size_degrees(5), cell_size_degrees(4) / 2)
+        self.assertEqual(len(grid_cluster([1.0, 1.5], [21.0, 21.5], zoom=3)), 1)
+        self.assertEqual(len(grid_cluster([1.0, 1.5], [21.0, 21.5], zoom=10)), 2)
+        self.assertEqual(grid_cluster([], [], zoom=3), [])
+
+
+class TestRadarView(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_patcher = patch.object(redis_client, 'get_redis', return_value=None)
+        self.redis_patcher.start()
+        self.gate_patcher = patch('utils.system_gate.SystemGate.is_active', return_value=True)
+        self.gate_patcher.start()
+        LiveStateStore.clear()
+        RadarViews.clear()
+
+        self.flights = [
+            flight('aaa001', -4.30, 15.40, altitude=3000, callsign='ACA101', airline_iata='9U', airline_name='Air Congo'),
+            flight('aaa002', -4.32, 15.42, altitude=36000, callsign='ACA102', airline_iata='9U', airline_name='Air Congo'),
+            flight('bbb001', -11.6, 27.5, callsign='ETH501', airline_iata='ET'),
+            flight('ccc001', 9.0, 38.7, in_rdc=False, callsign='KQA310'),
+        ]
+
+    def tearDown(self):
+        RadarViews.clear()
+        LiveStateStore.clear()
+        self.gate_patcher.stop()
+        self.redis_patcher.stop()
+
+    def test_parse_view(self):
+        self.assertIsNone(parse_view({}))
+        view = parse_view({'bbox': '12,-14,32,6', 'zoom': '6', 'in_rdc': 'true', 'airline': ' et '})
+        self.assertEqual(view['bbox'], (-14.0, 6.0, 12.0, 32.0))
+        self.assertEqual(view['zoom'], 6)
+        self.assertTrue(view['in_rdc'])
+        self.assertEqual(view['airline'], 'ET')
+        # Wrapped world longitudes are clamped
+        self.assertEqual(parse_view({'bbox': [-200, -10, 200, 10]})['bbox'], (-10.0, 10.0, -180.0, 180.0))
+        for bad in ({'bbox': '1,2,3'}, {'bbox': 'a,b,c,d'}, {'zoom': 'x'}, {'bbox': '10,0,5,1'}):
+            with self.assertRaises(ValueError):
+                parse_view(bad)
+
+    def test_filters(self):
+        def callsigns(params):
+            return sorted(f['callsign'] for f in build_view(parse_view(params), self.flights)['flights'])
+
+        self.assertEqual(callsigns({'in_rdc': '1'}), ['ACA101', 'ACA102', 'ETH501'])
+        self.assertEqual(callsigns({'alt_min': 10000, 'alt_max': 40000}), ['ACA102', 'ETH501', 'KQA310'])
+        self.assertEqual(callsigns({'airline': 'air congo'}), ['ACA101', 'ACA102'])
+        self.assertEqual(callsigns({'airline': '9U'}), ['ACA101', 'ACA102'])
+        # ICAO airline code as callsign prefix
+        self.assertEqual(callsigns({'airline': 'KQA'}), ['KQA310'])
+
+    def test_low_zoom_is_clustered(self):
+        view = build_view(parse_view({'zoom': 4}), self.flights)
+        self.assertTrue(view['clustered'])
+        self.assertEqual(view['count'], 4)
+        self.assertEqual(len(view['clusters']), 1)
+        self.assertEqual(view['clusters'][0]['count'], 2)
+        self.assertEqual(view['clusters'][0]['in_rdc'], 2)
+        self.assertEqual(sorted(f['callsign'] for f in view['flights']), ['ETH501', 'KQA310'])
+
+    def test_high_zoom_lists_aircraft_until_too_many(self):
+        view = build_view(parse_view({'zoom': 9}), self.flights)
+        self.assertFalse(view['clustered'])
+        self.assertEqual(len(view['flights']), 4)
+
+        with patch.object(radar_view, 'MAX_VIEW_FLIGHTS', 3):
+            view = build_view(parse_view({'zoom': 5}), self.flights)
+        self.assertTrue(view['clustered'])
+        self.assertEqual(view['count'], 4)
+
+    def test_viewport_reads_the_live_state(self):
+        LiveStateStore.write_snapshot([
+            normalize_state({'icao24': 'aaa001', 'latitude': -4.3, 'longitude': 15.4}, in_rdc=True),
+            normalize_state({'icao24': 'ccc001', 'latitude': 9.0, 'longitude': 38.7}),
+        ])
+        inside = viewport_flights(parse_view({'bbox': '12,-14,32,6'}))
+        self.assertEqual([f['id'] for f in inside], ['aaa001'])
+
+    def test_identical_views_are_computed_once(self):
+        LiveStateStore.write_snapshot([
+            normalize_state({'icao24': 'aaa001', 'latitude': -4.3, 'longitude': 15.4}, in_rdc=True),
+        ])
+        view = parse_view({'bbox': '12,-14,32,6', 'zoom': 8})
+        RadarViews.subscribe('sid-1', view)
+        RadarViews.subscribe('sid-2', dict(view))
+        RadarViews.subscribe('sid-3', parse_view({'zoom': 3}))
+        emit = MagicMock()
+
+        with patch.object(radar_view, 'build_view', wraps=build_view) as builder:
+            self.assertEqual(RadarViews.push(emit), 2)
+        self.assertEqual(builder.call_count, 2)
+        self.assertEqual(sorted(c.kwargs['to'] for c in emit.call_args_list), ['sid-1', 'sid-2', 'sid-3'])
+
+        # Same live version: nothing to send
+        self.assertEqual(RadarViews.push(emit), 0)
+
+        RadarViews.unsubscribe('sid-3')
+        self.assertEqual(len(RadarViews.groups()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
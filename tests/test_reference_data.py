@@ -0,0 +1,153 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_reference_data.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+os.environ['DISABLE_POSTGIS'] = '1'
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import event
+from models import db, Flight, Aircraft, Airport
+from services.live_state import LiveStateStore
+from services.reference_data import ReferenceData
+from services.flight_tracker import get_active_flights, simulate_flight_positions, clear_airspace_cache
+from utils import redis_client
+
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret'
+    db.init_app(app)
+    return app
+
+
+class TestReferenceData(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_patcher = patch.object(redis_client, 'get_redis', return_value=None)
+        self.redis_patcher.start()
+        ReferenceData.clear()
+
+        self.app = create_test_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.add_all([
+            Airport(icao_code='FZAA', name="N'Djili", country='RDC', latitude=-4.3858, longitude=15.4446),
+            Airport(icao_code='FZQA', name='Lubumbashi', country='RDC', latitude=-11.5913, longitude=27.5309),
+        ])
+        now = datetime.utcnow()
+        for i in range(50):
+            aircraft = Aircraft(icao24=f'a{i:05d}', registration=f'9S-T{i:02d}', model='B737', operator='CAA')
+            db.session.add(aircraft)
+            db.session.add(Flight(
+                callsign=f'SIM{i:03d}', aircraft=aircraft, departure_icao='FZAA', arrival_icao='FZQA',
+                flight_status='on_ground' if i % 10 == 0 else 'in_flight',
+                scheduled_departure=now - timedelta(hours=1), scheduled_arrival=now + timedelta(hours=1)
+            ))
+        db.session.commit()
+        ReferenceData.clear()
+
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def tearDown(self):
+        event.remove(db.engine, 'before_cursor_execute', self._count)
+        ReferenceData.clear()
+        self.redis_patcher.stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def poll(self):
+        self.statements = []
+        flights = get_active_flights(use_external_api=False, use_live_state=False)
+        return flights, [s for s in self.statements if 'system_configs' not in s]
+
+    def test_empty_live_snapshot_serves_the_fallback(self):
+        # Ingestion running without any source: every cycle writes an empty picture
+        LiveStateStore.clear()
+        LiveStateStore.write_snapshot([])
+        try:
+            flights = get_active_flights(use_external_api=False)
+        finally:
+            LiveStateStore.clear()
+            clear_airspace_cache()
+        self.assertEqual(len(flights), 50)
+
+    def test_fallback_radar_costs_one_flight_query_per_poll(self):
+        flights, statements = self.poll()
+        self.assertEqual(len(flights), 50)
+        # Flights, then airports, aircraft and the RDC boundary loaded once
+        self.assertEqual(len(statements), 4)
+
+        flights, statements = self.poll()
+        self.assertEqual(len(statements), 1)
+        self.assertIn('FROM flights', statements[0])
+
+        ground = [f for f in flights if f['status'] == 'on_ground']
+        self.assertEqual(len(ground), 5)
+        self.assertEqual((ground[0]['latitude'], ground[0]['longitude']), (-11.5913, 27.5309))
+        by_callsign = {f['callsign']: f for f in flights}
+        self.assertEqual(by_callsign['SIM001']['aircraft']['registration'], '9S-T01')
+
+    def test_batch_simulation_follows_the_route(self):
+        airborne = Flight.query.filter_by(flight_status='in_flight').all()
+        self.statements = []
+        positions = simulate_flight_positions(airborne)
+        self.assertEqual(len(positions), 45)
+        for lat, lon, altitude, heading, speed in positions:
+            # Half-way between Kinshasa and Lubumbashi, heading south-east
+            self.assertAlmostEqual(lat, (-4.3858 - 11.5913) / 2, delta=0.1)
+            self.assertAlmostEqual(lon, (15.4446 + 27.5309) / 2, delta=0.1)
+            self.assertEqual(altitude, 35000)
+            self.assertTrue(90 < heading < 180)
+        self.assertEqual(len([s for s in self.statements if 'FROM airports' in s]), 1)
+
+    def test_committed_change_reloads_the_registry(self):
+        self.assertIsNone(ReferenceData.airport('FZKA'))
+        loads = ReferenceData.stats['airport_loads']
+
+        db.session.add(Airport(icao_code='FZKA', name='Bunia', country='RDC', latitude=1.56, longitude=30.22))
+        db.session.commit()
+
+        self.assertEqual(ReferenceData.airport('FZKA')['name'], 'Bunia')
+        self.assertEqual(ReferenceData.stats['airport_loads'], loads + 1)
+
+        # Unrelated commits keep the registry
+        flight = Flight.query.first()
+        flight.callsign = 'SIM999'
+        db.session.commit()
+        ReferenceData.airport('FZKA')
+        self.assertEqual(ReferenceData.stats['airport_loads'], loads + 1)
+
+    def test_rolled_back_change_keeps_the_registry(self):
+        ReferenceData.airports()
+        db.session.add(Airport(icao_code='FZKA', name='Bunia', country='RDC', latitude=1.56, longitude=30.22))
+        db.session.flush()
+        db.session.rollback()
+        ReferenceData.airports()
+        self.assertEqual(ReferenceData.stats['airport_loads'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
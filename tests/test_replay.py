@@ -0,0 +1,184 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_replay.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import json
+import unittest
+from datetime import datetime, timedelta
+
+os.environ['DISABLE_POSTGIS'] = '1'
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import event
+from models import db, FlightPosition, position_time_bucket
+from services.replay import (
+    ReplaySessions, parse_instant, parse_window, parse_stream, play, replay_state, fixes_around,
+    FRAME_EVENT, END_EVENT, MAX_WINDOW_SECONDS
+)
+from routes.radar import api_replay
+
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret'
+    db.init_app(app)
+    return app
+
+
+T0 = datetime(2026, 3, 1, 12, 0, 0)
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        ReplaySessions.clear()
+        self.app = create_test_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # Aircraft 1: fixes at T0 and T0+60s, heading east
+        # Aircraft 2: one fix at T0, flying north at 360 kts (dead-reckoned after it)
+        # Aircraft 3: first seen at T0+90s
+        db.session.add_all([
+            FlightPosition(flight_id=1, icao24='aaa001', callsign='ACA1', latitude=-4.0, longitude=20.0,
+                           altitude=30000, heading=350, ground_speed=400, timestamp=T0),
+            FlightPosition(flight_id=1, icao24='aaa001', callsign='ACA1', latitude=-4.0, longitude=21.0,
+                           altitude=32000, heading=10, ground_speed=420, timestamp=T0 + timedelta(seconds=60)),
+            FlightPosition(flight_id=2, icao24='aaa002', callsign='ACA2', latitude=-5.0, longitude=22.0,
+                           altitude=35000, heading=0, ground_speed=360, timestamp=T0),
+            FlightPosition(flight_id=3, icao24='aaa003', callsign='ACA3', latitude=-6.0, longitude=23.0,
+                           altitude=35000, heading=0, ground_speed=360, timestamp=T0 + timedelta(seconds=90)),
+            # Far from the replayed instant
+            FlightPosition(flight_id=4, icao24='aaa004', callsign='ACA4', latitude=-7.0, longitude=24.0,
+                           timestamp=T0 - timedelta(hours=3)),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        ReplaySessions.clear()
+
+    def test_bucket_filled_on_insert(self):
+        position = FlightPosition.query.filter_by(flight_id=1).order_by(FlightPosition.timestamp).first()
+        self.assertEqual(position.time_bucket, position_time_bucket(T0))
+
+    def test_state_interpolated_between_fixes(self):
+        states = {s['callsign']: s for s in replay_state(T0 + timedelta(seconds=15), window=120)}
+        self.assertEqual(set(states), {'ACA1', 'ACA2'})
+
+        aca1 = states['ACA1']
+        self.assertEqual(aca1['mode'], 'interpolated')
+        self.assertAlmostEqual(aca1['longitude'], 20.25)
+        self.assertAlmostEqual(aca1['altitude'], 30500)
+        # 350 -> 10 goes through north
+        self.assertAlmostEqual(aca1['heading'], 355)
+
+    def test_state_dead_reckoned_after_the_last_fix(self):
+        aca2 = {s['callsign']: s for s in replay_state(T0 + timedelta(seconds=60), window=120)}['ACA2']
+        self.assertEqual(aca2['mode'], 'projected')
+        # 360 kts north for one minute: 6 NM, 0.1 degree of latitude
+        self.assertAlmostEqual(aca2['latitude'], -4.9, places=2)
+        self.assertAlmostEqual(aca2['longitude'], 22.0, places=5)
+        self.assertEqual(aca2['fix_age'], 60)
+
+    def test_frame_reads_its_buckets_only(self):
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, params, *args: statements.append((statement, params)))
+        replay_state(T0, window=60)
+        statement, params = statements[-1]
+        self.assertIn('time_bucket BETWEEN', statement)
+        self.assertIn(position_time_bucket(T0 - timedelta(seconds=60)), params)
+
+    def test_replay_endpoint(self):
+        view = api_replay.__wrapped__
+        with self.app.test_request_context(f'/radar/api/replay?t={T0.isoformat()}Z&window=30'):
+            data = json.loads(view().get_data())
+        self.assertEqual(data['window'], 30)
+        self.assertEqual(sorted(f['callsign'] for f in data['flights']), ['ACA1', 'ACA2'])
+
+        with self.app.test_request_context('/radar/api/replay?t=yesterday'):
+            _, status = view()
+        self.assertEqual(status, 400)
+
+    def test_parse_instant(self):
+        self.assertEqual(parse_instant('2026-03-01T13:00:00+01:00'), T0)
+        self.assertEqual(parse_instant(str((T0 - datetime(1970, 1, 1)).total_seconds())), T0)
+
+    def test_out_of_range_values_are_rejected(self):
+        for value in ('1e20', 'inf', '-inf', 'nan', '9999-12-31T23:59:59', '0001-01-01T00:00:00+01:00'):
+            with self.assertRaises(ValueError):
+                parse_instant(value)
+        for value in ('inf', '1e400', 'nan'):
+            with self.assertRaises(ValueError):
+                parse_window(value)
+        # A large finite window is clamped before any timedelta is built
+        self.assertEqual(parse_window('1e300'), MAX_WINDOW_SECONDS)
+        with self.assertRaises(ValueError):
+            fixes_around(datetime.max - timedelta(seconds=10), 60)
+        with self.assertRaises(ValueError):
+            parse_stream({'start': T0.isoformat(), 'end': (T0 + timedelta(hours=1)).isoformat(), 'step': 'inf'})
+
+        view = api_replay.__wrapped__
+        for query in ('t=1e20', 't=inf', f't={T0.isoformat()}&window=1e400'):
+            with self.app.test_request_context(f'/radar/api/replay?{query}'):
+                _, status = view()
+            self.assertEqual(status, 400, query)
+
+    def test_stream_plays_the_range(self):
+        emitted, slept = [], []
+        start, end, speed, step = parse_stream({
+            'start': T0.isoformat(), 'end': (T0 + timedelta(seconds=60)).isoformat(), 'speed': 10, 'step': 15
+        })
+        token = ReplaySessions.start('sid-1')
+        frames = play('sid-1', token, start, end, speed, step,
+                      emit=lambda event, data, to: emitted.append((event, data, to)), sleep=slept.append)
+
+        self.assertEqual(frames, 5)
+        self.assertEqual([e for e, _, _ in emitted], [FRAME_EVENT] * 5 + [END_EVENT])
+        self.assertTrue(all(to == 'sid-1' for _, _, to in emitted))
+        self.assertEqual(emitted[0][1]['t'], T0.isoformat() + 'Z')
+        # 15 s of replay per frame at 10x: 1.5 s apart
+        self.assertTrue(all(s <= 1.5 for s in slept))
+        self.assertFalse(ReplaySessions.is_current('sid-1', token))
+
+    def test_stopped_stream_ends(self):
+        emitted = []
+        start, end, speed, step = parse_stream({
+            'start': T0.isoformat(), 'end': (T0 + timedelta(minutes=10)).isoformat(), 'step': 10
+        })
+        token = ReplaySessions.start('sid-1')
+        frames = play('sid-1', token, start, end, speed, step,
+                      emit=lambda event, data, to: emitted.append(event),
+                      sleep=lambda seconds: ReplaySessions.stop('sid-1'))
+        self.assertEqual(frames, 1)
+        self.assertNotIn(END_EVENT, emitted)
+
+    def test_stream_limits(self):
+        with self.assertRaises(ValueError):
+            parse_stream({'start': T0.isoformat(), 'end': T0.isoformat()})
+        with self.assertRaises(ValueError):
+            parse_stream({'start': T0.isoformat(), 'end': (T0 + timedelta(days=2)).isoformat()})
+        # Fast replays skip instants rather than flooding the client
+        _, _, speed, step = parse_stream({'start': T0.isoformat(), 'end': (T0 + timedelta(hours=1)).isoformat(),
+                                          'speed': 100, 'step': 1})
+        self.assertEqual(step / speed, 0.25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_snapshot_cache.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from services.live_state import LiveStateStore, normalize_state
+from services.snapshot_cache import SnapshotCache, cycle_version, snapshot_response
+from utils import redis_client
+
+
+class TestSnapshotCache(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_patcher = patch.object(redis_client, 'get_redis', return_value=None)
+        self.redis_patcher.start()
+        LiveStateStore.clear()
+        SnapshotCache.clear()
+        self.build = MagicMock(return_value=[{'callsign': 'ACA1'}])
+
+    def tearDown(self):
+        SnapshotCache.clear()
+        LiveStateStore.clear()
+        self.redis_patcher.stop()
+
+    def test_built_once_per_version(self):
+        first = SnapshotCache.get('flights', 'v1', self.build)
+        again = SnapshotCache.get('flights', 'v1', self.build)
+        self.assertIs(first, again)
+        self.assertEqual(self.build.call_count, 1)
+        self.assertEqual(json.loads(first.body), [{'callsign': 'ACA1'}])
+
+        SnapshotCache.get('flights', 'v2', self.build)
+        self.assertEqual(self.build.call_count, 2)
+        self.assertEqual(SnapshotCache.stats, {'hits': 1, 'shared': 0, 'builds': 2})
+
+    def test_etag_follows_the_content(self):
+        first = SnapshotCache.get('flights', 'v1', self.build)
+        same_content = SnapshotCache.get('flights', 'v2', self.build)
+        self.assertEqual(first.etag, same_content.etag)
+
+        self.build.return_value = []
+        self.assertNotEqual(SnapshotCache.get('flights', 'v3', self.build).etag, first.etag)
+
+    def test_snapshot_shared_through_redis(self):
+        stored = {}
+        redis = MagicMock()
+        redis.hmget.side_effect = lambda key, *fields: [stored.get(key, {}).get(f) for f in fields]
+        pipe = redis.pipeline.return_value
+        pipe.hset.side_effect = lambda key, mapping: stored.setdefault(key, {}).update(
+            {k: v if isinstance(v, bytes) else str(v).encode('utf-8') for k, v in mapping.items()})
+
+        with patch.object(redis_client, 'get_redis', return_value=redis):
+            built = SnapshotCache.get('flights', 'v1', self.build)
+            # Another process: empty local memory, same Redis
+            SnapshotCache._local = {}
+            shared = SnapshotCache.get('flights', 'v1', self.build)
+
+        self.assertEqual(self.build.call_count, 1)
+        self.assertEqual((shared.etag, shared.body), (built.etag, built.body))
+        self.assertEqual(SnapshotCache.stats['shared'], 1)
+
+    def test_cycle_version_follows_the_live_picture(self):
+        self.assertTrue(cycle_version().startswith('cold-'))
+        version = LiveStateStore.write_snapshot([normalize_state({'icao24': 'abc123', 'latitude': 1.0, 'longitude': 22.0})])
+        self.assertEqual(cycle_version(), f'live-{version}')
+
+    def test_conditional_response(self):
+        app = Flask(__name__)
+        snapshot = SnapshotCache.get('flights', 'v1', self.build)
+        app.add_url_rule('/flights', 'flights', lambda: snapshot_response(snapshot))
+        client = app.test_client()
+
+        response = client.get('/flights')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['ETag'], f'"{snapshot.etag}"')
+        self.assertEqual(response.get_data(), snapshot.body)
+
+        response = client.get('/flights', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_spatial_query.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import json
+import unittest
+from datetime import datetime, timedelta
+
+# Configure environment before imports
+os.environ['DISABLE_POSTGIS'] = '1'
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from models import db, Flight, FlightPosition, Airspace
+from services.spatial_query import (
+    flights_crossing_airspace, positions_in_airspace, positions_near, positions_in_bbox
+)
+from routes.api import get_positions_near, get_airspace_crossings
+
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret'
+    db.init_app(app)
+    return app
+
+
+class TestSpatialQueryFallback(unittest.TestCase):
+    """Shapely fallback used when PostGIS is disabled"""
+
+    def setUp(self):
+        self.app = create_test_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        # Triangle-shaped restricted zone: its bounding box also covers (1.5, 0.5)
+        self.zone = Airspace(name='R-TEST', type='restricted',
+                             geom='MULTIPOLYGON(((0 0, 2 0, 0 2, 0 0)))')
+        db.session.add(self.zone)
+
+        self.inside = Flight(callsign='IN001')
+        self.outside = Flight(callsign='OUT001')
+        db.session.add_all([self.inside, self.outside])
+        db.session.flush()
+
+        t0 = datetime(2026, 1, 1, 12, 0)
+        db.session.add_all([
+            FlightPosition(flight_id=self.inside.id, callsign='IN001', latitude=0.5, longitude=0.5, altitude=30000, timestamp=t0),
+            FlightPosition(flight_id=self.inside.id, callsign='IN001', latitude=0.6, longitude=0.6, altitude=31000, timestamp=t0 + timedelta(minutes=1)),
+            FlightPosition(flight_id=self.inside.id, callsign='IN001', latitude=5.0, longitude=5.0, altitude=32000, timestamp=t0 + timedelta(minutes=30)),
+            # Within the bounding box but outside the triangle
+            FlightPosition(flight_id=self.outside.id, callsign='OUT001', latitude=1.8, longitude=1.8, altitude=20000, timestamp=t0),
+        ])
+        db.session.commit()
+        self.t0 = t0
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_positions_in_airspace(self):
+        rows = list(positions_in_airspace(self.zone.id))
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all(r['flight_id'] == self.inside.id for r in rows))
+
+        rows = list(positions_in_airspace(self.zone.id, start=self.t0 + timedelta(seconds=30)))
+        self.assertEqual(len(rows), 1)
+
+    def test_flights_crossing_airspace(self):
+        summaries = list(flights_crossing_airspace(self.zone.id))
+        self.assertEqual(len(summaries), 1)
+        summary = summaries[0]
+        self.assertEqual(summary['callsign'], 'IN001')
+        self.assertEqual(summary['position_count'], 2)
+        self.assertEqual(summary['min_altitude'], 30000)
+        self.assertEqual(summary['max_altitude'], 31000)
+
+    def test_unknown_airspace(self):
+        self.assertEqual(list(positions_in_airspace(9999)), [])
+
+    def test_positions_near(self):
+        # ~15.7 km between (0.5, 0.5) and (0.6, 0.6)
+        rows = list(positions_near(0.5, 0.5, 5000))
+        self.assertEqual([r['latitude'] for r in rows], [0.5])
+        rows = list(positions_near(0.5, 0.5, 20000))
+        self.assertEqual(len(rows), 2)
+
+    def test_positions_in_bbox(self):
+        rows = list(positions_in_bbox(1.0, 2.0, 1.0, 2.0))
+        self.assertEqual([r['callsign'] for r in rows], ['OUT001'])
+
+    def test_malformed_time_range_is_rejected(self):
+        view = get_positions_near.__wrapped__
+        with self.app.test_request_context('/api/spatial/positions/near?lat=0.5&lon=0.5&radius=20000'
+                                           '&start=2026-01-01T12:00:30Z'):
+            rows = json.loads(''.join(view().response))
+        self.assertEqual([r['latitude'] for r in rows], [0.6])
+
+        with self.app.test_request_context('/api/spatial/positions/near?lat=0.5&lon=0.5&start=last-week'):
+            _, status = view()
+        self.assertEqual(status, 400)
+
+        view = get_airspace_crossings.__wrapped__
+        with self.app.test_request_context(f'/api/spatial/airspaces/{self.zone.id}/crossings?end=2026-13-01'):
+            _, status = view(self.zone.id)
+        self.assertEqual(status, 400)
+
+    def test_out_of_range_time_bound_is_rejected(self):
+        for query in ('start=1e20', 'end=inf', 'start=-1e300'):
+            with self.app.test_request_context(f'/api/spatial/positions/near?lat=0.5&lon=0.5&{query}'):
+                _, status = get_positions_near.__wrapped__()
+            self.assertEqual(status, 400, query)
+            with self.app.test_request_context(f'/api/spatial/airspaces/{self.zone.id}/crossings?{query}'):
+                _, status = get_airspace_crossings.__wrapped__(self.zone.id)
+            self.assertEqual(status, 400, query)
+
+
+if __name__ == '__main__':
+    unittest.main()
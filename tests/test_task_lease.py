@@ -0,0 +1,134 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_task_lease.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.task_lease import TaskLease, LeaseHeartbeat, single_flight
+from utils import redis_client
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        # In-process lease (no Redis in tests)
+        self.patcher = patch.object(redis_client, 'get_redis', return_value=None)
+        self.patcher.start()
+        TaskLease.reset('job')
+
+    def tearDown(self):
+        TaskLease.reset('job')
+        self.patcher.stop()
+
+    def test_overlapping_tick_is_skipped(self):
+        results = []
+
+        @single_flight('job', ttl=30)
+        def job(task):
+            # A second tick arrives while this run is in progress
+            results.append(job(task))
+            return 'done'
+
+        self.assertEqual(job(MagicMock()), 'done')
+        self.assertEqual(results[0]['status'], 'skipped')
+
+        stats = TaskLease.get_stats('job')
+        self.assertEqual(stats['runs'], 1)
+        self.assertEqual(stats['skipped'], 1)
+        self.assertIn('last_duration', stats)
+
+    def test_lease_released_after_failure(self):
+        @single_flight('job', ttl=30)
+        def failing(task):
+            raise ValueError('boom')
+
+        with self.assertRaises(ValueError):
+            failing(MagicMock())
+        with self.assertRaises(ValueError):
+            failing(MagicMock())
+
+        stats = TaskLease.get_stats('job')
+        self.assertEqual(stats['runs'], 2)
+        self.assertEqual(stats['failures'], 2)
+
+    def test_skipped_ticks_coalesce_into_one_catch_up(self):
+        task = MagicMock()
+
+        @single_flight('job', ttl=30, coalesce=True)
+        def job(task):
+            job(task)
+            job(task)
+            return 'done'
+
+        job(task)
+
+        task.apply_async.assert_called_once()
+        self.assertEqual(TaskLease.get_stats('job')['coalesced'], 1)
+
+    def test_lag_is_recorded(self):
+        @single_flight('job', ttl=30, interval=5)
+        def job(task):
+            return 'done'
+
+        with patch('utils.task_lease.time.time', side_effect=[100.0, 100.5, 112.0, 112.5]):
+            job(MagicMock())
+            job(MagicMock())
+
+        stats = TaskLease.get_stats('job')
+        self.assertEqual(stats['lag'], 7.0)
+        self.assertEqual(stats['max_lag'], 7.0)
+
+
+class TestRedisLease(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = MagicMock()
+        self.redis.set.return_value = True
+        self.redis.eval.return_value = 1
+        self.patcher = patch.object(redis_client, 'get_redis', return_value=self.redis)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def scripts(self, script):
+        return [c.args for c in self.redis.eval.call_args_list if c.args[0] == script]
+
+    def test_lease_renewed_while_the_run_lasts(self):
+        @single_flight('job', ttl=0.03)
+        def job(task):
+            time.sleep(0.1)
+            return 'done'
+
+        self.assertEqual(job(MagicMock()), 'done')
+
+        token = self.redis.set.call_args.args[1]
+        renewals = self.scripts(TaskLease.RENEW_SCRIPT)
+        self.assertGreaterEqual(len(renewals), 2)
+        self.assertEqual(renewals[0][1:], (1, 'lease:job', token, 30))
+        # Released only if still ours, once the heartbeat has stopped
+        self.assertEqual(self.scripts(TaskLease.RELEASE_SCRIPT), [(TaskLease.RELEASE_SCRIPT, 1, 'lease:job', token)])
+        self.assertEqual(self.redis.eval.call_args.args[0], TaskLease.RELEASE_SCRIPT)
+
+    def test_heartbeat_stops_once_the_lease_is_lost(self):
+        self.redis.eval.return_value = 0
+        heartbeat = LeaseHeartbeat('job', 'token', ttl=0.03)
+        with self.assertLogs('utils.task_lease', level='WARNING'):
+            heartbeat.start()
+            time.sleep(0.1)
+        heartbeat.stop()
+        self.assertEqual(len(self.scripts(TaskLease.RENEW_SCRIPT)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
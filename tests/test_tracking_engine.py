@@ -0,0 +1,277 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_tracking_engine.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+os.environ['DISABLE_POSTGIS'] = '1'
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import event
+from models import db, Flight, FlightPosition, Overflight, Landing, Airport, OutboxEvent
+from services.flight_tracker import get_cached_rdc_airports
+from services.live_state import LiveStateStore
+from services.trail_buffer import TrailBuffer
+from services.tracking_engine import TrackingEngine
+from algorithms.dead_reckoning import PositionChangeDetector
+from utils import redis_client
+
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret'
+    db.init_app(app)
+    return app
+
+
+# Inside the RDC boundary, far from any airport
+INSIDE = {'latitude': 0.5, 'longitude': 22.0}
+# Outside the RDC (Addis Ababa area)
+OUTSIDE = {'latitude': 9.0, 'longitude': 38.7}
+
+
+def fix(callsign, position, altitude=35000, speed=450, **extra):
+    data = {'callsign': callsign, 'icao24': callsign.lower(), 'altitude': altitude,
+            'ground_speed': speed, 'heading': 90}
+    data.update(position)
+    data.update(extra)
+    return data
+
+
+class TestTrackingEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.redis_patcher = patch.object(redis_client, 'get_redis', return_value=None)
+        self.redis_patcher.start()
+        self.entry_patcher = patch('services.tracking_engine.notify_overflight_entry')
+        self.exit_patcher = patch('services.tracking_engine.notify_overflight_exit')
+        self.notify_entry = self.entry_patcher.start()
+        self.notify_exit = self.exit_patcher.start()
+        LiveStateStore.clear()
+        TrailBuffer.clear()
+
+        self.app = create_test_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.add(Airport(icao_code='FZAA', name="N'Djili", country='RDC',
+                               latitude=-4.3858, longitude=15.4446, elevation_ft=1026))
+        db.session.add_all([Flight(callsign='TST001'), Flight(callsign='TST002')])
+        db.session.commit()
+        get_cached_rdc_airports.cache_clear()
+
+        # Write every fix so assertions do not depend on timing
+        self.engine = TrackingEngine(detector=PositionChangeDetector(tolerance_m=0, max_silence_seconds=0))
+
+    def tearDown(self):
+        get_cached_rdc_airports.cache_clear()
+        self.entry_patcher.stop()
+        self.exit_patcher.stop()
+        LiveStateStore.clear()
+        TrailBuffer.clear()
+        self.redis_patcher.stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_entry_links_positions_to_new_session(self):
+        result = self.engine.process_batch([fix('TST001', INSIDE)])
+
+        self.assertEqual(result['entries'], ['TST001'])
+        overflight = Overflight.query.filter_by(status='active').one()
+        position = FlightPosition.query.one()
+        self.assertEqual(position.overflight_id, overflight.id)
+        self.assertTrue(position.is_in_rdc)
+        self.notify_entry.assert_called_once()
+        self.assertEqual(len(LiveStateStore.get_snapshot()), 1)
+
+    def test_unseen_aircraft_are_persisted(self):
+        result = self.engine.process_batch([fix('UNKNOWN', INSIDE)])
+
+        # A flight is created for the aircraft and tracked like any other
+        self.assertEqual(result['entries'], ['UNKNOWN'])
+        flight = Flight.query.filter_by(callsign='UNKNOWN').one()
+        self.assertEqual(flight.aircraft.icao24, 'unknown')
+        self.assertEqual(FlightPosition.query.filter_by(flight_id=flight.id).count(), 1)
+
+    def test_exit_closes_session_once(self):
+        self.engine.process_batch([fix('TST001', INSIDE)])
+        result = self.engine.process_batch([fix('TST001', OUTSIDE, live_updated=2)])
+        self.engine.process_batch([fix('TST001', OUTSIDE, live_updated=3)])
+
+        self.assertEqual(result['exits'], ['TST001'])
+        overflight = Overflight.query.one()
+        self.assertEqual(overflight.status, 'completed')
+        self.assertIsNotNone(overflight.distance_km)
+        self.notify_exit.assert_called_once()
+
+    def test_exit_writes_accumulated_metrics(self):
+        east = {'latitude': 0.5, 'longitude': 23.0}
+        self.engine.process_batch([fix('TST001', INSIDE, altitude=35000, speed=440)])
+        self.engine.process_batch([fix('TST001', east, altitude=37000, speed=460, live_updated=2)])
+        self.engine.process_batch([fix('TST001', OUTSIDE, live_updated=3)])
+
+        overflight = Overflight.query.one()
+        self.assertEqual(overflight.position_count, 2)
+        self.assertEqual(overflight.min_altitude, 35000)
+        self.assertEqual(overflight.max_altitude, 37000)
+        self.assertAlmostEqual(overflight.avg_speed, 450.0)
+        # Along the track: entry -> east fix -> exit fix
+        self.assertGreater(overflight.distance_km, 111.0 + 1600.0)
+
+    def test_side_effects_are_queued_in_outbox(self):
+        self.entry_patcher.stop()
+        self.exit_patcher.stop()
+        try:
+            self.engine.process_batch([fix('TST001', INSIDE)])
+            self.engine.process_batch([fix('TST001', OUTSIDE, live_updated=2)])
+        finally:
+            self.notify_entry = self.entry_patcher.start()
+            self.notify_exit = self.exit_patcher.start()
+
+        event_types = [e.event_type for e in OutboxEvent.query.order_by(OutboxEvent.id)]
+        self.assertEqual(event_types, ['telegram.entry', 'billing.notify', 'telegram.exit', 'invoice.auto'])
+
+    def test_known_aircraft_do_not_reload_sessions(self):
+        self.engine.process_batch([fix('TST001', INSIDE), fix('TST002', OUTSIDE)])
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            self.engine.process_batch([fix('TST001', INSIDE, live_updated=2), fix('TST002', OUTSIDE, live_updated=2)])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        session_reads = [s for s in statements
+                         if s.lstrip().upper().startswith('SELECT') and ('FROM overflights' in s or 'FROM landings' in s)]
+        self.assertEqual(session_reads, [])
+        self.assertEqual(Overflight.query.count(), 1)
+
+    def test_entries_of_a_cycle_use_one_insert(self):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = self.engine.process_batch([fix('TST001', INSIDE), fix('TST002', INSIDE)])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(sorted(result['entries']), ['TST001', 'TST002'])
+        inserts = [s for s in statements if s.lstrip().upper().startswith('INSERT INTO OVERFLIGHTS')]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn('ON CONFLICT', inserts[0].upper())
+
+    def test_session_opened_by_another_worker_is_reused(self):
+        self.engine.process_batch([fix('TST001', OUTSIDE)])
+        # Another worker opens the session between two of our cycles
+        other = TrackingEngine(detector=PositionChangeDetector(tolerance_m=0, max_silence_seconds=0))
+        other.process_batch([fix('TST001', INSIDE)])
+        self.notify_entry.reset_mock()
+
+        result = self.engine.process_batch([fix('TST001', INSIDE, live_updated=2)])
+
+        self.assertEqual(result['entries'], [])
+        overflight = Overflight.query.filter_by(status='active').one()
+        self.assertEqual(FlightPosition.query.filter_by(overflight_id=overflight.id).count(), 2)
+        self.notify_entry.assert_not_called()
+
+    def test_one_active_session_per_flight(self):
+        from sqlalchemy.exc import IntegrityError
+        flight = Flight.query.filter_by(callsign='TST001').one()
+        for n in range(2):
+            db.session.add(Overflight(session_id=f'OVF-{n}', flight_id=flight.id, status='active'))
+        with self.assertRaises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+    def test_partition_handover_rewarms_tracks(self):
+        from services.partitioning import partition_for
+        partition = partition_for('tst001')
+        self.engine.process_batch([fix('TST001', INSIDE)], partitions={partition: '1'})
+
+        # The partition is owned elsewhere for a while and the session is closed there
+        Overflight.query.one().status = 'completed'
+        db.session.commit()
+
+        result = self.engine.process_batch([fix('TST001', INSIDE, live_updated=2)], partitions={partition: '2'})
+
+        self.assertEqual(result['entries'], ['TST001'])
+        self.assertEqual(Overflight.query.filter_by(status='active').count(), 1)
+
+    def test_cycle_picture_is_pushed_to_radar(self):
+        with patch('services.tracking_engine.RadarFeed') as feed:
+            self.engine.process_batch([fix('TST001', INSIDE), fix('TST002', OUTSIDE)])
+
+        flights, version = feed.publish.call_args.args
+        self.assertEqual(sorted(f['callsign'] for f in flights), ['TST001', 'TST002'])
+        self.assertEqual(version, LiveStateStore.get_meta()['version'])
+
+    def test_warm_from_existing_session(self):
+        self.engine.process_batch([fix('TST001', INSIDE)])
+
+        # A fresh engine (worker restart) picks the active session back up
+        engine = TrackingEngine(detector=PositionChangeDetector(tolerance_m=0, max_silence_seconds=0))
+        result = engine.process_batch([fix('TST001', INSIDE, live_updated=2)])
+
+        self.assertEqual(result['entries'], [])
+        self.assertEqual(Overflight.query.count(), 1)
+
+    @patch('services.notification_service.NotificationService.notify_billing')
+    def test_approach_starts_landing_session(self, _notify_billing):
+        approach = {'latitude': -4.3358, 'longitude': 15.4946}
+        result = self.engine.process_batch([fix('TST002', approach, altitude=3000, speed=180)])
+
+        self.assertEqual(result['movements'][0]['status'], 'approach')
+        landing = Landing.query.one()
+        self.assertEqual(landing.airport_icao, 'FZAA')
+        self.assertEqual(Flight.query.filter_by(callsign='TST002').one().flight_status, 'approaching')
+
+    @patch('services.flight_tracker.get_tariff_value', side_effect=lambda code, default=0.0: default)
+    def test_landing_sequence_one_commit_per_batch(self, _tariff):
+        airport = {'latitude': -4.3858, 'longitude': 15.4446}
+        approach = {'latitude': -4.3358, 'longitude': 15.4946}
+
+        commits = []
+        listener = lambda session: commits.append(session)
+        event.listen(db.session, 'after_commit', listener)
+        try:
+            steps = [
+                (approach, 3000, 180, 'approach'),
+                (airport, 1076, 130, 'landed'),
+                (airport, 1026, 3, 'parking'),
+                (airport, 1026, 15, 'completed'),
+            ]
+            for n, (position, altitude, speed, expected) in enumerate(steps):
+                before = len(commits)
+                result = self.engine.process_batch([fix('TST002', position, altitude=altitude, speed=speed, live_updated=n)])
+                self.assertEqual(result['movements'][0]['status'], expected)
+                self.assertEqual(len(commits) - before, 1)
+        finally:
+            event.remove(db.session, 'after_commit', listener)
+
+        landing = Landing.query.one()
+        self.assertEqual(landing.status, 'completed')
+        self.assertEqual(landing.landing_fee, 150.0)
+        # Touchdown closed the overflight opened on approach
+        self.assertEqual(Overflight.query.one().status, 'completed')
+        event_types = [e.event_type for e in OutboxEvent.query.order_by(OutboxEvent.id)]
+        self.assertEqual(event_types, ['billing.notify', 'billing.notify', 'invoice.auto'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_tracking_worker.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ['DISABLE_POSTGIS'] = '1'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.tracking_worker import TrackingWorker
+
+
+class TestTrackingWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = MagicMock()
+        self.worker = TrackingWorker('w1', MagicMock(), engine=self.engine)
+        self.worker.owned = {0: 's0', 1: 's1'}
+        self.ack = patch('services.tracking_worker.IngestStream.ack').start()
+        self.addCleanup(patch.stopall)
+
+    def test_round_is_acknowledged_after_processing(self):
+        now = time.time()
+        processed = self.worker.process({0: [('1-0', now, ['a'])], 1: [('1-0', now, ['b'])]})
+
+        self.assertEqual(processed, 1)
+        self.engine.process_batch.assert_called_once_with(['a', 'b'], partitions={0: 's0', 1: 's1'})
+        self.ack.assert_called_once_with({0: ['1-0'], 1: ['1-0']})
+
+    @patch('services.tracking_worker.db')
+    def test_failed_round_stays_pending(self, _db):
+        self.engine.process_batch.side_effect = RuntimeError('database down')
+        now = time.time()
+
+        processed = self.worker.process({0: [('1-0', now, ['a']), ('2-0', now, ['a2'])]})
+
+        self.assertEqual(processed, 0)
+        self.engine.process_batch.assert_called_once()
+        self.ack.assert_not_called()
+        self.assertTrue(self.worker.replay_pending)
+
+    @patch('services.tracking_worker.IngestStream.claim_abandoned', return_value=2)
+    @patch('services.tracking_worker.IngestStream.ensure_group')
+    @patch('utils.redis_client.get_redis')
+    @patch('services.tracking_worker.PartitionCoordinator')
+    def test_takeover_replays_abandoned_batches(self, coordinator, _redis, ensure_group, claim):
+        coordinator.HEARTBEAT_SECONDS = 5
+        coordinator.owned_by.return_value = {0: 's0', 1: 's1', 2: 's2'}
+        self.worker.replay_pending = False
+
+        self.worker._refresh_assignment()
+
+        coordinator.heartbeat.assert_called_once_with('w1')
+        claim.assert_called_once_with('w1', [2])
+        self.assertTrue(self.worker.replay_pending)
+        self.assertEqual(self.worker.owned, {0: 's0', 1: 's1', 2: 's2'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_traffic_density.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import io
+import os
+import sys
+import json
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+os.environ['DISABLE_POSTGIS'] = '1'
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import event
+from algorithms.density_grid import GRID, bin_positions, mercator_pixels, render_rgba
+from models import db, FlightPosition, TrafficDensityTile
+from services import traffic_density
+from routes.radar import api_heatmap_tile
+
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret'
+    db.init_app(app)
+    return app
+
+
+class TestDensityGrid(unittest.TestCase):
+
+    def test_tiles_partition_the_positions(self):
+        rng = np.random.default_rng(0)
+        lats = rng.uniform(-12, 4, 5000)
+        lons = rng.uniform(13, 30, 5000)
+        tiles = bin_positions(lats, lons, zoom=6)
+        self.assertEqual(sum(int(t.sum()) for t in tiles.values()), 5000)
+        for counts in tiles.values():
+            self.assertEqual(counts.shape, (GRID, GRID))
+
+    def test_binning_is_sparse_over_wide_extents(self):
+        # Opposite corners of the world at zoom 9: two tiles, not the grid spanning them
+        tiles = bin_positions([-60.0, 60.0, 60.0], [-170.0, 170.0, 170.0], zoom=9)
+        self.assertEqual(len(tiles), 2)
+        self.assertEqual(sorted(int(t.sum()) for t in tiles.values()), [1, 2])
+        self.assertEqual(bin_positions([], [], zoom=9), {})
+
+    def test_position_lands_in_its_tile_cell(self):
+        # Kinshasa at zoom 8: tile from the slippy map formula, cell from the pixel offset
+        px, py = mercator_pixels([-4.3858], [15.4446], 8)
+        tiles = bin_positions([-4.3858], [15.4446], zoom=8)
+        (x, y), counts = next(iter(tiles.items()))
+        self.assertEqual((x, y), (int(px[0] // 256), int(py[0] // 256)))
+        row, col = np.argwhere(counts)[0]
+        self.assertEqual((row, col), (int(py[0] % 256 // (256 / GRID)), int(px[0] % 256 // (256 / GRID))))
+
+    def test_render_is_transparent_without_traffic(self):
+        counts = np.zeros((GRID, GRID), dtype=np.uint32)
+        counts[10, 20] = 5
+        image = render_rgba(counts, scale=10)
+        self.assertEqual(image.shape, (256, 256, 4))
+        self.assertEqual(image[0, 0, 3], 0)
+        self.assertGreater(image[10 * 4, 20 * 4, 3], 0)
+
+
+class TestTrafficDensityAggregate(unittest.TestCase):
+
+    def setUp(self):
+        traffic_density._rendered_tile.cache_clear()
+        self.app = create_test_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.now = datetime.utcnow()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        traffic_density._rendered_tile.cache_clear()
+
+    def add_positions(self, count, lat=-4.0, lon=21.0, on_ground=False, timestamp=None):
+        db.session.add_all([
+            FlightPosition(latitude=lat + i * 0.001, longitude=lon + i * 0.001, on_ground=on_ground,
+                           timestamp=timestamp or self.now)
+            for i in range(count)
+        ])
+        db.session.commit()
+
+    def total(self, zoom):
+        return sum(t.total for t in TrafficDensityTile.query.filter_by(zoom=zoom))
+
+    def test_incremental_aggregation(self):
+        self.add_positions(100)
+        self.add_positions(20, on_ground=True)
+        first = traffic_density.aggregate()
+        self.assertEqual(first['positions'], 100)
+        self.assertEqual(self.total(traffic_density.MIN_ZOOM), 100)
+        self.assertEqual(self.total(traffic_density.MAX_ZOOM), 100)
+
+        # Only the new positions are read; the counts add up
+        self.add_positions(50)
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+        second = traffic_density.aggregate()
+        self.assertEqual(second['positions'], 50)
+        self.assertEqual(self.total(traffic_density.MIN_ZOOM), 150)
+        self.assertEqual(len([s for s in statements if 'FROM flight_positions' in s]), 1)
+
+        self.assertEqual(traffic_density.aggregate()['positions'], 0)
+        self.assertEqual(traffic_density.current_cursor(), second['cursor'])
+
+    def test_positions_committed_out_of_order(self):
+        # Ids 11-14 allocated by a transaction still open when the aggregate runs
+        db.session.add_all([FlightPosition(id=i, latitude=-4.0, longitude=21.0, on_ground=False, timestamp=self.now)
+                            for i in list(range(1, 11)) + list(range(15, 21))])
+        db.session.commit()
+        first = traffic_density.aggregate()
+        self.assertEqual((first['positions'], first['cursor']), (16, 20))
+        version = traffic_density.aggregate_version()
+
+        db.session.add_all([FlightPosition(id=i, latitude=-4.0, longitude=21.0, on_ground=False, timestamp=self.now)
+                            for i in (11, 13)])
+        db.session.commit()
+        second = traffic_density.aggregate()
+        self.assertEqual((second['late'], second['cursor']), (2, 20))
+        self.assertEqual(self.total(traffic_density.MIN_ZOOM), 18)
+        self.assertNotEqual(traffic_density.aggregate_version(), version)
+
+        # Counted once, though 12 and 14 are still awaited
+        self.assertEqual(traffic_density.aggregate()['late'], 0)
+        self.assertEqual(self.total(traffic_density.MIN_ZOOM), 18)
+
+        # A hole older than GAP_SECONDS was a rollback: no longer read
+        traffic_density.GAP_SECONDS, gap_seconds = 0, traffic_density.GAP_SECONDS
+        try:
+            traffic_density.aggregate()
+        finally:
+            traffic_density.GAP_SECONDS = gap_seconds
+        db.session.add(FlightPosition(id=12, latitude=-4.0, longitude=21.0, on_ground=False, timestamp=self.now))
+        db.session.commit()
+        self.assertEqual(traffic_density.aggregate()['late'], 0)
+
+    def test_days_are_kept_apart(self):
+        self.add_positions(10, timestamp=self.now - timedelta(days=3))
+        self.add_positions(30)
+        traffic_density.aggregate()
+        zoom = traffic_density.MIN_ZOOM
+        days = {t.day: t.total for t in TrafficDensityTile.query.filter_by(zoom=zoom)}
+        self.assertEqual(days, {(self.now - timedelta(days=3)).date(): 10, self.now.date(): 30})
+
+        (x, y) = next(iter(bin_positions([-4.0], [21.0], zoom)))
+        self.assertEqual(int(traffic_density.tile_counts(zoom, x, y, days=1).sum()), 30)
+        self.assertEqual(int(traffic_density.tile_counts(zoom, x, y, days=7).sum()), 40)
+
+    def test_tiles_served_as_png_and_json(self):
+        self.add_positions(40)
+        traffic_density.aggregate()
+        zoom = 6
+        (x, y) = next(iter(bin_positions([-4.0], [21.0], zoom)))
+        view = api_heatmap_tile.__wrapped__
+
+        with self.app.test_request_context(f'/radar/api/heatmap/{zoom}/{x}/{y}.json?days=1'):
+            response = view(zoom, x, y, 'json')
+        data = json.loads(response.get_data())
+        self.assertEqual(data['total'], 40)
+        self.assertIn('max-age=', response.headers['Cache-Control'])
+
+        with self.app.test_request_context(f'/radar/api/heatmap/{zoom}/{x}/{y}.png'):
+            response = view(zoom, x, y, 'png')
+        self.assertEqual(response.mimetype, 'image/png')
+        from PIL import Image
+        self.assertEqual(Image.open(io.BytesIO(response.get_data())).size, (256, 256))
+
+        etag = response.headers['ETag']
+        with self.app.test_request_context(f'/radar/api/heatmap/{zoom}/{x}/{y}.png',
+                                           headers={'If-None-Match': etag}):
+            self.assertEqual(view(zoom, x, y, 'png').status_code, 304)
+
+        with self.app.test_request_context('/radar/api/heatmap/1/0/0.png'):
+            _, status = view(1, 0, 0, 'png')
+        self.assertEqual(status, 404)
+
+    def test_tile_rendered_once_per_aggregate_state(self):
+        self.add_positions(10)
+        traffic_density.aggregate()
+        zoom = 5
+        (x, y) = next(iter(bin_positions([-4.0], [21.0], zoom)))
+        first = traffic_density.render_tile(zoom, x, y, fmt='json')
+        self.assertIs(traffic_density.render_tile(zoom, x, y, fmt='json'), first)
+
+        self.add_positions(10)
+        traffic_density.aggregate()
+        self.assertEqual(json.loads(traffic_density.render_tile(zoom, x, y, fmt='json')[0])['total'], 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_traffic_simulator.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from algorithms.traffic_simulator import (
+    TrafficSimulator, great_circle_distances, great_circle_points, CLIMB_RATE_FPM, DESCENT_RATE_FPM
+)
+
+AIRPORTS = [
+    ('FZAA', -4.3858, 15.4446),
+    ('FZQA', -11.5913, 27.5309),
+    ('FZNA', -1.6708, 29.2385),
+    ('FZIC', 0.5175, 25.1550),
+    ('FZWA', -6.1211, 23.5690),
+]
+
+
+class TestGreatCircle(unittest.TestCase):
+
+    def test_endpoints_and_midpoint(self):
+        lat, lon = great_circle_points([-4.3858], [15.4446], [-11.5913], [27.5309], [0.0])
+        self.assertAlmostEqual(lat[0], -4.3858, places=6)
+        self.assertAlmostEqual(lon[0], 15.4446, places=6)
+        lat, lon = great_circle_points([-4.3858], [15.4446], [-11.5913], [27.5309], [1.0])
+        self.assertAlmostEqual(lat[0], -11.5913, places=6)
+        self.assertAlmostEqual(lon[0], 27.5309, places=6)
+
+        lat, lon = great_circle_points([-4.3858], [15.4446], [-11.5913], [27.5309], [0.5])
+        to_mid = great_circle_distances([-4.3858], [15.4446], lat, lon)[0]
+        from_mid = great_circle_distances(lat, lon, [-11.5913], [27.5309])[0]
+        self.assertAlmostEqual(to_mid, from_mid, places=3)
+
+    def test_kinshasa_lubumbashi_distance(self):
+        self.assertAlmostEqual(great_circle_distances(-4.3858, 15.4446, -11.5913, 27.5309), 1550, delta=10)
+
+
+class TestTrafficSimulator(unittest.TestCase):
+
+    def setUp(self):
+        # One flight Kinshasa -> Lubumbashi, departing at t=0
+        self.sim = TrafficSimulator([-4.3858], [15.4446], [-11.5913], [27.5309], [0.0],
+                                    cruise_speeds=[450], cruise_altitudes=[35000])
+        self.duration = self.sim.durations[0]
+
+    def test_vertical_profile(self):
+        climb = self.sim.positions(300)
+        self.assertAlmostEqual(climb['altitude'][0], 300 / 60 * CLIMB_RATE_FPM)
+        self.assertEqual(climb['vertical_speed'][0], CLIMB_RATE_FPM)
+
+        cruise = self.sim.positions(self.duration / 2)
+        self.assertEqual(cruise['altitude'][0], 35000)
+        self.assertEqual(cruise['vertical_speed'][0], 0)
+        self.assertTrue(90 < cruise['heading'][0] < 180)
+
+        descent = self.sim.positions(self.duration - 600)
+        self.assertAlmostEqual(descent['altitude'][0], 600 / 60 * DESCENT_RATE_FPM)
+        self.assertEqual(descent['vertical_speed'][0], -DESCENT_RATE_FPM)
+
+    def test_short_flight_never_reaches_cruise(self):
+        sim = TrafficSimulator([-4.3858], [15.4446], [-5.0], [16.0], [0.0], cruise_altitudes=[39000])
+        top = max(sim.positions(t)['altitude'][0] for t in np.linspace(0, sim.durations[0], 200))
+        self.assertLess(top, 39000)
+        self.assertGreater(top, 0)
+
+    def test_on_ground_outside_the_flight(self):
+        before = self.sim.positions(-60)
+        self.assertFalse(before['airborne'][0])
+        self.assertEqual((before['altitude'][0], before['ground_speed'][0]), (0, 0))
+        self.assertAlmostEqual(before['latitude'][0], -4.3858, places=6)
+
+        after = self.sim.positions(self.duration + 60)
+        self.assertFalse(after['airborne'][0])
+        self.assertAlmostEqual(after['longitude'][0], 27.5309, places=6)
+
+    def test_positions_are_a_function_of_time(self):
+        first = self.sim.positions(1234.5)
+        second = self.sim.positions(1234.5)
+        for key in first:
+            np.testing.assert_array_equal(first[key], second[key])
+
+    def test_track_advances_at_cruise_speed(self):
+        a = self.sim.positions(1800)
+        b = self.sim.positions(1860)
+        moved = great_circle_distances(a['latitude'], a['longitude'], b['latitude'], b['longitude'])[0]
+        self.assertAlmostEqual(moved, 450 * 1.852 / 60, places=2)
+
+
+class TestRandomFleet(unittest.TestCase):
+
+    def test_same_seed_same_traffic(self):
+        a = TrafficSimulator.random_fleet(AIRPORTS, 200, seed=7, start=1000.0)
+        b = TrafficSimulator.random_fleet(AIRPORTS, 200, seed=7, start=1000.0)
+        self.assertEqual(a.records(1000.0), b.records(1000.0))
+        c = TrafficSimulator.random_fleet(AIRPORTS, 200, seed=8, start=1000.0)
+        self.assertNotEqual(a.records(1000.0), c.records(1000.0))
+
+    def test_routes_join_distinct_airports(self):
+        fleet = TrafficSimulator.random_fleet(AIRPORTS, 500, seed=1)
+        self.assertEqual(len(fleet), 500)
+        self.assertTrue(all(i['departure_icao'] != i['arrival_icao'] for i in fleet.identities))
+        self.assertEqual(len({i['icao24'] for i in fleet.identities}), 500)
+        self.assertTrue(np.all(fleet.distances_km >= 150))
+
+    def test_stream_emits_batches_at_the_requested_rate(self):
+        fleet = TrafficSimulator.random_fleet(AIRPORTS, 50, seed=3, start=0.0)
+        batches = list(fleet.stream(0.0, interval=2.0, count=5))
+        self.assertEqual([t for t, _ in batches], [0.0, 2.0, 4.0, 6.0, 8.0])
+
+        # Every flight is airborne at the start of the run
+        t, records = batches[0]
+        self.assertEqual(len(records), 50)
+        record = records[0]
+        for field in ('icao24', 'callsign', 'latitude', 'longitude', 'altitude', 'heading',
+                      'ground_speed', 'vertical_speed', 'departure_icao', 'arrival_icao'):
+            self.assertIn(field, record)
+        self.assertFalse(record['on_ground'])
+        self.assertEqual(record['source'], 'simulator')
+
+        # The same aircraft moved between two batches
+        later = {r['icao24']: r for r in batches[-1][1]}
+        self.assertNotEqual((record['latitude'], record['longitude']),
+                            (later[record['icao24']]['latitude'], later[record['icao24']]['longitude']))
+
+
+if __name__ == '__main__':
+    unittest.main()
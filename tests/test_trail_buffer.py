@@ -0,0 +1,105 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_trail_buffer.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+os.environ['DISABLE_POSTGIS'] = '1'
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from sqlalchemy import event
+from models import db, Flight, FlightPosition
+from services.trail_buffer import TrailBuffer, trail_point, get_trails, load_trails_from_db
+from utils import redis_client
+
+
+def create_test_app():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'test-secret'
+    db.init_app(app)
+    return app
+
+
+class TestTrailBuffer(unittest.TestCase):
+
+    def setUp(self):
+        # In-process buffers (no Redis in tests)
+        self.patcher = patch.object(redis_client, 'get_redis', return_value=None)
+        self.patcher.start()
+        TrailBuffer.clear()
+
+        self.app = create_test_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.flights = [Flight(callsign='TRL001'), Flight(callsign='TRL002')]
+        db.session.add_all(self.flights)
+        db.session.flush()
+
+        t0 = datetime(2026, 1, 1, 12, 0)
+        for flight in self.flights:
+            for i in range(5):
+                db.session.add(FlightPosition(
+                    flight_id=flight.id, latitude=-4.0 + i, longitude=15.0,
+                    altitude=1000 * i, ground_speed=400, timestamp=t0 + timedelta(seconds=i)
+                ))
+        db.session.commit()
+
+    def tearDown(self):
+        TrailBuffer.clear()
+        self.patcher.stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_ring_buffer_is_capped(self):
+        flight_id = self.flights[0].id
+        points = [(flight_id, trail_point(float(i), 0.0)) for i in range(TrailBuffer.TRAIL_LENGTH + 10)]
+        TrailBuffer.push_many(points)
+
+        trail = TrailBuffer.get_many([flight_id])[flight_id]
+        self.assertEqual(len(trail), TrailBuffer.TRAIL_LENGTH)
+        self.assertEqual(trail[0]['lat'], 10.0)
+        self.assertEqual(trail[-1]['lat'], float(TrailBuffer.TRAIL_LENGTH + 9))
+
+    def test_window_function_fallback(self):
+        trails = load_trails_from_db([f.id for f in self.flights], limit=3)
+        for flight in self.flights:
+            trail = trails[flight.id]
+            # Latest three fixes, oldest first
+            self.assertEqual([p['alt'] for p in trail], [2000, 3000, 4000])
+
+    def test_get_trails_single_query_for_cold_buffers(self):
+        warm_id, cold_id = [f.id for f in self.flights]
+        TrailBuffer.push_many([(warm_id, trail_point(1.0, 2.0, 35000))])
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            trails = get_trails([warm_id, cold_id])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(trails[warm_id][0]['alt'], 35000)
+        self.assertEqual(len(trails[cold_id]), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: test_worker_app.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+os.environ['DISABLE_POSTGIS'] = '1'
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, current_app
+from sqlalchemy import event
+from models import db, TariffConfig, Airport
+import worker_app
+from services import flight_tracker
+
+
+def create_test_app(path):
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    # A file database: the worker process drops inherited connections on start-up
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+class TestWorkerApp(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.app = create_test_app(self.db_path)
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(TariffConfig(code='LANDING_BASE', name='Landing', value=175.0, category='landing'))
+            db.session.add(Airport(icao_code='FZAA', name="N'Djili", country='RDC',
+                                   latitude=-4.3858, longitude=15.4446, elevation_ft=1026))
+            db.session.commit()
+
+        flight_tracker.CACHED_TARIFFS = None
+        flight_tracker.get_cached_rdc_airports.cache_clear()
+        self.app_patcher = patch.object(worker_app, '_app', self.app)
+        self.app_patcher.start()
+        self.gate_patcher = patch('utils.system_gate.SystemGate.is_active', return_value=True)
+        self.gate_patcher.start()
+
+    def tearDown(self):
+        worker_app.shutdown_worker_process()
+        self.gate_patcher.stop()
+        self.app_patcher.stop()
+        flight_tracker.CACHED_TARIFFS = None
+        flight_tracker.get_cached_rdc_airports.cache_clear()
+        with self.app.app_context():
+            db.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_worker_app_has_no_web_setup(self):
+        app = worker_app.create_worker_app()
+        self.assertEqual(app.blueprints, {})
+        self.assertNotIn('socketio', app.extensions)
+        self.assertIn('sqlalchemy', app.extensions)
+
+    def test_process_context_is_warm_before_first_task(self):
+        timings = worker_app.init_worker_process()
+        self.assertEqual(set(timings), {'geofence', 'airspace_zones', 'airports', 'tariffs', 'system_gate'})
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        with worker_app.worker_context():
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                self.assertIs(current_app._get_current_object(), self.app)
+                self.assertEqual(flight_tracker.get_tariff_value('LANDING_BASE', 150.0), 175.0)
+                airports, index, _ = flight_tracker.nearest_rdc_airports([-4.4], [15.4])
+                self.assertEqual(airports[index[0]]['icao_code'], 'FZAA')
+                self.assertTrue(flight_tracker.are_points_in_rdc([-4.4], [15.4])[0])
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+
+        # Everything the first tick needs was loaded at start-up
+        self.assertEqual(statements, [])
+
+    def test_temporary_context_without_worker_process(self):
+        with worker_app.worker_context() as app:
+            self.assertIs(app, self.app)
+            self.assertEqual(TariffConfig.query.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
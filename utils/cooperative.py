@@ -0,0 +1,134 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: cooperative.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Keeping the eventlet hub of the web server responsive
+The web process serves every Socket.IO client from one OS thread: anything
+that holds that thread without yielding (a C-level blocking call, a long
+computation) freezes every websocket of the process.
+
+- make_psycopg2_green() installs a psycopg2 wait callback (the psycogreen
+  technique): queries are sent asynchronously and the green thread waits for
+  the socket through the hub, so other green threads run meanwhile.
+- run_cpu_bound(fn, ...) runs CPU-heavy work (PDF layout, geometry
+  simplification) in a process pool when called under eventlet; the calling
+  green thread waits for the result without blocking the hub. Elsewhere
+  (Celery workers, scripts, tests) it simply calls fn.
+
+Functions sent to the pool must be importable module-level functions taking
+and returning picklable data; they must not use the database.
+"""
+import os
+import sys
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 0 runs CPU-bound work inline, even under eventlet
+CPU_POOL_WORKERS = int(os.environ.get('CPU_POOL_WORKERS', 2))
+# Longest wait for a pooled job before giving up on it
+CPU_POOL_TIMEOUT_SECONDS = float(os.environ.get('CPU_POOL_TIMEOUT', 120))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def eventlet_active():
+    """True in a process whose sockets are monkey patched by eventlet (the web server)"""
+    eventlet = sys.modules.get('eventlet')
+    if eventlet is None:
+        return False
+    return eventlet.patcher.is_monkey_patched('socket')
+
+
+# ----------------------------------------------------------------------
+# Database
+# ----------------------------------------------------------------------
+
+def _eventlet_wait_callback(conn, timeout=-1):
+    """Wait for a psycopg2 connection through the eventlet hub"""
+    import psycopg2
+    from psycopg2 import extensions
+    from eventlet.hubs import trampoline
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            trampoline(conn.fileno(), read=True)
+        elif state == extensions.POLL_WRITE:
+            trampoline(conn.fileno(), write=True)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def make_psycopg2_green():
+    """
+    Make psycopg2 cooperative with eventlet (call after monkey_patch(), before
+    the first connection). Returns False when not under eventlet or without
+    psycopg2.
+    """
+    if not eventlet_active():
+        return False
+    try:
+        from psycopg2 import extensions
+    except ImportError:
+        return False
+    extensions.set_wait_callback(_eventlet_wait_callback)
+    return True
+
+
+# ----------------------------------------------------------------------
+# CPU-bound work
+# ----------------------------------------------------------------------
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Spawned, not forked: a forked child would inherit the hub and its green threads
+            _pool = ProcessPoolExecutor(CPU_POOL_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+            # Registered after multiprocessing's own exit hook, so it runs first: that hook
+            # joins the workers, which only exit once the pool is shut down
+            atexit.unregister(shutdown_pool)
+            atexit.register(shutdown_pool)
+            logger.info(f"[CpuPool] Started with {CPU_POOL_WORKERS} workers")
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_cpu_bound(fn, *args, **kwargs):
+    """
+    fn(*args, **kwargs), in the process pool under eventlet. Exceptions of fn
+    are raised here; a pool broken by a dying worker is replaced for the next
+    call.
+    """
+    if CPU_POOL_WORKERS <= 0 or not eventlet_active():
+        return fn(*args, **kwargs)
+
+    from concurrent.futures.process import BrokenProcessPool
+
+    try:
+        return _get_pool().submit(fn, *args, **kwargs).result(timeout=CPU_POOL_TIMEOUT_SECONDS)
+    except BrokenProcessPool:
+        logger.error(f"[CpuPool] Worker died running {fn.__name__}, restarting the pool")
+        shutdown_pool()
+        raise
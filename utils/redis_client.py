@@ -0,0 +1,53 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: redis_client.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Process-wide Redis client shared by the live state, radar, ingestion and task
+modules. Every caller has an in-process fallback: after a failed command it
+calls mark_down(), and get_redis() returns None for REDIS_RETRY_SECONDS so a
+Redis outage costs one failed connect per period instead of one per read.
+"""
+import os
+import time
+import logging
+import threading
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# After a Redis failure, wait before trying again (avoid a connect per read)
+REDIS_RETRY_SECONDS = 30
+
+_client = None
+_down_until = 0.0
+_lock = threading.Lock()
+
+
+def get_redis():
+    """The shared client, or None while Redis is marked down"""
+    global _client
+    if time.time() < _down_until:
+        return None
+    if _client is None:
+        with _lock:
+            if _client is None:
+                redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+                try:
+                    _client = redis.from_url(redis_url)
+                except Exception as e:
+                    logger.error(f"[Redis] Failed to connect to Redis: {e}")
+                    mark_down()
+                    return None
+    return _client
+
+
+def mark_down():
+    """Record a failed Redis command: callers use their fallback for a while"""
+    global _down_until
+    _down_until = time.time() + REDIS_RETRY_SECONDS
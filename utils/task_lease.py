@@ -0,0 +1,262 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: task_lease.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+import time
+import uuid
+import logging
+import threading
+from functools import wraps
+
+from utils import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class TaskLease:
+    """
+    Single-flight guard for periodic Celery tasks.
+
+    A run holds a Redis lease (SET NX PX) for its task name; a tick that finds
+    the lease taken is skipped and counted instead of running concurrently.
+    The lease carries a TTL, renewed while the run is in progress, so a worker
+    that dies mid-run releases it on its own. Without Redis, an in-process
+    lock gives the same guarantee per worker.
+    """
+
+    KEY_PREFIX = 'lease:'
+    STATS_PREFIX = 'task:stats:'
+
+    # Delete the lease only if we still own it
+    RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    # Extend the lease only if we still own it
+    RENEW_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    _lock = threading.Lock()
+    _local_locks = {}
+    _local_stats = {}
+
+    # ------------------------------------------------------------------
+    # Lease
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def acquire(cls, name, ttl):
+        """Returns a release token, or None when another run holds the lease"""
+        token = uuid.uuid4().hex
+
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                if r.set(f"{cls.KEY_PREFIX}{name}", token, nx=True, px=int(ttl * 1000)):
+                    return token
+                return None
+            except Exception as e:
+                logger.warning(f"[TaskLease] Redis acquire failed for {name}: {e}")
+                redis_client.mark_down()
+
+        with cls._lock:
+            lock = cls._local_locks.setdefault(name, threading.Lock())
+        if lock.acquire(blocking=False):
+            return f"local:{token}"
+        return None
+
+    @classmethod
+    def renew(cls, name, token, ttl):
+        """Extend the lease of a run in progress; False once another run owns it"""
+        if token is None or token.startswith('local:'):
+            return True
+        r = redis_client.get_redis()
+        if r is None:
+            return True
+        try:
+            return bool(r.eval(cls.RENEW_SCRIPT, 1, f"{cls.KEY_PREFIX}{name}", token, int(ttl * 1000)))
+        except Exception as e:
+            logger.warning(f"[TaskLease] Redis renew failed for {name}: {e}")
+            redis_client.mark_down()
+            return True
+
+    @classmethod
+    def release(cls, name, token):
+        if token is None:
+            return
+        if token.startswith('local:'):
+            with cls._lock:
+                lock = cls._local_locks.get(name)
+            if lock is not None and lock.locked():
+                lock.release()
+            return
+
+        r = redis_client.get_redis()
+        if r is None:
+            # The TTL frees the lease
+            return
+        try:
+            r.eval(cls.RELEASE_SCRIPT, 1, f"{cls.KEY_PREFIX}{name}", token)
+        except Exception as e:
+            logger.warning(f"[TaskLease] Redis release failed for {name}: {e}")
+            redis_client.mark_down()
+
+    # ------------------------------------------------------------------
+    # Run statistics
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def record(cls, name, **fields):
+        """Update the run statistics of a task; `*_incr` fields are counters"""
+        counters = {k[:-5]: v for k, v in fields.items() if k.endswith('_incr')}
+        values = {k: v for k, v in fields.items() if not k.endswith('_incr')}
+
+        with cls._lock:
+            stats = cls._local_stats.setdefault(name, {})
+            for key, amount in counters.items():
+                stats[key] = stats.get(key, 0) + amount
+            stats.update(values)
+            if 'lag' in values:
+                stats['max_lag'] = max(stats.get('max_lag', 0), values['lag'])
+
+        r = redis_client.get_redis()
+        if r is None:
+            return
+        try:
+            key = f"{cls.STATS_PREFIX}{name}"
+            pipe = r.pipeline(transaction=False)
+            for field, amount in counters.items():
+                pipe.hincrby(key, field, amount)
+            if values:
+                pipe.hset(key, mapping=values)
+            pipe.execute()
+            if 'lag' in values:
+                current = r.hget(key, 'max_lag')
+                if current is None or float(current) < values['lag']:
+                    r.hset(key, 'max_lag', values['lag'])
+        except Exception as e:
+            logger.warning(f"[TaskLease] Redis stats write failed for {name}: {e}")
+            redis_client.mark_down()
+
+    @classmethod
+    def get_stats(cls, name):
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                raw = r.hgetall(f"{cls.STATS_PREFIX}{name}")
+                if raw:
+                    return {k.decode('utf-8'): float(v) for k, v in raw.items()}
+            except Exception as e:
+                logger.warning(f"[TaskLease] Redis stats read failed for {name}: {e}")
+                redis_client.mark_down()
+
+        with cls._lock:
+            return dict(cls._local_stats.get(name, {}))
+
+    @classmethod
+    def reset(cls, name):
+        with cls._lock:
+            cls._local_stats.pop(name, None)
+            cls._local_locks.pop(name, None)
+        r = redis_client.get_redis()
+        if r is not None:
+            try:
+                r.delete(f"{cls.KEY_PREFIX}{name}", f"{cls.STATS_PREFIX}{name}")
+            except Exception as e:
+                logger.warning(f"[TaskLease] Redis reset failed for {name}: {e}")
+                redis_client.mark_down()
+
+
+class LeaseHeartbeat:
+    """Renews a Redis lease every ttl / 3 until stopped or the lease is lost"""
+
+    def __init__(self, name, token, ttl):
+        self.name = name
+        self.token = token
+        self.ttl = ttl
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # The in-process lock has no TTL to extend
+        if self.token is None or self.token.startswith('local:'):
+            return self
+        self._thread = threading.Thread(target=self._run, name=f"lease:{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.ttl / 3):
+            if not TaskLease.renew(self.name, self.token, self.ttl):
+                logger.warning(f"[TaskLease] {self.name}: lease lost during the run")
+                return
+
+
+def single_flight(name, ttl, interval=None, coalesce=False):
+    """
+    Run the decorated task body at most once at a time across all workers.
+
+    - ttl: lease lifetime in seconds. It is renewed every ttl / 3 while the
+      run is in progress, so a long run keeps it; a crashed worker's lease
+      expires after ttl.
+    - interval: schedule period, used to report lag (how late a run starts
+      compared to the previous start + interval).
+    - coalesce: when ticks were skipped during a run, the run that finishes
+      re-enqueues one catch-up execution instead of dropping them (the task
+      must be bound).
+
+    Place it under @celery.task so retries go through the guard too.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            token = TaskLease.acquire(name, ttl)
+            if token is None:
+                TaskLease.record(name, skipped_incr=1, pending=1)
+                logger.info(f"[TaskLease] {name}: previous run still in progress, tick skipped")
+                return {'status': 'skipped', 'reason': 'Previous run in progress'}
+
+            started = time.time()
+            previous = TaskLease.get_stats(name)
+            fields = {'last_started': started, 'pending': 0}
+            if interval and previous.get('last_started'):
+                fields['lag'] = round(max(0.0, started - previous['last_started'] - interval), 3)
+            TaskLease.record(name, runs_incr=1, **fields)
+
+            heartbeat = LeaseHeartbeat(name, token, ttl).start()
+            try:
+                return f(*args, **kwargs)
+            except Exception:
+                TaskLease.record(name, failures_incr=1)
+                raise
+            finally:
+                heartbeat.stop()
+                finished = time.time()
+                TaskLease.record(name, last_finished=finished, last_duration=round(finished - started, 3))
+                TaskLease.release(name, token)
+
+                if coalesce and TaskLease.get_stats(name).get('pending') and args:
+                    task = args[0]
+                    try:
+                        TaskLease.record(name, pending=0, coalesced_incr=1)
+                        task.apply_async()
+                    except Exception as e:
+                        logger.warning(f"[TaskLease] {name}: catch-up enqueue failed: {e}")
+        return wrapper
+    return decorator
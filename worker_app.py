@@ -0,0 +1,118 @@
+"""
+/* * Nom de l'application : ATM-RDC
+ * Description : Source file: worker_app.py
+ * Produit de : MOA Digital Agency, www.myoneart.com
+ * Fait par : Aisance KALONJI, www.aisancekalonji.com
+ * Auditer par : La CyberConfiance, www.cyberconfiance.com
+ */
+"""
+"""
+Application for background processes (Celery workers, tracking workers)
+Configuration and database only: no blueprints, Socket.IO, login or the
+web start-up checks of app.create_app(), and no eventlet monkey patching.
+
+Each worker process pushes one application context when it starts
+(worker_process_init) and warms the caches of the tracking path, so the first
+tick does not pay for them. Tasks run inside worker_context(), which reuses
+that context and removes the session afterwards.
+"""
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+from flask import Flask
+
+from config.settings import config
+from models import db
+
+logger = logging.getLogger(__name__)
+
+_app = None
+_context = None
+
+
+def create_worker_app(config_name=None):
+    app = Flask(__name__)
+    app.config.from_object(config[config_name or os.environ.get('FLASK_CONFIG', 'default')])
+    db.init_app(app)
+    return app
+
+
+def get_worker_app():
+    global _app
+    if _app is None:
+        _app = create_worker_app()
+    return _app
+
+
+def init_worker_process(warm=True):
+    """Push the process-wide application context, then warm the caches"""
+    global _context
+    if _context is None:
+        # Connections inherited from the parent process must not be shared
+        app = get_worker_app()
+        with app.app_context():
+            db.engine.dispose()
+        _context = app.app_context()
+        _context.push()
+    if warm:
+        return warm_up()
+    return {}
+
+
+def shutdown_worker_process():
+    global _context
+    if _context is not None:
+        db.session.remove()
+        _context.pop()
+        _context = None
+
+
+@contextmanager
+def worker_context():
+    """Application context for one task run"""
+    if _context is not None:
+        try:
+            yield _app
+        finally:
+            # Tasks never share a session or an open transaction
+            db.session.remove()
+    else:
+        app = get_worker_app()
+        with app.app_context():
+            yield app
+
+
+def warm_up():
+    """
+    Load what the tracking path needs before the first batch: geofence and
+    airspace zones, airport index, tariff snapshot, system switch.
+    Returns the load time of each step in milliseconds.
+    """
+    from services.flight_tracker import (
+        get_rdc_boundary_geom, get_airspace_zones, get_rdc_airport_index, get_tariff_snapshot
+    )
+    from utils.system_gate import SystemGate
+
+    steps = [
+        ('geofence', get_rdc_boundary_geom),
+        ('airspace_zones', get_airspace_zones),
+        ('airports', get_rdc_airport_index),
+        ('tariffs', get_tariff_snapshot),
+        ('system_gate', SystemGate.is_active),
+    ]
+    timings = {}
+    with worker_context():
+        for name, load in steps:
+            started = time.time()
+            try:
+                load()
+            except Exception as e:
+                db.session.rollback()
+                logger.warning(f"[WorkerApp] Warm-up of {name} failed: {e}")
+                continue
+            timings[name] = round((time.time() - started) * 1000, 1)
+
+    logger.info(f"[WorkerApp] Process {os.getpid()} warmed: {timings}")
+    return timings